@@ -3,12 +3,19 @@
 # Generated by xtUML to Python Compiler
 
 from __future__ import annotations
+import argparse
+import asyncio
+import signal
 import sys
 
 # Import runtime
 from runtime.storage import ObjectStore
 from runtime.relationship import relate, unrelate, select_related, clear_relationships
 from runtime.base import RuntimeServices
+from runtime.reload import reload_models
+from runtime.memory import sample as memory_sample, format_report as memory_report
+from runtime.event_server import EventServer
+from runtime.state_machine import StateMachine
 
 # Import model classes
 from models.Product import Product
@@ -87,6 +94,8 @@ def run():
         '2': 'Payment success',
         '3': 'Payment failed',
         '4': 'Show state',
+        'r': 'Reload models',
+        'm': 'Memory report',
         'x': 'Exit'
     }
 
@@ -108,6 +117,10 @@ def run():
                 main_instance.dispatch_event('PaymentFailed')
         elif choice == '4':
             show_state()
+        elif choice == 'r':
+            reload_models()
+        elif choice == 'm':
+            print(memory_report(memory_sample()))
         elif choice == 'x':
             print('Exiting...')
             break
@@ -117,7 +130,39 @@ def run():
     print('\nSimulation selesai.')
     return instances
 
+def serve(host: str = '127.0.0.1', port: int = 8765, path: str = None, workers: int = 0, quiet: bool = False):
+    """Serve events to the demo instances over a JSON-lines socket instead of the menu"""
+    ObjectStore.clear()
+    clear_relationships()
+    instances = setup_demo_data()
+    if quiet:
+        StateMachine.log_transitions = False
+    server = EventServer(host, port, path=path, workers=workers)
+    signal.signal(signal.SIGTERM, _interrupt)
+    try:
+        asyncio.run(server.serve_forever())
+    except KeyboardInterrupt:
+        print(f"\nEvent server stopped: {server.stats()}")
+    return instances
+
+def _interrupt(signum, frame):
+    raise KeyboardInterrupt
+
+def parse_args(argv=None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description='vending_machine_qris')
+    parser.add_argument('--serve', nargs='?', const='127.0.0.1:8765', metavar='HOST:PORT',
+                        help='accept events over TCP (JSON lines) instead of the interactive menu')
+    parser.add_argument('--unix', metavar='PATH', help='accept events on a Unix socket instead of the interactive menu')
+    parser.add_argument('--workers', type=int, default=0, help='dispatch threads for the event server (0: event loop)')
+    parser.add_argument('--quiet', action='store_true', help='do not log transitions while serving')
+    return parser.parse_args(argv)
+
 if __name__ == '__main__':
+    args = parse_args(sys.argv[1:])
+    if args.serve or args.unix:
+        host, _, port = (args.serve or '').rpartition(':')
+        serve(host or '127.0.0.1', int(port or 0), path=args.unix, workers=args.workers, quiet=args.quiet)
+        sys.exit(0)
     instances = run()
     
     # Interactive mode hint
@@ -0,0 +1,226 @@
+#!/usr/bin/env python3
+# bench.py - Dispatch micro-benchmarks for the runtime and generated models
+#
+#   python bench.py                 # all benchmarks
+#   python bench.py --only purchase --iterations 20000
+#   python bench.py --only broadcast --iterations 5000    # iterations = fleet size
+#   python bench.py --only contended --threads 8          # machines on 8 threads selling one product
+#   python bench.py --save base.json                      # record a run (e.g. on the base revision)
+#   python bench.py --against base.json --tolerance 0.1   # exit 1 if any benchmark got >10% slower
+#
+# Console logging from the runtime is switched off and stdout discarded while
+# timing, so the numbers reflect dispatch cost rather than terminal I/O. The
+# gen0/1k column counts young-generation garbage collections per 1000 events:
+# objects allocated on the dispatch path that outlive their event show up there.
+#
+# Absolute ns/event figures depend on the machine and drift with its load, so
+# compare revisions by running both on the same machine in one sitting
+# (--save on one, --against on the other) rather than quoting past numbers.
+
+from __future__ import annotations
+import argparse
+import contextlib
+import gc
+import io
+import json
+import sys
+import threading
+import time
+from typing import Callable, Dict, List, Optional
+
+from runtime.base import InstanceBase
+from runtime.broadcast import broadcast
+from runtime.state_machine import StateMachine, EventPayload
+from runtime.storage import ObjectStore
+from runtime.relationship import relate, clear_relationships
+
+from models.Product import Product
+from models.VendingMachine import VendingMachine
+from models.UserInterface import UserInterface
+
+class _NullWriter(io.TextIOBase):
+    def write(self, s: str) -> int:
+        return len(s)
+
+def _timed(fn: Callable[[], int]) -> Dict[str, float]:
+    collections = [0]
+    def count(phase: str, info: Dict[str, int]):
+        if phase == 'start' and info['generation'] == 0:
+            collections[0] += 1
+    gc.collect()
+    gc.callbacks.append(count)
+    try:
+        with contextlib.redirect_stdout(_NullWriter()):
+            start = time.perf_counter()
+            events = fn()
+            elapsed = time.perf_counter() - start
+    finally:
+        gc.callbacks.remove(count)
+    return {'events': events, 'seconds': elapsed, 'ns_per_event': elapsed * 1e9 / events, 'events_per_second': events / elapsed,
+            'gen0_per_1k': collections[0] * 1000 / events}
+
+def bench_transition(iterations: int) -> Dict[str, float]:
+    """Bare state machine: two states toggled by one event, no actions"""
+    owner = InstanceBase('bench_1', 'BENCH')
+    sm = StateMachine(owner, 'A', {'A': {'Toggle': (None, None, 'B')}, 'B': {'Toggle': (None, None, 'A')}})
+
+    def run() -> int:
+        dispatch = sm.dispatch
+        for _ in range(iterations):
+            dispatch('Toggle')
+        return iterations
+    return _timed(run)
+
+def bench_step(iterations: int) -> Dict[str, float]:
+    """The same toggle with an action writing an attribute: one unit of work staged and committed per event"""
+    owner = InstanceBase('bench_1', 'BENCH')
+    owner.set_attr('count', 0)
+
+    def count(owner: InstanceBase, payload):
+        owner.set_attr('count', owner.get_attr('count') + 1)
+    sm = StateMachine(owner, 'A', {'A': {'Toggle': (None, count, 'B')}, 'B': {'Toggle': (None, count, 'A')}})
+
+    def run() -> int:
+        dispatch = sm.dispatch
+        for _ in range(iterations):
+            dispatch('Toggle')
+        return iterations
+    result = _timed(run)
+    if owner.get_attr('count') != iterations:
+        raise AssertionError(f"{owner.get_attr('count')} writes committed for {iterations} events")
+    return result
+
+def bench_purchase(iterations: int) -> Dict[str, float]:
+    """Generated VendingMachine: ProductSelected + PaymentSuccess per purchase (5 transitions)"""
+    with contextlib.redirect_stdout(_NullWriter()):
+        ObjectStore.clear()
+        clear_relationships()
+        product = Product._create_instance(id='product_1')
+        product.set_attr('productCode', 'A1')
+        product.set_attr('price', 7000.0)
+        product.set_attr('stock', iterations + 1)
+        vm = VendingMachine._create_instance(id='vendingmachine_1')
+        relate('R2', vm, UserInterface._create_instance(id='userinterface_1'))
+
+    def run() -> int:
+        for _ in range(iterations):
+            vm.send_ProductSelected('A1')
+            vm.send_PaymentSuccess()
+        return iterations * 2
+    return _timed(run)
+
+def bench_broadcast(iterations: int) -> Dict[str, float]:
+    """Bulk dispatch: ProductSelected then Reset broadcast to a fleet of `iterations` sold-out machines"""
+    with contextlib.redirect_stdout(_NullWriter()):
+        ObjectStore.clear()
+        clear_relationships()
+        product = Product._create_instance(id='product_1')
+        product.set_attr('productCode', 'A1')
+        product.set_attr('price', 7000.0)
+        product.set_attr('stock', 0)
+        for i in range(iterations):
+            vm = VendingMachine._create_instance(id=f'vendingmachine_{i + 1}')
+            relate('R2', vm, UserInterface._create_instance(id=f'userinterface_{i + 1}'))
+
+    def run() -> int:
+        selected = broadcast('ProductSelected', 'VendingMachine', state='Idle', payload={'p_productCode': 'A1'})
+        reset = broadcast('Reset', 'VendingMachine', state='OutOfStock')
+        return selected.handled + reset.handled
+    return _timed(run)
+
+def bench_contended(iterations: int, threads: int = 4) -> Dict[str, float]:
+    """Purchases of one product from machines on several threads, more than it has in stock;
+    fails if any sale's stock update was lost"""
+    stock = iterations // 2
+    with contextlib.redirect_stdout(_NullWriter()):
+        ObjectStore.clear()
+        clear_relationships()
+        product = Product._create_instance(id='product_1')
+        product.set_attr('productCode', 'A1')
+        product.set_attr('price', 7000.0)
+        product.set_attr('stock', stock)
+        machines = []
+        for i in range(threads):
+            vm = VendingMachine._create_instance(id=f'vendingmachine_{i + 1}')
+            relate('R2', vm, UserInterface._create_instance(id=f'userinterface_{i + 1}'))
+            machines.append(vm)
+    tallies = [[0, 0] for _ in machines]  # [events, sales] per machine
+
+    def sell(vm: VendingMachine, purchases: int, tally: List[int]):
+        sm = vm.sm
+        for _ in range(purchases):
+            vm.send_ProductSelected('A1')
+            tally[0] += 1
+            if sm.index == VendingMachine.S_WaitingPayment:
+                vm.send_PaymentSuccess()
+                tally[0] += 1
+            if sm.index == VendingMachine.S_Idle:
+                tally[1] += 1
+            else:
+                vm.send_Reset()  # out of stock
+                tally[0] += 1
+
+    def run() -> int:
+        workers = [threading.Thread(target=sell, args=(vm, iterations // threads, tally))
+                   for vm, tally in zip(machines, tallies)]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+        return sum(events for events, _ in tallies)
+    result = _timed(run)
+    sold = sum(sales for _, sales in tallies)
+    if product.get_attr('stock') != stock - sold:
+        raise AssertionError(f"{sold} sales from a stock of {stock}, {product.get_attr('stock')} left")
+    return result
+
+BENCHMARKS: Dict[str, Callable[[int], Dict[str, float]]] = {
+    'transition': bench_transition,
+    'step': bench_step,
+    'purchase': bench_purchase,
+    'broadcast': bench_broadcast,
+    'contended': bench_contended,
+}
+
+def main(argv: Optional[List[str]] = None) -> Dict[str, Dict[str, float]]:
+    parser = argparse.ArgumentParser(description='Runtime dispatch benchmarks')
+    parser.add_argument('--iterations', type=int, default=50000)
+    parser.add_argument('--only', choices=sorted(BENCHMARKS), action='append')
+    parser.add_argument('--threads', type=int, default=4, help='dispatching threads for the contended benchmark')
+    parser.add_argument('--pool', action='store_true', help='pool event parameter payloads (EventPayload.pool())')
+    parser.add_argument('--save', metavar='FILE', help='write the results as JSON')
+    parser.add_argument('--against', metavar='FILE', help='compare with results saved by --save')
+    parser.add_argument('--tolerance', type=float, default=0.1, help='slowdown allowed by --against (fraction)')
+    args = parser.parse_args(argv)
+
+    StateMachine.log_transitions = False
+    if args.pool:
+        EventPayload.pool()
+    results = {}
+    for name in args.only or BENCHMARKS:
+        results[name] = r = (bench_contended(args.iterations, args.threads) if name == 'contended'
+                             else BENCHMARKS[name](args.iterations))
+        print(f"{name:<12}{r['events']:>10} events {r['seconds']:>8.3f} s {r['ns_per_event']:>10.0f} ns/event {r['events_per_second']:>12.0f} events/s {r['gen0_per_1k']:>7.2f} gen0/1k")
+    if args.save:
+        with open(args.save, 'w') as f:
+            json.dump(results, f, indent=2)
+    if args.against and not _compare(results, args.against, args.tolerance):
+        sys.exit(1)
+    return results
+
+def _compare(results: Dict[str, Dict[str, float]], path: str, tolerance: float) -> bool:
+    """Print each benchmark's change against a saved run; False if any slowed down by more than tolerance"""
+    with open(path) as f:
+        saved = json.load(f)
+    ok = True
+    for name, r in results.items():
+        if name not in saved:
+            continue
+        change = r['ns_per_event'] / saved[name]['ns_per_event'] - 1
+        slower = change > tolerance
+        ok = ok and not slower
+        print(f"{name:<12}{saved[name]['ns_per_event']:>10.0f} -> {r['ns_per_event']:.0f} ns/event ({change:+.1%}){'  REGRESSION' if slower else ''}")
+    return ok
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
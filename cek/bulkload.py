@@ -0,0 +1,164 @@
+#!/usr/bin/env python3
+# bulkload.py - Bulk-load model instances from CSV / JSON files
+#
+# Loads records into the runtime with runtime.bulk.bulk_load and reports
+# rows per second. Each FILE is loaded as CLASS; relationships are given as
+# REL=FIELD:CLASS (the record's FIELD holds the id of the related CLASS
+# instance, which may be loaded earlier on the command line).
+#
+#   python bulkload.py catalog.csv:Product
+#   python bulkload.py uis.jsonl:UserInterface machines.csv:VendingMachine --link R2=ui:UserInterface
+#   python bulkload.py --generate 100000 --format csv          # synthetic catalog and fleet
+#   python bulkload.py --generate 20000 --compare              # also time one-by-one creation
+#
+# --generate writes a catalog of N products plus N/10 machines, each with its
+# own user interface, to a temporary directory and loads those.
+
+from __future__ import annotations
+import argparse
+import csv
+import importlib
+import json
+import os
+import sys
+import tempfile
+import time
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from runtime.bulk import LoadReport, bulk_load
+from runtime.context import RuntimeContext
+from runtime.relationship import relate
+
+import loadgen
+
+def write_records(path: str, records: Iterator[Dict[str, Any]], fields: List[str], fmt: str):
+    """Write records as CSV, a JSON array or JSON lines"""
+    with open(path, 'w', newline='') as f:
+        if fmt == 'csv':
+            writer = csv.DictWriter(f, fieldnames=fields)
+            writer.writeheader()
+            writer.writerows(records)
+        elif fmt == 'json':
+            f.write('[\n')
+            for n, record in enumerate(records):
+                f.write((',\n' if n else '') + json.dumps(record))
+            f.write('\n]\n')
+        else:
+            for record in records:
+                f.write(json.dumps(record) + '\n')
+
+def generate(directory: str, products: int, fmt: str) -> List[Tuple[str, str]]:
+    """Synthetic catalog and fleet files; returns (path, class name) in load order"""
+    machines = max(1, products // 10)
+    suffix = 'jsonl' if fmt == 'jsonl' else fmt
+    files = [
+        (os.path.join(directory, f'products.{suffix}'), 'Product', ['id', 'productCode', 'name', 'price', 'stock'],
+         ({'id': f'product_{i + 1}', 'productCode': f'P{i + 1:06d}', 'name': f'Product {i + 1}',
+           'price': 5000.0 + (i % 50) * 500, 'stock': 10 + i % 90} for i in range(products))),
+        (os.path.join(directory, f'uis.{suffix}'), 'UserInterface', ['id'],
+         ({'id': f'userinterface_{i + 1}'} for i in range(machines))),
+        (os.path.join(directory, f'machines.{suffix}'), 'VendingMachine', ['id', 'currentState', 'ui'],
+         ({'id': f'vendingmachine_{i + 1}', 'currentState': 'Idle', 'ui': f'userinterface_{i + 1}'} for i in range(machines))),
+    ]
+    for path, _, fields, records in files:
+        write_records(path, records, fields, fmt)
+    return [(path, class_name) for path, class_name, _, _ in files]
+
+def model_class(name: str) -> type:
+    return getattr(importlib.import_module(f'models.{name}'), name)
+
+def one_by_one(path: str, class_name: str, links: Dict[str, Tuple[str, str]]) -> Tuple[int, float]:
+    """Create the same records through _create_instance/set_attr/relate, for comparison"""
+    from runtime.bulk import iter_records
+    from runtime.storage import ObjectStore
+    cls = model_class(class_name)
+    declared = cls._declared_attrs()
+    started = time.perf_counter()
+    rows = 0
+    for record in iter_records(path):
+        inst = cls._create_instance(id=record.get('id'))
+        for name, value in record.items():
+            if name in declared and name != 'id':
+                default = declared[name]
+                inst.set_attr(name, type(default)(value) if default is not None and value != '' else value)
+        for rel_id, (field, related) in links.items():
+            if record.get(field):
+                relate(rel_id, inst, ObjectStore.find(related, record[field]))
+        rows += 1
+    return rows, time.perf_counter() - started
+
+def format_report(reports: List[LoadReport], compared: Optional[List[Tuple[int, float]]]) -> str:
+    lines = ['=' * 72, 'Bulk load report', '=' * 72]
+    lines.append(f"{'class':<18}{'rows':>10}{'skipped':>9}{'batches':>9}{'links':>9}{'seconds':>10}{'rows/s':>12}"
+                 + (f"{'1-by-1 rows/s':>16}" if compared else ''))
+    for n, r in enumerate(reports):
+        row = (f"{r.class_name:<18}{r.rows:>10}{r.skipped:>9}{r.batches:>9}{sum(r.links.values()):>9}"
+               f"{r.seconds:>10.3f}{r.rows_per_second:>12.0f}")
+        if compared:
+            rows, seconds = compared[n]
+            row += f"{rows / seconds if seconds else 0.0:>16.0f}"
+        lines.append(row)
+    rows = sum(r.rows for r in reports)
+    seconds = sum(r.seconds for r in reports)
+    lines.append(f"{'total':<18}{rows:>10}{'':>27}{seconds:>10.3f}{rows / seconds if seconds else 0.0:>12.0f}")
+    for r in reports:
+        for row, message in r.errors[:5]:
+            lines.append(f"  {r.class_name} row {row}: {message}")
+        if r.ignored_fields:
+            lines.append(f"  {r.class_name} ignored fields: {', '.join(sorted(r.ignored_fields))}")
+    return '\n'.join(lines)
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description='Bulk-load model instances from CSV / JSON files')
+    parser.add_argument('files', nargs='*', metavar='FILE:CLASS', help='record file and the class to load it as')
+    parser.add_argument('--link', action='append', default=[], metavar='REL=FIELD:CLASS',
+                        help='relationship to build from a record field (repeatable)')
+    parser.add_argument('--format', choices=('csv', 'json', 'jsonl'), help='record format (default: from the suffix)')
+    parser.add_argument('--batch-size', type=int, default=10000, help='instances stored per batch')
+    parser.add_argument('--skip-errors', action='store_true', help='leave out bad records instead of stopping')
+    parser.add_argument('--generate', type=int, metavar='N', help='load a synthetic catalog of N products and N/10 machines')
+    parser.add_argument('--compare', action='store_true', help='also time creating the same records one by one')
+    args = parser.parse_args(argv)
+    if not args.files and not args.generate:
+        parser.error('give FILE:CLASS arguments or --generate N')
+    return args
+
+def main(argv: Optional[List[str]] = None) -> List[LoadReport]:
+    args = parse_args(argv)
+    links: Dict[str, Tuple[str, str]] = {}
+    for spec in args.link:
+        rel_id, _, target = spec.partition('=')
+        field, _, related = target.partition(':')
+        links[rel_id] = (field, related)
+    with tempfile.TemporaryDirectory() as directory:
+        if args.generate:
+            files = generate(directory, args.generate, args.format or 'csv')
+            links.setdefault('R2', ('ui', 'UserInterface'))
+        else:
+            files = [tuple(spec.rsplit(':', 1)) for spec in args.files]
+        reports = []
+        with loadgen.quieted(True):
+            for path, class_name in files:
+                cls = model_class(class_name)
+                own = {rel_id: link for rel_id, link in links.items() if link[0] in _fields(path, args.format)}
+                reports.append(bulk_load(cls, path, format=args.format, links=own, batch_size=args.batch_size,
+                                         on_error='skip' if args.skip_errors else 'raise'))
+        compared = None
+        if args.compare:
+            compared = []
+            with loadgen.quieted(True), RuntimeContext('one-by-one'):
+                for path, class_name in files:
+                    own = {rel_id: link for rel_id, link in links.items() if link[0] in _fields(path, args.format)}
+                    compared.append(one_by_one(path, class_name, own))
+    print(format_report(reports, compared))
+    return reports
+
+def _fields(path: str, fmt: Optional[str]) -> List[str]:
+    """Field names of a record file, from its first record"""
+    from runtime.bulk import iter_records
+    for record in iter_records(path, fmt):
+        return list(record)
+    return []
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
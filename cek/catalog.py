@@ -0,0 +1,177 @@
+#!/usr/bin/env python3
+# catalog.py - Publish, inspect and benchmark memory-mapped product catalogs
+#
+# A catalog file holds the Product extent in a fixed layout with an on-disk
+# productCode index (see runtime.catalog). Worker processes map it with
+# ObjectStore.map_catalog instead of each building its own instances; stock
+# stays writable in a separate column file. Publishing again swaps the new
+# file in atomically and running workers pick it up with refresh_catalogs().
+#
+#   python catalog.py publish products.cat --generate 100000
+#   python catalog.py publish products.cat --from products.csv --keep-stock   # new prices, same stock
+#   python catalog.py show products.cat P000042 P000043
+#   python catalog.py bench --products 100000 --workers 4                      # RSS per worker, in memory vs mapped
+
+from __future__ import annotations
+import argparse
+import concurrent.futures
+import multiprocessing
+import os
+import random
+import sys
+import tempfile
+import time
+from typing import Any, Dict, Iterator, List, Optional
+
+from runtime.bulk import bulk_load, iter_records
+from runtime.catalog import write_catalog
+from runtime.storage import ObjectStore
+
+import loadgen
+
+def generate(products: int, price_factor: float = 1.0, stock: int = 100) -> Iterator[Dict[str, Any]]:
+    for i in range(products):
+        yield {'id': f'product_{i + 1}', 'productCode': f'P{i + 1:06d}', 'name': f'Product {i + 1}',
+               'price': (5000.0 + (i % 50) * 500) * price_factor, 'stock': stock}
+
+def publish(args: argparse.Namespace) -> int:
+    records = iter_records(args.source) if args.source else generate(args.generate, args.price_factor, args.stock)
+    if args.source and args.price_factor != 1.0:
+        records = (dict(r, price=float(r['price']) * args.price_factor) for r in records)
+    started = time.perf_counter()
+    generation = write_catalog(args.path, loadgen.Product, records, writable=['stock'], indexes=['productCode'],
+                               keep_writable=args.keep_stock)
+    print(f"Published in {time.perf_counter() - started:.3f} s, {os.path.getsize(args.path)} bytes")
+    return generation
+
+def show(args: argparse.Namespace):
+    with loadgen.quieted(True):
+        catalog = ObjectStore.map_catalog(loadgen.Product, args.path)
+    print(f"{catalog} generation {catalog.generation:x}, {catalog.mapped_bytes()} bytes mapped")
+    for code in args.codes:
+        p = ObjectStore.find_by('Product', 'productCode', code)
+        if p is None:
+            print(f"  {code}: not found")
+        else:
+            print(f"  {code}: {p._id} {p.get_attr('name')!r} price {p.get_attr('price')} stock {p.get_attr('stock')}")
+
+# --- Worker processes ---
+
+def _memory() -> Dict[str, int]:
+    """Resident and proportional set size of this process in bytes (PSS splits shared pages between processes)"""
+    usage = {}
+    for name, key in (('/proc/self/status', 'VmRSS:'), ('/proc/self/smaps_rollup', 'Pss:')):
+        try:
+            with open(name) as f:
+                for line in f:
+                    if line.startswith(key):
+                        usage['rss' if key == 'VmRSS:' else 'pss'] = int(line.split()[1]) * 1024
+                        break
+        except OSError:
+            pass
+    return usage
+
+def bench_worker(mode: str, path: str, products: int, machines: int, purchases: int, seed: int,
+                 barrier: Any) -> Dict[str, Any]:
+    """Load the catalog in memory or map it, sell from it, and measure this process"""
+    from runtime.state_machine import StateMachine
+    StateMachine.log_transitions = False
+    sys.stdout = loadgen.NullWriter()
+    before = _memory()
+    started = time.perf_counter()
+    if mode == 'memory':
+        bulk_load(loadgen.Product, generate(products))
+    else:
+        ObjectStore.map_catalog(loadgen.Product, path)
+    load_seconds = time.perf_counter() - started
+    vms = []
+    for i in range(machines):
+        vm = loadgen.VendingMachine._create_instance(id=f'vendingmachine_{i + 1}')
+        ui = loadgen.UserInterface._create_instance(id=f'userinterface_{i + 1}')
+        loadgen.relate('R2', vm, ui)
+        vms.append(vm)
+    rng = random.Random(seed)
+    sales = 0
+    started = time.perf_counter()
+    for n in range(purchases):
+        vm = vms[n % machines]
+        vm.dispatch_event('ProductSelected', p_productCode=f'P{rng.randrange(products) + 1:06d}')
+        if vm.sm.get_current_state() == 'WaitingPayment':
+            vm.dispatch_event('PaymentSuccess')
+            sales += 1
+        else:
+            vm.dispatch_event('Reset')
+    sell_seconds = time.perf_counter() - started
+    barrier.wait()  # every worker holds its catalog while the others are measured
+    after = _memory()
+    barrier.wait()
+    return {
+        'mode': mode,
+        'pid': os.getpid(),
+        'rss': after.get('rss', 0),
+        'pss': after.get('pss', 0),
+        'catalog_rss': after.get('rss', 0) - before.get('rss', 0),
+        'load_seconds': load_seconds,
+        'purchases_per_second': purchases / sell_seconds if sell_seconds else 0.0,
+        'sales': sales,
+    }
+
+def bench(args: argparse.Namespace) -> List[Dict[str, Any]]:
+    results = []
+    spawn = multiprocessing.get_context('spawn')  # fresh interpreters: nothing inherited from this process
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'products.cat')
+        with loadgen.quieted(True):
+            write_catalog(path, loadgen.Product, generate(args.products), writable=['stock'], indexes=['productCode'])
+        for mode in ('memory', 'mapped'):
+            with spawn.Manager() as manager:
+                barrier = manager.Barrier(args.workers)
+                with concurrent.futures.ProcessPoolExecutor(max_workers=args.workers, mp_context=spawn) as pool:
+                    futures = [pool.submit(bench_worker, mode, path, args.products, args.machines, args.purchases,
+                                           args.seed + n, barrier) for n in range(args.workers)]
+                    results.extend(future.result() for future in futures)
+    print(format_bench(results, args))
+    return results
+
+def format_bench(results: List[Dict[str, Any]], args: argparse.Namespace) -> str:
+    mb = 1024 * 1024
+    lines = ['=' * 76, f"Catalog of {args.products} products, {args.workers} worker processes", '=' * 76]
+    lines.append(f"{'mode':<10}{'RSS/worker':>12}{'PSS/worker':>12}{'catalog RSS':>13}{'load s':>9}{'purchases/s':>13}{'sales':>7}")
+    for mode in ('memory', 'mapped'):
+        rows = [r for r in results if r['mode'] == mode]
+        if not rows:
+            continue
+        n = len(rows)
+        lines.append(f"{mode:<10}{sum(r['rss'] for r in rows) / n / mb:>10.1f}MB{sum(r['pss'] for r in rows) / n / mb:>10.1f}MB"
+                     f"{sum(r['catalog_rss'] for r in rows) / n / mb:>11.1f}MB{sum(r['load_seconds'] for r in rows) / n:>9.3f}"
+                     f"{sum(r['purchases_per_second'] for r in rows) / n:>13.0f}{sum(r['sales'] for r in rows):>7}")
+    return '\n'.join(lines)
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description='Publish, inspect and benchmark memory-mapped product catalogs')
+    commands = parser.add_subparsers(dest='command', required=True)
+    p = commands.add_parser('publish', help='write a catalog file (atomically replacing any previous one)')
+    p.add_argument('path')
+    source = p.add_mutually_exclusive_group(required=True)
+    source.add_argument('--from', dest='source', metavar='FILE', help='CSV / JSON / JSON-lines product records')
+    source.add_argument('--generate', type=int, metavar='N', help='synthetic catalog of N products')
+    p.add_argument('--stock', type=int, default=100, help='stock of generated products')
+    p.add_argument('--price-factor', type=float, default=1.0, help='multiply every price (e.g. a price update)')
+    p.add_argument('--keep-stock', action='store_true', help='carry stock over from the catalog being replaced')
+    s = commands.add_parser('show', help='map a catalog and look products up by productCode')
+    s.add_argument('path')
+    s.add_argument('codes', nargs='*')
+    b = commands.add_parser('bench', help='per-worker memory and sales rate, in-memory extent vs mapped catalog')
+    b.add_argument('--products', type=int, default=100000)
+    b.add_argument('--workers', type=int, default=4)
+    b.add_argument('--machines', type=int, default=10)
+    b.add_argument('--purchases', type=int, default=500, help='purchases per worker (the in-memory extent is scanned per lookup)')
+    b.add_argument('--seed', type=int, default=1)
+    return parser.parse_args(argv)
+
+def main(argv: Optional[List[str]] = None) -> Any:
+    args = parse_args(argv)
+    return {'publish': publish, 'show': show, 'bench': bench}[args.command](args)
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
@@ -0,0 +1,341 @@
+#!/usr/bin/env python3
+# loadgen.py - Scenario-driven load generator for the VendingMachine model
+#
+# Simulates a fleet of vending machines with customers arriving on a Poisson
+# schedule (or replayed from a CSV trace), picking products from a Zipf-skewed
+# catalog and paying with configurable success/failure rates. Events are
+# dispatched to the generated models as fast as possible (or paced in real
+# time) and the report gives sustained events/s, dispatch latency
+# percentiles, stock-outs and payment failures.
+#
+#   python loadgen.py --machines 50 --customers 20000 --rate 500
+#   python loadgen.py --trace arrivals.csv --realtime
+#   python loadgen.py --standin 5        # bridges over HTTP to a local stand-in (5 ms per call)
+#   python loadgen.py --trace-out trace.json --trace-sample 0.01   # open in chrome://tracing or Perfetto
+#   python loadgen.py --tenants 4        # four independent fleets, one runtime context and thread each
+#
+# Trace CSV columns: time (seconds from start), machine (index), product
+# (productCode) and optional outcome (success | failed | timeout).
+
+from __future__ import annotations
+import argparse
+import contextlib
+import csv
+import io
+import random
+import sys
+import threading
+import time
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+# Import runtime
+from runtime.context import RuntimeContext
+from runtime.state_machine import StateMachine
+from runtime.storage import ObjectStore
+from runtime.relationship import relate, select_one_related, clear_relationships
+from runtime.bridge import BridgeAdapter
+from runtime.bridge_server import StandInServer
+from runtime.tracing import Tracer
+
+# Import model classes
+from models.Product import Product
+from models.VendingMachine import VendingMachine
+from models.UserInterface import UserInterface
+
+# (time, machine index, productCode, outcome or None)
+Arrival = Tuple[float, int, str, Optional[str]]
+
+OUTCOMES = ('success', 'failed', 'timeout')
+
+class NullWriter(io.TextIOBase):
+    """Discards the runtime's per-event console logging during a run"""
+    def write(self, s: str) -> int:
+        return len(s)
+
+def build_fleet(machines: int, products: int, stock: int, price: float = 7000.0) -> Tuple[List[VendingMachine], List[str]]:
+    """Create machines (each with its own UI across R2) and a shared product catalog"""
+    ObjectStore.clear()
+    clear_relationships()
+    codes = []
+    for i in range(products):
+        p = Product._create_instance(id=f'product_{i + 1}')
+        code = f'P{i + 1:04d}'
+        p.set_attr('productCode', code)
+        p.set_attr('name', f'Product {i + 1}')
+        p.set_attr('price', price)
+        p.set_attr('stock', stock)
+        codes.append(code)
+    vms = []
+    for i in range(machines):
+        vm = VendingMachine._create_instance(id=f'vendingmachine_{i + 1}')
+        ui = UserInterface._create_instance(id=f'userinterface_{i + 1}')
+        relate('R2', vm, ui)
+        vms.append(vm)
+    return vms, codes
+
+def zipf_weights(n: int, s: float) -> List[float]:
+    """Cumulative Zipf weights for ranks 1..n with exponent s"""
+    cum, total = [], 0.0
+    for k in range(1, n + 1):
+        total += 1.0 / (k ** s)
+        cum.append(total)
+    return cum
+
+def poisson_arrivals(rate: float, customers: int, machines: int, codes: List[str], zipf_s: float, rng: random.Random) -> Iterator[Arrival]:
+    """Customers arriving fleet-wide as a Poisson process of `rate` per second"""
+    cum = zipf_weights(len(codes), zipf_s)
+    t = 0.0
+    for _ in range(customers):
+        t += rng.expovariate(rate)
+        code = rng.choices(codes, cum_weights=cum)[0]
+        yield (t, rng.randrange(machines), code, None)
+
+def trace_arrivals(path: str) -> Iterator[Arrival]:
+    """Replay arrivals from a CSV trace"""
+    with open(path, newline='') as f:
+        for row in csv.DictReader(f):
+            outcome = (row.get('outcome') or '').strip().lower() or None
+            if outcome is not None and outcome not in OUTCOMES:
+                raise ValueError(f"Unknown outcome '{outcome}' in trace {path}")
+            yield (float(row['time']), int(row['machine']), row['product'].strip(), outcome)
+
+class LoadStats:
+    """Counters and per-event dispatch latencies collected during a run"""
+
+    def __init__(self):
+        self.latencies: Dict[str, List[int]] = {}  # { event: [ns] }
+        self.customers = 0
+        self.sales = 0
+        self.revenue = 0.0
+        self.stock_outs = 0
+        self.not_found = 0
+        self.payment_failures = 0
+        self.payment_timeouts = 0
+        self.rejected = 0
+        self.wall_seconds = 0.0
+
+    @property
+    def events(self) -> int:
+        return sum(len(v) for v in self.latencies.values())
+
+    def percentile(self, event: str, q: float) -> float:
+        """Latency percentile in microseconds"""
+        samples = sorted(self.latencies.get(event, []))
+        if not samples:
+            return 0.0
+        idx = min(len(samples) - 1, int(round(q / 100.0 * (len(samples) - 1))))
+        return samples[idx] / 1000.0
+
+    def summary(self) -> Dict[str, Any]:
+        """Plain-dict summary suitable for aggregation"""
+        return {
+            'customers': self.customers,
+            'events': self.events,
+            'wall_seconds': self.wall_seconds,
+            'events_per_second': self.events / self.wall_seconds if self.wall_seconds else 0.0,
+            'sales': self.sales,
+            'revenue': self.revenue,
+            'stock_outs': self.stock_outs,
+            'not_found': self.not_found,
+            'payment_failures': self.payment_failures,
+            'payment_timeouts': self.payment_timeouts,
+            'rejected': self.rejected,
+        }
+
+def _dispatch(stats: LoadStats, vm: VendingMachine, event: str, **payload) -> bool:
+    start = time.perf_counter_ns()
+    ok = vm.dispatch_event(event, **payload)
+    stats.latencies.setdefault(event, []).append(time.perf_counter_ns() - start)
+    return ok
+
+def _pick_outcome(rng: random.Random, success_rate: float, failure_rate: float) -> str:
+    r = rng.random()
+    if r < success_rate:
+        return 'success'
+    if r < success_rate + failure_rate:
+        return 'failed'
+    return 'timeout'
+
+def run_scenario(arrivals: Iterable[Arrival], vms: List[VendingMachine], success_rate: float = 0.9,
+                 failure_rate: float = 0.08, rng: Optional[random.Random] = None, realtime: bool = False,
+                 quiet: bool = True) -> LoadStats:
+    """Drive one purchase session per arrival and collect statistics"""
+    stats = LoadStats()
+    with quieted(quiet):
+        drive(stats, arrivals, vms, success_rate, failure_rate, rng or random.Random(), realtime)
+    return stats
+
+@contextlib.contextmanager
+def quieted(quiet: bool):
+    """Silence model output and transition logging (process-wide, so set once around all threads)"""
+    sink = contextlib.redirect_stdout(NullWriter()) if quiet else contextlib.nullcontext()
+    log_transitions = StateMachine.log_transitions
+    StateMachine.log_transitions = not quiet
+    try:
+        with sink:
+            yield
+    finally:
+        StateMachine.log_transitions = log_transitions
+
+def drive(stats: LoadStats, arrivals: Iterable[Arrival], vms: List[VendingMachine], success_rate: float,
+          failure_rate: float, rng: random.Random, realtime: bool):
+    """Run the arrivals against vms in the current context, adding to stats (run_scenario without the quieting)"""
+    started = time.perf_counter()
+    for t, machine, code, outcome in arrivals:
+        if realtime:
+            delay = t - (time.perf_counter() - started)
+            if delay > 0:
+                time.sleep(delay)
+        vm = vms[machine % len(vms)]
+        stats.customers += 1
+        if not _dispatch(stats, vm, 'ProductSelected', p_productCode=code):
+            stats.rejected += 1
+            continue
+        state = vm.sm.get_current_state()
+        if state == 'OutOfStock':
+            # Model leaves the machine in OutOfStock; the customer walks away
+            stats.stock_outs += 1
+            _dispatch(stats, vm, 'Reset')
+            continue
+        if state != 'WaitingPayment':
+            stats.not_found += 1
+            continue
+        outcome = outcome or _pick_outcome(rng, success_rate, failure_rate)
+        if outcome == 'success':
+            txn = select_one_related('R3', vm)
+            # A sale once the item is out: the step ends in Idle only through the ItemDispensed transition
+            if _dispatch(stats, vm, 'PaymentSuccess') and vm.sm.get_current_state() == 'Idle':
+                stats.sales += 1
+                stats.revenue += (txn.get_attr('amount') if txn else 0.0) or 0.0
+        else:
+            # A payment timeout surfaces to the model as PaymentFailed
+            _dispatch(stats, vm, 'PaymentFailed')
+            if outcome == 'failed':
+                stats.payment_failures += 1
+            else:
+                stats.payment_timeouts += 1
+    stats.wall_seconds = time.perf_counter() - started
+
+def run_tenants(tenants: int, args: argparse.Namespace, rng: random.Random) -> List[Tuple[RuntimeContext, LoadStats]]:
+    """Run independent fleets, each in its own runtime context on its own thread"""
+    fleets = []
+    with contextlib.redirect_stdout(NullWriter()):
+        for n in range(tenants):
+            ctx = RuntimeContext(f"tenant-{n + 1}")
+            with ctx:
+                vms, codes = build_fleet(args.machines, args.products, args.stock)
+            arrivals = list(poisson_arrivals(args.rate, args.customers, args.machines, codes, args.zipf, rng))
+            fleets.append((ctx, vms, arrivals, random.Random(rng.random())))
+    results = [(ctx, LoadStats()) for ctx, _, _, _ in fleets]
+
+    def tenant(n: int):
+        ctx, vms, arrivals, tenant_rng = fleets[n]
+        with ctx:
+            drive(results[n][1], arrivals, vms, args.success_rate, args.failure_rate, tenant_rng, args.realtime)
+
+    threads = [threading.Thread(target=tenant, args=(n,), name=f"tenant-{n + 1}") for n in range(tenants)]
+    with quieted(True):
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+    return results
+
+def format_report(stats: LoadStats) -> str:
+    """Human-readable load report"""
+    s = stats.summary()
+    lines = ['=' * 60, 'Load generator report', '=' * 60]
+    lines.append(f"Customers:          {s['customers']}")
+    lines.append(f"Events dispatched:  {s['events']}")
+    lines.append(f"Wall time:          {s['wall_seconds']:.3f} s")
+    lines.append(f"Sustained rate:     {s['events_per_second']:.0f} events/s")
+    lines.append(f"Sales:              {s['sales']} (revenue {s['revenue']:.2f})")
+    lines.append(f"Stock-outs:         {s['stock_outs']}")
+    lines.append(f"Unknown product:    {s['not_found']}")
+    lines.append(f"Payment failures:   {s['payment_failures']}")
+    lines.append(f"Payment timeouts:   {s['payment_timeouts']}")
+    lines.append(f"Rejected events:    {s['rejected']}")
+    lines.append('')
+    lines.append(f"{'event':<18}{'count':>8}{'p50 us':>10}{'p90 us':>10}{'p99 us':>10}{'max us':>10}")
+    for event in sorted(stats.latencies):
+        n = len(stats.latencies[event])
+        lines.append(f"{event:<18}{n:>8}{stats.percentile(event, 50):>10.1f}{stats.percentile(event, 90):>10.1f}"
+                     f"{stats.percentile(event, 99):>10.1f}{stats.percentile(event, 100):>10.1f}")
+    if BridgeAdapter.is_configured():
+        bridges = BridgeAdapter.stats()
+        lines.append('')
+        lines.append(f"Bridge connections: {bridges['connections_opened']} opened (pool of {bridges['max_connections']})")
+        lines.append(f"{'bridge':<28}{'calls':>8}{'errors':>8}{'mean us':>10}{'max us':>10}")
+        for op, b in sorted(bridges['operations'].items()):
+            lines.append(f"{op:<28}{b['calls']:>8}{b['errors']:>8}{b['mean_seconds'] * 1e6:>10.1f}{b['max_seconds'] * 1e6:>10.1f}")
+    return '\n'.join(lines)
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description='Load generator for the VendingMachine model')
+    parser.add_argument('--machines', type=int, default=10, help='number of vending machines')
+    parser.add_argument('--products', type=int, default=20, help='number of catalog products')
+    parser.add_argument('--stock', type=int, default=100, help='initial stock per product')
+    parser.add_argument('--customers', type=int, default=1000, help='customers to generate (Poisson mode)')
+    parser.add_argument('--rate', type=float, default=100.0, help='fleet-wide arrivals per second (Poisson mode)')
+    parser.add_argument('--zipf', type=float, default=1.1, help='Zipf exponent for product popularity')
+    parser.add_argument('--success-rate', type=float, default=0.9, help='probability a payment succeeds')
+    parser.add_argument('--failure-rate', type=float, default=0.08, help='probability a payment fails (rest time out)')
+    parser.add_argument('--trace', help='replay arrivals from a CSV trace instead of Poisson')
+    parser.add_argument('--realtime', action='store_true', help='pace arrivals on the wall clock')
+    parser.add_argument('--seed', type=int, default=None, help='random seed')
+    parser.add_argument('--bridge-url', help='send bridge calls to this HTTP service')
+    parser.add_argument('--standin', type=float, metavar='MS', default=None,
+                        help='send bridge calls to a local stand-in server answering after MS milliseconds')
+    parser.add_argument('--pool-size', type=int, default=8, help='bridge keep-alive connections')
+    parser.add_argument('--trace-out', help='write sampled causal traces to this Chrome trace-event file')
+    parser.add_argument('--trace-sample', type=float, default=0.01, help='fraction of root dispatches traced')
+    parser.add_argument('--tenants', type=int, default=1,
+                        help='independent fleets, each in its own runtime context on its own thread (Poisson mode)')
+    args = parser.parse_args(argv)
+    if args.success_rate + args.failure_rate > 1.0:
+        parser.error('--success-rate + --failure-rate must not exceed 1.0')
+    if args.tenants > 1 and args.trace:
+        parser.error('--tenants cannot be combined with --trace')
+    return args
+
+def main(argv: Optional[List[str]] = None) -> LoadStats:
+    args = parse_args(argv)
+    rng = random.Random(args.seed)
+    standin = None
+    if args.standin is not None:
+        with contextlib.redirect_stdout(NullWriter()):
+            standin = StandInServer(latency=args.standin / 1000.0)
+            args.bridge_url = standin.start()
+    if args.bridge_url:
+        BridgeAdapter.configure(args.bridge_url, max_connections=args.pool_size)
+    if args.trace_out:
+        Tracer.configure(args.trace_sample, seed=args.seed)
+    try:
+        if args.tenants > 1:
+            results = run_tenants(args.tenants, args, rng)
+            for ctx, stats in results:
+                print(f"{ctx.name}: {stats.customers} customers, {stats.events} events, {stats.sales} sales "
+                      f"in {stats.wall_seconds:.3f} s")
+            wall = max(s.wall_seconds for _, s in results)
+            events = sum(s.events for _, s in results)
+            print(f"All tenants: {events} events in {wall:.3f} s ({events / wall if wall else 0.0:.0f} events/s)")
+            return results[0][1]
+        with contextlib.redirect_stdout(NullWriter()):
+            vms, codes = build_fleet(args.machines, args.products, args.stock)
+        if args.trace:
+            arrivals = trace_arrivals(args.trace)
+        else:
+            arrivals = poisson_arrivals(args.rate, args.customers, args.machines, codes, args.zipf, rng)
+        stats = run_scenario(arrivals, vms, args.success_rate, args.failure_rate, rng, realtime=args.realtime)
+        print(format_report(stats))
+    finally:
+        if args.trace_out:
+            Tracer.disable()
+            Tracer.export(args.trace_out)
+        BridgeAdapter.configure(None)
+        if standin:
+            standin.stop()
+    return stats
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
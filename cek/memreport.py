@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+# memreport.py - Memory footprint report for the VendingMachine runtime
+#
+# Builds a fleet, drives it with the load generator in rounds and samples the
+# runtime's containers after each round. Every report shows per-class
+# instance counts and estimated bytes, links per relationship, state machine
+# history and queue sizes, with the growth since the previous sample, so
+# containers that keep growing under a steady workload stand out.
+#
+#   python memreport.py --machines 50 --customers 5000 --rounds 4
+#   python memreport.py --json footprint.json
+#   python memreport.py --machines 20000 --active 200 --max-resident 500   # page idle machines out to disk
+#
+# With --max-resident or --idle-seconds a runtime.paging.Pager evicts
+# quiescent machines after each round; --active sends every customer to the
+# first N machines so the rest of the fleet sits idle.
+
+from __future__ import annotations
+import argparse
+import contextlib
+import json
+import random
+import sys
+from typing import List, Optional
+
+from runtime.memory import MemorySample, format_report, growth, sample
+from runtime.paging import Pager
+
+import loadgen
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description='Runtime memory footprint report')
+    parser.add_argument('--machines', type=int, default=10, help='number of vending machines')
+    parser.add_argument('--products', type=int, default=20, help='number of catalog products')
+    parser.add_argument('--stock', type=int, default=1000, help='initial stock per product')
+    parser.add_argument('--customers', type=int, default=2000, help='customers per round')
+    parser.add_argument('--rounds', type=int, default=3, help='workload rounds, sampled after each')
+    parser.add_argument('--max-per-class', type=int, default=1000, help='instances measured per class before extrapolating')
+    parser.add_argument('--seed', type=int, default=None, help='random seed')
+    parser.add_argument('--json', help='also write every sample and the growth between them to this file')
+    parser.add_argument('--active', type=int, default=None, help='machines customers visit (default: all)')
+    parser.add_argument('--max-resident', type=int, default=None, help='page out machines beyond this many in memory')
+    parser.add_argument('--idle-seconds', type=float, default=None, help='page out machines idle this long')
+    parser.add_argument('--page-file', default=None, help='page store (default: a temporary file)')
+    return parser.parse_args(argv)
+
+def main(argv: Optional[List[str]] = None) -> List[MemorySample]:
+    args = parse_args(argv)
+    rng = random.Random(args.seed)
+    with contextlib.redirect_stdout(loadgen.NullWriter()):
+        vms, codes = loadgen.build_fleet(args.machines, args.products, args.stock)
+    pager = None
+    if args.max_resident is not None or args.idle_seconds is not None:
+        pager = Pager(args.page_file, classes=[loadgen.VendingMachine], max_resident=args.max_resident,
+                      idle_seconds=args.idle_seconds, states=['Idle'])
+        pager.maintain()
+    samples = [sample(args.max_per_class)]
+    print('After setup')
+    print(format_report(samples[0]))
+    if pager is not None:
+        print(f"Pager:              {pager.stats()}")
+    for n in range(1, args.rounds + 1):
+        arrivals = loadgen.poisson_arrivals(1000.0, args.customers, args.active or args.machines, codes, 1.1, rng)
+        loadgen.run_scenario(arrivals, vms, rng=rng)
+        if pager is not None:
+            pager.maintain()
+        samples.append(sample(args.max_per_class))
+        print(f"\nAfter round {n} ({args.customers} customers)")
+        print(format_report(samples[-1], samples[-2]))
+        if pager is not None:
+            print(f"Pager:              {pager.stats()}")
+    if pager is not None:
+        pager.close()
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump({
+                'samples': [s.to_dict() for s in samples],
+                'growth': [growth(a, b) for a, b in zip(samples, samples[1:])],
+            }, f, indent=2)
+    return samples
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
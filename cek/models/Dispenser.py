@@ -3,9 +3,11 @@ from __future__ import annotations
 import uuid
 from typing import Any, Dict, List, Optional, TYPE_CHECKING
 from runtime.base import InstanceBase, RuntimeServices, EventInstance
-from runtime.state_machine import StateMachine
+from runtime.state_machine import StateMachine, StateModel, EventPayload, NO_PAYLOAD
 from runtime.storage import ObjectStore
 from runtime.relationship import relate, unrelate, select_related, select_one_related
+from runtime.tracing import Tracer
+from runtime.bridge import BridgeAdapter
 
 # Lazy import helper to avoid circular dependencies
 def _get_class(name: str):
@@ -42,14 +44,19 @@ class Dispenser(InstanceBase):
         ObjectStore.register("Dispenser")
         ObjectStore.create("Dispenser", self._id, self)
 
+    @staticmethod
+    def _declared_attrs() -> Dict[str, Any]:
+        """Attributes declared on this class with fresh initial values"""
+        return {}
+
     def activateMotor(self, **kwargs):
         """Operation: activateMotor()"""
         print(f"[{self.kl}:{self._id}] OPERATION: activateMotor")
+        if Tracer.enabled: Tracer.instant(f"{self.kl}.activateMotor", 'operation', {'id': self._id})
         pass
 
     @classmethod
     def activateMotor(cls, **kwargs):
         """Bridge operation: activateMotor()"""
         print(f"[BRIDGE] DSP::activateMotor called")
-        # TODO: Implement external service integration
-        pass
+        return BridgeAdapter.call("DSP", "activateMotor", {**kwargs})
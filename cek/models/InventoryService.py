@@ -3,9 +3,11 @@ from __future__ import annotations
 import uuid
 from typing import Any, Dict, List, Optional, TYPE_CHECKING
 from runtime.base import InstanceBase, RuntimeServices, EventInstance
-from runtime.state_machine import StateMachine
+from runtime.state_machine import StateMachine, StateModel, EventPayload, NO_PAYLOAD
 from runtime.storage import ObjectStore
 from runtime.relationship import relate, unrelate, select_related, select_one_related
+from runtime.tracing import Tracer
+from runtime.bridge import BridgeAdapter
 
 # Lazy import helper to avoid circular dependencies
 def _get_class(name: str):
@@ -42,14 +44,21 @@ class InventoryService(InstanceBase):
         ObjectStore.register("InventoryService")
         ObjectStore.create("InventoryService", self._id, self)
 
+    @staticmethod
+    def _declared_attrs() -> Dict[str, Any]:
+        """Attributes declared on this class with fresh initial values"""
+        return {}
+
     def getStockStatus(self, **kwargs):
         """Operation: getStockStatus()"""
         print(f"[{self.kl}:{self._id}] OPERATION: getStockStatus")
+        if Tracer.enabled: Tracer.instant(f"{self.kl}.getStockStatus", 'operation', {'id': self._id})
         pass
 
     def updateStock(self, productCode: str = '', newStock: int = 0, **kwargs):
         """Operation: updateStock(productCode: string, newStock: integer)"""
         print(f"[{self.kl}:{self._id}] OPERATION: updateStock")
+        if Tracer.enabled: Tracer.instant(f"{self.kl}.updateStock", 'operation', {'id': self._id})
         kwargs['productCode'] = productCode
         kwargs['newStock'] = newStock
         pass
@@ -58,12 +67,10 @@ class InventoryService(InstanceBase):
     def getStockStatus(cls, **kwargs):
         """Bridge operation: getStockStatus()"""
         print(f"[BRIDGE] IS::getStockStatus called")
-        # TODO: Implement external service integration
-        pass
+        return BridgeAdapter.call("IS", "getStockStatus", {**kwargs})
 
     @classmethod
     def updateStock(cls, productCode: str = '', newStock: int = 0, **kwargs):
         """Bridge operation: updateStock(productCode: string, newStock: integer)"""
         print(f"[BRIDGE] IS::updateStock called")
-        # TODO: Implement external service integration
-        pass
+        return BridgeAdapter.call("IS", "updateStock", {'productCode': productCode, 'newStock': newStock, **kwargs})
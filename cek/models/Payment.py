@@ -3,9 +3,10 @@ from __future__ import annotations
 import uuid
 from typing import Any, Dict, List, Optional, TYPE_CHECKING
 from runtime.base import InstanceBase, RuntimeServices, EventInstance
-from runtime.state_machine import StateMachine
+from runtime.state_machine import StateMachine, StateModel, EventPayload, NO_PAYLOAD
 from runtime.storage import ObjectStore
 from runtime.relationship import relate, unrelate, select_related, select_one_related
+from runtime.tracing import Tracer
 
 # Lazy import helper to avoid circular dependencies
 def _get_class(name: str):
@@ -34,6 +35,7 @@ def _get_class_by_kl(kl: str):
 class Payment(InstanceBase):
     """xtUML Class: Payment (PAY)"""
     kl = "PAY"
+    _NUMERIC_ATTRS = {'amount': 'float64'}
 
     def __init__(self, id: Optional[str] = None):
         if id is None:
@@ -46,12 +48,19 @@ class Payment(InstanceBase):
         ObjectStore.register("Payment")
         ObjectStore.create("Payment", self._id, self)
 
+    @staticmethod
+    def _declared_attrs() -> Dict[str, Any]:
+        """Attributes declared on this class with fresh initial values"""
+        return {'paymentId': '', 'qrisCode': '', 'amount': 0.0, 'status': "Waiting"}
+
     def generateQRIS(self, **kwargs):
         """Operation: generateQRIS()"""
         print(f"[{self.kl}:{self._id}] OPERATION: generateQRIS")
+        if Tracer.enabled: Tracer.instant(f"{self.kl}.generateQRIS", 'operation', {'id': self._id})
         pass
 
     def verifyQRIS(self, **kwargs):
         """Operation: verifyQRIS()"""
         print(f"[{self.kl}:{self._id}] OPERATION: verifyQRIS")
+        if Tracer.enabled: Tracer.instant(f"{self.kl}.verifyQRIS", 'operation', {'id': self._id})
         pass
@@ -3,9 +3,11 @@ from __future__ import annotations
 import uuid
 from typing import Any, Dict, List, Optional, TYPE_CHECKING
 from runtime.base import InstanceBase, RuntimeServices, EventInstance
-from runtime.state_machine import StateMachine
+from runtime.state_machine import StateMachine, StateModel, EventPayload, NO_PAYLOAD
 from runtime.storage import ObjectStore
 from runtime.relationship import relate, unrelate, select_related, select_one_related
+from runtime.tracing import Tracer
+from runtime.bridge import BridgeAdapter
 
 # Lazy import helper to avoid circular dependencies
 def _get_class(name: str):
@@ -42,27 +44,32 @@ class PaymentService(InstanceBase):
         ObjectStore.register("PaymentService")
         ObjectStore.create("PaymentService", self._id, self)
 
+    @staticmethod
+    def _declared_attrs() -> Dict[str, Any]:
+        """Attributes declared on this class with fresh initial values"""
+        return {}
+
     def createQR(self, t_instance: Optional['Transaction'] = None, **kwargs):
         """Operation: createQR(t_instance: inst_ref<Transaction>)"""
         print(f"[{self.kl}:{self._id}] OPERATION: createQR")
+        if Tracer.enabled: Tracer.instant(f"{self.kl}.createQR", 'operation', {'id': self._id})
         kwargs['t_instance'] = t_instance
         pass
 
     def validatePayment(self, **kwargs):
         """Operation: validatePayment()"""
         print(f"[{self.kl}:{self._id}] OPERATION: validatePayment")
+        if Tracer.enabled: Tracer.instant(f"{self.kl}.validatePayment", 'operation', {'id': self._id})
         pass
 
     @classmethod
     def createQR(cls, t_instance: Optional['Transaction'] = None, **kwargs):
         """Bridge operation: createQR(t_instance: inst_ref<Transaction>)"""
         print(f"[BRIDGE] PS::createQR called")
-        # TODO: Implement external service integration
-        pass
+        return BridgeAdapter.call("PS", "createQR", {'t_instance': t_instance, **kwargs})
 
     @classmethod
     def validatePayment(cls, **kwargs):
         """Bridge operation: validatePayment()"""
         print(f"[BRIDGE] PS::validatePayment called")
-        # TODO: Implement external service integration
-        pass
+        return BridgeAdapter.call("PS", "validatePayment", {**kwargs})
@@ -3,9 +3,10 @@ from __future__ import annotations
 import uuid
 from typing import Any, Dict, List, Optional, TYPE_CHECKING
 from runtime.base import InstanceBase, RuntimeServices, EventInstance
-from runtime.state_machine import StateMachine
+from runtime.state_machine import StateMachine, StateModel, EventPayload, NO_PAYLOAD
 from runtime.storage import ObjectStore
 from runtime.relationship import relate, unrelate, select_related, select_one_related
+from runtime.tracing import Tracer
 
 # Lazy import helper to avoid circular dependencies
 def _get_class(name: str):
@@ -34,6 +35,7 @@ def _get_class_by_kl(kl: str):
 class Product(InstanceBase):
     """xtUML Class: Product (PRD)"""
     kl = "PRD"
+    _NUMERIC_ATTRS = {'price': 'float64', 'stock': 'int64'}
 
     def __init__(self, id: Optional[str] = None):
         if id is None:
@@ -46,12 +48,19 @@ class Product(InstanceBase):
         ObjectStore.register("Product")
         ObjectStore.create("Product", self._id, self)
 
+    @staticmethod
+    def _declared_attrs() -> Dict[str, Any]:
+        """Attributes declared on this class with fresh initial values"""
+        return {'productCode': '', 'name': '', 'price': 0.0, 'stock': 0}
+
     def checkStock(self, **kwargs):
         """Operation: checkStock()"""
         print(f"[{self.kl}:{self._id}] OPERATION: checkStock")
+        if Tracer.enabled: Tracer.instant(f"{self.kl}.checkStock", 'operation', {'id': self._id})
         pass
 
     def reduceStock(self, **kwargs):
         """Operation: reduceStock()"""
         print(f"[{self.kl}:{self._id}] OPERATION: reduceStock")
+        if Tracer.enabled: Tracer.instant(f"{self.kl}.reduceStock", 'operation', {'id': self._id})
         pass
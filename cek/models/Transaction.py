@@ -3,9 +3,10 @@ from __future__ import annotations
 import uuid
 from typing import Any, Dict, List, Optional, TYPE_CHECKING
 from runtime.base import InstanceBase, RuntimeServices, EventInstance
-from runtime.state_machine import StateMachine
+from runtime.state_machine import StateMachine, StateModel, EventPayload, NO_PAYLOAD
 from runtime.storage import ObjectStore
 from runtime.relationship import relate, unrelate, select_related, select_one_related
+from runtime.tracing import Tracer
 
 # Lazy import helper to avoid circular dependencies
 def _get_class(name: str):
@@ -34,6 +35,8 @@ def _get_class_by_kl(kl: str):
 class Transaction(InstanceBase):
     """xtUML Class: Transaction (TXN)"""
     kl = "TXN"
+    _NUMERIC_ATTRS = {'amount': 'float64'}
+    _REF_SLOTS = {'R4': 'R4_payment'}
 
     def __init__(self, id: Optional[str] = None):
         if id is None:
@@ -43,10 +46,17 @@ class Transaction(InstanceBase):
         self.set_attr('amount', 0.0)  # real
         self.set_attr('status', "Pending")  # string
         self.set_attr('timestamp', '')  # datetime
+        self.set_attr('R4_payment', None)  # inst_ref<Payment> (R4)
         ObjectStore.register("Transaction")
         ObjectStore.create("Transaction", self._id, self)
 
+    @staticmethod
+    def _declared_attrs() -> Dict[str, Any]:
+        """Attributes declared on this class with fresh initial values"""
+        return {'transactionId': '', 'amount': 0.0, 'status': "Pending", 'timestamp': '', 'R4_payment': None}
+
     def logTransaction(self, **kwargs):
         """Operation: logTransaction()"""
         print(f"[{self.kl}:{self._id}] OPERATION: logTransaction")
+        if Tracer.enabled: Tracer.instant(f"{self.kl}.logTransaction", 'operation', {'id': self._id})
         pass
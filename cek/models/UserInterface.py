@@ -3,9 +3,10 @@ from __future__ import annotations
 import uuid
 from typing import Any, Dict, List, Optional, TYPE_CHECKING
 from runtime.base import InstanceBase, RuntimeServices, EventInstance
-from runtime.state_machine import StateMachine
+from runtime.state_machine import StateMachine, StateModel, EventPayload, NO_PAYLOAD
 from runtime.storage import ObjectStore
 from runtime.relationship import relate, unrelate, select_related, select_one_related
+from runtime.tracing import Tracer
 
 # Lazy import helper to avoid circular dependencies
 def _get_class(name: str):
@@ -34,38 +35,50 @@ def _get_class_by_kl(kl: str):
 class UserInterface(InstanceBase):
     """xtUML Class: UserInterface (UI)"""
     kl = "UI"
+    _REF_SLOTS = {'R2': 'R2_vendingMachine'}
 
     def __init__(self, id: Optional[str] = None):
         if id is None:
             id = str(uuid.uuid4())
         super().__init__(id, "UI")
         self.set_attr('displayStatus', '')  # string
+        self.set_attr('R2_vendingMachine', None)  # inst_ref<VendingMachine> (R2)
         ObjectStore.register("UserInterface")
         ObjectStore.create("UserInterface", self._id, self)
 
+    @staticmethod
+    def _declared_attrs() -> Dict[str, Any]:
+        """Attributes declared on this class with fresh initial values"""
+        return {'displayStatus': '', 'R2_vendingMachine': None}
+
     def displayScreen(self, **kwargs):
         """Operation: displayScreen()"""
         print(f"[{self.kl}:{self._id}] OPERATION: displayScreen")
+        if Tracer.enabled: Tracer.instant(f"{self.kl}.displayScreen", 'operation', {'id': self._id})
         pass
 
     def receiveInput(self, **kwargs):
         """Operation: receiveInput()"""
         print(f"[{self.kl}:{self._id}] OPERATION: receiveInput")
+        if Tracer.enabled: Tracer.instant(f"{self.kl}.receiveInput", 'operation', {'id': self._id})
         pass
 
     def showQR(self, **kwargs):
         """Operation: showQR()"""
         print(f"[{self.kl}:{self._id}] OPERATION: showQR")
+        if Tracer.enabled: Tracer.instant(f"{self.kl}.showQR", 'operation', {'id': self._id})
         pass
 
     def showMessage(self, message: str = '', **kwargs):
         """Operation: showMessage(message: string)"""
         print(f"[{self.kl}:{self._id}] OPERATION: showMessage")
+        if Tracer.enabled: Tracer.instant(f"{self.kl}.showMessage", 'operation', {'id': self._id})
         kwargs['message'] = message
         pass
 
     def showError(self, error_msg: str = '', **kwargs):
         """Operation: showError(error_msg: string)"""
         print(f"[{self.kl}:{self._id}] OPERATION: showError")
+        if Tracer.enabled: Tracer.instant(f"{self.kl}.showError", 'operation', {'id': self._id})
         kwargs['error_msg'] = error_msg
         pass
@@ -3,9 +3,10 @@ from __future__ import annotations
 import uuid
 from typing import Any, Dict, List, Optional, TYPE_CHECKING
 from runtime.base import InstanceBase, RuntimeServices, EventInstance
-from runtime.state_machine import StateMachine
+from runtime.state_machine import StateMachine, StateModel, EventPayload, NO_PAYLOAD
 from runtime.storage import ObjectStore
 from runtime.relationship import relate, unrelate, select_related, select_one_related
+from runtime.tracing import Tracer
 
 # Lazy import helper to avoid circular dependencies
 def _get_class(name: str):
@@ -34,6 +35,31 @@ def _get_class_by_kl(kl: str):
 class VendingMachine(InstanceBase):
     """xtUML Class: VendingMachine (VM)"""
     kl = "VM"
+    _REF_SLOTS = {'R1': 'R1_selectedProduct', 'R2': 'R2_userInterface', 'R3': 'R3_transaction'}
+
+    # State and event encoding for the dense transition table
+    S_Idle = 0
+    S_CheckStock = 1
+    S_PaymentInitiated = 2
+    S_WaitingPayment = 3
+    S_WaitingPayment_Failed = 4
+    S_Dispensing = 5
+    S_OutOfStock = 6
+    S_Error = 7
+    E_ProductSelected = 0
+    E_StockEmpty = 1
+    E_PaymentInitiated = 2
+    E_PaymentSuccess = 3
+    E_PaymentFailed = 4
+    E_ItemDispensed = 5
+    E_Reset = 6
+
+    class P_ProductSelected(EventPayload):
+        """Parameters of VM1:ProductSelected"""
+        __slots__ = _FIELDS = ('p_productCode',)
+
+        def __init__(self, p_productCode: str = ''):
+            self.p_productCode = p_productCode
 
     def __init__(self, id: Optional[str] = None):
         if id is None:
@@ -42,101 +68,96 @@ class VendingMachine(InstanceBase):
         self.set_attr('currentState', "Idle")  # string
         self.set_attr('R1_selectedProduct', None)  # inst_ref<Product>
         self.set_attr('R3_transaction', None)  # inst_ref<Transaction>
+        self.set_attr('R2_userInterface', None)  # inst_ref<UserInterface> (R2)
         ObjectStore.register("VendingMachine")
         ObjectStore.create("VendingMachine", self._id, self)
         self._build_state_machine()
 
+    @staticmethod
+    def _declared_attrs() -> Dict[str, Any]:
+        """Attributes declared on this class with fresh initial values"""
+        return {'currentState': "Idle", 'R1_selectedProduct': None, 'R3_transaction': None, 'R2_userInterface': None}
+
     def handleSelection(self, p_productCode: str = '', **kwargs):
         """Operation: handleSelection(p_productCode: string)"""
         print(f"[{self.kl}:{self._id}] OPERATION: handleSelection")
+        if Tracer.enabled: Tracer.instant(f"{self.kl}.handleSelection", 'operation', {'id': self._id})
         kwargs['p_productCode'] = p_productCode
         pass
 
     def initiatePayment(self, **kwargs):
         """Operation: initiatePayment()"""
         print(f"[{self.kl}:{self._id}] OPERATION: initiatePayment")
+        if Tracer.enabled: Tracer.instant(f"{self.kl}.initiatePayment", 'operation', {'id': self._id})
         pass
 
     def verifyPayment(self, **kwargs):
         """Operation: verifyPayment()"""
         print(f"[{self.kl}:{self._id}] OPERATION: verifyPayment")
+        if Tracer.enabled: Tracer.instant(f"{self.kl}.verifyPayment", 'operation', {'id': self._id})
         pass
 
     def dispenseItem(self, **kwargs):
         """Operation: dispenseItem()"""
         print(f"[{self.kl}:{self._id}] OPERATION: dispenseItem")
+        if Tracer.enabled: Tracer.instant(f"{self.kl}.dispenseItem", 'operation', {'id': self._id})
         pass
 
     def cancelOrder(self, **kwargs):
         """Operation: cancelOrder()"""
         print(f"[{self.kl}:{self._id}] OPERATION: cancelOrder")
+        if Tracer.enabled: Tracer.instant(f"{self.kl}.cancelOrder", 'operation', {'id': self._id})
         pass
 
     def handleError(self, **kwargs):
         """Operation: handleError()"""
         print(f"[{self.kl}:{self._id}] OPERATION: handleError")
+        if Tracer.enabled: Tracer.instant(f"{self.kl}.handleError", 'operation', {'id': self._id})
         pass
 
     def _sm_action_Idle_ProductSelected(self, owner: 'VendingMachine', payload: Dict[str, Any]):
         """State action for Idle -> CheckStock via ProductSelected"""
         # Event parameters: p_productCode: string
-        from runtime.base import RuntimeServices
         # [Instance Selection] select any p from instances of PRD where (selected.productCode == rcvd_evt.p_productCode);
-        p_list = [candidate for candidate in ObjectStore.select_all(_KL_MAP.get("PRD", "PRD")) if candidate.get_attr('productCode') == payload.get('p_productCode')]
-        p = p_list[0] if p_list else None
+        p = ObjectStore.find_by("Product", 'productCode', payload.get('p_productCode'))
         if p is not None:
             relate("R1", owner, p)
             if p.get_attr('stock') > 0:
                 #  Stock tersedia, lanjut ke inisiasi pembayaran
                 # [Event Generation] PaymentInitiated to self
-                if owner and hasattr(owner, 'sm'):
-                    owner.sm.state = 'PaymentInitiated'
-                    owner.set_attr('currentState', 'PaymentInitiated')
-                if owner and hasattr(owner, 'sm'):
-                    owner.sm.dispatch("PaymentInitiated", {})
+                owner.sm.index = owner.S_PaymentInitiated
+                owner.sm.dispatch_index(owner.E_PaymentInitiated, NO_PAYLOAD)
             else:
                 #  Stock kosong, alihkan ke state CheckStock (next_state default)
                 # [Event Generation] StockEmpty to self
-                if owner and hasattr(owner, 'sm'):
-                    owner.sm.state = 'CheckStock'
-                    owner.set_attr('currentState', 'CheckStock')
-                if owner and hasattr(owner, 'sm'):
-                    owner.sm.dispatch("StockEmpty", {})
+                owner.sm.index = owner.S_CheckStock
+                owner.sm.dispatch_index(owner.E_StockEmpty, NO_PAYLOAD)
         else:
             #  Produk tidak ditemukan
             # [Relationship Navigation] select one ui related by self->UI[R2];
-            ui_list = select_related("R2", owner)
-            ui = ui_list[0] if ui_list else None
+            ui = select_one_related("R2", owner)
             if ui is not None:
                 # [Operation Call] ui.showError(error_msg:"Product not found");
-                if hasattr(ui, 'showError'): ui.showError(error_msg="Product not found")
+                ui.showError(error_msg="Product not found")
             #  Kembali ke Idle setelah error
             # [Event Generation] Reset to self
-            if owner and hasattr(owner, 'sm'):
-                owner.sm.state = 'OutOfStock'
-                owner.set_attr('currentState', 'OutOfStock')
-            if owner and hasattr(owner, 'sm'):
-                owner.sm.dispatch("Reset", {})
+            owner.sm.index = owner.S_OutOfStock
+            owner.sm.dispatch_index(owner.E_Reset, NO_PAYLOAD)
 
     def _sm_action_CheckStock_StockEmpty(self, owner: 'VendingMachine', payload: Dict[str, Any]):
         """State action for CheckStock -> OutOfStock via StockEmpty"""
-        from runtime.base import RuntimeServices
         # [Relationship Navigation] select one ui related by self->UI[R2];
-        ui_list = select_related("R2", owner)
-        ui = ui_list[0] if ui_list else None
+        ui = select_one_related("R2", owner)
         if ui is not None:
             # [Operation Call] ui.showMessage(message:"Out of stock. Please select another item.");
-            if hasattr(ui, 'showMessage'): ui.showMessage(message="Out of stock. Please select another item.")
+            ui.showMessage(message="Out of stock. Please select another item.")
 
     def _sm_action_PaymentInitiated_PaymentInitiated(self, owner: 'VendingMachine', payload: Dict[str, Any]):
         """State action for PaymentInitiated -> WaitingPayment via PaymentInitiated"""
-        from runtime.base import RuntimeServices
-        _cls_t = _get_class_by_kl("TXN")
-        t = _cls_t._create_instance()
+        t = Transaction._create_instance()
         print(f"[OAL] Created {t.kl}:{t._id}")
         # [Relationship Navigation] select one p related by self->PRD[R1];
-        p_list = select_related("R1", owner)
-        p = p_list[0] if p_list else None
+        p = select_one_related("R1", owner)
         #  Pastikan produk dipilih
         if p is not None:
             t.set_attr('amount', p.get_attr('price'))
@@ -144,102 +165,76 @@ class VendingMachine(InstanceBase):
             relate("R3", owner, t)
             #  Bridge Call: Initiate QR creation (PS is External Entity)
             # [Bridge/Function Call] PS::createQR(t_instance:t);
-            try:
-                PS.createQR(t_instance=t)
-            except NameError: print(f"[OAL] External Entity PS not loaded.")
+            PaymentService.createQR(t_instance=t)
             #  Optionally show QR on UI
             # [Relationship Navigation] select one ui related by self->UI[R2];
-            ui_list = select_related("R2", owner)
-            ui = ui_list[0] if ui_list else None
+            ui = select_one_related("R2", owner)
             if ui is not None:
                 # [Operation Call] ui.showQR();
-                if hasattr(ui, 'showQR'): ui.showQR()
+                ui.showQR()
         else:
             #  Error: Product lost or unselected
             # [Event Generation] Reset to self
-            if owner and hasattr(owner, 'sm'):
-                owner.sm.state = 'OutOfStock'
-                owner.set_attr('currentState', 'OutOfStock')
-            if owner and hasattr(owner, 'sm'):
-                owner.sm.dispatch("Reset", {})
+            owner.sm.index = owner.S_OutOfStock
+            owner.sm.dispatch_index(owner.E_Reset, NO_PAYLOAD)
 
     def _sm_action_WaitingPayment_PaymentSuccess(self, owner: 'VendingMachine', payload: Dict[str, Any]):
         """State action for WaitingPayment -> Dispensing via PaymentSuccess"""
-        from runtime.base import RuntimeServices
         #  On successful payment, mark transaction, reduce stock, and dispense */
         # [Relationship Navigation] select one t related by self->TXN[R3];
-        t_list = select_related("R3", owner)
-        t = t_list[0] if t_list else None
+        t = select_one_related("R3", owner)
         if t is not None:
             t.set_attr('status', "Completed")
         #  Activate Dispenser (DSP is External Entity, langsung panggil bridge)
         # [Bridge/Function Call] DSP::activateMotor();
-        try:
-            DSP.activateMotor()
-        except NameError: print(f"[OAL] External Entity DSP not loaded.")
+        Dispenser.activateMotor()
         # [Event Generation] ItemDispensed to self
-        if owner and hasattr(owner, 'sm'):
-            owner.sm.state = 'Dispensing'
-            owner.set_attr('currentState', 'Dispensing')
-        if owner and hasattr(owner, 'sm'):
-            owner.sm.dispatch("ItemDispensed", {})
+        owner.sm.index = owner.S_Dispensing
+        owner.sm.dispatch_index(owner.E_ItemDispensed, NO_PAYLOAD)
 
     def _sm_action_WaitingPayment_Failed_PaymentFailed(self, owner: 'VendingMachine', payload: Dict[str, Any]):
         """State action for WaitingPayment_Failed -> Error via PaymentFailed"""
-        from runtime.base import RuntimeServices
         # [Relationship Navigation] select one ui related by self->UI[R2];
-        ui_list = select_related("R2", owner)
-        ui = ui_list[0] if ui_list else None
+        ui = select_one_related("R2", owner)
         if ui is not None:
             # [Operation Call] ui.showError(error_msg:"Payment failed. Transaction canceled.");
-            if hasattr(ui, 'showError'): ui.showError(error_msg="Payment failed. Transaction canceled.")
+            ui.showError(error_msg="Payment failed. Transaction canceled.")
         # [Relationship Navigation] select one t related by self->TXN[R3];
-        t_list = select_related("R3", owner)
-        t = t_list[0] if t_list else None
+        t = select_one_related("R3", owner)
         if t is not None:
             unrelate("R3", owner, t)
             if t: ObjectStore.delete(type(t).__name__, t._id)
         #  Unrelate product selection (R1) as well
         # [Unrelate Navigation] unrelate self from self->PRD[R1] across R1;
-        owner_rel_tmp_list = select_related("R1", owner)
-        owner_rel_tmp = owner_rel_tmp_list[0] if owner_rel_tmp_list else None
+        owner_rel_tmp = select_one_related("R1", owner)
         if owner_rel_tmp is not None: unrelate("R1", owner, owner_rel_tmp)
         # [Event Generation] Reset to self
-        if owner and hasattr(owner, 'sm'):
-            owner.sm.state = 'OutOfStock'
-            owner.set_attr('currentState', 'OutOfStock')
-        if owner and hasattr(owner, 'sm'):
-            owner.sm.dispatch("Reset", {})
+        owner.sm.index = owner.S_OutOfStock
+        owner.sm.dispatch_index(owner.E_Reset, NO_PAYLOAD)
 
     def _sm_action_Dispensing_ItemDispensed(self, owner: 'VendingMachine', payload: Dict[str, Any]):
         """State action for Dispensing -> Idle via ItemDispensed"""
-        from runtime.base import RuntimeServices
         #  1. Update stock (local attribute & external service)
         # [Relationship Navigation] select one p related by self->PRD[R1];
-        p_list = select_related("R1", owner)
-        p = p_list[0] if p_list else None
+        p = select_one_related("R1", owner)
         if p is not None:
-            #  Hitung dan simpan nilai baru dalam variabel lokal (kepatuhan OAL)
-            new_stock = p.get_attr('stock') - 1
+            #  Kurangi stok dalam satu langkah atomik (mesin lain bisa menjual produk yang sama)
+            # [Atomic Update] atomic assign p.stock = p.stock - 1;
+            p.increment_attr('stock', -1)
+            new_stock = p.get_attr('stock')
             product_code = p.get_attr('productCode')
-            #  Update local stock
-            p.set_attr('stock', new_stock)
             #  Update external inventory (IS is External Entity)
             # [Bridge/Function Call] IS::updateStock(productCode: product_code, newStock: new_stock);
-            try:
-                IS.updateStock(productCode=product_code, newStock=new_stock)
-            except NameError: print(f"[OAL] External Entity IS not loaded.")
+            InventoryService.updateStock(productCode=product_code, newStock=new_stock)
             #  Optionally notify UI
             # [Relationship Navigation] select one ui related by self->UI[R2];
-            ui_list = select_related("R2", owner)
-            ui = ui_list[0] if ui_list else None
+            ui = select_one_related("R2", owner)
             if ui is not None:
                 # [Operation Call] ui.showMessage(message:"Item dispensed. Thank you!");
-                if hasattr(ui, 'showMessage'): ui.showMessage(message="Item dispensed. Thank you!")
+                ui.showMessage(message="Item dispensed. Thank you!")
         #  2. Clean up transaction (Hapus TXN dan R3)
         # [Relationship Navigation] select one t related by self->TXN[R3];
-        t_list = select_related("R3", owner)
-        t = t_list[0] if t_list else None
+        t = select_one_related("R3", owner)
         if t is not None:
             unrelate("R3", owner, t)
             if t: ObjectStore.delete(type(t).__name__, t._id)
@@ -248,58 +243,97 @@ class VendingMachine(InstanceBase):
 
     def _sm_action_OutOfStock_Reset(self, owner: 'VendingMachine', payload: Dict[str, Any]):
         """State action for OutOfStock -> Idle via Reset"""
-        from runtime.base import RuntimeServices
         # [Relationship Navigation] select one ui related by self->UI[R2];
-        ui_list = select_related("R2", owner)
-        ui = ui_list[0] if ui_list else None
+        ui = select_one_related("R2", owner)
         if ui is not None:
             # [Operation Call] ui.showMessage(message:"System ready for next order.");
-            if hasattr(ui, 'showMessage'): ui.showMessage(message="System ready for next order.")
+            ui.showMessage(message="System ready for next order.")
         # [Unrelate Navigation] unrelate self from self->PRD[R1] across R1; // Hapus referensi produk yang gagal
-        owner_rel_tmp_list = select_related("R1", owner)
-        owner_rel_tmp = owner_rel_tmp_list[0] if owner_rel_tmp_list else None
+        owner_rel_tmp = select_one_related("R1", owner)
         if owner_rel_tmp is not None: unrelate("R1", owner, owner_rel_tmp)
 
     def _sm_action_Error_Reset(self, owner: 'VendingMachine', payload: Dict[str, Any]):
         """State action for Error -> Idle via Reset"""
-        from runtime.base import RuntimeServices
         # [Relationship Navigation] select one ui related by self->UI[R2];
-        ui_list = select_related("R2", owner)
-        ui = ui_list[0] if ui_list else None
+        ui = select_one_related("R2", owner)
         if ui is not None:
             # [Operation Call] ui.showMessage(message:"Initializing system. Ready.");
-            if hasattr(ui, 'showMessage'): ui.showMessage(message="Initializing system. Ready.")
+            ui.showMessage(message="Initializing system. Ready.")
         #  Ensure all references are cleared (R1 and R3 if they exist)
         # [Unrelate Navigation] unrelate self from self->PRD[R1] across R1;
-        owner_rel_tmp_list = select_related("R1", owner)
-        owner_rel_tmp = owner_rel_tmp_list[0] if owner_rel_tmp_list else None
+        owner_rel_tmp = select_one_related("R1", owner)
         if owner_rel_tmp is not None: unrelate("R1", owner, owner_rel_tmp)
         # [Unrelate Navigation] unrelate self from self->TXN[R3] across R3;
-        owner_rel_tmp_list = select_related("R3", owner)
-        owner_rel_tmp = owner_rel_tmp_list[0] if owner_rel_tmp_list else None
+        owner_rel_tmp = select_one_related("R3", owner)
         if owner_rel_tmp is not None: unrelate("R3", owner, owner_rel_tmp)
 
-    def _build_sm_table(self) -> Dict:
-        """Build state machine transition table"""
-        table: Dict = {}
-        table.setdefault('Idle', {})['ProductSelected'] = (None, self._sm_action_Idle_ProductSelected, 'CheckStock')
-        table.setdefault('CheckStock', {})['StockEmpty'] = (None, self._sm_action_CheckStock_StockEmpty, 'OutOfStock')
-        table.setdefault('PaymentInitiated', {})['PaymentInitiated'] = (None, self._sm_action_PaymentInitiated_PaymentInitiated, 'WaitingPayment')
-        table.setdefault('WaitingPayment', {})['PaymentSuccess'] = (None, self._sm_action_WaitingPayment_PaymentSuccess, 'Dispensing')
-        table.setdefault('WaitingPayment_Failed', {})['PaymentFailed'] = (None, self._sm_action_WaitingPayment_Failed_PaymentFailed, 'Error')
-        table.setdefault('Dispensing', {})['ItemDispensed'] = (None, self._sm_action_Dispensing_ItemDispensed, 'Idle')
-        table.setdefault('OutOfStock', {})['Reset'] = (None, self._sm_action_OutOfStock_Reset, 'Idle')
-        table.setdefault('Error', {})['Reset'] = (None, self._sm_action_Error_Reset, 'Idle')
-        table.setdefault('WaitingPayment', {})['PaymentFailed'] = (None, self._sm_action_WaitingPayment_Failed_PaymentFailed, 'Error')
-        return table
+    _SM = StateModel(
+        states=('Idle', 'CheckStock', 'PaymentInitiated', 'WaitingPayment', 'WaitingPayment_Failed', 'Dispensing', 'OutOfStock', 'Error'),
+        events=('ProductSelected', 'StockEmpty', 'PaymentInitiated', 'PaymentSuccess', 'PaymentFailed', 'ItemDispensed', 'Reset'),
+        table=(
+            # Idle
+            ((None, _sm_action_Idle_ProductSelected, S_CheckStock), None, None, None, None, None, None),
+            # CheckStock
+            (None, (None, _sm_action_CheckStock_StockEmpty, S_OutOfStock), None, None, None, None, None),
+            # PaymentInitiated
+            (None, None, (None, _sm_action_PaymentInitiated_PaymentInitiated, S_WaitingPayment), None, None, None, None),
+            # WaitingPayment
+            (None, None, None, (None, _sm_action_WaitingPayment_PaymentSuccess, S_Dispensing), (None, _sm_action_WaitingPayment_Failed_PaymentFailed, S_Error), None, None),
+            # WaitingPayment_Failed
+            (None, None, None, None, (None, _sm_action_WaitingPayment_Failed_PaymentFailed, S_Error), None, None),
+            # Dispensing
+            (None, None, None, None, None, (None, _sm_action_Dispensing_ItemDispensed, S_Idle), None),
+            # OutOfStock
+            (None, None, None, None, None, None, (None, _sm_action_OutOfStock_Reset, S_Idle)),
+            # Error
+            (None, None, None, None, None, None, (None, _sm_action_Error_Reset, S_Idle)),
+        ),
+    )
 
     def _build_state_machine(self):
         """Initialize state machine"""
         initial_state = self.get_attr('currentState') or 'Idle'
-        self.sm = StateMachine(self, initial_state, self._build_sm_table())
+        self.sm = StateMachine(self, initial_state, self._SM)
 
     def dispatch_event(self, event_name: str, **payload) -> bool:
         """Dispatch an event to this instance's state machine"""
         if hasattr(self, 'sm'):
             return self.sm.dispatch(event_name, payload)
         return False
+
+    def send_ProductSelected(self, p_productCode: str = '') -> bool:
+        """Dispatch ProductSelected to this instance's state machine"""
+        payload = self.P_ProductSelected.acquire(p_productCode)
+        handled = self.sm.dispatch_index(self.E_ProductSelected, payload)
+        payload.release()
+        return handled
+
+    def send_StockEmpty(self) -> bool:
+        """Dispatch StockEmpty to this instance's state machine"""
+        return self.sm.dispatch_index(self.E_StockEmpty, NO_PAYLOAD)
+
+    def send_PaymentInitiated(self) -> bool:
+        """Dispatch PaymentInitiated to this instance's state machine"""
+        return self.sm.dispatch_index(self.E_PaymentInitiated, NO_PAYLOAD)
+
+    def send_PaymentSuccess(self) -> bool:
+        """Dispatch PaymentSuccess to this instance's state machine"""
+        return self.sm.dispatch_index(self.E_PaymentSuccess, NO_PAYLOAD)
+
+    def send_PaymentFailed(self) -> bool:
+        """Dispatch PaymentFailed to this instance's state machine"""
+        return self.sm.dispatch_index(self.E_PaymentFailed, NO_PAYLOAD)
+
+    def send_ItemDispensed(self) -> bool:
+        """Dispatch ItemDispensed to this instance's state machine"""
+        return self.sm.dispatch_index(self.E_ItemDispensed, NO_PAYLOAD)
+
+    def send_Reset(self) -> bool:
+        """Dispatch Reset to this instance's state machine"""
+        return self.sm.dispatch_index(self.E_Reset, NO_PAYLOAD)
+
+# Model classes used by the actions above
+from models.Dispenser import Dispenser
+from models.InventoryService import InventoryService
+from models.PaymentService import PaymentService
+from models.Transaction import Transaction
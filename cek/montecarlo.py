@@ -0,0 +1,209 @@
+#!/usr/bin/env python3
+# montecarlo.py - Parallel Monte Carlo what-if runner for the VendingMachine model
+#
+# Expands a grid of scenario parameters (price, stock, payment failure rate,
+# ...) times a number of replicas, fans the runs out over a process pool and
+# aggregates the per-run summaries as they stream back. Worker processes
+# import the generated models once and reset the runtime between runs, so a
+# run costs only its own simulation.
+#
+#   python montecarlo.py --price 5000 7000 9000 --stock 20 50 --replicas 200
+#   python montecarlo.py --success-rate 0.75 --failure-rate 0.05 0.1 0.2 --workers 8 --results runs.jsonl
+#   python montecarlo.py --workers 1      # serial, in this process
+#
+# Every run gets its own seed derived from --seed and the run number, so each
+# run's result is the same whatever the worker count or completion order.
+
+from __future__ import annotations
+import argparse
+import concurrent.futures
+import itertools
+import json
+import math
+import os
+import random
+import sys
+import time
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+# (run number, scenario parameters)
+Run = Tuple[int, Dict[str, Any]]
+
+# Scenario parameters that can be varied (each a command-line option taking several values)
+GRID = ('machines', 'products', 'stock', 'price', 'customers', 'rate', 'zipf', 'success_rate', 'failure_rate')
+
+# Per-run summary fields aggregated across replicas
+METRICS = ('sales', 'revenue', 'stock_outs', 'not_found', 'payment_failures', 'payment_timeouts', 'rejected', 'events')
+
+_loadgen: Any = None  # the worker's loadgen module, imported once per process
+
+def _load() -> Any:
+    global _loadgen
+    if _loadgen is None:
+        import loadgen
+        _loadgen = loadgen
+    return _loadgen
+
+def _init_worker():
+    """Import the models once and silence per-event output for the life of the worker"""
+    from runtime.state_machine import StateMachine
+    StateMachine.log_transitions = False
+    sys.stdout = _load().NullWriter()
+
+def run_one(run: Run) -> Dict[str, Any]:
+    """Simulate one scenario in the calling process and return its summary"""
+    from runtime.context import current_context
+    _load()
+    number, params = run
+    rng = random.Random(params['seed'])
+    ctx = current_context()
+    ctx.clear()  # drop the previous run's instances, links, timers and messages
+    vms, codes = _loadgen.build_fleet(params['machines'], params['products'], params['stock'], params['price'])
+    arrivals = _loadgen.poisson_arrivals(params['rate'], params['customers'], params['machines'], codes, params['zipf'], rng)
+    stats = _loadgen.LoadStats()
+    _loadgen.drive(stats, arrivals, vms, params['success_rate'], params['failure_rate'], rng, False)
+    ctx.clear()
+    return {'run': number, 'pid': os.getpid(), 'params': params, 'summary': stats.summary()}
+
+def scenarios(grid: Dict[str, List[Any]], replicas: int, seed: int) -> Iterator[Run]:
+    """Every combination of grid values, replicas times, each with its own seed"""
+    names = list(grid)
+    number = 0
+    for values in itertools.product(*(grid[name] for name in names)):
+        for replica in range(replicas):
+            params = dict(zip(names, values), replica=replica, seed=seed * 1000003 + number)
+            yield number, params
+            number += 1
+
+def iter_results(runs: Iterable[Run], workers: int, window: int = 0) -> Iterator[Dict[str, Any]]:
+    """Run scenarios on a process pool, yielding summaries in completion order.
+
+    At most `window` runs (default 4 per worker) are in flight, so very large
+    studies are neither submitted nor held in memory all at once.
+    """
+    if workers <= 1:
+        for run in runs:
+            with _load().quieted(True):
+                result = run_one(run)
+            yield result
+        return
+    window = window or workers * 4
+    runs = iter(runs)
+    with concurrent.futures.ProcessPoolExecutor(max_workers=workers, initializer=_init_worker) as pool:
+        pending = {pool.submit(run_one, run) for run in itertools.islice(runs, window)}
+        while pending:
+            done, pending = concurrent.futures.wait(pending, return_when=concurrent.futures.FIRST_COMPLETED)
+            for future in done:
+                yield future.result()
+            for run in itertools.islice(runs, len(done)):
+                pending.add(pool.submit(run_one, run))
+
+class Aggregate:
+    """Running mean and variance of each metric for one parameter set (Welford)"""
+
+    def __init__(self, params: Dict[str, Any]):
+        self.params = params
+        self.runs = 0
+        self._mean: Dict[str, float] = {m: 0.0 for m in METRICS}
+        self._m2: Dict[str, float] = {m: 0.0 for m in METRICS}
+
+    def add(self, summary: Dict[str, Any]):
+        self.runs += 1
+        for m in METRICS:
+            x = float(summary.get(m, 0) or 0)
+            delta = x - self._mean[m]
+            self._mean[m] += delta / self.runs
+            self._m2[m] += delta * (x - self._mean[m])
+
+    def mean(self, metric: str) -> float:
+        return self._mean[metric]
+
+    def stdev(self, metric: str) -> float:
+        return math.sqrt(self._m2[metric] / (self.runs - 1)) if self.runs > 1 else 0.0
+
+    def ci95(self, metric: str) -> float:
+        """Half-width of the normal-approximation 95% confidence interval of the mean"""
+        return 1.96 * self.stdev(metric) / math.sqrt(self.runs) if self.runs else 0.0
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'params': self.params,
+            'runs': self.runs,
+            'mean': dict(self._mean),
+            'stdev': {m: self.stdev(m) for m in METRICS},
+            'ci95': {m: self.ci95(m) for m in METRICS},
+        }
+
+def format_report(aggregates: List[Aggregate], varied: List[str], runs: int, seconds: float, workers: int) -> str:
+    """Human-readable study summary, one row per parameter set"""
+    lines = ['=' * 72, 'Monte Carlo study', '=' * 72]
+    lines.append(f"Runs:               {runs} on {workers} worker(s)")
+    lines.append(f"Wall time:          {seconds:.2f} s ({runs / seconds if seconds else 0.0:.1f} runs/s)")
+    lines.append('')
+    header = ''.join(f"{name:>14}" for name in varied)
+    lines.append(f"{header}{'runs':>6}{'sales':>16}{'revenue':>22}{'stock-outs':>16}{'pay fail':>10}")
+    for agg in aggregates:
+        key = ''.join(f"{agg.params[name]!s:>14}" for name in varied)
+        lines.append(f"{key}{agg.runs:>6}"
+                     f"{agg.mean('sales'):>9.1f} ±{agg.ci95('sales'):<5.1f}"
+                     f"{agg.mean('revenue'):>14.0f} ±{agg.ci95('revenue'):<6.0f}"
+                     f"{agg.mean('stock_outs'):>9.1f} ±{agg.ci95('stock_outs'):<5.1f}"
+                     f"{agg.mean('payment_failures'):>10.1f}")
+    return '\n'.join(lines)
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description='Parallel Monte Carlo runner for the VendingMachine model')
+    parser.add_argument('--machines', type=int, nargs='+', default=[10], help='vending machines per run')
+    parser.add_argument('--products', type=int, nargs='+', default=[20], help='catalog products per run')
+    parser.add_argument('--stock', type=int, nargs='+', default=[50], help='initial stock per product')
+    parser.add_argument('--price', type=float, nargs='+', default=[7000.0], help='product price')
+    parser.add_argument('--customers', type=int, nargs='+', default=[500], help='customers per run')
+    parser.add_argument('--rate', type=float, nargs='+', default=[100.0], help='fleet-wide arrivals per second')
+    parser.add_argument('--zipf', type=float, nargs='+', default=[1.1], help='Zipf exponent for product popularity')
+    parser.add_argument('--success-rate', type=float, nargs='+', default=[0.9], help='probability a payment succeeds')
+    parser.add_argument('--failure-rate', type=float, nargs='+', default=[0.08], help='probability a payment fails')
+    parser.add_argument('--replicas', type=int, default=100, help='runs per parameter set')
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1, help='worker processes (1 runs serially)')
+    parser.add_argument('--seed', type=int, default=0, help='base random seed')
+    parser.add_argument('--results', help='stream every run summary to this JSON-lines file')
+    parser.add_argument('--json', help='write the aggregated study to this file')
+    args = parser.parse_args(argv)
+    for s in args.success_rate:
+        for f in args.failure_rate:
+            if s + f > 1.0:
+                parser.error('--success-rate + --failure-rate must not exceed 1.0')
+    return args
+
+def main(argv: Optional[List[str]] = None) -> List[Aggregate]:
+    args = parse_args(argv)
+    grid = {name: getattr(args, name) for name in GRID}
+    varied = [name for name, values in grid.items() if len(values) > 1]
+    aggregates: Dict[Tuple, Aggregate] = {}
+    total = 0
+    started = time.perf_counter()
+    out = open(args.results, 'w') if args.results else None
+    try:
+        for result in iter_results(scenarios(grid, args.replicas, args.seed), args.workers):
+            params = result['params']
+            key = tuple(params[name] for name in grid)
+            agg = aggregates.get(key)
+            if agg is None:
+                agg = aggregates[key] = Aggregate({name: params[name] for name in grid})
+            agg.add(result['summary'])
+            total += 1
+            if out is not None:
+                out.write(json.dumps(result) + '\n')
+    finally:
+        if out is not None:
+            out.close()
+    seconds = time.perf_counter() - started
+    ordered = [aggregates[key] for key in sorted(aggregates)]
+    print(format_report(ordered, varied, total, seconds, args.workers))
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump({'runs': total, 'seconds': seconds, 'workers': args.workers,
+                       'results': [agg.to_dict() for agg in ordered]}, f, indent=2)
+    return ordered
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
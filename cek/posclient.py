@@ -0,0 +1,172 @@
+#!/usr/bin/env python3
+# posclient.py - Point-of-sale terminal simulator for the event server
+#
+# Opens many concurrent connections to an EventServer (app.py --serve, or one
+# started in this process), each acting as the terminal of one vending
+# machine, and pipelines whole purchases over it: ProductSelected, then
+# PaymentSuccess or PaymentFailed, then Reset. The report gives requests/s,
+# round-trip percentiles and the purchase outcomes read from the replies.
+#
+#   python posclient.py --connections 2000 --purchases 20      # server in this process
+#   python posclient.py --connect 127.0.0.1:8765 --connections 1 --machines 1
+#   python posclient.py --unix /tmp/vm.sock --workers 4
+#
+# A remote server must already hold the machines (vendingmachine_1 ..
+# vendingmachine_N, as created by loadgen.build_fleet or app.py's demo data).
+
+from __future__ import annotations
+import argparse
+import asyncio
+import random
+import sys
+import time
+from typing import Any, Dict, List, Optional
+
+from runtime.event_server import EventClient, EventServer
+
+import loadgen
+
+class PosStats:
+    """Outcomes and round-trip times collected from the replies"""
+
+    def __init__(self):
+        self.round_trips: List[int] = []  # ns per request, submit to reply
+        self.requests = 0
+        self.errors = 0
+        self.sales = 0
+        self.stock_outs = 0
+        self.not_found = 0
+        self.payment_failures = 0
+        self.final_states: Dict[str, int] = {}
+        self.wall_seconds = 0.0
+
+    def percentile(self, q: float) -> float:
+        """Round-trip percentile in microseconds"""
+        samples = sorted(self.round_trips)
+        if not samples:
+            return 0.0
+        idx = min(len(samples) - 1, int(round(q / 100.0 * (len(samples) - 1))))
+        return samples[idx] / 1000.0
+
+def _submit(client: EventClient, stats: PosStats, machine: str, event: str, **params) -> asyncio.Future:
+    """Pipeline one request, timing it from submission to the arrival of its reply"""
+    start = time.perf_counter_ns()
+    future = client.submit('VendingMachine', machine, event, **params)
+    future.add_done_callback(lambda _: stats.round_trips.append(time.perf_counter_ns() - start))
+    return future
+
+async def _reply(stats: PosStats, future: asyncio.Future) -> Dict[str, Any]:
+    reply = await future
+    stats.requests += 1
+    if 'error' in reply:
+        stats.errors += 1
+    return reply
+
+async def terminal(client: EventClient, stats: PosStats, machine: str, codes: List[str], purchases: int,
+                   success_rate: float, rng: random.Random):
+    """One terminal: pipeline every purchase, then read the replies in order"""
+    flows = []
+    for _ in range(purchases):
+        code = rng.choice(codes)
+        payment = 'PaymentSuccess' if rng.random() < success_rate else 'PaymentFailed'
+        flows.append((
+            payment,
+            _submit(client, stats, machine, 'ProductSelected', p_productCode=code),
+            _submit(client, stats, machine, payment),
+            _submit(client, stats, machine, 'Reset'),
+        ))
+    last = None
+    for payment, *futures in flows:
+        selected, paid, last = [await _reply(stats, future) for future in futures]
+        if selected.get('state') == 'OutOfStock':
+            stats.stock_outs += 1
+        elif selected.get('state') != 'WaitingPayment':
+            stats.not_found += 1
+        elif payment == 'PaymentSuccess' and paid.get('ok'):
+            stats.sales += 1
+        elif payment == 'PaymentFailed':
+            stats.payment_failures += 1
+    if last is not None:
+        state = last.get('state') or 'unknown'
+        stats.final_states[state] = stats.final_states.get(state, 0) + 1
+
+async def run_terminals(args: argparse.Namespace, host: str, port: int, path: Optional[str], codes: List[str]) -> PosStats:
+    stats = PosStats()
+    rng = random.Random(args.seed)
+    clients = [EventClient(host, port, path) for _ in range(args.connections)]
+    await asyncio.gather(*(client.connect() for client in clients))
+    started = time.perf_counter()
+    try:
+        await asyncio.gather(*(
+            terminal(client, stats, f'vendingmachine_{n % args.machines + 1}', codes, args.purchases,
+                     args.success_rate, random.Random(rng.random()))
+            for n, client in enumerate(clients)
+        ))
+    finally:
+        stats.wall_seconds = time.perf_counter() - started
+        await asyncio.gather(*(client.close() for client in clients))
+    return stats
+
+def format_report(stats: PosStats, connections: int, server: Optional[EventServer]) -> str:
+    lines = ['=' * 60, 'Point-of-sale client report', '=' * 60]
+    lines.append(f"Connections:        {connections}")
+    lines.append(f"Requests:           {stats.requests} ({stats.errors} errors)")
+    lines.append(f"Wall time:          {stats.wall_seconds:.3f} s")
+    lines.append(f"Throughput:         {stats.requests / stats.wall_seconds if stats.wall_seconds else 0.0:.0f} requests/s")
+    lines.append(f"Round trip us:      p50 {stats.percentile(50):.0f}  p90 {stats.percentile(90):.0f}  "
+                 f"p99 {stats.percentile(99):.0f}  max {stats.percentile(100):.0f}")
+    lines.append(f"Sales:              {stats.sales}")
+    lines.append(f"Stock-outs:         {stats.stock_outs}")
+    lines.append(f"Unknown product:    {stats.not_found}")
+    lines.append(f"Payment failures:   {stats.payment_failures}")
+    lines.append(f"Final states:       {dict(sorted(stats.final_states.items()))}")
+    if server is not None:
+        lines.append(f"Server:             {server.stats()}")
+    return '\n'.join(lines)
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description='Point-of-sale terminal simulator for the event server')
+    parser.add_argument('--connect', metavar='HOST:PORT', help='use a running TCP event server')
+    parser.add_argument('--unix', metavar='PATH', help='use a Unix socket (started here unless --external)')
+    parser.add_argument('--external', action='store_true', help='the --unix server is already running')
+    parser.add_argument('--connections', type=int, default=1000, help='concurrent terminal connections')
+    parser.add_argument('--machines', type=int, default=None, help='machines addressed (default: one per connection)')
+    parser.add_argument('--purchases', type=int, default=10, help='purchases pipelined per connection')
+    parser.add_argument('--products', type=int, default=20, help='catalog products (local server)')
+    parser.add_argument('--stock', type=int, default=1000, help='initial stock per product (local server)')
+    parser.add_argument('--codes', nargs='+', default=None, help='productCodes to buy (remote server; default A1)')
+    parser.add_argument('--success-rate', type=float, default=0.9, help='probability a payment succeeds')
+    parser.add_argument('--workers', type=int, default=0, help='dispatch threads of the local server')
+    parser.add_argument('--seed', type=int, default=None, help='random seed')
+    args = parser.parse_args(argv)
+    if args.machines is None:
+        args.machines = args.connections
+    return args
+
+def main(argv: Optional[List[str]] = None) -> PosStats:
+    args = parse_args(argv)
+    server = None
+    if args.connect:
+        host, _, port = args.connect.rpartition(':')
+        host, port, path = host or '127.0.0.1', int(port), None
+        codes = args.codes or ['A1']
+    elif args.unix and args.external:
+        host, port, path = '127.0.0.1', 0, args.unix
+        codes = args.codes or ['A1']
+    else:
+        with loadgen.quieted(True):
+            _, codes = loadgen.build_fleet(args.machines, args.products, args.stock)
+        server = EventServer(path=args.unix, workers=args.workers)
+        server.start()
+        host, port, path = server.host, server.port, args.unix
+    try:
+        with loadgen.quieted(server is not None):
+            stats = asyncio.run(run_terminals(args, host, port, path, codes))
+    finally:
+        if server is not None:
+            server.stop()
+    print(format_report(stats, args.connections, server))
+    return stats
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
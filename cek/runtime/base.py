@@ -3,88 +3,216 @@ from __future__ import annotations
 import time
 import threading
 import uuid
-from typing import Any, Dict, List, Optional, TYPE_CHECKING
+from collections.abc import Mapping
+from typing import Any, Callable, Dict, List, Optional, Tuple, TYPE_CHECKING
+from runtime.context import RuntimeContext, current_context
+from runtime.unit_of_work import active_unit, _KEEP, _stripe
+from runtime.changefeed import ChangeFeed
+from runtime.tracing import Tracer
+from runtime.state_machine import NO_PAYLOAD
 
 class EventInstance:
     """Represents an OAL event with payload data"""
-    def __init__(self, name: str, target: Any, payload: Optional[Dict] = None):
+    __slots__ = ('name', 'target', 'payload', 'timestamp')
+
+    def __init__(self, name: str, target: Any, payload: Optional[Mapping] = None):
         self.name = name
         self.target = target
-        self.payload = payload or {}
+        self.payload = payload if payload is not None else NO_PAYLOAD
         self.timestamp = time.time()
     
     def __repr__(self):
         return f"<Event:{self.name} -> {self.target}>"
 
 class RuntimeServices:
-    """Core runtime services for OAL simulation"""
-    _timers: Dict[str, threading.Timer] = {} 
-    _current_time: float = time.time()
-    _message_bus: List[Dict] = []
+    """Core runtime services for OAL simulation, acting on the current runtime context"""
 
     @classmethod
     def send_message(cls, target: str, message: str, payload: Dict):
         """Send inter-component message"""
         print(f"[MSG] Sending {message} to {target} with {payload}")
-        cls._message_bus.append({'to': target, 'msg': message, 'data': payload})
+        current_context().message_bus.append({'to': target, 'msg': message, 'data': payload})
     
     @classmethod
     def create_timer(cls, instance: Any, duration: float, event_name: str) -> str:
         """Create a timer that dispatches event after duration"""
         timer_id = str(uuid.uuid4())
+        timers = current_context().timers
+        handoff = Tracer.handoff() if Tracer.enabled else None  # the expiry joins the trace that set the timer
         def callback():
             print(f"[TIMER] Expired. Dispatching {event_name} to {instance.kl}")
             if hasattr(instance, 'sm'):
-                instance.sm.dispatch(event_name, {})
-            if timer_id in cls._timers:
-                del cls._timers[timer_id]
+                with Tracer.resume(handoff):
+                    instance.sm.dispatch(event_name, NO_PAYLOAD)
+            timers.pop(timer_id, None)
 
         t = threading.Timer(float(duration), callback)
+        t.instance = instance  # armed timers keep their instance from being paged out
         t.start()
-        cls._timers[timer_id] = t
+        timers[timer_id] = t
         return timer_id
     
     @classmethod
     def cancel_timer(cls, timer_id: str):
         """Cancel an existing timer"""
-        if timer_id in cls._timers:
-            cls._timers[timer_id].cancel()
-            del cls._timers[timer_id]
+        timers = current_context().timers
+        if timer_id in timers:
+            timers[timer_id].cancel()
+            del timers[timer_id]
         
     @classmethod
     def current_date(cls) -> str:
         """Get current date in ISO format"""
-        return time.strftime("%Y-%m-%d", time.localtime(cls._current_time))
+        return time.strftime("%Y-%m-%d", time.localtime(current_context().current_time))
     
     @classmethod
     def current_time(cls) -> str:
         """Get current time"""
-        return time.strftime("%H:%M:%S", time.localtime(cls._current_time))
+        return time.strftime("%H:%M:%S", time.localtime(current_context().current_time))
     
     @classmethod
     def current_timestamp(cls) -> float:
         """Get current timestamp"""
-        return cls._current_time
+        return current_context().current_time
 
 class InstanceBase:
     """Base class for all model instances"""
     kl: str = "BASE"
+    _columns: Optional[Any] = None  # ColumnStore holding this class's numeric attributes
+    _row: Optional[int] = None  # this instance's row in _columns
+    _watched: frozenset = frozenset()  # attributes captured by ChangeFeed
+    _watch_lifecycle: bool = False  # whether ChangeFeed captures creates/deletes
+    _REF_SLOTS: Dict[str, str] = {}  # { rel_id: referential attribute holding the single related instance }
+    _ctx: RuntimeContext  # context the instance was created in
+    _seq: int = 0  # creation number within the context (instances newer than a snapshot are not preserved for it)
+    _pager: Optional[Any] = None  # Pager holding this instance's attributes and state machine while it is evicted
     
     def __init__(self, id: str, kl: str):
         self._id = id
         self.kl = kl
         self._attrs: Dict[str, Any] = {}
+        self._ctx = ctx = current_context()
+        self._seq = ctx.instance_seq = ctx.instance_seq + 1
+        if ctx.columns:
+            self._columns = ctx.columns.get(type(self).__name__)
         
     def __repr__(self):
         return f"<{self.kl}:{self._id}>"
 
+    def __getattr__(self, name: str) -> Any:
+        # Only reached when normal lookup fails: an evicted instance is missing _attrs and sm until faulted in
+        pager = self.__dict__.get('_pager')
+        if pager is not None and name in ('_attrs', 'sm') and pager.fault_in(self):
+            return object.__getattribute__(self, name)
+        raise AttributeError(f"'{type(self).__name__}' object has no attribute '{name}'")
+
     def set_attr(self, name: str, value: Any):
-        """Set attribute value"""
-        self._attrs[name] = value
+        """Set attribute value (buffered while a unit of work is open)"""
+        uow = active_unit.uow
+        if uow is not None:
+            uow.stage_attr(self, name, value)
+            return
+        if self._ctx.snapshots:
+            self._ctx.preserve_attrs(self)
+        watched = name in self._watched
+        if watched:
+            old = self._stored_attr(name)
+        if self._columns is not None and name in self._columns.arrays:
+            self._columns.set(self, name, value)
+        else:
+            self._attrs[name] = value
+        if watched:
+            ChangeFeed.attr_changed(self, name, old, value)
 
     def get_attr(self, name: str) -> Any:
-        """Get attribute value"""
+        """Get attribute value, seeing writes buffered on this thread"""
+        uow = active_unit.uow
+        if uow is not None:
+            pending = uow.attrs.get(self)
+            if pending is not None and name in pending:
+                return pending[name]
+            if uow.atomics:
+                staged = uow.atomics.get((self, name))
+                if staged is not None:
+                    return staged[0]
+        if self._columns is not None and name in self._columns.arrays:
+            return self._columns.get(self, name)
+        return self._attrs.get(name)
+
+    # --- Atomic updates ---
+    # For counters that several threads update at once (like Product.stock).
+    # Inside a step they are buffered like set_attr, as the update itself
+    # rather than its result: the step sees its own outcome at once, nobody
+    # else sees anything until commit, and commit re-runs each update on the
+    # latest value under its stripe lock, failing the step if the outcome
+    # changed. Outside a step each is applied at once under its stripe lock.
+    # An attribute the step already wrote with set_attr is private to it until
+    # commit, so the update applies to that pending value instead. Plain
+    # set_attr writes are not ordered against atomic ones: once an attribute is
+    # updated atomically, update it that way everywhere.
+
+    def increment_attr(self, name: str, delta: Any = 1) -> Any:
+        """Atomically add delta (negative to subtract) to a numeric attribute; returns the new value"""
+        return self._update_attr(name, lambda value: value + delta)[1]
+
+    def decrement_attr_if_positive(self, name: str, amount: Any = 1) -> Optional[Any]:
+        """Atomically subtract amount unless that takes the attribute below zero; returns the new value, or None if refused"""
+        old, new = self._update_attr(name, lambda value: value - amount if value is not None and value >= amount else _KEEP)
+        return None if new is _KEEP else new
+
+    def compare_and_set_attr(self, name: str, expected: Any, value: Any) -> bool:
+        """Atomically set the attribute to value if it currently equals expected; returns whether it did"""
+        return self._update_attr(name, lambda current: value if current == expected else _KEEP)[1] is not _KEEP
+
+    def _update_attr(self, name: str, update: Callable[[Any], Any]) -> Tuple[Any, Any]:
+        """Apply update(old) -> new (or _KEEP) atomically; returns (old, new)"""
+        uow = active_unit.uow
+        if uow is not None:
+            pending = uow.attrs.get(self)
+            if pending is not None and name in pending:
+                old = pending[name]
+                new = update(old)
+                if new is not _KEEP:
+                    pending[name] = new
+                return old, new
+            return uow.stage_atomic(self, name, update)
+        held = ChangeFeed.hold()  # subscribers are called once the stripe is released
+        try:
+            with _stripe(self, name):
+                old = self._stored_attr(name)
+                new = update(old)
+                if new is not _KEEP:
+                    self._apply_attrs({name: new})
+        finally:
+            if held:
+                ChangeFeed.release()
+        ChangeFeed.deliver()
+        return old, new
+
+    def _stored_attr(self, name: str) -> Any:
+        """Committed attribute value, ignoring any open unit of work"""
+        if self._columns is not None and name in self._columns.arrays:
+            return self._columns.get(self, name)
         return self._attrs.get(name)
+
+    def _apply_attrs(self, changes: Dict[str, Any]):
+        """Write a batch of committed attribute values"""
+        if self._ctx.snapshots:
+            self._ctx.preserve_attrs(self)
+        columns = self._columns
+        watched = self._watched
+        if columns is None and not watched:
+            self._attrs.update(changes)
+            return
+        for name, value in changes.items():
+            if name in watched:
+                old = self._stored_attr(name)
+            if columns is not None and name in columns.arrays:
+                columns.set(self, name, value)
+            else:
+                self._attrs[name] = value
+            if name in watched:
+                ChangeFeed.attr_changed(self, name, old, value)
     
     @classmethod
     def _create_instance(cls, id: Optional[str] = None) -> 'InstanceBase':
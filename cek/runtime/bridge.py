@@ -0,0 +1,233 @@
+# runtime/bridge.py
+from __future__ import annotations
+import http.client
+import json
+import select
+import threading
+import time
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import urlsplit
+from runtime.tracing import Tracer
+from runtime.unit_of_work import active_unit
+
+class BridgeError(Exception):
+    """A bridge call could not be completed"""
+
+class ConnectionPool:
+    """Keep-alive HTTP connections to one host, at most max_size in use at a time"""
+
+    def __init__(self, host: str, port: int, max_size: int = 8, timeout: float = 2.0, https: bool = False):
+        self.host = host
+        self.port = port
+        self.max_size = max_size
+        self.timeout = timeout
+        self._factory = http.client.HTTPSConnection if https else http.client.HTTPConnection
+        self._idle: List[http.client.HTTPConnection] = []
+        self._slots = threading.BoundedSemaphore(max_size)
+        self._lock = threading.Lock()
+        self.opened = 0  # connections created over the pool's lifetime
+
+    def acquire(self) -> Tuple[http.client.HTTPConnection, bool]:
+        """Take a connection, waiting up to timeout for a free slot; returns (conn, reused)"""
+        if not self._slots.acquire(timeout=self.timeout):
+            raise BridgeError(f"No free connection to {self.host}:{self.port} within {self.timeout}s")
+        with self._lock:
+            conn = self._idle.pop() if self._idle else None
+        if conn is not None and not _dropped(conn):
+            return conn, True
+        if conn is not None:
+            conn.close()  # the server closed it while idle
+        with self._lock:
+            self.opened += 1
+        return self._factory(self.host, self.port, timeout=self.timeout), False
+
+    def release(self, conn: http.client.HTTPConnection, reusable: bool = True):
+        """Return a connection; broken ones are closed instead of kept"""
+        if reusable:
+            with self._lock:
+                self._idle.append(conn)
+        else:
+            conn.close()
+        self._slots.release()
+
+    def close(self):
+        """Close idle connections"""
+        with self._lock:
+            idle, self._idle = self._idle, []
+        for conn in idle:
+            conn.close()
+
+class BridgeAdapter:
+    """Maps external entity bridge operations to HTTP/JSON calls.
+
+    Until configure() is called every bridge is a local no-op returning None.
+    Once configured, KL::op(params) is sent as POST {base_url}/{KL}/{op} with
+    the parameters as a JSON object; the reply's "result" field is returned.
+
+    A call that fails on a reused keep-alive connection is retried once on a
+    fresh one only if the service cannot have acted on it: the request was
+    not completely sent, or the operation is idempotent (GET, HEAD, PUT,
+    DELETE and OPTIONS routes, or a route declared idempotent).
+    """
+    _pool: Optional[ConnectionPool] = None
+    _base_path: str = ''
+    _routes: Dict[Tuple[str, str], Tuple[str, str, bool]] = {}  # { (kl, op): (method, path, idempotent) }
+    _stats: Dict[Tuple[str, str], Dict[str, float]] = {}  # { (kl, op): {calls, errors, seconds, max_seconds} }
+    _lock = threading.Lock()
+
+    @classmethod
+    def configure(cls, base_url: Optional[str], max_connections: int = 8, timeout: float = 2.0):
+        """Point bridges at a service (None switches back to local no-ops)"""
+        if cls._pool is not None:
+            cls._pool.close()
+        if base_url is None:
+            cls._pool = None
+            return
+        url = urlsplit(base_url)
+        if url.scheme not in ('http', 'https') or not url.hostname:
+            raise ValueError(f"Unsupported bridge URL: {base_url}")
+        https = url.scheme == 'https'
+        cls._pool = ConnectionPool(url.hostname, url.port or (443 if https else 80), max_connections, timeout, https)
+        cls._base_path = url.path.rstrip('/')
+
+    @classmethod
+    def route(cls, kl: str, op: str, path: str, method: str = 'POST', idempotent: Optional[bool] = None):
+        """Override the endpoint of one bridge operation (path is relative to the base URL)"""
+        method = method.upper()
+        if idempotent is None:
+            idempotent = method in _IDEMPOTENT
+        cls._routes[(kl, op)] = (method, '/' + path.lstrip('/'), idempotent)
+
+    @classmethod
+    def is_configured(cls) -> bool:
+        return cls._pool is not None
+
+    @classmethod
+    def call(cls, kl: str, op: str, params: Optional[Dict[str, Any]] = None) -> Any:
+        """Invoke a bridge operation; raises BridgeError on transport or service failure"""
+        if Tracer.enabled:
+            span = Tracer.begin(f"{kl}::{op}", 'bridge', params)
+            try:
+                return cls._call(kl, op, params)
+            finally:
+                Tracer.end(span)
+        return cls._call(kl, op, params)
+
+    @classmethod
+    def _call(cls, kl: str, op: str, params: Optional[Dict[str, Any]]) -> Any:
+        pool = cls._pool
+        if pool is None:
+            return None
+        method, path, idempotent = cls._routes.get((kl, op), ('POST', f"/{kl}/{op}", False))
+        body = json.dumps({k: _to_json(v) for k, v in (params or {}).items()})
+        started = time.perf_counter()
+        try:
+            reply = cls._send(pool, method, cls._base_path + path, body, idempotent)
+        except BridgeError:
+            cls._record(kl, op, time.perf_counter() - started, failed=True)
+            raise
+        cls._record(kl, op, time.perf_counter() - started)
+        return reply.get('result')
+
+    @classmethod
+    def _send(cls, pool: ConnectionPool, method: str, path: str, body: str, idempotent: bool) -> Dict[str, Any]:
+        headers = {'Content-Type': 'application/json', 'Connection': 'keep-alive'}
+        conn, reused = pool.acquire()
+        try:
+            sent = False
+            try:
+                conn.request(method, path, body=body, headers=headers)
+                sent = True
+                response = conn.getresponse()
+            except (http.client.RemoteDisconnected, ConnectionResetError, BrokenPipeError):
+                if not reused or (sent and not idempotent):
+                    raise  # the service may have acted on it: a second send could apply it twice
+                # The server dropped an idle keep-alive connection; retry once on a fresh one
+                conn.close()
+                conn.request(method, path, body=body, headers=headers)
+                response = conn.getresponse()
+            data = response.read()
+        except (OSError, http.client.HTTPException) as e:
+            pool.release(conn, reusable=False)
+            raise BridgeError(f"{method} {path} failed: {e}") from e
+        pool.release(conn, reusable=not response.will_close)
+        try:
+            reply = json.loads(data) if data else {}
+        except ValueError:
+            raise BridgeError(f"{method} {path} returned invalid JSON")
+        if response.status >= 400:
+            raise BridgeError(f"{method} {path} returned {response.status}: {reply.get('error', response.reason)}")
+        return reply
+
+    @classmethod
+    def _record(cls, kl: str, op: str, seconds: float, failed: bool = False):
+        with cls._lock:
+            s = cls._stats.get((kl, op))
+            if s is None:
+                s = cls._stats[(kl, op)] = {'calls': 0, 'errors': 0, 'seconds': 0.0, 'max_seconds': 0.0}
+            s['calls'] += 1
+            s['errors'] += failed
+            s['seconds'] += seconds
+            s['max_seconds'] = max(s['max_seconds'], seconds)
+
+    @classmethod
+    def stats(cls) -> Dict[str, Any]:
+        """Per-operation call counts and latency, plus pool usage"""
+        with cls._lock:
+            ops = {f"{kl}::{op}": dict(s, mean_seconds=s['seconds'] / s['calls']) for (kl, op), s in cls._stats.items()}
+        pool = cls._pool
+        return {
+            'operations': ops,
+            'connections_opened': pool.opened if pool else 0,
+            'max_connections': pool.max_size if pool else 0,
+        }
+
+    @classmethod
+    def reset_stats(cls):
+        with cls._lock:
+            cls._stats = {}
+
+_IDEMPOTENT = frozenset(('GET', 'HEAD', 'PUT', 'DELETE', 'OPTIONS'))
+
+def _dropped(conn: http.client.HTTPConnection) -> bool:
+    """Whether an idle connection was closed by the server (its socket reads as ready)"""
+    sock = conn.sock
+    if sock is None:
+        return False  # not connected yet: connects on the next request
+    try:
+        return bool(select.select([sock], [], [], 0)[0])
+    except (OSError, ValueError):
+        return True
+
+def _to_json(value: Any, nested: bool = False) -> Any:
+    """Encode bridge arguments; instance references travel as their kl, id and attributes.
+
+    Instances referenced from another instance's attributes (referential
+    slots) are sent as just their kl and id, so cycles such as 1:1 links
+    are not followed. Attribute values are read through get_attr, so they
+    include what the calling step has set but not yet committed.
+    """
+    if hasattr(value, '_REF_SLOTS') and hasattr(value, 'kl'):
+        if nested:
+            return {'kl': value.kl, 'id': value._id}
+        return {'kl': value.kl, 'id': value._id, 'attrs': {name: _to_json(value.get_attr(name), True) for name in _attr_names(value)}}
+    if isinstance(value, (list, tuple)):
+        return [_to_json(v, nested) for v in value]
+    if isinstance(value, dict):
+        return {str(k): _to_json(v, nested) for k, v in value.items()}
+    if hasattr(value, 'item'):
+        return value.item()  # numpy scalar read from a column
+    return value
+
+def _attr_names(inst: Any) -> List[str]:
+    """Declared, stored and pending attribute names of an instance (one created in the calling step has none stored yet)"""
+    declared = getattr(inst, '_declared_attrs', None)
+    names = dict.fromkeys(declared() if declared is not None else ())
+    names.update(dict.fromkeys(inst._attrs))
+    if inst._columns is not None:
+        names.update(dict.fromkeys(inst._columns.arrays))
+    uow = active_unit.uow
+    if uow is not None:
+        names.update(dict.fromkeys(uow.attrs.get(inst, ())))
+        names.update(dict.fromkeys(name for owner, name in uow.atomics if owner is inst))
+    return list(names)
@@ -0,0 +1,111 @@
+# runtime/bridge_server.py
+from __future__ import annotations
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Callable, Dict, Optional, Tuple
+
+Handler = Callable[[Dict[str, Any]], Any]  # bridge parameters -> result
+
+class StandInServer:
+    """In-process HTTP/JSON stand-in for external entities, for offline runs.
+
+    Serves POST /{KL}/{op} the way BridgeAdapter sends it. Operations without
+    a registered handler answer {"result": null}. latency adds a fixed delay
+    per request to model a remote service.
+    """
+
+    def __init__(self, host: str = '127.0.0.1', port: int = 0, latency: float = 0.0):
+        self.host = host
+        self.port = port
+        self.latency = latency
+        self.handlers: Dict[Tuple[str, str], Handler] = {}
+        self.requests = 0
+        self.connections = 0
+        self._lock = threading.Lock()
+        self._server: Optional[ThreadingHTTPServer] = None
+        self._thread: Optional[threading.Thread] = None
+
+    def handle(self, kl: str, op: str, fn: Handler):
+        """Register the implementation of one bridge operation"""
+        self.handlers[(kl, op)] = fn
+
+    @property
+    def url(self) -> str:
+        return f"http://{self.host}:{self.port}"
+
+    def start(self) -> str:
+        """Serve on a background thread; returns the base URL"""
+        if self._server is not None:
+            return self.url
+        self._server = ThreadingHTTPServer((self.host, self.port), _make_request_handler(self))
+        self._server.daemon_threads = True
+        self.port = self._server.server_address[1]
+        self._thread = threading.Thread(target=self._server.serve_forever, name='bridge-standin', daemon=True)
+        self._thread.start()
+        print(f"[BRIDGE] Stand-in server listening on {self.url}")
+        return self.url
+
+    def stop(self):
+        if self._server is None:
+            return
+        self._server.shutdown()
+        self._server.server_close()
+        self._thread.join()
+        self._server = None
+        self._thread = None
+
+    def __enter__(self) -> 'StandInServer':
+        self.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def _dispatch(self, path: str, params: Dict[str, Any]) -> Tuple[int, Dict[str, Any]]:
+        with self._lock:
+            self.requests += 1
+        parts = path.strip('/').split('/')
+        if len(parts) < 2:
+            return 404, {'error': f"No bridge operation at {path}"}
+        kl, op = parts[-2], parts[-1]
+        if self.latency:
+            time.sleep(self.latency)
+        fn = self.handlers.get((kl, op))
+        try:
+            return 200, {'result': fn(params) if fn else None}
+        except Exception as e:
+            return 500, {'error': f"{kl}::{op}: {e}"}
+
+def _make_request_handler(server: StandInServer) -> type:
+    class _RequestHandler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'  # keep connections open between requests
+        disable_nagle_algorithm = True  # headers and body go out in separate writes
+
+        def setup(self):
+            super().setup()
+            with server._lock:
+                server.connections += 1
+
+        def do_POST(self):
+            length = int(self.headers.get('Content-Length') or 0)
+            try:
+                params = json.loads(self.rfile.read(length) or b'{}')
+            except ValueError:
+                status, reply = 400, {'error': 'Body is not JSON'}
+            else:
+                status, reply = server._dispatch(self.path, params)
+            body = json.dumps(reply).encode()
+            self.send_response(status)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        do_PUT = do_POST
+
+        def log_message(self, format, *args):
+            pass
+
+    return _RequestHandler
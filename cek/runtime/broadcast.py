@@ -0,0 +1,155 @@
+# runtime/broadcast.py
+from __future__ import annotations
+import time
+import types
+from concurrent.futures import ThreadPoolExecutor
+from threading import get_ident
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple, Union
+from runtime.context import current_context
+from runtime.storage import ObjectStore
+from runtime.state_machine import StateMachine
+from runtime.tracing import Tracer
+from runtime.unit_of_work import active_unit
+
+class BroadcastResult:
+    """Aggregate outcome of one bulk dispatch"""
+
+    def __init__(self, event: str):
+        self.event = event
+        self.targets = 0  # instances selected
+        self.handled = 0  # transitions taken
+        self.ignored = 0  # no transition for the event in the instance's state (when grouped or when its turn came)
+        self.failed: List[Any] = []  # instances whose guard failed or whose action rolled back
+        self.by_state: Dict[str, Dict[str, Any]] = {}  # { from state: {targets, handled, to} }
+        self.seconds = 0.0
+
+    def summary(self) -> Dict[str, Any]:
+        return {
+            'event': self.event,
+            'targets': self.targets,
+            'handled': self.handled,
+            'ignored': self.ignored,
+            'failed': len(self.failed),
+            'by_state': self.by_state,
+            'seconds': self.seconds,
+        }
+
+    def __repr__(self):
+        return (f"<BroadcastResult {self.event}: {self.handled}/{self.targets} handled, "
+                f"{self.ignored} ignored, {len(self.failed)} failed>")
+
+# (runtime context, state model, state index) -> state machines in that state
+_Group = Tuple[Any, Any, int]
+
+def broadcast(event: str, targets: Union[str, Iterable[Any]], state: Union[str, Iterable[str], None] = None,
+              where: Optional[Callable[[Any], bool]] = None, payload: Optional[Dict[str, Any]] = None,
+              workers: int = 1, chunk_size: int = 256) -> BroadcastResult:
+    """Send one event to many instances.
+
+    targets is a class name (every instance of it in the current context)
+    or an iterable of instances; state and where narrow the selection.
+    Targets are grouped by their current state so each group looks its
+    transition up once; groups with no transition are counted as ignored
+    without touching their instances. Called outside a step, each instance
+    takes its step as its own unit of work. Called from an action with
+    workers=1, the steps run on the caller's thread and join the action's
+    unit like any event the action generates: they commit or roll back with
+    it, and an action error in one of them propagates to the caller. With
+    workers > 1 the steps are spread over a thread pool in chunks, each
+    step its own unit of work (worker threads never join the caller's unit,
+    so use workers only outside actions). The payload is shared read-only
+    by every step.
+    """
+    started = time.perf_counter()
+    result = BroadcastResult(event)
+    instances = ObjectStore.select_all(targets) if isinstance(targets, str) else targets
+    states = {state} if isinstance(state, str) else set(state) if state is not None else None
+    shared = types.MappingProxyType(dict(payload or {}))
+
+    groups: Dict[_Group, List[Any]] = {}
+    for inst in instances:
+        sm = inst.__dict__.get('sm')
+        if sm is not None:
+            model, index, target = sm.model, sm.index, sm
+        elif '_paged_state' in inst.__dict__:
+            # Paged out: grouped by the state it was evicted in, faulted in only if that state handles the event
+            model, index, target = type(inst)._SM, inst._paged_state, inst
+        else:
+            continue
+        if states is not None and model.states[index] not in states:
+            continue
+        if where is not None and not where(inst):
+            continue
+        key = (inst._ctx, model, index)
+        machines = groups.get(key)
+        if machines is None:
+            machines = groups[key] = []
+        machines.append(target)
+    result.targets = sum(len(machines) for machines in groups.values())
+
+    work: List[Tuple[Any, Any, int, int, List[Any]]] = []  # (ctx, transition, state index, event index, machines)
+    for (ctx, model, index), machines in groups.items():
+        name = model.states[index]
+        stats = result.by_state.setdefault(name, {'targets': 0, 'handled': 0, 'to': None})
+        stats['targets'] += len(machines)
+        event_index = model.event_index.get(event)
+        transition = model.table[index][event_index] if event_index is not None else None
+        if transition is None:
+            result.ignored += len(machines)
+            continue
+        machines = [target if target.__class__ is StateMachine else target.sm for target in machines]
+        next_index = transition[2]
+        stats['to'] = model.states[next_index] if next_index is not None else name
+        print(f"[BROADCAST] {event} -> {len(machines)} {machines[0].owner.kl} in {name}")
+        size = chunk_size if workers > 1 else len(machines)
+        for i in range(0, len(machines), size):
+            work.append((ctx, transition, index, event_index, machines[i:i + size]))
+
+    if workers > 1 and len(work) > 1:
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            outcomes = list(pool.map(lambda chunk: _run_chunk(*chunk, shared), work))
+    else:
+        outcomes = [_run_chunk(*chunk, shared) for chunk in work]
+
+    for (ctx, transition, index, event_index, machines), (handled, ignored, failed) in zip(work, outcomes):
+        result.handled += handled
+        result.ignored += ignored
+        result.failed.extend(failed)
+        result.by_state[machines[0].model.states[index]]['handled'] += handled
+    result.seconds = time.perf_counter() - started
+    return result
+
+def _run_chunk(ctx: Any, transition: Any, index: int, event_index: int, machines: List[Any],
+               payload: Any) -> Tuple[int, int, List[Any]]:
+    """Fire a looked-up transition on each machine still in the grouped state; returns (handled, ignored, failed)"""
+    handled = 0
+    ignored = 0
+    failed = []
+    traced = Tracer.enabled  # traced dispatches go through the normal path to get their spans
+    entered = ctx is not current_context()
+    if entered:
+        ctx.__enter__()
+    me = get_ident()
+    gate = ctx.steps if active_unit.uow is None else None  # steps joining the caller's unit count under its step
+    waited = gate is not None and gate.enter(me)  # models may have been reloaded meanwhile: look transitions up again
+    try:
+        for sm in machines:
+            if sm.owner.__dict__.get('sm') is not sm:
+                sm = sm._resolved()  # evicted (or faulted back in) since grouping
+            if sm.index == index and not traced and not waited:
+                ok = sm._fire(transition, event_index, payload, False)
+            elif sm.model.table[sm.index][event_index] is None:
+                ignored += 1  # moved on since grouping (an earlier step sent it an event) to a state that ignores it
+                continue
+            else:
+                ok = sm.dispatch_index(event_index, payload)
+            if ok:
+                handled += 1
+            else:
+                failed.append(sm.owner)
+    finally:
+        if gate is not None:
+            gate.leave(me)
+        if entered:
+            ctx.__exit__(None, None, None)
+    return handled, ignored, failed
@@ -0,0 +1,341 @@
+# runtime/bulk.py
+from __future__ import annotations
+import csv
+import gc
+import json
+import os
+import re
+import time
+import uuid
+from typing import Any, Callable, Dict, IO, Iterable, Iterator, List, Optional, Set, Tuple, Union
+from runtime.context import RuntimeContext, current_context
+from runtime.unit_of_work import active_unit
+from runtime.changefeed import ChangeFeed
+from runtime.state_machine import StateMachine
+from runtime.relationship import relate_many
+
+Record = Dict[str, Any]
+# rel_id -> (record field holding the related instance's id, related class or class name)
+Links = Dict[str, Tuple[str, Union[str, type]]]
+
+class LoadReport:
+    """Outcome of one bulk load"""
+
+    def __init__(self, class_name: str):
+        self.class_name = class_name
+        self.rows = 0  # records read
+        self.created = 0  # instances stored
+        self.skipped = 0  # records rejected (on_error='skip')
+        self.batches = 0
+        self.links: Dict[str, int] = {}  # { rel_id: links created }
+        self.errors: List[Tuple[int, str]] = []  # (row number, message), the first 100
+        self.ignored_fields: Set[str] = set()  # record fields that are not attributes of the class
+        self.seconds = 0.0
+
+    @property
+    def rows_per_second(self) -> float:
+        return self.rows / self.seconds if self.seconds else 0.0
+
+    def summary(self) -> Dict[str, Any]:
+        return {
+            'class': self.class_name,
+            'rows': self.rows,
+            'created': self.created,
+            'skipped': self.skipped,
+            'batches': self.batches,
+            'links': dict(self.links),
+            'ignored_fields': sorted(self.ignored_fields),
+            'seconds': self.seconds,
+            'rows_per_second': self.rows_per_second,
+        }
+
+    def __repr__(self):
+        return (f"<LoadReport {self.class_name}: {self.created}/{self.rows} rows in {self.seconds:.3f} s "
+                f"({self.rows_per_second:.0f} rows/s), {self.skipped} skipped>")
+
+    def _error(self, row: int, message: str):
+        self.skipped += 1
+        if len(self.errors) < 100:
+            self.errors.append((row, message))
+
+def bulk_load(model_class: type, source: Union[str, Iterable[Record]], format: Optional[str] = None,
+              id_field: str = 'id', links: Optional[Links] = None, batch_size: int = 10000,
+              on_error: str = 'raise', ctx: Optional[RuntimeContext] = None,
+              progress: Optional[Callable[[LoadReport], None]] = None) -> LoadReport:
+    """Create many instances of a model class from a file or an iterable of records.
+
+    source is a path (.csv, .json holding an array of objects, or
+    .jsonl/.ndjson with one object per line; format overrides the suffix)
+    or any iterable of dicts. Records are streamed, never read whole.
+    Fields named like the class's attributes are converted to the
+    attribute's type (CSV values arrive as text); id_field gives the
+    instance id (a uuid when missing). links maps a relationship to the
+    field holding the related instance's id, e.g.
+    {'R2': ('ui', 'UserInterface')}.
+
+    Instances are built without running the class's __init__: no per-row
+    set_attr, register/create call, state machine validation or log line.
+    Each batch of batch_size instances is added to the store at once under
+    the context lock, and the relationships are linked in one pass after
+    the last batch, so records may refer to instances loaded later in the
+    same file. A bad record raises ValueError, or with on_error='skip' is
+    counted in the report and left out.
+    """
+    if active_unit.uow is not None:
+        raise RuntimeError("bulk_load cannot run inside a unit of work")
+    if on_error not in ('raise', 'skip'):
+        raise ValueError(f"on_error must be 'raise' or 'skip', not {on_error!r}")
+    ctx = ctx or current_context()
+    class_name = model_class.__name__
+    report = LoadReport(class_name)
+    started = time.perf_counter()
+    collecting = gc.isenabled()
+    gc.disable()  # the loader only allocates; collections would rescan the growing store over and over
+    try:
+        with ctx:
+            records = iter_records(source, format) if isinstance(source, (str, os.PathLike)) else source
+            pending_links = _load_batches(model_class, records, id_field, links or {}, batch_size, on_error,
+                                          ctx, report, progress)
+            for rel_id, (related, pairs) in pending_links.items():
+                report.links[rel_id] = _link_pending(ctx, rel_id, related, pairs, on_error, report)
+    finally:
+        if collecting:
+            gc.enable()
+    report.seconds = time.perf_counter() - started
+    print(f"[BULK] Loaded {report.created} {class_name} in {report.seconds:.3f} s "
+          f"({report.rows_per_second:.0f} rows/s, {report.skipped} skipped)")
+    return report
+
+def _load_batches(model_class: type, records: Iterable[Record], id_field: str, links: Links, batch_size: int,
+                  on_error: str, ctx: RuntimeContext, report: LoadReport,
+                  progress: Optional[Callable[[LoadReport], None]]) -> Dict[str, Tuple[str, List[Tuple[int, Any, Any]]]]:
+    """Build and store instances batch by batch; returns the links still to make"""
+    class_name = model_class.__name__
+    extent = ctx.store.setdefault(class_name, {})
+    defaults = model_class._declared_attrs()
+    slots = set(model_class._REF_SLOTS.values())
+    converters = {name: _converter(value) for name, value in defaults.items() if name not in slots}
+    link_fields = {field: rel_id for rel_id, (field, _) in links.items()}
+    pending_links = {rel_id: (related if isinstance(related, str) else related.__name__, [])
+                     for rel_id, (_, related) in links.items()}
+    model = getattr(model_class, '_SM', None)
+    state_attr = model.state_attr if model is not None else None
+    plans: Dict[Tuple[str, ...], Tuple[List[Tuple[str, Callable]], List[Tuple[str, List]]]] = {}
+    new = object.__new__
+    declared_attrs = model_class._declared_attrs
+    kl = model_class.kl
+    batch: Dict[str, Any] = {}
+
+    for row, record in enumerate(records, 1):
+        report.rows = row
+        try:
+            # Records from one file share their fields: work out what to do with them once
+            fields = tuple(record)
+            plan = plans.get(fields)
+            if plan is None:
+                plan = plans[fields] = (
+                    [(field, converters[field]) for field in fields if field in converters],
+                    [(field, pending_links[link_fields[field]][1]) for field in fields if field in link_fields],
+                )
+                report.ignored_fields.update(f for f in fields if f not in converters and f not in link_fields and f != id_field)
+            convert_fields, link_targets = plan
+            id = record.get(id_field)
+            id = str(id) if id not in (None, '') else str(uuid.uuid4())
+            if id in extent or id in batch:
+                raise ValueError(f"duplicate id {id}")
+            attrs = declared_attrs()
+            for field, convert in convert_fields:
+                attrs[field] = convert(record[field], attrs[field])
+            for field, pairs in link_targets:
+                value = record[field]
+                if value not in (None, ''):
+                    pairs.append((row, id, str(value)))
+            inst = new(model_class)
+            inst._id = id
+            inst.kl = kl
+            inst._attrs = attrs
+            inst._ctx = ctx
+            inst._seq = ctx.instance_seq = ctx.instance_seq + 1
+            if model is not None:
+                state = attrs.get(state_attr) if state_attr else None
+                index = model.state_index.get(state) if state else 0
+                if index is None:
+                    raise ValueError(f"unknown state {state!r}")
+                inst.sm = StateMachine.attach(inst, model, index)
+        except (ValueError, TypeError) as e:
+            if on_error == 'raise':
+                raise ValueError(f"{class_name} row {row}: {e}") from e
+            report._error(row, str(e))
+            continue
+        batch[id] = inst
+        if len(batch) >= batch_size:
+            _store_batch(ctx, class_name, extent, batch, report, progress)
+            batch = {}
+    if batch:
+        _store_batch(ctx, class_name, extent, batch, report, progress)
+    return pending_links
+
+def _store_batch(ctx: RuntimeContext, class_name: str, extent: Dict[str, Any], batch: Dict[str, Any],
+                 report: LoadReport, progress: Optional[Callable[[LoadReport], None]]):
+    """Add one batch to the store, as one commit"""
+    columns = ctx.columns.get(class_name)
+    with ctx.lock:
+        if ctx.snapshots:
+            ctx.preserve_extent(class_name)
+        if columns is not None:
+            names = list(columns.arrays)
+            for inst in batch.values():
+                inst._columns = columns
+                columns.allocate(inst)
+                attrs = inst._attrs
+                for name in names:
+                    if name in attrs:
+                        columns.set(inst, name, attrs.pop(name))
+        extent.update(batch)
+        held = ChangeFeed.hold()
+        try:
+            for inst in batch.values():
+                if inst._watch_lifecycle:
+                    ChangeFeed.instance_created(class_name, inst)
+        finally:
+            if held:
+                ChangeFeed.release()
+        ctx.version += 1
+    ChangeFeed.deliver()
+    report.created += len(batch)
+    report.batches += 1
+    if progress is not None:
+        progress(report)
+
+def _link_pending(ctx: RuntimeContext, rel_id: str, related: str, pairs: List[Tuple[int, Any, Any]],
+                  on_error: str, report: LoadReport) -> int:
+    """Resolve the collected ids and link them across rel_id in one pass"""
+    extent = ctx.store[report.class_name]
+    targets = ctx.store.get(related, {})
+    resolved = []
+    for row, id, target_id in pairs:
+        inst = extent.get(id)
+        target = targets.get(target_id)
+        if inst is None:
+            continue  # the record itself was skipped
+        if target is None:
+            message = f"{rel_id}: no {related} {target_id}"
+            if on_error == 'raise':
+                raise ValueError(f"{report.class_name} row {row}: {message}")
+            report._error(row, message)
+            continue
+        resolved.append((inst, target))
+    with ctx.lock:
+        created = relate_many(rel_id, resolved)
+        ctx.version += 1
+    return created
+
+# --- Attribute conversion ---
+
+def _converter(default: Any) -> Callable[[Any, Any], Any]:
+    """Conversion of a record value to the type of an attribute's initial value"""
+    if isinstance(default, bool):
+        return _to_bool
+    if isinstance(default, int):
+        return _to_int
+    if isinstance(default, float):
+        return _to_float
+    if isinstance(default, str):
+        return _to_str
+    return _as_is
+
+def _to_bool(value: Any, default: Any) -> Any:
+    if isinstance(value, str):
+        text = value.strip().lower()
+        return default if not text else text in ('1', 'true', 'yes', 'y', 't')
+    return default if value is None else bool(value)
+
+def _to_int(value: Any, default: Any) -> Any:
+    if isinstance(value, str):
+        text = value.strip()
+        if not text:
+            return default
+        try:
+            return int(text)
+        except ValueError:
+            number = float(text)
+            if not number.is_integer():
+                raise ValueError(f"{value!r} is not an integer")
+            return int(number)
+    return default if value is None else int(value)
+
+def _to_float(value: Any, default: Any) -> Any:
+    if isinstance(value, str):
+        text = value.strip()
+        return float(text) if text else default
+    return default if value is None else float(value)
+
+def _to_str(value: Any, default: Any) -> Any:
+    return default if value is None else value if isinstance(value, str) else str(value)
+
+def _as_is(value: Any, default: Any) -> Any:
+    return value
+
+# --- Record sources ---
+
+def iter_records(path: Union[str, os.PathLike], format: Optional[str] = None) -> Iterator[Record]:
+    """Stream records from a CSV, JSON array or JSON-lines file"""
+    fmt = (format or os.path.splitext(os.fspath(path))[1].lstrip('.')).lower()
+    if fmt == 'csv':
+        with open(path, newline='') as f:
+            reader = csv.reader(f)
+            header = next(reader, None)
+            for values in reader:
+                if values:  # short rows leave the missing fields out, as if absent from the record
+                    yield dict(zip(header, values))
+    elif fmt in ('jsonl', 'ndjson'):
+        with open(path) as f:
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
+    elif fmt == 'json':
+        with open(path) as f:
+            yield from _iter_json_array(f)
+    else:
+        raise ValueError(f"Unknown record format '{fmt}' for {path} (expected csv, json or jsonl)")
+
+_WHITESPACE = re.compile(r'[ \t\n\r]*')
+
+def _iter_json_array(f: IO[str], chunk_size: int = 1 << 16) -> Iterator[Record]:
+    """Yield the elements of a top-level JSON array, reading the file a chunk at a time"""
+    decoder = json.JSONDecoder()
+    buf = f.read(chunk_size)
+    pos = _WHITESPACE.match(buf).end()
+    if buf[pos:pos + 1] != '[':
+        raise ValueError("expected a JSON array of objects")
+    pos += 1
+    expect = 'first'  # 'first' (a record or ']'), 'record', or 'next' (',' or ']')
+    eof = False
+    while True:
+        pos = _WHITESPACE.match(buf, pos).end()
+        if pos == len(buf):
+            if eof:
+                raise ValueError("unterminated JSON array")
+            buf, pos = f.read(chunk_size), 0
+            eof = not buf
+            continue
+        char = buf[pos]
+        if char == ']' and expect != 'record':
+            return
+        if expect == 'next':
+            if char != ',':
+                raise ValueError(f"expected ',' or ']' in JSON array, found {buf[pos:pos + 20]!r}")
+            pos += 1
+            expect = 'record'
+            continue
+        try:
+            record, end = decoder.raw_decode(buf, pos)
+        except ValueError:
+            more = '' if eof else f.read(chunk_size)
+            if not more:
+                raise
+            buf, pos = buf[pos:] + more, 0  # the record spans the chunk boundary
+            continue
+        yield record
+        pos = end
+        expect = 'next'
@@ -0,0 +1,459 @@
+# runtime/catalog.py
+from __future__ import annotations
+import json
+import mmap
+import os
+import struct
+import threading
+import time
+import weakref
+import zlib
+from collections.abc import Mapping
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+from runtime.context import RuntimeContext, current_context, quiesced
+
+MAGIC = b'XTCATLG1'
+# magic, generation, rows, record size, layout offset, layout length (the layout is JSON at the end of the file)
+_HEADER = struct.Struct('<8sQQIQQ')
+_DATA_OFFSET = 64
+_SLOT = struct.Struct('<I')  # index slot: row + 1, or 0 when empty
+# attribute type -> field type; strings are stored as fixed-width UTF-8, sized to the longest value
+_FIELD_TYPES = {bool: '?', int: 'q', float: 'd', str: 's'}
+_COLUMN_TYPES = ('q', 'd')  # writable columns: 8-byte integers or reals
+
+def write_catalog(path: str, model_class: type, records: Iterable[Any], writable: Sequence[str] = (),
+                  indexes: Sequence[str] = (), keep_writable: bool = False) -> int:
+    """Publish a read-only catalog of a model class to path; returns its generation.
+
+    records are instances of the class or dicts of attribute values with an
+    'id'. Every declared attribute is stored in a fixed-width record; the
+    writable ones (numeric, e.g. stock) go to a separate column file that
+    processes may update. indexes names string attributes to build on-disk
+    hash indexes for (the id is always indexed). With keep_writable the
+    writable values of ids already in the catalog at path are carried over,
+    so a refreshed price list does not reset stock.
+
+    The new catalog is written beside path and renamed over it, so readers
+    see either the old or the new file, never a partial one.
+    """
+    class_name = model_class.__name__
+    slots = set(model_class._REF_SLOTS.values())
+    declared = {name: value for name, value in model_class._declared_attrs().items() if name not in slots}
+    fields: List[Tuple[str, str]] = [('_id', 's')]
+    for name, value in declared.items():
+        kind = _FIELD_TYPES.get(type(value))
+        if kind is None:
+            raise ValueError(f"{class_name}.{name} cannot be stored in a catalog ({type(value).__name__})")
+        fields.append((name, kind))
+    for name in writable:
+        if name not in declared or _FIELD_TYPES[type(declared[name])] not in _COLUMN_TYPES:
+            raise ValueError(f"{class_name}.{name} is not a numeric attribute and cannot be writable")
+    for name in indexes:
+        if name not in declared or not isinstance(declared[name], str):
+            raise ValueError(f"{class_name}.{name} is not a string attribute and cannot be indexed")
+
+    from runtime.bulk import _converter
+    converters = {name: _converter(value) for name, value in declared.items()}
+    rows: List[List[Any]] = []
+    for record in records:
+        if isinstance(record, Mapping):
+            values = [str(record['id'])]
+            values.extend(converters[name](record.get(name), default) for name, default in declared.items())
+        else:
+            values = [record._id]
+            values.extend(record._stored_attr(name) for name in declared)
+        rows.append(values)
+
+    generation = time.time_ns()
+    previous = _read_header(path)[1] if os.path.exists(path) else None
+    carried: Dict[str, List[Any]] = {}
+    if keep_writable and previous is not None and writable:
+        old = Catalog(path, model_class)
+        try:
+            for values in rows:
+                row = old._row_of('_id', values[0])
+                if row is not None:
+                    carried[values[0]] = [old._value(row, name) for name in writable]
+        finally:
+            old.close()
+
+    # Fixed-width record layout
+    columns = {name: n for n, (name, _) in enumerate(fields)}
+    layout_fields = []
+    formats = []
+    offset = 0
+    for name, kind in fields:
+        n = columns[name]
+        if kind == 's':
+            size = max([len(str(values[n]).encode()) for values in rows] + [1])
+            formats.append(f'{size}s')
+        else:
+            size = struct.calcsize('<' + kind)
+            formats.append(kind)
+        layout_fields.append({'name': name, 'type': kind, 'size': size, 'offset': offset})
+        offset += size
+    record = struct.Struct('<' + ''.join(formats))
+    record_size = record.size
+    data = bytearray(record_size * len(rows))
+    for row, values in enumerate(rows):
+        record.pack_into(data, row * record_size,
+                         *(str(v).encode() if kind == 's' else v for v, (_, kind) in zip(values, fields)))
+
+    # Open-addressing hash indexes over the raw field bytes
+    index_layout = {}
+    index_data = []
+    position = _DATA_OFFSET + len(data)
+    for name in ['_id'] + [name for name in indexes if name != '_id']:
+        size = 8
+        while size < 2 * len(rows):
+            size *= 2
+        table = bytearray(size * _SLOT.size)
+        n = columns[name]
+        for row, values in enumerate(rows):
+            key = str(values[n]).encode()
+            slot = zlib.crc32(key) & (size - 1)
+            while True:
+                entry = _SLOT.unpack_from(table, slot * _SLOT.size)[0]
+                if entry == 0:
+                    _SLOT.pack_into(table, slot * _SLOT.size, row + 1)
+                    break
+                if str(rows[entry - 1][n]).encode() == key:
+                    if name == '_id':
+                        raise ValueError(f"duplicate id {values[n]}")
+                    break  # select any: the first row with the key answers
+                slot = (slot + 1) & (size - 1)
+        position += -position % 8
+        index_layout[name] = [position, size]
+        index_data.append((position, table))
+        position += len(table)
+    layout = json.dumps({
+        'class': class_name,
+        'fields': layout_fields,
+        'writable': [[name, _FIELD_TYPES[type(declared[name])]] for name in writable],
+        'indexes': index_layout,
+    }).encode()
+
+    # Writable columns live in their own file, named after the generation that owns them
+    column_data = bytearray(8 * len(writable) * len(rows))
+    for k, name in enumerate(writable):
+        kind = _FIELD_TYPES[type(declared[name])]
+        view = memoryview(column_data)[8 * k * len(rows):8 * (k + 1) * len(rows)].cast(kind)
+        n = columns[name]
+        for row, values in enumerate(rows):
+            kept = carried.get(values[0])
+            view[row] = kept[k] if kept is not None else values[n]
+        view.release()
+    _write_file(_column_path(path, generation), column_data)
+
+    tmp = f"{path}.{generation:x}.tmp"
+    with open(tmp, 'wb') as f:
+        f.write(_HEADER.pack(MAGIC, generation, len(rows), record_size, position, len(layout)))
+        f.write(bytes(_DATA_OFFSET - _HEADER.size))
+        f.write(data)
+        for at, table in index_data:
+            f.write(bytes(at - f.tell()))
+            f.write(table)
+        f.write(layout)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+    if previous is not None and os.path.exists(_column_path(path, previous)):
+        os.unlink(_column_path(path, previous))  # processes still mapping it keep their pages until they refresh
+    print(f"[CATALOG] Published {len(rows)} {class_name} to {path} (generation {generation:x})")
+    return generation
+
+def _write_file(path: str, data: bytes):
+    with open(path, 'wb') as f:
+        f.write(data)
+        f.flush()
+        os.fsync(f.fileno())
+
+def _column_path(path: str, generation: int) -> str:
+    return f"{path}.{generation:x}.rw"
+
+def _read_header(path: str) -> Tuple[Any, ...]:
+    with open(path, 'rb') as f:
+        header = _HEADER.unpack(f.read(_HEADER.size))
+    if header[0] != MAGIC:
+        raise ValueError(f"{path} is not a catalog file")
+    return header
+
+class _Generation:
+    """One mapped catalog file and its writable columns"""
+
+    def __init__(self, path: str, shared_writes: bool):
+        with open(path, 'rb') as f:
+            self.mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        _, self.generation, self.rows, self.record_size, layout_offset, layout_len = _HEADER.unpack_from(self.mm, 0)
+        layout = json.loads(self.mm[layout_offset:layout_offset + layout_len])
+        # { attribute: (offset in record, unpack_from, is text) }
+        self.fields = {f['name']: (f['offset'], struct.Struct(f"<{f['size']}s" if f['type'] == 's' else '<' + f['type']).unpack_from,
+                                   f['type'] == 's') for f in layout['fields']}
+        self.indexes: Dict[str, Tuple[int, int]] = {name: tuple(spec) for name, spec in layout['indexes'].items()}
+        self.columns: Dict[str, memoryview] = {}
+        self.rw: Optional[mmap.mmap] = None
+        writable = layout['writable']
+        if writable and self.rows:
+            with open(_column_path(path, self.generation), 'r+b' if shared_writes else 'rb') as f:
+                self.rw = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_WRITE if shared_writes else mmap.ACCESS_COPY)
+            view = memoryview(self.rw)
+            for k, (name, kind) in enumerate(writable):
+                self.columns[name] = view[8 * k * self.rows:8 * (k + 1) * self.rows].cast(kind)
+            view.release()
+        else:
+            self.columns = {name: memoryview(bytearray()).cast(kind) for name, kind in writable}
+        # Where each attribute is read from: its writable column, else its record field
+        self.arrays: Dict[str, Any] = {name: self.columns.get(name, spec) for name, spec in self.fields.items() if name != '_id'}
+
+    def close(self):
+        for column in self.columns.values():
+            column.release()
+        if self.rw is not None:
+            self.rw.close()
+        self.mm.close()
+
+class Catalog:
+    """Instances of a read-mostly class served from a memory-mapped catalog file.
+
+    The file (see write_catalog) is mapped read-only, so every process that
+    opens it shares one copy of the records in the page cache instead of
+    holding its own instances. Instances are built on first access and kept
+    only while referenced; their attributes are read from the mapping
+    through the same hook ColumnStore uses. find() and find_by() on
+    indexed attributes probe the file's hash indexes.
+
+    Writable columns (e.g. stock) are private to the process by default
+    (copy-on-write pages) and survive refresh(); with shared_writes=True
+    they are mapped shared, so every process sees every write. Shared
+    writes are plain stores: concurrent updates of one value from several
+    processes are not serialized. Other attributes are read-only, and
+    instances cannot be created or deleted.
+    """
+
+    def __init__(self, path: str, model_class: type, ctx: Optional[RuntimeContext] = None, shared_writes: bool = False):
+        if getattr(model_class, '_SM', None) is not None:
+            raise ValueError(f"{model_class.__name__} has a state machine and cannot be served from a catalog")
+        self.path = path
+        self.model_class = model_class
+        self.class_name = model_class.__name__
+        self.ctx = ctx or current_context()
+        self.shared_writes = shared_writes
+        self._map = _Generation(path, shared_writes)
+        self.arrays = self._map.arrays
+        self._instances: 'weakref.WeakValueDictionary[str, Any]' = weakref.WeakValueDictionary()
+        self._written: Dict[str, Dict[str, Any]] = {}  # { id: {column: value} } private writes, replayed by refresh
+        self._lock = threading.Lock()  # one instance per id, even when two threads ask at once
+
+    def __repr__(self):
+        return f"<Catalog {self.class_name}: {len(self)} rows from {self.path}>"
+
+    def __len__(self) -> int:
+        return self._map.rows
+
+    @property
+    def generation(self) -> int:
+        return self._map.generation
+
+    # --- Attribute access, called by InstanceBase through _columns ---
+
+    def get(self, inst: Any, name: str) -> Any:
+        row = inst._row
+        if row is None:
+            return None
+        where = self.arrays[name]
+        if type(where) is not tuple:
+            return where[row]
+        offset, unpack, text = where
+        m = self._map
+        value = unpack(m.mm, _DATA_OFFSET + row * m.record_size + offset)[0]
+        return value.rstrip(b'\0').decode() if text else value
+
+    def set(self, inst: Any, name: str, value: Any):
+        column = self._map.columns.get(name)
+        if column is None:
+            raise RuntimeError(f"{self.class_name}.{name} is read-only (served from the catalog {self.path})")
+        value = column[inst._row] = float(value) if column.format == 'd' else int(value)
+        if not self.shared_writes:
+            self._written.setdefault(inst._id, {})[name] = value
+
+    def release(self, inst: Any):
+        raise RuntimeError(f"{self.class_name} instances come from the read-only catalog {self.path}")
+
+    # --- Lookups ---
+
+    def find(self, id: Any) -> Optional[Any]:
+        inst = self._instances.get(id)
+        if inst is not None:
+            return inst
+        row = self._row_of('_id', id)
+        return self._instance(row, id) if row is not None else None
+
+    def find_by(self, name: str, value: Any) -> Optional[Any]:
+        """An instance whose attribute equals value (the index answers for indexed attributes)"""
+        if name in self._map.indexes:
+            row = self._row_of(name, value)
+            return self.instance(row) if row is not None else None
+        for row in range(self._map.rows):
+            if self._value(row, name) == value:
+                return self.instance(row)
+        return None
+
+    def instance(self, row: int) -> Any:
+        id = self._value(row, '_id')
+        inst = self._instances.get(id)
+        return inst if inst is not None else self._instance(row, id)
+
+    def instances(self) -> Iterator[Any]:
+        for row in range(self._map.rows):
+            yield self.instance(row)
+
+    def ids(self) -> Iterator[str]:
+        for row in range(self._map.rows):
+            yield self._value(row, '_id')
+
+    def materialized(self) -> int:
+        """Instances currently held in memory"""
+        return len(self._instances)
+
+    def mapped_bytes(self) -> int:
+        """Size of the mapped catalog and column files"""
+        m = self._map
+        return len(m.mm) + (len(m.rw) if m.rw is not None else 0)
+
+    def _instance(self, row: int, id: str) -> Any:
+        with self._lock:
+            inst = self._instances.get(id)
+            if inst is None:
+                cls = self.model_class
+                inst = object.__new__(cls)
+                inst._id = id
+                inst.kl = cls.kl
+                inst._attrs = {slot: None for slot in cls._REF_SLOTS.values()}
+                inst._ctx = self.ctx
+                inst._columns = self
+                inst._row = row
+                self._instances[id] = inst
+        return inst
+
+    def _value(self, row: int, name: str) -> Any:
+        m = self._map
+        column = m.columns.get(name)
+        if column is not None:
+            return column[row]
+        offset, unpack, text = m.fields[name]
+        value = unpack(m.mm, _DATA_OFFSET + row * m.record_size + offset)[0]
+        return value.rstrip(b'\0').decode() if text else value
+
+    def _row_of(self, name: str, value: Any, m: Optional[_Generation] = None) -> Optional[int]:
+        """Probe the hash index on name; None if no row holds value"""
+        if not isinstance(value, str):
+            return None
+        m = m or self._map
+        at, size = m.indexes[name]
+        offset, unpack, _ = m.fields[name]
+        key = value.encode()
+        slot = zlib.crc32(key) & (size - 1)
+        while True:
+            entry = _SLOT.unpack_from(m.mm, at + slot * _SLOT.size)[0]
+            if entry == 0:
+                return None
+            if unpack(m.mm, _DATA_OFFSET + (entry - 1) * m.record_size + offset)[0].rstrip(b'\0') == key:
+                return entry - 1
+            slot = (slot + 1) & (size - 1)
+
+    # --- Refresh ---
+
+    def refresh(self) -> bool:
+        """Switch to a newer catalog published at path; returns whether there was one.
+
+        Instances in memory keep their identity (and so their links) and
+        are repointed to their rows in the new file; those whose id is no
+        longer in it keep their last values, detached. Private writes are
+        applied again to the new columns. The old file is unmapped, so the
+        swap waits for the context's steps in flight; reads from other
+        threads outside a step must not overlap it.
+        """
+        if _read_header(self.path)[1] == self._map.generation:
+            return False
+        new = _Generation(self.path, self.shared_writes)
+        ctx = self.ctx
+        with quiesced([ctx]), ctx.lock, self._lock:
+            instances = list(self._instances.values())
+            if ctx.snapshots:
+                for inst in instances:
+                    ctx.preserve_attrs(inst)
+            for inst in instances:
+                row = self._row_of('_id', inst._id, new)
+                if row is None:
+                    for name in self.arrays:
+                        inst._attrs[name] = self.get(inst, name)
+                    inst._columns = None
+                    inst._row = None
+                    del self._instances[inst._id]
+                else:
+                    inst._row = row
+            written = self._written
+            self._written = {}
+            old = self._map
+            self._map = new
+            self.arrays = new.arrays
+            for id, values in written.items():
+                row = self._row_of('_id', id, new)
+                if row is not None:
+                    for name, value in values.items():
+                        column = new.columns.get(name)
+                        if column is not None:
+                            column[row] = value
+                            self._written.setdefault(id, {})[name] = value
+            old.close()
+            ctx.version += 1
+        print(f"[CATALOG] {self.class_name} refreshed from {self.path} "
+              f"(generation {old.generation:x} -> {new.generation:x}, {new.rows} rows)")
+        return True
+
+    def close(self):
+        """Unmap the file; instances still in memory keep their last values"""
+        with self._lock:
+            for inst in list(self._instances.values()):
+                for name in self.arrays:
+                    inst._attrs[name] = self.get(inst, name)
+                inst._columns = None
+                inst._row = None
+            self._instances.clear()
+        self._map.close()
+
+class CatalogExtent(Mapping):
+    """Extent of a catalog-backed class in a context's store: {id: instance}, read-only"""
+
+    def __init__(self, catalog: Catalog):
+        self.catalog = catalog
+
+    def __getitem__(self, id: str) -> Any:
+        inst = self.catalog.find(id)
+        if inst is None:
+            raise KeyError(id)
+        return inst
+
+    def get(self, id: str, default: Any = None) -> Any:
+        inst = self.catalog.find(id)
+        return default if inst is None else inst
+
+    def __contains__(self, id: Any) -> bool:
+        return self.catalog.find(id) is not None
+
+    def __iter__(self) -> Iterator[str]:
+        return self.catalog.ids()
+
+    def __len__(self) -> int:
+        return len(self.catalog)
+
+    def values(self) -> Iterator[Any]:
+        return self.catalog.instances()
+
+    def items(self) -> Iterator[Tuple[str, Any]]:
+        return ((inst._id, inst) for inst in self.catalog.instances())
+
+    def _read_only(self, *args, **kwargs):
+        raise RuntimeError(f"{self.catalog.class_name} instances come from the read-only catalog {self.catalog.path}")
+
+    __setitem__ = __delitem__ = update = pop = setdefault = _read_only
@@ -0,0 +1,218 @@
+# runtime/changefeed.py
+from __future__ import annotations
+import itertools
+import threading
+import time
+from collections import deque
+from typing import Any, Callable, Deque, Dict, Iterable, List, Optional, Set
+
+class ChangeRecord:
+    """One captured change: create, update or delete of an instance"""
+    __slots__ = ('seq', 'kind', 'class_name', 'id', 'attr', 'old', 'new', 'timestamp')
+
+    def __init__(self, seq: int, kind: str, class_name: str, id: str, attr: Optional[str] = None, old: Any = None, new: Any = None):
+        self.seq = seq
+        self.kind = kind
+        self.class_name = class_name
+        self.id = id
+        self.attr = attr
+        self.old = old
+        self.new = new
+        self.timestamp = time.time()
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {name: getattr(self, name) for name in self.__slots__}
+
+    def __repr__(self):
+        if self.kind == 'update':
+            return f"<Change#{self.seq} {self.class_name}:{self.id}.{self.attr} {self.old!r} -> {self.new!r}>"
+        return f"<Change#{self.seq} {self.kind} {self.class_name}:{self.id}>"
+
+class Subscription:
+    """A consumer's cursor into the change buffer"""
+
+    def __init__(self, callback: Optional[Callable[[List[ChangeRecord]], None]], batch_size: int,
+                 classes: Optional[Iterable[str]], attrs: Optional[Iterable[str]], cursor: int):
+        self.callback = callback
+        self.batch_size = batch_size
+        self.classes = frozenset(classes) if classes else None
+        self.attrs = frozenset(attrs) if attrs else None
+        self.cursor = cursor  # seq of the last record consumed
+        self.missed = 0  # records evicted from the buffer before this subscriber read them
+
+    def _accepts(self, record: ChangeRecord) -> bool:
+        if self.classes is not None and record.class_name not in self.classes:
+            return False
+        if self.attrs is not None and record.kind == 'update' and record.attr not in self.attrs:
+            return False
+        return True
+
+    def poll(self, max_records: Optional[int] = None) -> List[ChangeRecord]:
+        """Take the next batch of records (pull-style consumers)"""
+        return ChangeFeed._take(self, max_records or self.batch_size)
+
+class ChangeFeed:
+    """Change-data-capture of watched attributes into a bounded buffer"""
+    _buffer: Deque[ChangeRecord] = deque(maxlen=10000)
+    _seq: int = 0
+    _subscribers: List[Subscription] = []
+    _lock = threading.RLock()
+    _held = threading.local()  # records emitted on this thread while it applies a commit
+    _watched_classes: Set[str] = set()
+    watching: bool = False  # some class is watched (commits only hold records back then)
+
+    @classmethod
+    def configure(cls, capacity: int):
+        """Resize the buffer (drops buffered records)"""
+        with cls._lock:
+            cls._buffer = deque(maxlen=capacity)
+
+    @classmethod
+    def watch(cls, model_class: type, attrs: Iterable[str] = (), lifecycle: bool = True):
+        """Capture changes to attrs (and creates/deletes if lifecycle) of a model class"""
+        model_class._watched = frozenset(model_class._watched) | frozenset(attrs)
+        model_class._watch_lifecycle = model_class._watch_lifecycle or lifecycle
+        if model_class._watched or model_class._watch_lifecycle:
+            cls._watched_classes.add(model_class.__name__)
+            cls.watching = True
+
+    @classmethod
+    def unwatch(cls, model_class: type):
+        """Stop capturing changes for a model class"""
+        model_class._watched = frozenset()
+        model_class._watch_lifecycle = False
+        cls._watched_classes.discard(model_class.__name__)
+        cls.watching = bool(cls._watched_classes)
+
+    @classmethod
+    def subscribe(cls, callback: Optional[Callable[[List[ChangeRecord]], None]] = None, batch_size: int = 100,
+                  classes: Optional[Iterable[str]] = None, attrs: Optional[Iterable[str]] = None) -> Subscription:
+        """Register a consumer; with a callback, batches are pushed once batch_size records are pending"""
+        with cls._lock:
+            sub = Subscription(callback, batch_size, classes, attrs, cls._seq)
+            cls._subscribers.append(sub)
+        return sub
+
+    @classmethod
+    def unsubscribe(cls, sub: Subscription):
+        with cls._lock:
+            if sub in cls._subscribers:
+                cls._subscribers.remove(sub)
+
+    @classmethod
+    def flush(cls):
+        """Push every pending record to callback subscribers regardless of batch size"""
+        cls.deliver(force=True)
+
+    @classmethod
+    def hold(cls) -> bool:
+        """Keep this thread's records back until release (False if they are already held)"""
+        if getattr(cls._held, 'records', None) is not None:
+            return False
+        cls._held.records = []
+        return True
+
+    @classmethod
+    def release(cls, publish: bool = True):
+        """Publish the held records to the buffer, or drop them (a rolled-back commit)"""
+        records, cls._held.records = cls._held.records, None
+        if publish and records:
+            with cls._lock:
+                for kind, class_name, id, attr, old, new in records:
+                    cls._seq += 1
+                    cls._buffer.append(ChangeRecord(cls._seq, kind, class_name, id, attr, old, new))
+
+    @classmethod
+    def deliver(cls, force: bool = False):
+        """Push pending batches to callback subscribers.
+
+        Called once the writer has released the context lock and closed its
+        unit of work, so a callback that writes opens a unit of its own. Every
+        subscriber is served; the first callback error is then re-raised.
+        """
+        if not cls._subscribers:
+            return
+        uow, active_unit.uow = active_unit.uow, None
+        try:
+            error = cls._deliver(force)
+        finally:
+            active_unit.uow = uow
+        if error is not None:
+            raise error
+
+    @classmethod
+    def clear(cls):
+        """Drop buffered records and subscribers"""
+        with cls._lock:
+            cls._buffer.clear()
+            cls._subscribers = []
+
+    # --- Emission (called by the runtime) ---
+
+    @classmethod
+    def attr_changed(cls, inst: Any, name: str, old: Any, new: Any):
+        """Record an attribute write on a stored instance"""
+        if old == new:
+            return
+        class_name = type(inst).__name__
+        if inst._ctx.store.get(class_name, {}).get(inst._id) is not inst:
+            return  # not stored yet (initial values travel with the create record) or already deleted
+        cls._emit('update', class_name, inst._id, name, old, new)
+
+    @classmethod
+    def instance_created(cls, class_name: str, inst: Any):
+        values = {name: inst.get_attr(name) for name in inst._watched} if inst._watched else None
+        cls._emit('create', class_name, inst._id, None, None, values)
+
+    @classmethod
+    def instance_deleted(cls, class_name: str, inst: Any):
+        cls._emit('delete', class_name, inst._id)
+
+    @classmethod
+    def _emit(cls, kind: str, class_name: str, id: str, attr: Optional[str] = None, old: Any = None, new: Any = None):
+        held = getattr(cls._held, 'records', None)
+        if held is not None:
+            held.append((kind, class_name, id, attr, old, new))
+            return
+        with cls._lock:
+            cls._seq += 1
+            cls._buffer.append(ChangeRecord(cls._seq, kind, class_name, id, attr, old, new))
+        cls.deliver()
+
+    @classmethod
+    def _take(cls, sub: Subscription, max_records: int) -> List[ChangeRecord]:
+        with cls._lock:
+            batch: List[ChangeRecord] = []
+            if not cls._buffer or sub.cursor >= cls._seq:
+                return batch
+            first = cls._buffer[0].seq
+            if sub.cursor + 1 < first:
+                sub.missed += first - sub.cursor - 1
+                sub.cursor = first - 1
+            for record in itertools.islice(cls._buffer, sub.cursor + 1 - first, None):
+                sub.cursor = record.seq
+                if sub._accepts(record):
+                    batch.append(record)
+                    if len(batch) >= max_records:
+                        break
+            return batch
+
+    @classmethod
+    def _deliver(cls, force: bool = False) -> Optional[Exception]:
+        error = None
+        for sub in list(cls._subscribers):
+            if sub.callback is None:
+                continue
+            while force or cls._seq - sub.cursor >= sub.batch_size:
+                batch = cls._take(sub, sub.batch_size)
+                if not batch:
+                    break
+                try:
+                    sub.callback(batch)
+                except Exception as e:
+                    if error is None:
+                        error = e
+        return error
+
+# Imported last: the unit of work module imports the store, which imports this one
+from runtime.unit_of_work import active_unit
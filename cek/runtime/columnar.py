@@ -0,0 +1,135 @@
+# runtime/columnar.py
+from __future__ import annotations
+from typing import Any, Dict, List, Optional, Tuple
+
+try:
+    import numpy as np
+except ImportError:  # optional dependency, only needed for columnar classes
+    np = None
+
+# (attribute, operator, value) predicate for vectorized queries
+Predicate = Tuple[str, str, Any]
+
+_OPERATORS: Dict[str, str] = {
+    '<': 'less',
+    '<=': 'less_equal',
+    '>': 'greater',
+    '>=': 'greater_equal',
+    '==': 'equal',
+    '!=': 'not_equal',
+}
+
+class ColumnStore:
+    """Numeric attributes of one class held as NumPy columns, one row per instance"""
+
+    def __init__(self, model_class: type, columns: Dict[str, str], capacity: int = 1024):
+        if np is None:
+            raise RuntimeError("Columnar storage requires numpy (pip install numpy)")
+        self.model_class = model_class
+        self.class_name = model_class.__name__
+        self.dtypes = dict(columns)
+        self.capacity = max(1, capacity)
+        self.reset()
+
+    def reset(self):
+        """Drop all rows"""
+        self.arrays: Dict[str, Any] = {name: np.zeros(self.capacity, dtype=dtype) for name, dtype in self.dtypes.items()}
+        self.live = np.zeros(self.capacity, dtype=bool)
+        self.instances: List[Any] = [None] * self.capacity
+        self.size = 0  # rows ever handed out
+        self._free: List[int] = []
+
+    def _grow(self):
+        new_capacity = self.capacity * 2
+        for name, column in self.arrays.items():
+            grown = np.zeros(new_capacity, dtype=column.dtype)
+            grown[:self.capacity] = column
+            self.arrays[name] = grown
+        live = np.zeros(new_capacity, dtype=bool)
+        live[:self.capacity] = self.live
+        self.live = live
+        self.instances.extend([None] * (new_capacity - self.capacity))
+        self.capacity = new_capacity
+
+    def allocate(self, inst: Any) -> int:
+        """Give an instance a row"""
+        if self._free:
+            row = self._free.pop()
+        else:
+            if self.size == self.capacity:
+                self._grow()
+            row = self.size
+            self.size += 1
+        for column in self.arrays.values():
+            column[row] = 0
+        self.live[row] = True
+        self.instances[row] = inst
+        inst._row = row
+        return row
+
+    def release(self, inst: Any):
+        """Free an instance's row, leaving its last values readable from _attrs"""
+        row = inst._row
+        if row is None or self.instances[row] is not inst:
+            return
+        for name, column in self.arrays.items():
+            inst._attrs[name] = column[row].item()
+        inst._columns = None  # detached: later reads and writes use the dict
+        self.live[row] = False
+        self.instances[row] = None
+        self._free.append(row)
+        inst._row = None
+
+    def get(self, inst: Any, name: str) -> Any:
+        """Read one value as a Python scalar"""
+        row = inst._row
+        if row is None:
+            return None
+        return self.arrays[name][row].item()
+
+    def set(self, inst: Any, name: str, value: Any):
+        """Write one value"""
+        row = inst._row
+        if row is None:
+            row = self.allocate(inst)
+        self.arrays[name][row] = value
+
+    # --- Vectorized queries ---
+
+    def mask(self, where: Optional[Predicate] = None) -> Any:
+        """Boolean row mask of live rows matching the predicate"""
+        live = self.live[:self.size]
+        if where is None:
+            return live.copy()
+        name, op, value = where
+        if op not in _OPERATORS:
+            raise ValueError(f"Unsupported operator '{op}' (use one of {', '.join(_OPERATORS)})")
+        return getattr(np, _OPERATORS[op])(self.arrays[name][:self.size], value) & live
+
+    def filter(self, where: Optional[Predicate] = None) -> List[Any]:
+        """Instances whose rows match the predicate"""
+        instances = self.instances
+        return [instances[row] for row in np.flatnonzero(self.mask(where))]
+
+    def aggregate(self, name: str, fn: str = 'sum', where: Optional[Predicate] = None) -> Any:
+        """sum | mean | min | max | count over matching rows"""
+        selected = self.arrays[name][:self.size][self.mask(where)]
+        if fn == 'count':
+            return int(selected.size)
+        if selected.size == 0:
+            return 0 if fn == 'sum' else None
+        if fn not in ('sum', 'mean', 'min', 'max'):
+            raise ValueError(f"Unsupported aggregate '{fn}'")
+        return getattr(selected, fn)().item()
+
+    def update(self, name: str, value: Any, where: Optional[Predicate] = None, mode: str = 'set') -> int:
+        """Set (or add to) a column on all matching rows; returns rows touched"""
+        mask = self.mask(where)
+        column = self.arrays[name][:self.size]
+        if mode == 'set':
+            column[mask] = value
+        elif mode == 'add':
+            column[mask] += value
+        else:
+            raise ValueError(f"Unsupported update mode '{mode}'")
+        return int(np.count_nonzero(mask))
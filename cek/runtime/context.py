@@ -0,0 +1,197 @@
+# runtime/context.py
+from __future__ import annotations
+import contextlib
+import contextvars
+import itertools
+import threading
+import time
+import weakref
+from collections import defaultdict
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+class StepGate:
+    """The root steps in flight in one context, and a way to hold new ones back.
+
+    A step that opens its own unit of work enters before it looks up its
+    transition and leaves once it has committed. While the gate is closed,
+    steps that have not entered yet wait for it to open again, and drain()
+    waits for the ones already inside. A thread that is itself inside a step
+    of a closed gate is let through, since whoever closed it is waiting for
+    that step to finish.
+    """
+
+    def __init__(self):
+        self.active: List[int] = []  # thread ident per step inside (list append/remove are atomic)
+        self.closed = False
+        self._closers = 0
+        self._opened = threading.Event()
+        self._opened.set()
+        self._lock = threading.Lock()
+
+    def enter(self, me: int) -> bool:
+        """Count a step of thread me in; returns True if it had to wait for the gate to open"""
+        self.active.append(me)
+        return self.closed and self.admit(me)
+
+    def admit(self, me: int) -> bool:
+        """For a step already counted in while the gate is closed: wait for it to open unless let through"""
+        if _inside_closed_gate(me, self):
+            return False
+        active = self.active
+        while self.closed:
+            active.remove(me)
+            self._opened.wait()
+            active.append(me)
+        return True
+
+    def leave(self, me: int):
+        self.active.remove(me)
+
+    def close(self):
+        """Hold back steps that have not entered yet (closes nest)"""
+        with self._lock:
+            self._closers += 1
+            self._opened.clear()
+            self.closed = True
+
+    def open(self):
+        with self._lock:
+            self._closers -= 1
+            if not self._closers:
+                self.closed = False
+                self._opened.set()
+
+    def drain(self, poll: float = 0.0005):
+        """Wait until no step is inside (call with the gate closed, from outside any step)"""
+        if threading.get_ident() in self.active:
+            raise RuntimeError("Cannot wait for a context's steps from inside one of them")
+        while self.active:
+            time.sleep(poll)
+
+def _inside_closed_gate(me: int, entering: StepGate) -> bool:
+    """Whether thread me already has a step inside a closed gate (counting entering's new entry out)"""
+    for ctx in RuntimeContext.all():
+        gate = ctx.steps
+        inside = gate.active.count(me) - (gate is entering)
+        if gate.closed and inside > 0:
+            return True
+    return False
+
+@contextlib.contextmanager
+def quiesced(contexts: Iterable['RuntimeContext']) -> Iterator[None]:
+    """Hold back new steps in contexts and wait for the ones in flight to commit"""
+    gates = [ctx.steps for ctx in contexts]
+    for gate in gates:
+        gate.close()
+    try:
+        for gate in gates:
+            gate.drain()
+        yield
+    finally:
+        for gate in gates:
+            gate.open()
+
+class RuntimeContext:
+    """State of one simulation: instances, links, timers and messages.
+
+    ObjectStore, the relationship functions and RuntimeServices act on the
+    context that is current for the calling thread (the default context
+    unless another one is entered with `with ctx:`). Instances remember the
+    context they were created in, and events dispatched to them run there,
+    so independent domains can share a process and run on separate threads.
+    """
+    _ids = itertools.count(1)
+    _all: 'weakref.WeakSet[RuntimeContext]' = weakref.WeakSet()
+
+    def __init__(self, name: Optional[str] = None):
+        self.name = name or f"context-{next(self._ids)}"
+        self.store: Dict[str, Dict[str, Any]] = defaultdict(dict)  # { classname: {id: instance} }
+        self.columns: Dict[str, Any] = {}  # { classname: ColumnStore }
+        self.links: Dict[str, Dict[Tuple[Any, Any], None]] = {}  # { rel_id: {(inst1, inst2): None} } in link order
+        self.partners: Dict[str, Dict[Any, List[Any]]] = {}  # { rel_id: {instance: [related instances]} }
+        self.timers: Dict[str, threading.Timer] = {}
+        self.message_bus: List[Dict] = []
+        self.current_time: float = time.time()
+        self.lock = threading.RLock()  # held while a unit of work is applied to this context
+        self.steps = StepGate()  # root steps in flight (reload and eviction wait for them)
+        self.version = 0  # units of work committed
+        self.instance_seq = 0  # instances created so far (numbers them for snapshots)
+        self.snapshots: Tuple[Any, ...] = ()  # open read snapshots, handed old values before each write
+        self._tokens = threading.local()
+        RuntimeContext._all.add(self)
+
+    def __repr__(self):
+        return f"<RuntimeContext {self.name}>"
+
+    def __enter__(self) -> 'RuntimeContext':
+        tokens = self._tokens.__dict__.setdefault('stack', [])
+        tokens.append(_current.set(self))
+        return self
+
+    def __exit__(self, *exc):
+        _current.reset(self._tokens.stack.pop())
+
+    def run(self, fn: Callable, *args, **kwargs) -> Any:
+        """Call fn with this context current"""
+        with self:
+            return fn(*args, **kwargs)
+
+    def snapshot(self) -> Any:
+        """Open a consistent point-in-time read view (see runtime.snapshot.Snapshot)"""
+        from runtime.snapshot import Snapshot
+        with self.lock:  # between commits
+            snap = Snapshot(self)
+            self.snapshots = self.snapshots + (snap,)
+        return snap
+
+    def _release_snapshot(self, snap: Any):
+        with self.lock:
+            self.snapshots = tuple(s for s in self.snapshots if s is not snap)
+
+    # Copy-on-write hooks: the runtime calls these (only when snapshots are open) before changing state
+
+    def preserve_attrs(self, inst: Any):
+        for snap in self.snapshots:
+            snap._keep_attrs(inst)
+
+    def preserve_extent(self, class_name: str):
+        for snap in self.snapshots:
+            snap._keep_extent(class_name)
+
+    def preserve_links(self, rel_id: str, inst1: Any, inst2: Any):
+        for snap in self.snapshots:
+            snap._keep_links(rel_id, inst1, inst2)
+
+    def preserve_all(self):
+        for snap in self.snapshots:
+            snap._keep_all()
+
+    def clear(self):
+        """Cancel timers and drop all instances, links and messages"""
+        if self.snapshots:
+            self.preserve_all()
+        for timer in list(self.timers.values()):
+            timer.cancel()
+        self.timers.clear()
+        self.store = defaultdict(dict)
+        for columns in self.columns.values():
+            columns.reset()
+        self.links = {}
+        self.partners = {}
+        self.message_bus = []
+
+    @classmethod
+    def all(cls) -> List['RuntimeContext']:
+        """Every live context"""
+        return list(cls._all)
+
+_default = RuntimeContext('default')
+_current: contextvars.ContextVar = contextvars.ContextVar('runtime_context', default=_default)
+
+def current_context() -> RuntimeContext:
+    """The context the calling thread is working in"""
+    return _current.get()
+
+def default_context() -> RuntimeContext:
+    """The process-wide context used when no other one has been entered"""
+    return _default
@@ -0,0 +1,371 @@
+# runtime/event_server.py
+from __future__ import annotations
+import asyncio
+import collections
+import json
+import os
+import threading
+import weakref
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Deque, Dict, List, Optional, Tuple
+from runtime.context import RuntimeContext, current_context
+from runtime.storage import ObjectStore
+
+class EventServer:
+    """Asyncio JSON-lines front end that feeds events to model instances.
+
+    Each request is one JSON object on its own line:
+
+        {"id": 7, "class": "VendingMachine", "instance": "vendingmachine_1",
+         "event": "ProductSelected", "params": {"p_productCode": "A1"}}
+
+    and is answered by one line with the dispatch result and the state the
+    instance is in afterwards:
+
+        {"id": 7, "ok": true, "state": "WaitingPayment"}
+
+    "class" is a class name or KeyLetters; leave out "event" to only read the
+    state. Clients may pipeline: a connection's requests are handled in the
+    order sent and answered in that order, while connections are served
+    concurrently. Listens on TCP (host, port) or on a Unix socket (path).
+
+    Events are dispatched on the event loop thread. With workers > 0 they run
+    on a thread pool instead, so actions that block in bridge calls do not
+    hold up other connections; requests for the same instance still take
+    their turns, one at a time.
+    """
+
+    def __init__(self, host: str = '127.0.0.1', port: int = 0, path: Optional[str] = None,
+                 ctx: Optional[RuntimeContext] = None, workers: int = 0, backlog: int = 4096,
+                 line_limit: int = 64 * 1024):
+        self.host = host
+        self.port = port
+        self.path = path
+        self.ctx = ctx or current_context()
+        self.workers = workers
+        self.backlog = backlog
+        self.line_limit = line_limit
+        self.requests = 0
+        self.errors = 0
+        self.connections = 0  # accepted so far
+        self._counts = threading.Lock()  # requests and errors are counted on worker threads too
+        self.open_connections = 0
+        self._classes: Dict[str, str] = {}  # { class name or KeyLetters: class name }
+        self._turns: 'weakref.WeakKeyDictionary[Any, threading.Lock]' = weakref.WeakKeyDictionary()  # per instance, with workers
+        self._turns_lock = threading.Lock()
+        self._pool: Optional[ThreadPoolExecutor] = None
+        self._server: Optional[asyncio.AbstractServer] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def address(self) -> str:
+        return f"unix:{self.path}" if self.path else f"{self.host}:{self.port}"
+
+    async def serve(self) -> asyncio.AbstractServer:
+        """Start listening on the running event loop"""
+        if self.workers > 0 and self._pool is None:
+            self._pool = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='event-server')
+        if self.path:
+            if os.path.exists(self.path):
+                os.unlink(self.path)
+            self._server = await asyncio.start_unix_server(self._handle, path=self.path, backlog=self.backlog,
+                                                           limit=self.line_limit)
+        else:
+            self._server = await asyncio.start_server(self._handle, self.host, self.port, backlog=self.backlog,
+                                                      limit=self.line_limit)
+            self.port = self._server.sockets[0].getsockname()[1]
+        print(f"[EVENTS] Event server listening on {self.address}")
+        return self._server
+
+    async def serve_forever(self):
+        server = await self.serve()
+        try:
+            async with server:
+                await server.serve_forever()
+        finally:
+            self._close()
+
+    def start(self) -> str:
+        """Serve on a background thread with its own event loop; returns the address"""
+        if self._thread is not None:
+            return self.address
+        ready = threading.Event()
+        failure = []
+
+        def run():
+            self._loop = asyncio.new_event_loop()
+            try:
+                self._loop.run_until_complete(self.serve())
+            except Exception as e:
+                failure.append(e)
+                ready.set()
+                return
+            ready.set()
+            self._loop.run_forever()
+            self._server.close()
+            self._loop.run_until_complete(self._server.wait_closed())
+            self._loop.close()
+            self._close()
+
+        self._thread = threading.Thread(target=run, name='event-server', daemon=True)
+        self._thread.start()
+        ready.wait()
+        if failure:
+            self._thread = None
+            raise failure[0]
+        return self.address
+
+    def stop(self):
+        if self._thread is None:
+            return
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join()
+        self._thread = None
+        self._loop = None
+
+    def __enter__(self) -> 'EventServer':
+        self.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            'requests': self.requests,
+            'errors': self.errors,
+            'connections': self.connections,
+            'open_connections': self.open_connections,
+        }
+
+    def _close(self):
+        if self._pool is not None:
+            self._pool.shutdown(wait=True)
+            self._pool = None
+        if self.path and os.path.exists(self.path):
+            os.unlink(self.path)
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        self.connections += 1
+        self.open_connections += 1
+        loop = asyncio.get_running_loop()
+        pending = b''  # start of a request line not yet complete
+        try:
+            while True:
+                chunk = await reader.read(self.line_limit)
+                if not chunk:
+                    break
+                # Everything a pipelining client has sent so far is answered with one write
+                *lines, pending = (pending + chunk).split(b'\n')
+                if lines:
+                    if self._pool is None:
+                        replies = self._answer_all(lines)
+                    else:
+                        replies = await loop.run_in_executor(self._pool, self._answer_all, lines)
+                    writer.write(replies)
+                if len(pending) > self.line_limit:
+                    with self._counts:
+                        self.errors += 1
+                    writer.write(_encode({'id': None, 'ok': False, 'error': f"Request line exceeds {self.line_limit} bytes"}))
+                    break
+                if writer.transport.get_write_buffer_size() > self.line_limit:
+                    await writer.drain()  # the client is not reading its replies
+            await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            self.open_connections -= 1
+            writer.close()
+            try:
+                await writer.wait_closed()
+            except ConnectionError:
+                pass
+
+    def _answer_all(self, lines: List[bytes]) -> bytes:
+        """Handle a connection's request lines in order; returns their reply lines"""
+        replies = []
+        errors = 0
+        for line in lines:
+            if line.strip():
+                reply, failed = self._answer(line)
+                replies.append(reply)
+                errors += failed
+        with self._counts:
+            self.requests += len(replies)
+            self.errors += errors
+        return b''.join(replies)
+
+    def _answer(self, line: bytes) -> Tuple[bytes, bool]:
+        """Handle one request line; returns the reply line and whether the request failed"""
+        try:
+            request = json.loads(line)
+        except ValueError as e:
+            return _encode({'id': None, 'ok': False, 'error': f"Malformed request: {e}"}), True
+        if not isinstance(request, dict):
+            return _encode({'id': None, 'ok': False, 'error': "Request must be a JSON object"}), True
+        reply: Dict[str, Any] = {'id': request.get('id')}
+        try:
+            with self.ctx:
+                reply.update(self._route(request))
+        except Exception as e:
+            reply.update(ok=False, error=f"{type(e).__name__}: {e}")
+        return _encode(reply), 'error' in reply
+
+    def _route(self, request: Dict[str, Any]) -> Dict[str, Any]:
+        class_name = self._class_name(request.get('class'))
+        instance_id = request.get('instance')
+        inst = ObjectStore.find(class_name, instance_id) if class_name else None
+        if inst is None:
+            return {'ok': False, 'error': f"No instance {request.get('class')}:{instance_id}"}
+        if self._pool is None:
+            return self._request(inst, class_name, request)
+        with self._turns_lock:
+            turn = self._turns.get(inst)
+            if turn is None:
+                turn = self._turns[inst] = threading.Lock()
+        with turn:  # connections on other worker threads may be sending to the same instance
+            return self._request(inst, class_name, request)
+
+    def _request(self, inst: Any, class_name: str, request: Dict[str, Any]) -> Dict[str, Any]:
+        sm = inst.__dict__.get('sm')
+        event = request.get('event')
+        ok = True
+        if event is not None:
+            if sm is None:
+                return {'ok': False, 'error': f"{class_name} has no state machine"}
+            params = request.get('params') or {}
+            if not isinstance(params, dict):
+                return {'ok': False, 'error': "params must be a JSON object"}
+            ok = inst.dispatch_event(event, **params)
+        return {'ok': ok, 'state': sm.get_current_state() if sm is not None else None}
+
+    def _class_name(self, name: Any) -> Optional[str]:
+        """Resolve a class name or KeyLetters to the name instances are stored under"""
+        if not isinstance(name, str):
+            return None
+        resolved = self._classes.get(name)
+        if resolved is None:
+            from runtime.base import InstanceBase
+            pending = list(InstanceBase.__subclasses__())
+            while pending:
+                cls = pending.pop()
+                self._classes.setdefault(cls.__name__, cls.__name__)
+                kl = cls.__dict__.get('kl')
+                if isinstance(kl, str):
+                    self._classes.setdefault(kl, cls.__name__)
+                pending.extend(cls.__subclasses__())
+            resolved = self._classes.get(name)
+        return resolved
+
+def _encode(reply: Dict[str, Any]) -> bytes:
+    return (json.dumps(reply, default=str) + '\n').encode()
+
+class EventClient:
+    """Asyncio client for EventServer that pipelines requests on one connection.
+
+    submit() writes a request and returns a future for its reply without
+    waiting for earlier replies; send() submits and waits.
+    """
+
+    def __init__(self, host: str = '127.0.0.1', port: int = 0, path: Optional[str] = None):
+        self.host = host
+        self.port = port
+        self.path = path
+        self._ids = 0
+        self._outgoing: List[bytes] = []  # encoded requests written together on the next loop turn
+        self._pending: Deque[Tuple[int, asyncio.Future]] = collections.deque()
+        self._reader: Optional[asyncio.StreamReader] = None
+        self._writer: Optional[asyncio.StreamWriter] = None
+        self._receiver: Optional[asyncio.Task] = None
+
+    async def connect(self) -> 'EventClient':
+        if self.path:
+            self._reader, self._writer = await asyncio.open_unix_connection(self.path)
+        else:
+            self._reader, self._writer = await asyncio.open_connection(self.host, self.port)
+        self._receiver = asyncio.get_running_loop().create_task(self._receive())
+        return self
+
+    async def close(self):
+        if self._writer is None:
+            return
+        self._flush()
+        self._writer.close()
+        try:
+            await self._writer.wait_closed()
+        except ConnectionError:
+            pass
+        if self._receiver is not None:
+            self._receiver.cancel()
+            try:
+                await self._receiver
+            except asyncio.CancelledError:
+                pass
+        self._fail_pending(ConnectionError("Connection closed"))
+        self._writer = None
+
+    async def __aenter__(self) -> 'EventClient':
+        return await self.connect()
+
+    async def __aexit__(self, *exc):
+        await self.close()
+
+    def submit(self, class_name: str, instance: str, event: Optional[str] = None, **params) -> asyncio.Future:
+        """Send one request now; the future resolves with its reply"""
+        if self._writer is None or self._receiver.done():
+            raise ConnectionError("EventClient is not connected")
+        self._ids += 1
+        request: Dict[str, Any] = {'id': self._ids, 'class': class_name, 'instance': instance}
+        if event is not None:
+            request['event'] = event
+            if params:
+                request['params'] = params
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((self._ids, future))
+        if not self._outgoing:
+            loop.call_soon(self._flush)
+        self._outgoing.append(_encode(request))
+        return future
+
+    async def send(self, class_name: str, instance: str, event: Optional[str] = None, **params) -> Dict[str, Any]:
+        future = self.submit(class_name, instance, event, **params)
+        self._flush()
+        await self._writer.drain()
+        return await future
+
+    def _flush(self):
+        if self._outgoing and self._writer is not None:
+            self._writer.write(b''.join(self._outgoing))
+            self._outgoing = []
+
+    async def _receive(self):
+        try:
+            while True:
+                line = await self._reader.readline()
+                if not line:
+                    break
+                try:
+                    reply = json.loads(line)
+                except ValueError as e:
+                    raise ConnectionError(f"Malformed reply: {e}") from e
+                if not isinstance(reply, dict):
+                    raise ConnectionError("Malformed reply: not a JSON object")
+                if not self._pending:
+                    continue
+                request_id, future = self._pending.popleft()
+                if reply.get('id') not in (request_id, None):
+                    future.set_exception(ConnectionError(f"Reply {reply.get('id')} out of order (expected {request_id})"))
+                elif not future.done():
+                    future.set_result(reply)
+        except ConnectionError as e:
+            self._fail_pending(e)
+            return
+        self._fail_pending(ConnectionError("Server closed the connection"))
+
+    def _fail_pending(self, error: Exception):
+        while self._pending:
+            _, future = self._pending.popleft()
+            if not future.done():
+                future.set_exception(error)
@@ -0,0 +1,206 @@
+# runtime/memory.py
+from __future__ import annotations
+import random
+import sys
+import time
+from typing import Any, Dict, Optional, Tuple
+from runtime.context import RuntimeContext, current_context
+from runtime.changefeed import ChangeFeed
+from runtime.catalog import CatalogExtent
+
+try:
+    import resource
+except ImportError:  # not available on Windows
+    resource = None
+
+_sizeof = sys.getsizeof
+
+class MemorySample:
+    """Estimated memory held by the runtime at one point in time"""
+
+    def __init__(self):
+        self.timestamp = time.time()
+        self.classes: Dict[str, Dict[str, int]] = {}  # { classname: {instances, paged, bytes, attr_bytes, history, history_bytes} }
+        self.links: Dict[str, Dict[str, int]] = {}  # { rel_id: {links, bytes} }
+        self.columns: Dict[str, int] = {}  # { classname: bytes held by its ColumnStore }
+        self.catalogs: Dict[str, Dict[str, int]] = {}  # { classname: {rows, materialized, mapped_bytes} } (shared, not in the total)
+        self.queues: Dict[str, Dict[str, int]] = {}  # timers, message bus, change feed: {items, bytes}
+        self.max_rss: Optional[int] = None  # peak resident set size of the process, bytes
+
+    @property
+    def total_bytes(self) -> int:
+        return (sum(c['bytes'] for c in self.classes.values()) + sum(l['bytes'] for l in self.links.values())
+                + sum(self.columns.values()) + sum(q['bytes'] for q in self.queues.values()))
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'timestamp': self.timestamp,
+            'classes': self.classes,
+            'links': self.links,
+            'columns': self.columns,
+            'catalogs': self.catalogs,
+            'queues': self.queues,
+            'total_bytes': self.total_bytes,
+            'max_rss': self.max_rss,
+        }
+
+def sample(max_per_class: int = 1000, rng: Optional[random.Random] = None, ctx: Optional[RuntimeContext] = None) -> MemorySample:
+    """Measure the containers of a runtime context (the current one by default).
+
+    Instance sizes are shallow sizes of the instance, its dicts, attribute
+    values and state machine history (instances referenced from attributes
+    count as one pointer). Classes with more than max_per_class instances are
+    estimated from a random sample; max_per_class=None measures every one.
+    """
+    rng = rng or random.Random(0)
+    ctx = ctx or current_context()
+    snapshot = MemorySample()
+    for class_name, extent in list(ctx.store.items()):
+        if type(extent) is CatalogExtent:
+            catalog = extent.catalog
+            snapshot.catalogs[class_name] = {'rows': len(catalog), 'materialized': catalog.materialized(),
+                                             'mapped_bytes': catalog.mapped_bytes()}
+            continue
+        instances = list(extent.values())
+        measured = instances
+        if max_per_class is not None and len(instances) > max_per_class:
+            measured = rng.sample(instances, max_per_class)
+        scale = len(instances) / len(measured) if measured else 0
+        total = attrs = history = history_bytes = 0
+        for inst in measured:
+            if inst._pager is not None:
+                total += _sizeof(inst) + _sizeof(inst.__dict__)  # paged out: only the stub is in memory
+                continue
+            inst_attrs = _attrs_size(inst)
+            inst_history, inst_history_bytes = _history_size(inst)
+            attrs += inst_attrs
+            history += inst_history
+            history_bytes += inst_history_bytes
+            total += _sizeof(inst) + _sizeof(inst.__dict__) + inst_attrs + inst_history_bytes
+        snapshot.classes[class_name] = {
+            'instances': len(instances),
+            'paged': sum(1 for inst in instances if inst._pager is not None),
+            'bytes': int(total * scale),
+            'attr_bytes': int(attrs * scale),
+            'history': int(history * scale),
+            'history_bytes': int(history_bytes * scale),
+        }
+    for rel_id, links in list(ctx.links.items()):
+        # Each link is a 2-tuple key in the relationship's dict, plus one entry in each end's partner list
+        partners = ctx.partners.get(rel_id, {})
+        index = _sizeof(partners) + sum(_sizeof(related) for related in list(partners.values()))
+        snapshot.links[rel_id] = {'links': len(links), 'bytes': _sizeof(links) + len(links) * _sizeof((None, None)) + index}
+    for class_name, store in ctx.columns.items():
+        snapshot.columns[class_name] = (sum(a.nbytes for a in store.arrays.values()) + store.live.nbytes
+                                        + _sizeof(store.instances) + _sizeof(store._free))
+    timers = ctx.timers
+    snapshot.queues['timers'] = {
+        'items': len(timers),
+        'bytes': _sizeof(timers) + sum(_sizeof(t) + _sizeof(t.__dict__) for t in list(timers.values())),
+    }
+    bus = ctx.message_bus
+    snapshot.queues['message_bus'] = {
+        'items': len(bus),
+        'bytes': _sizeof(bus) + sum(_container_size(m) for m in list(bus)),
+    }
+    feed = ChangeFeed._buffer
+    record_size = _sizeof(feed[0]) if feed else 0
+    snapshot.queues['change_feed'] = {'items': len(feed), 'bytes': _sizeof(feed) + len(feed) * record_size}
+    if resource is not None:
+        rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        snapshot.max_rss = rss if sys.platform == 'darwin' else rss * 1024
+    return snapshot
+
+def _attrs_size(inst: Any) -> int:
+    size = _sizeof(inst._attrs)
+    for value in inst._attrs.values():
+        if not hasattr(value, '_REF_SLOTS'):  # references to other instances (even paged out ones) are counted by their own class
+            size += _container_size(value)
+    return size
+
+def _history_size(inst: Any) -> Tuple[int, int]:
+    sm = inst.__dict__.get('sm')
+    if sm is None:
+        return 0, 0
+    history = sm._history
+    entry = 0
+    if history:
+        first = history[0]
+        if sm.model.steps[first[0]][first[1]] is not first:  # entries the state model shares cost only their list slot
+            entry = _sizeof(first)
+    return len(history), _sizeof(sm) + _sizeof(sm.__dict__) + _sizeof(history) + len(history) * entry
+
+def _container_size(value: Any) -> int:
+    """Shallow size of a value plus, for plain containers, their items"""
+    size = _sizeof(value)
+    if isinstance(value, dict):
+        size += sum(_sizeof(k) + _sizeof(v) for k, v in value.items())
+    elif isinstance(value, (list, tuple, set, frozenset)):
+        size += sum(_sizeof(v) for v in value)
+    return size
+
+def growth(before: MemorySample, after: MemorySample) -> Dict[str, Dict[str, int]]:
+    """Per-entry deltas between two samples (only entries that changed)"""
+    deltas: Dict[str, Dict[str, int]] = {}
+
+    def compare(prefix: str, old: Dict[str, Dict[str, int]], new: Dict[str, Dict[str, int]]):
+        for name in sorted(set(old) | set(new)):
+            a, b = old.get(name, {}), new.get(name, {})
+            changed = {k: b.get(k, 0) - a.get(k, 0) for k in set(a) | set(b) if b.get(k, 0) != a.get(k, 0)}
+            if changed:
+                deltas[f"{prefix}{name}"] = changed
+
+    compare('class:', before.classes, after.classes)
+    compare('rel:', before.links, after.links)
+    compare('columns:', {k: {'bytes': v} for k, v in before.columns.items()}, {k: {'bytes': v} for k, v in after.columns.items()})
+    compare('catalog:', before.catalogs, after.catalogs)
+    compare('queue:', before.queues, after.queues)
+    return deltas
+
+def format_report(snapshot: MemorySample, previous: Optional[MemorySample] = None) -> str:
+    """Human-readable footprint report, with growth since previous if given"""
+    delta = growth(previous, snapshot) if previous is not None else {}
+
+    def change(key: str, field: str) -> str:
+        d = delta.get(key, {}).get(field)
+        return f"{d:+d}" if d else ''
+
+    lines = ['=' * 72, 'Runtime memory footprint', '=' * 72]
+    paging = any(c.get('paged') for c in snapshot.classes.values())
+    lines.append(f"{'class':<20}{'instances':>10}{'(+/-)':>8}{'bytes':>12}{'(+/-)':>10}{'history':>10}{'(+/-)':>8}"
+                 + (f"{'paged':>9}" if paging else ''))
+    for name, c in sorted(snapshot.classes.items()):
+        key = f"class:{name}"
+        lines.append(f"{name:<20}{c['instances']:>10}{change(key, 'instances'):>8}{c['bytes']:>12}"
+                     f"{change(key, 'bytes'):>10}{c['history']:>10}{change(key, 'history'):>8}"
+                     + (f"{c.get('paged', 0):>9}" if paging else ''))
+    lines.append('')
+    lines.append(f"{'relationship':<20}{'links':>10}{'(+/-)':>8}{'bytes':>12}{'(+/-)':>10}")
+    for rel_id, l in sorted(snapshot.links.items()):
+        key = f"rel:{rel_id}"
+        lines.append(f"{rel_id:<20}{l['links']:>10}{change(key, 'links'):>8}{l['bytes']:>12}{change(key, 'bytes'):>10}")
+    if snapshot.columns:
+        lines.append('')
+        lines.append(f"{'columns':<20}{'':>18}{'bytes':>12}{'(+/-)':>10}")
+        for name, size in sorted(snapshot.columns.items()):
+            lines.append(f"{name:<20}{'':>18}{size:>12}{change(f'columns:{name}', 'bytes'):>10}")
+    if snapshot.catalogs:
+        lines.append('')
+        lines.append(f"{'catalog':<20}{'rows':>10}{'in use':>8}{'mapped':>12}{'(+/-)':>10}")
+        for name, c in sorted(snapshot.catalogs.items()):
+            key = f"catalog:{name}"
+            lines.append(f"{name:<20}{c['rows']:>10}{c['materialized']:>8}{c['mapped_bytes']:>12}"
+                         f"{change(key, 'mapped_bytes'):>10}")
+    lines.append('')
+    lines.append(f"{'queue':<20}{'items':>10}{'(+/-)':>8}{'bytes':>12}{'(+/-)':>10}")
+    for name, q in snapshot.queues.items():
+        key = f"queue:{name}"
+        lines.append(f"{name:<20}{q['items']:>10}{change(key, 'items'):>8}{q['bytes']:>12}{change(key, 'bytes'):>10}")
+    lines.append('')
+    total = f"Estimated total:    {snapshot.total_bytes} bytes"
+    if previous is not None:
+        total += f" ({snapshot.total_bytes - previous.total_bytes:+d} since previous sample)"
+    lines.append(total)
+    if snapshot.max_rss is not None:
+        lines.append(f"Process peak RSS:   {snapshot.max_rss} bytes")
+    return '\n'.join(lines)
@@ -0,0 +1,209 @@
+# runtime/paging.py
+from __future__ import annotations
+import json
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+from runtime.context import RuntimeContext, current_context, quiesced
+from runtime.unit_of_work import active_unit
+from runtime.state_machine import StateMachine
+
+_PLAIN = (str, int, float, bool, type(None))  # attribute values a page can hold
+
+class Pager:
+    """Evicts quiescent instances to a local on-disk store and faults them back in on use.
+
+    An evicted instance stays in the store as a stub with the same identity
+    (so its links and references stay valid) but without its attribute
+    dict and state machine, which are written to an SQLite file. Touching
+    the stub's attributes or state machine, find() and events sent to it
+    (dispatch_event, broadcasts with a transition for its state, timers)
+    bring them back transparently.
+
+    maintain() applies the policy: with idle_seconds, instances without a
+    transition for that long are evicted; with max_resident, the least
+    recently active are evicted until at most that many are in memory.
+    Activity is seen from state machine history, so the dispatch path pays
+    nothing. Only quiescent instances are evicted: no timer armed for them,
+    plain attribute values and, if states is given, in one of those states.
+    Eviction waits for the steps in flight in the pager's context to commit
+    and holds new ones back while it writes pages, so it can be called from
+    any thread that is not itself inside a step.
+    """
+
+    def __init__(self, path: Optional[str] = None, ctx: Optional[RuntimeContext] = None,
+                 classes: Optional[Iterable[type]] = None, max_resident: Optional[int] = None,
+                 idle_seconds: Optional[float] = None, states: Optional[Sequence[str]] = None):
+        self.ctx = ctx or current_context()
+        self._owns_file = path is None
+        if path is None:
+            fd, path = tempfile.mkstemp(prefix='pages-', suffix='.db')
+            os.close(fd)
+        self.path = path
+        self.classes = list(classes) if classes is not None else None  # None: every class with a state machine
+        self.max_resident = max_resident
+        self.idle_seconds = idle_seconds
+        self.states = set(states) if states is not None else None
+        self.evictions = 0
+        self.faults = 0
+        self.paged = 0  # instances currently evicted
+        self._seen: Dict[Any, Tuple[int, float]] = {}  # { resident instance: (history length, last active) }
+        self._lock = threading.RLock()  # faults can come from any thread
+        self._db = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._db.execute('PRAGMA journal_mode=WAL')
+        self._db.execute('PRAGMA synchronous=OFF')  # pages only need to outlive the process's memory, not a crash
+        self._db.execute('CREATE TABLE IF NOT EXISTS pages (class TEXT, id TEXT, page TEXT, PRIMARY KEY (class, id))')
+
+    def __repr__(self):
+        return f"<Pager {self.path}: {self.paged} paged, {self.evictions} evictions, {self.faults} faults>"
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            'paged': self.paged,
+            'resident': len(self._seen),
+            'evictions': self.evictions,
+            'faults': self.faults,
+            'file_bytes': sum(os.path.getsize(self.path + suffix) for suffix in ('', '-wal')
+                              if os.path.exists(self.path + suffix)),
+        }
+
+    # --- Policy ---
+
+    def maintain(self) -> int:
+        """Apply the eviction policy once; returns the number of instances evicted"""
+        if self.idle_seconds is None and self.max_resident is None:
+            return 0
+        now = time.monotonic()
+        seen: Dict[Any, Tuple[int, float]] = {}
+        for inst in self._resident():
+            sm = inst.__dict__.get('sm')
+            length = len(sm._history) if sm is not None else 0
+            last = self._seen.get(inst)
+            seen[inst] = last if last is not None and last[0] == length else (length, now)
+        self._seen = seen
+        by_age = sorted(seen, key=lambda inst: seen[inst][1])
+        victims = []
+        if self.idle_seconds is not None:
+            victims = [inst for inst in by_age if now - seen[inst][1] >= self.idle_seconds]
+        if self.max_resident is not None and len(by_age) - len(victims) > self.max_resident:
+            chosen = set(victims)
+            excess = len(by_age) - len(victims) - self.max_resident
+            victims.extend([inst for inst in by_age if inst not in chosen][:excess])
+        return self.evict(victims)
+
+    def _resident(self) -> List[Any]:
+        ctx = self.ctx
+        if self.classes is not None:
+            names = [cls.__name__ for cls in self.classes]
+        else:
+            names = [name for name, extent in ctx.store.items() if extent and _has_machine(next(iter(extent.values())))]
+        return [inst for name in names for inst in ctx.store.get(name, {}).values() if inst._pager is None]
+
+    # --- Eviction ---
+
+    def evict(self, instances: Iterable[Any]) -> int:
+        """Write the quiescent ones among instances to disk and drop them from memory; returns how many"""
+        if active_unit.uow is not None:
+            raise RuntimeError("Pager.evict cannot run inside a unit of work")
+        ctx = self.ctx
+        with quiesced([ctx]), ctx.lock, self._lock:  # no step can hold an instance half-changed meanwhile
+            armed = {timer.instance for timer in list(ctx.timers.values()) if getattr(timer, 'instance', None) is not None}
+            pages = []
+            evicted = []
+            for inst in instances:
+                page = self._page(inst, armed)
+                if page is not None:
+                    pages.append((type(inst).__name__, inst._id, json.dumps(page)))
+                    evicted.append(inst)
+            if not pages:
+                return 0
+            with self._db:
+                self._db.execute('BEGIN')
+                self._db.executemany('INSERT OR REPLACE INTO pages VALUES (?, ?, ?)', pages)
+            for inst in evicted:
+                if ctx.snapshots:
+                    ctx.preserve_attrs(inst)
+                state = inst.__dict__.pop('sm', None)
+                if state is not None:
+                    inst._paged_state = state.index  # lets broadcasts skip it when its state ignores the event
+                del inst._attrs
+                inst._pager = self
+                self._seen.pop(inst, None)
+            self.evictions += len(evicted)
+            self.paged += len(evicted)
+        return len(evicted)
+
+    def _page(self, inst: Any, armed: set) -> Optional[Dict[str, Any]]:
+        """What is written for an evictable instance, or None if it is not quiescent"""
+        if inst._pager is not None or inst._columns is not None or inst in armed or inst._ctx is not self.ctx:
+            return None
+        slots = inst._REF_SLOTS
+        refs = set(slots.values())
+        attrs = {}
+        for name, value in inst._attrs.items():
+            if name in refs:
+                continue  # rebuilt from the links when faulted in
+            if type(value) not in _PLAIN:
+                return None
+            attrs[name] = value
+        page: Dict[str, Any] = {'attrs': attrs}
+        sm = inst.__dict__.get('sm')
+        if sm is not None:
+            if self.states is not None and sm.model.states[sm.index] not in self.states:
+                return None
+            page['state'] = sm.index
+            page['history'] = sm._history
+        return page
+
+    # --- Faults ---
+
+    def fault_in(self, inst: Any) -> bool:
+        """Bring an evicted instance back into memory; False if it was resident"""
+        with self._lock:
+            if inst.__dict__.get('_pager') is not self:
+                return False
+            row = self._db.execute('SELECT page FROM pages WHERE class = ? AND id = ?',
+                                   (type(inst).__name__, inst._id)).fetchone()
+            if row is None:
+                raise RuntimeError(f"Page of {inst.kl}:{inst._id} is missing from {self.path}")
+            page = json.loads(row[0])
+            attrs = page['attrs']
+            ctx = inst._ctx
+            for rel_id, slot in inst._REF_SLOTS.items():
+                related = ctx.partners.get(rel_id, {}).get(inst)
+                attrs[slot] = related[0] if related else None
+            if 'state' in page:
+                sm = StateMachine.attach(inst, type(inst)._SM, page['state'])
+                sm._history = [sm.model.step(*step) for step in page['history']]
+                inst.sm = sm
+            inst._attrs = attrs
+            inst.__dict__.pop('_paged_state', None)
+            del inst._pager  # back to the class default: resident
+            self._seen[inst] = (len(page.get('history', ())), time.monotonic())
+            self.faults += 1
+            self.paged -= 1
+        return True
+
+    def fault_all(self) -> int:
+        """Bring every instance evicted by this pager back; returns how many"""
+        count = 0
+        for extent in list(self.ctx.store.values()):
+            for inst in list(extent.values()):
+                if inst.__dict__.get('_pager') is self:
+                    count += self.fault_in(inst)
+        return count
+
+    def close(self):
+        """Fault everything back in and close the store (deleting it if the pager created it)"""
+        self.fault_all()
+        self._db.close()
+        if self._owns_file:
+            for suffix in ('', '-wal', '-shm'):
+                if os.path.exists(self.path + suffix):
+                    os.unlink(self.path + suffix)
+
+def _has_machine(inst: Any) -> bool:
+    return getattr(type(inst), '_SM', None) is not None
@@ -1,73 +1,207 @@
 # runtime/relationship.py
 from __future__ import annotations
-from typing import Any, Dict, List, Tuple, Optional
-
-# Global relationship storage
-_LINKS: Dict[str, List[Tuple[Any, Any]]] = {}
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+from runtime.context import RuntimeContext, current_context
+from runtime.unit_of_work import active_unit
+from runtime.tracing import traced
+from runtime.catalog import CatalogExtent
 
+@traced('relationship')
 def relate(rel_id: str, inst1: Any, inst2: Any) -> bool:
     """Create a relationship link between two instances"""
     if inst1 is None or inst2 is None:
         print(f"[RELATE] Warning: Cannot relate None instances across {rel_id}")
         return False
-        
-    link = (inst1, inst2)
-    if link not in _LINKS.setdefault(rel_id, []):
-        _LINKS[rel_id].append(link)
-        print(f"[RELATE] {inst1.kl}:{inst1._id} linked to {inst2.kl}:{inst2._id} across {rel_id}")
+
+    uow = active_unit.uow
+    if uow is not None:
+        if inst2 in _related(rel_id, inst1):
+            return False
+        uow.stage_link(rel_id, inst1, inst2, True)
         return True
-    return False
+    return _link(rel_id, inst1, inst2)
 
+@traced('relationship')
 def unrelate(rel_id: str, inst1: Any, inst2: Any) -> bool:
     """Remove a relationship link between two instances"""
     if inst1 is None or inst2 is None:
         return False
-        
+
+    uow = active_unit.uow
+    if uow is not None:
+        if inst2 not in _related(rel_id, inst1):
+            return False
+        uow.stage_link(rel_id, inst1, inst2, False)
+        return True
+    return _unlink(rel_id, inst1, inst2)
+
+def _link(rel_id: str, inst1: Any, inst2: Any) -> bool:
+    """Store a link immediately"""
+    ctx = inst1._ctx
     link = (inst1, inst2)
-    reverse_link = (inst2, inst1)
-    
-    if rel_id in _LINKS:
-        if link in _LINKS[rel_id]:
-            _LINKS[rel_id].remove(link)
-            print(f"[UNRELATE] {inst1.kl}:{inst1._id} unlinked from {inst2.kl}:{inst2._id} across {rel_id}")
-            return True
-        elif reverse_link in _LINKS[rel_id]:
-            _LINKS[rel_id].remove(reverse_link)
-            print(f"[UNRELATE] {inst2.kl}:{inst2._id} unlinked from {inst1.kl}:{inst1._id} across {rel_id}")
-            return True
-    return False
-    
+    links = ctx.links.get(rel_id)
+    if links is None:
+        links = ctx.links[rel_id] = {}
+    if link in links:
+        return False
+    if ctx.snapshots:
+        ctx.preserve_links(rel_id, inst1, inst2)
+    links[link] = None
+    partners = ctx.partners.get(rel_id)
+    if partners is None:
+        partners = ctx.partners[rel_id] = {}
+    _add_partner(rel_id, partners, inst1, inst2)
+    if inst2 is not inst1:
+        _add_partner(rel_id, partners, inst2, inst1)
+    print(f"[RELATE] {inst1.kl}:{inst1._id} linked to {inst2.kl}:{inst2._id} across {rel_id}")
+    return True
+
+def relate_many(rel_id: str, pairs: Iterable[Tuple[Any, Any]]) -> int:
+    """Link many pairs in one pass, outside any unit of work (bulk loading).
+
+    Same result as relating each pair, without the per-link log line.
+    Pairs already linked are skipped; returns the number of new links.
+    """
+    if active_unit.uow is not None:
+        raise RuntimeError("relate_many cannot run inside a unit of work")
+    created = 0
+    ctx = links = partners = None
+    for inst1, inst2 in pairs:
+        if inst1._ctx is not ctx:
+            ctx = inst1._ctx
+            links = ctx.links.setdefault(rel_id, {})
+            partners = ctx.partners.setdefault(rel_id, {})
+        link = (inst1, inst2)
+        if link in links:
+            continue
+        if ctx.snapshots:
+            ctx.preserve_links(rel_id, inst1, inst2)
+        links[link] = None
+        _add_partner(rel_id, partners, inst1, inst2)
+        if inst2 is not inst1:
+            _add_partner(rel_id, partners, inst2, inst1)
+        created += 1
+    print(f"[RELATE] {created} links across {rel_id}")
+    return created
+
+def _unlink(rel_id: str, inst1: Any, inst2: Any) -> bool:
+    """Drop a link immediately, in either direction"""
+    ctx = inst1._ctx
+    links = ctx.links.get(rel_id)
+    if not links:
+        return False
+    if ctx.snapshots and ((inst1, inst2) in links or (inst2, inst1) in links):
+        ctx.preserve_links(rel_id, inst1, inst2)
+    if (inst1, inst2) in links:
+        del links[(inst1, inst2)]
+        print(f"[UNRELATE] {inst1.kl}:{inst1._id} unlinked from {inst2.kl}:{inst2._id} across {rel_id}")
+    elif (inst2, inst1) in links:
+        del links[(inst2, inst1)]
+        print(f"[UNRELATE] {inst2.kl}:{inst2._id} unlinked from {inst1.kl}:{inst1._id} across {rel_id}")
+    else:
+        return False
+    partners = ctx.partners[rel_id]
+    _drop_partner(rel_id, partners, inst1, inst2)
+    if inst2 is not inst1:
+        _drop_partner(rel_id, partners, inst2, inst1)
+    return True
+
+def _add_partner(rel_id: str, partners: Dict[Any, List[Any]], inst: Any, other: Any):
+    """Add other to inst's partners; inst's reference slot holds the first of them, as select_one_related returns"""
+    related = partners.get(inst)
+    if related is None:
+        partners[inst] = [other]
+        slot = inst._REF_SLOTS.get(rel_id)
+        if slot is not None:
+            inst._attrs[slot] = other
+    else:
+        related.append(other)
+
+def _drop_partner(rel_id: str, partners: Dict[Any, List[Any]], inst: Any, other: Any):
+    """Remove other from inst's partners; repoint or empty inst's reference slot if it held other"""
+    related = partners[inst]
+    related.remove(other)
+    if not related:
+        del partners[inst]
+    slot = inst._REF_SLOTS.get(rel_id)
+    if slot is not None and inst._attrs.get(slot) is other:
+        inst._attrs[slot] = related[0] if related else None
+
+@traced('relationship')
 def select_related(rel_id: str, source_instance: Any) -> List[Any]:
     """Select all instances related to source across relationship"""
     if source_instance is None:
         return []
-        
-    results = []
-    for inst1, inst2 in _LINKS.get(rel_id, []):
-        if inst1._id == source_instance._id:
-            results.append(inst2)
-        elif inst2._id == source_instance._id:
-            results.append(inst1)
+    return _related(rel_id, source_instance)
+
+def _related(rel_id: str, source_instance: Any) -> List[Any]:
+    """select_related without its span, for the runtime's own reads (relate, unrelate, select_one_related)"""
+    partners = source_instance._ctx.partners.get(rel_id)
+    results = list(partners.get(source_instance, ())) if partners else []
+    uow = active_unit.uow
+    if uow is not None and rel_id in uow.links:
+        return uow.resolve_related(rel_id, source_instance, results)
     return results
 
 def select_one_related(rel_id: str, source_instance: Any) -> Optional[Any]:
-    """Select one instance related to source across relationship"""
-    related = select_related(rel_id, source_instance)
+    """Select one instance related to source across relationship.
+
+    Single-valued ends (those with a reference slot) are read straight from
+    the slot unless the calling unit of work has pending links across rel_id.
+    """
+    if source_instance is None:
+        return None
+    slot = source_instance._REF_SLOTS.get(rel_id)
+    if slot is not None:
+        uow = active_unit.uow
+        if uow is None or rel_id not in uow.links:
+            return source_instance._attrs.get(slot)
+    related = _related(rel_id, source_instance)
     return related[0] if related else None
 
 def is_related(rel_id: str, inst1: Any, inst2: Any) -> bool:
     """Check if two instances are related"""
     if inst1 is None or inst2 is None:
         return False
-    link = (inst1, inst2)
-    reverse = (inst2, inst1)
-    links = _LINKS.get(rel_id, [])
-    return link in links or reverse in links
+    uow = active_unit.uow
+    if uow is not None and rel_id in uow.links:
+        return inst2 in select_related(rel_id, inst1)
+    links = inst1._ctx.links.get(rel_id, ())
+    return (inst1, inst2) in links or (inst2, inst1) in links
 
 def clear_relationships(rel_id: Optional[str] = None):
     """Clear all relationships or specific relationship"""
-    global _LINKS
+    ctx = current_context()
+    if ctx.snapshots:
+        ctx.preserve_all()
+    dropped = {rel_id: ctx.links.get(rel_id, {})} if rel_id else ctx.links
+    for rid, links in dropped.items():
+        for inst1, inst2 in links:
+            for inst in (inst1, inst2):
+                slot = inst._REF_SLOTS.get(rid)
+                if slot is not None:
+                    inst._attrs[slot] = None
     if rel_id:
-        _LINKS[rel_id] = []
+        ctx.links[rel_id] = {}
+        ctx.partners.pop(rel_id, None)
     else:
-        _LINKS = {}
+        ctx.links = {}
+        ctx.partners = {}
+
+def rebuild_ref_slots(ctx: Optional[RuntimeContext] = None):
+    """Recompute every reference slot of a context from its links (e.g. after the slot layout changed)"""
+    ctx = ctx or current_context()
+    if ctx.snapshots:
+        ctx.preserve_all()
+    for extent in ctx.store.values():
+        # A catalog's rows are not instances until used; paged stubs rebuild their slots when faulted in
+        instances = extent.catalog._instances.values() if type(extent) is CatalogExtent else extent.values()
+        for inst in list(instances):
+            if inst._pager is None:
+                for slot in inst._REF_SLOTS.values():
+                    inst._attrs[slot] = None
+    for rel_id, partners in ctx.partners.items():
+        for inst, related in partners.items():
+            slot = inst._REF_SLOTS.get(rel_id)
+            if slot is not None and inst._pager is None:
+                inst._attrs[slot] = related[0]
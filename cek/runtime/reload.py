@@ -0,0 +1,183 @@
+# runtime/reload.py
+from __future__ import annotations
+import contextlib
+import importlib
+import sys
+import time
+from typing import Any, Dict, List
+from runtime.context import RuntimeContext, quiesced
+from runtime.unit_of_work import active_unit
+from runtime.storage import ObjectStore
+from runtime.catalog import CatalogExtent
+from runtime.relationship import rebuild_ref_slots
+
+class ReloadReport:
+    """What a reload changed, per class"""
+
+    def __init__(self):
+        self.modules: List[str] = []
+        self.migrated: Dict[str, int] = {}  # { classname: instances moved to the new class }
+        self.added_attrs: Dict[str, List[str]] = {}
+        self.removed_attrs: Dict[str, List[str]] = {}
+        self.orphaned_states: Dict[str, Dict[str, str]] = {}  # { classname: {id: state that no longer exists} }
+        self.missing_classes: List[str] = []  # stored classes the new models no longer define
+        self.seconds = 0.0
+
+    def summary(self) -> str:
+        lines = [f"[RELOAD] {len(self.modules)} modules reloaded in {self.seconds * 1000:.1f} ms"]
+        for class_name, count in self.migrated.items():
+            added = self.added_attrs.get(class_name, [])
+            removed = self.removed_attrs.get(class_name, [])
+            lines.append(f"[RELOAD] {class_name}: {count} instances migrated (+{len(added)} / -{len(removed)} attrs)")
+            for id, state in self.orphaned_states.get(class_name, {}).items():
+                lines.append(f"[RELOAD] {class_name}:{id} state '{state}' removed, reset to initial state")
+        for class_name in self.missing_classes:
+            lines.append(f"[RELOAD] {class_name} is no longer generated; its instances keep the old class")
+        return '\n'.join(lines)
+
+def reload_models(package: str = 'models') -> ReloadReport:
+    """Re-import regenerated model modules and move live instances onto the new classes.
+
+    Instances of every runtime context are migrated. They keep their
+    identity, so the relationship store, pending timers
+    and any caller-held references stay valid. Attributes are migrated to the
+    new layout (new ones get their initial value, dropped ones are removed)
+    and state machines switch to the new transition table, keeping their
+    current state by name. Runs between steps: dispatches already in flight
+    in any context finish on the old code and commit first, and ones that
+    start meanwhile wait for the swap, then run on the new code.
+    Names bound with `from models.X import X` before the reload still refer to
+    the old class objects; look classes up again afterwards.
+    """
+    if active_unit.uow is not None:
+        raise RuntimeError("Cannot reload models from inside a state machine step")
+    report = ReloadReport()
+    started = time.perf_counter()
+    importlib.invalidate_caches()
+    contexts = RuntimeContext.all()
+    with quiesced(contexts), contextlib.ExitStack() as locks:
+        for ctx in contexts:
+            locks.enter_context(ctx.lock)
+        old_classes = {name: _stored_class(instances)
+                       for ctx in contexts for name, instances in ctx.store.items() if instances}
+        modules = [m for name, m in sys.modules.items() if name.startswith(package + '.') and m is not None]
+        # Base classes first so subclasses re-import the new superclass
+        modules.sort(key=lambda m: _hierarchy_depth(m, package))
+        for module in modules:
+            importlib.reload(module)
+            report.modules.append(module.__name__)
+        if package in sys.modules:
+            importlib.reload(sys.modules[package])
+
+        for class_name, old_cls in old_classes.items():
+            new_cls = getattr(sys.modules.get(old_cls.__module__), class_name, None)
+            if new_cls is None or new_cls is old_cls:
+                report.missing_classes.append(class_name)
+                continue
+            for ctx in contexts:
+                if ctx.store.get(class_name):
+                    with ctx:
+                        _migrate_class(ctx, class_name, old_cls, new_cls, report)
+        for ctx in contexts:
+            rebuild_ref_slots(ctx)  # relationship ends may have gained or lost their slot
+    report.seconds = time.perf_counter() - started
+    print(report.summary())
+    return report
+
+def _stored_class(instances: Any) -> type:
+    """Class of a stored extent's instances (a catalog knows it without building one)"""
+    if type(instances) is CatalogExtent:
+        return instances.catalog.model_class
+    return type(next(iter(instances.values())))
+
+def _hierarchy_depth(module: Any, package: str) -> int:
+    """How many generated superclasses the module's class has"""
+    cls = getattr(module, module.__name__.rsplit('.', 1)[-1], None)
+    if not isinstance(cls, type):
+        return 0
+    return sum(1 for base in cls.__mro__[1:] if base.__module__.startswith(package + '.'))
+
+def _declared(cls: type) -> Dict[str, Any]:
+    """Declared attributes across the class hierarchy (superclass first)"""
+    attrs: Dict[str, Any] = {}
+    for klass in reversed(cls.__mro__):
+        fn = klass.__dict__.get('_declared_attrs')
+        if fn is not None:
+            attrs.update(fn.__func__())
+    return attrs
+
+def _migrate_class(ctx: RuntimeContext, class_name: str, old_cls: type, new_cls: type, report: ReloadReport):
+    old_attrs = _declared(old_cls)
+    new_attrs = _declared(new_cls)
+    added = [name for name in new_attrs if name not in old_attrs]
+    removed = [name for name in old_attrs if name not in new_attrs]
+    report.added_attrs[class_name] = added
+    report.removed_attrs[class_name] = removed
+
+    # Change data capture settings belong to the class, not the module
+    new_cls._watched = old_cls._watched
+    new_cls._watch_lifecycle = old_cls._watch_lifecycle
+
+    extent = ctx.store[class_name]
+    if type(extent) is CatalogExtent:
+        # Rows live in the catalog file: only the instances built so far exist, and later ones use model_class
+        catalog = extent.catalog
+        catalog.model_class = new_cls
+        built = list(catalog._instances.values())
+        for instance in built:
+            instance.__class__ = new_cls
+        report.migrated[class_name] = report.migrated.get(class_name, 0) + len(built)
+        return
+
+    # Move column-stored values back to the instances, re-enable on the new layout below
+    columns = ctx.columns.pop(class_name, None)
+    instances = list(ctx.store[class_name].values())
+    for instance in instances:
+        if instance._pager is not None:
+            instance._pager.fault_in(instance)  # its page holds state and history indices of the old model
+    if columns is not None:
+        for instance in instances:
+            columns.release(instance)
+
+    new_model = getattr(new_cls, '_SM', None)
+    for instance in instances:
+        instance.__class__ = new_cls
+        if added:
+            fresh = _declared(new_cls)  # per instance: defaults such as unique ids are not shared
+            for name in added:
+                instance._attrs.setdefault(name, fresh[name])
+        for name in removed:
+            instance._attrs.pop(name, None)
+        _migrate_state_machine(instance, new_model, report)
+    report.migrated[class_name] = report.migrated.get(class_name, 0) + len(instances)
+
+    if columns is not None and getattr(new_cls, '_NUMERIC_ATTRS', None):
+        ObjectStore.enable_columns(new_cls, capacity=max(len(instances), 1024))
+
+def _migrate_state_machine(instance: Any, new_model: Any, report: ReloadReport):
+    sm = instance.__dict__.get('sm')
+    if new_model is None:
+        if sm is not None:
+            del instance.sm  # the class no longer has a state machine
+        return
+    if sm is None:
+        instance._build_state_machine()
+        return
+    old_model = sm.model
+    state = old_model.states[sm.index]
+    index = new_model.state_index.get(state)
+    if index is None:
+        report.orphaned_states.setdefault(type(instance).__name__, {})[instance._id] = state
+        index = 0  # the initial state is encoded first
+    sm.model = new_model
+    sm.index = index
+    history = []
+    for s, e, n in sm._history:
+        s = new_model.state_index.get(old_model.states[s])
+        e = new_model.event_index.get(old_model.events[e])
+        n = new_model.state_index.get(old_model.states[n]) if n is not None else None
+        if s is not None and e is not None:
+            history.append(new_model.step(s, e, n))
+    sm._history = history
+    if new_model.state_attr:
+        instance._apply_attrs({new_model.state_attr: new_model.states[index]})
@@ -0,0 +1,180 @@
+# runtime/snapshot.py
+from __future__ import annotations
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+class Snapshot:
+    """Point-in-time read view of a runtime context, kept by copy-on-write.
+
+    Opening a snapshot copies nothing. While it is open, every write to the
+    context (attribute commits, creates and deletes, relates and unrelates)
+    first hands the snapshot the value about to be overwritten, once per
+    instance, extent or relationship end. Reads return that saved value if
+    there is one and the live value otherwise, so a long report sees the
+    state as of the commit boundary it was opened at while dispatch carries
+    on. Close the snapshot (or use it as a context manager) to stop the
+    copying.
+    """
+
+    def __init__(self, ctx: Any):
+        self.ctx = ctx
+        self.version = ctx.version  # units of work committed before the snapshot
+        self.seq = ctx.instance_seq  # instances numbered above this were created after it
+        self.taken = time.time()
+        self.closed = False
+        self._attrs: Dict[Any, Dict[str, Any]] = {}  # { instance: attributes at snapshot time }
+        self._extents: Dict[str, Dict[str, Any]] = {}  # { classname: {id: instance} }
+        self._links: Dict[str, Dict[Tuple[Any, Any], None]] = {}  # { rel_id: link pairs }
+        self._partners: Dict[Tuple[str, Any], List[Any]] = {}  # { (rel_id, instance): related instances }
+        self._complete = False  # everything preserved (the live state was cleared)
+
+    def __repr__(self):
+        return f"<Snapshot {self.ctx.name} v{self.version}{' closed' if self.closed else ''}>"
+
+    def __enter__(self) -> 'Snapshot':
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        """Stop preserving and drop the saved values"""
+        if not self.closed:
+            self.ctx._release_snapshot(self)
+            self.closed = True
+            self._attrs = {}
+            self._extents = {}
+            self._links = {}
+            self._partners = {}
+
+    # --- Writer side: called by the runtime before it changes live state ---
+
+    def _keep_attrs(self, inst: Any):
+        if self._complete or inst._seq > self.seq or inst in self._attrs:
+            return
+        self._attrs[inst] = _current_attrs(inst)
+
+    def _keep_extent(self, class_name: str):
+        if self._complete or class_name in self._extents:
+            return
+        self._extents[class_name] = dict(self.ctx.store.get(class_name, {}))
+
+    def _keep_links(self, rel_id: str, inst1: Any, inst2: Any):
+        if self._complete:
+            return
+        if rel_id not in self._links:
+            self._links[rel_id] = dict(self.ctx.links.get(rel_id, {}))
+        partners = self.ctx.partners.get(rel_id, {})
+        for inst in (inst1, inst2):
+            if inst._seq <= self.seq:
+                if (rel_id, inst) not in self._partners:
+                    self._partners[(rel_id, inst)] = list(partners.get(inst, ()))
+                self._keep_attrs(inst)  # reference slots live in the attributes
+
+    def _keep_all(self):
+        """Preserve the whole context (before it is cleared)"""
+        if self._complete:
+            return
+        ctx = self.ctx
+        for class_name, extent in list(ctx.store.items()):
+            self._keep_extent(class_name)
+            for inst in list(extent.values()):
+                self._keep_attrs(inst)
+        for rel_id, partners in list(ctx.partners.items()):
+            self._links.setdefault(rel_id, dict(ctx.links.get(rel_id, {})))
+            for inst, related in list(partners.items()):
+                self._partners.setdefault((rel_id, inst), list(related))
+        self._complete = True
+
+    # --- Reader side ---
+
+    def _extent(self, class_name: str) -> Dict[str, Any]:
+        saved = self._extents.get(class_name)
+        if saved is None:
+            live = {} if self._complete else dict(self.ctx.store.get(class_name, {}))
+            saved = self._extents.get(class_name)  # preserved while we were copying: that copy is older
+            if saved is None:
+                return live
+        return saved
+
+    def select_all(self, class_name: str) -> List[Any]:
+        """Instances of a class as of the snapshot"""
+        return list(self._extent(class_name).values())
+
+    def find(self, class_name: str, id: str) -> Optional[Any]:
+        return self._extent(class_name).get(id)
+
+    def count(self, class_name: str) -> int:
+        return len(self._extent(class_name))
+
+    def attrs(self, inst: Any) -> Dict[str, Any]:
+        """All attribute values of an instance as of the snapshot"""
+        saved = self._attrs.get(inst)
+        if saved is None:
+            live = _current_attrs(inst)
+            saved = self._attrs.get(inst)
+            if saved is None:
+                return live
+        return dict(saved)
+
+    def get_attr(self, inst: Any, name: str) -> Any:
+        saved = self._attrs.get(inst)
+        if saved is None:
+            value = inst._stored_attr(name)
+            saved = self._attrs.get(inst)
+            if saved is None:
+                return value
+        return saved.get(name)
+
+    def state(self, inst: Any) -> Optional[str]:
+        """Current state of an instance's state machine as of the snapshot"""
+        sm = inst.__dict__.get('sm')
+        model = sm.model if sm is not None else type(inst)._SM if '_paged_state' in inst.__dict__ else None
+        if model is None or not model.state_attr:
+            return None
+        return self.get_attr(inst, model.state_attr)
+
+    def select_related(self, rel_id: str, inst: Any) -> List[Any]:
+        saved = self._partners.get((rel_id, inst))
+        if saved is None:
+            if self._complete:
+                return []
+            live = list(self.ctx.partners.get(rel_id, {}).get(inst, ()))
+            saved = self._partners.get((rel_id, inst))
+            if saved is None:
+                return live
+        return list(saved)
+
+    def select_one_related(self, rel_id: str, inst: Any) -> Optional[Any]:
+        related = self.select_related(rel_id, inst)
+        return related[0] if related else None
+
+    def links(self, rel_id: str) -> List[Tuple[Any, Any]]:
+        """Link pairs of a relationship as of the snapshot"""
+        saved = self._links.get(rel_id)
+        if saved is None:
+            live = [] if self._complete else list(self.ctx.links.get(rel_id, {}))
+            saved = self._links.get(rel_id)
+            if saved is None:
+                return live
+        return list(saved)
+
+    def stats(self) -> Dict[str, int]:
+        """How much has been copied to keep the snapshot consistent"""
+        return {
+            'version': self.version,
+            'commits_since': self.ctx.version - self.version,
+            'instances': len(self._attrs),
+            'extents': len(self._extents),
+            'relationships': len(self._links),
+            'partner_lists': len(self._partners),
+        }
+
+def _current_attrs(inst: Any) -> Dict[str, Any]:
+    """Committed attribute values of an instance, including column-stored ones"""
+    attrs = dict(inst._attrs)
+    columns = inst._columns
+    if columns is not None:
+        for name in columns.arrays:
+            attrs[name] = columns.get(inst, name)
+    return attrs
@@ -1,62 +1,348 @@
 # runtime/state_machine.py
 from __future__ import annotations
-from typing import Any, Callable, Dict, Optional, Tuple
+from collections.abc import Mapping
+from threading import get_ident
+from typing import Any, Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+from runtime.context import current_context
+from runtime.unit_of_work import UnitOfWork, active_unit
+from runtime.changefeed import ChangeFeed
+from runtime.tracing import Tracer
+
+# (guard, action, next state index); guard and action are called as fn(owner, owner, payload)
+Transition = Tuple[Optional[Callable], Optional[Callable], Optional[int]]
+
+class EventPayload:
+    """Parameters of one event, laid out in slots by a generated subclass (P_<event> on the model class)
+
+    It reads like a read-only mapping, so guards and actions that take dict
+    payloads (payload.get('p_productCode')) work with either. A subclass can
+    pool its instances (see pool()): acquire() then reuses released payloads
+    instead of allocating, and the sender releases a payload once its dispatch
+    returns. Actions must copy out any value they keep.
+    """
+    __slots__ = ()
+    _FIELDS: Tuple[str, ...] = ()
+    _free: Optional[List['EventPayload']] = None  # released instances, when this layout is pooled
+    _pool_size: int = 0
+
+    @classmethod
+    def acquire(cls, *values: Any) -> 'EventPayload':
+        """A payload holding values, reused from the pool when there is one"""
+        free = cls._free
+        if free:
+            try:
+                payload = free.pop()
+            except IndexError:  # another thread took the last one
+                return cls(*values)
+            payload.__init__(*values)
+            return payload
+        return cls(*values)
+
+    def release(self):
+        """Return the payload to its layout's pool (no-op when the layout is not pooled)"""
+        free = self._free
+        if free is not None and len(free) < self._pool_size:
+            free.append(self)
+
+    @classmethod
+    def pool(cls, size: int = 64):
+        """Pool up to size released payloads of this layout (0 turns pooling off); on EventPayload itself, of every layout"""
+        layouts = [cls] if cls._FIELDS else _layouts(cls)
+        for layout in layouts:
+            layout._free = [] if size > 0 else None
+            layout._pool_size = size
+
+    def get(self, name: str, default: Any = None) -> Any:
+        if name in self._FIELDS:
+            return getattr(self, name, default)
+        return default
+
+    def __getitem__(self, name: str) -> Any:
+        if name in self._FIELDS:
+            return getattr(self, name)
+        raise KeyError(name)
+
+    def __contains__(self, name: Any) -> bool:
+        return name in self._FIELDS
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._FIELDS)
+
+    def __len__(self) -> int:
+        return len(self._FIELDS)
+
+    def keys(self):
+        return self._FIELDS
+
+    def values(self) -> List[Any]:
+        return [getattr(self, name, None) for name in self._FIELDS]
+
+    def items(self) -> List[Tuple[str, Any]]:
+        return [(name, getattr(self, name, None)) for name in self._FIELDS]
+
+    def __eq__(self, other: Any) -> bool:
+        if isinstance(other, Mapping):
+            return dict(self.items()) == dict(other.items())
+        return NotImplemented
+
+    __hash__ = None  # mutable while pooled
+
+    def __repr__(self):
+        return f"{type(self).__name__}({', '.join(f'{k}={v!r}' for k, v in self.items())})"
+
+Mapping.register(EventPayload)
+
+def _layouts(cls: type) -> List[type]:
+    found = []
+    for sub in cls.__subclasses__():
+        if sub._FIELDS:
+            found.append(sub)
+        found.extend(_layouts(sub))
+    return found
+
+# Payload of events without parameters: shared, nothing to allocate
+NO_PAYLOAD = EventPayload()
+
+class StateModel:
+    """Integer-encoded states and events with a dense transition table, shared by all instances of a class"""
+
+    def __init__(self, states: Sequence[str], events: Sequence[str], table: Sequence[Sequence[Optional[Transition]]],
+                 state_attr: Optional[str] = 'currentState'):
+        self.states = tuple(states)
+        self.events = tuple(events)
+        self.state_index: Dict[str, int] = {name: i for i, name in enumerate(self.states)}
+        self.event_index: Dict[str, int] = {name: i for i, name in enumerate(self.events)}
+        self.table = tuple(tuple(row) for row in table)  # table[state][event] -> Transition or None
+        # steps[state][event] -> the (state, event, next state) history entry of that transition, built once
+        # and shared by every machine of the class so recording history allocates nothing
+        self.steps = tuple(tuple((s, e, t[2]) if t is not None else None for e, t in enumerate(row))
+                           for s, row in enumerate(self.table))
+        self.state_attr = state_attr  # attribute mirroring the current state name, synced on commit
+
+    @classmethod
+    def from_dict(cls, transition_table: Dict) -> 'StateModel':
+        """Encode a {state: {event: (guard, action, next_state)}} table of bound methods"""
+        states: List[str] = []
+        events: List[str] = []
+        for state, transitions in transition_table.items():
+            if state not in states:
+                states.append(state)
+            for event, (_, _, next_state) in transitions.items():
+                if event not in events:
+                    events.append(event)
+                if next_state and next_state not in states:
+                    states.append(next_state)
+        table = [[None] * len(events) for _ in states]
+        for state, transitions in transition_table.items():
+            for event, (guard_fn, action_fn, next_state) in transitions.items():
+                table[states.index(state)][events.index(event)] = (
+                    _unbound(guard_fn),
+                    _unbound(action_fn),
+                    states.index(next_state) if next_state else None,
+                )
+        return cls(states, events, table)
+
+    def step(self, state: int, event: int, next_state: Optional[int]) -> Tuple[int, int, Optional[int]]:
+        """The shared history entry for a transition (a new tuple if the table has no such transition)"""
+        entry = self.steps[state][event]
+        if entry is not None and entry[2] == next_state:
+            return entry
+        return (state, event, next_state)
+
+def _unbound(fn: Optional[Callable]) -> Optional[Callable]:
+    """Adapt an fn(owner, payload) callable to the fn(self, owner, payload) table convention"""
+    if fn is None:
+        return None
+    return lambda self, owner, payload: fn(owner, payload)
 
 class StateMachine:
     """State machine implementation for xtUML classes"""
-    
-    def __init__(self, owner: Any, initial_state: str, transition_table: Dict):
+    log_transitions: bool = True  # print init/transition/ignored lines
+
+    def __init__(self, owner: Any, initial_state: str, model: Any):
+        if isinstance(model, dict):
+            model = StateModel.from_dict(model)
+        if initial_state not in model.state_index:
+            raise ValueError(f"[{owner.kl}:{owner._id}] Unknown initial state '{initial_state}'")
         self.owner = owner
-        self.state = initial_state
-        self.table = transition_table
-        self._history: list = []
-        print(f"[{owner.kl}:{owner._id}] SM Init: {self.state}")
+        self.model = model
+        self.index = model.state_index[initial_state]
+        self._history: list = []  # (from index, event index, to index)
+        if self.log_transitions:
+            print(f"[{owner.kl}:{owner._id}] SM Init: {initial_state}")
+
+    @classmethod
+    def attach(cls, owner: Any, model: StateModel, index: int) -> 'StateMachine':
+        """Build a machine already in state `index`, skipping validation and the init log (bulk loading)"""
+        sm = cls.__new__(cls)
+        sm.owner = owner
+        sm.model = model
+        sm.index = index
+        sm._history = []
+        return sm
+
+    @property
+    def state(self) -> str:
+        """Current state name"""
+        return self.model.states[self.index]
+
+    @state.setter
+    def state(self, name: str):
+        self.index = self.model.state_index[name]
 
-    def dispatch(self, event: str, payload: Optional[Dict] = None) -> bool:
+    def dispatch(self, event: str, payload: Optional[Mapping] = None) -> bool:
+        """Dispatch an event by name"""
+        event_index = self.model.event_index.get(event)
+        if event_index is None:
+            if self.log_transitions:
+                print(f"[{self.owner.kl}] Ignored event {event} in state {self.state}")
+            return False
+        return self.dispatch_index(event_index, payload)
+
+    def dispatch_index(self, event: int, payload: Optional[Mapping] = None) -> bool:
       """
-      Dispatch an event to the state machine.
+      Dispatch an event by its index in the class's event encoding.
       payload contains event parameters (rcvd_evt data).
+      The transition and its action run as one unit of work: attribute,
+      relationship, create and delete changes are applied together when the
+      step completes and discarded if the action raises. A step not sent by
+      an action is counted in its context's StepGate until it has committed,
+      so reload_models and Pager.evict can wait for it.
       """
       if payload is None:
-        payload = {}
-            
-      state_transitions = self.table.get(self.state, {})
-      if event in state_transitions:
-        guard_fn, action_fn, next_state = state_transitions[event]
-            
+        payload = NO_PAYLOAD
+      ctx = getattr(self.owner, '_ctx', None)
+      if ctx is not None and ctx is not current_context():
+        return self._step_in(ctx, event, payload)
+      if active_unit.uow is not None:  # sent by an action: joins the unit of the step that sent it
+        return self._traced_step(event, payload) if Tracer.enabled else self._step(event, payload)
+      # A root step: counted in the context's step gate before its transition is looked up
+      me = get_ident()
+      gate = (ctx or current_context()).steps
+      active = gate.active
+      active.append(me)  # StepGate.enter, inlined
+      if gate.closed:
+        gate.admit(me)
+      try:
+        attrs = self.owner.__dict__
+        sm = self if attrs.get('sm', self) is self and '_pager' not in attrs else self._resolved()
+        if Tracer.enabled:
+          return sm._traced_step(event, payload)
+        transition = sm.model.table[sm.index][event]  # _step, inlined on the untraced path
+        if transition is not None:
+          return sm._fire(transition, event, payload, sm.log_transitions)
+        if sm.log_transitions:
+          print(f"[{sm.owner.kl}] Ignored event {sm.model.events[event]} in state {sm.state}")
+        return False
+      finally:
+        active.remove(me)
+
+    def _step_in(self, ctx: Any, event: int, payload: Mapping) -> bool:
+      """Run a step in the owner's runtime context, as its own unit of work"""
+      outer = active_unit.uow
+      active_unit.uow = None
+      try:
+        with ctx:
+          return self.dispatch_index(event, payload)
+      finally:
+        active_unit.uow = outer
+
+    def _resolved(self) -> 'StateMachine':
+      """The owner's machine now: another one if the owner was evicted (or faulted back in) since this one was read"""
+      attrs = self.owner.__dict__
+      if attrs.get('sm', self) is self and '_pager' not in attrs:
+        return self
+      return self.owner.sm
+
+    def _traced_step(self, event: int, payload: Mapping) -> bool:
+      """Run a step inside a dispatch span"""
+      span = Tracer.begin('dispatch', 'dispatch', root=True)
+      if span is None:
+        return self._step(event, payload)
+      if span:
+        span.name = f"{self.owner.kl}.{self.model.events[event]}"
+        span.args = {'id': self.owner._id, 'from': self.state}
+      handled = False
+      try:
+        handled = self._step(event, payload)
+        return handled
+      finally:
+        Tracer.end(span, {'to': self.state, 'handled': handled} if span else None)
+
+    def _step(self, event: int, payload: Mapping) -> bool:
+      transition = self.model.table[self.index][event]
+      if transition is not None:
+        return self._fire(transition, event, payload, self.log_transitions)
+      else:
+        if self.log_transitions:
+          print(f"[{self.owner.kl}] Ignored event {self.model.events[event]} in state {self.state}")
+        return False
+
+    def _fire(self, transition: Transition, event: int, payload: Mapping, log: bool) -> bool:
+        """Take a transition already looked up for the current state (guard, action, commit)"""
+        guard_fn, action_fn, next_index = transition
+        owner = self.owner
+
         # Check guard condition if exists
-        if guard_fn and not guard_fn(self.owner, payload):
-          print(f"[{self.owner.kl}:{self.owner._id}] Guard failed for {event}")
+        if guard_fn and not guard_fn(owner, owner, payload):
+          if log:
+            print(f"[{owner.kl}:{owner._id}] Guard failed for {self.model.events[event]}")
+          return False
+
+        if log:
+          next_state = self.model.states[next_index] if next_index is not None else None
+          print(f"[{owner.kl}:{owner._id}] Transition: {self.state} -> {next_state} via {self.model.events[event]}")
+
+        # Events generated by an action join the unit of the outermost dispatch
+        uow, owned = UnitOfWork.begin()
+        uow.track(self)
+        try:
+          # Record history
+          self._history.append(self.model.steps[self.index][event] or (self.index, event, next_index))
+
+          # Apply state change before action so self-generated events see the target state
+          if next_index is not None:
+            self.index = next_index
+
+          # Execute action with payload
+          if action_fn:
+            span = Tracer.begin('action', 'action') if Tracer.enabled else None
+            if span is None:
+              action_fn(owner, owner, payload)
+            else:
+              span.name = getattr(action_fn, '__name__', 'action')
+              try:
+                action_fn(owner, owner, payload)
+              finally:
+                Tracer.end(span)
+        except Exception as e:
+          if not owned:
+            raise
+          uow.rollback()
+          print(f"[{owner.kl}:{owner._id}] Action error: {e} (step rolled back)")
           return False
-            
-        print(f"[{self.owner.kl}:{self.owner._id}] Transition: {self.state} -> {next_state} via {event}")
-            
-        # Record history
-        self._history.append((self.state, event, next_state))
-            
-        # Apply state change before action so self-generated events see the target state
-        prior_state = self.state
-        if next_state:
-          self.state = next_state
-          self.owner.set_attr('currentState', next_state)
-
-        # Execute action with payload
-        if action_fn:
-          try:
-            action_fn(self.owner, payload)
-          except Exception as e:
-            print(f"[{self.owner.kl}:{self.owner._id}] Action error: {e}")
-                    
+        else:
+          if owned:
+            try:
+              uow.commit()
+            except Exception as e:
+              print(f"[{owner.kl}:{owner._id}] Commit error: {e} (step rolled back)")
+              return False
+        finally:
+          UnitOfWork.end(owned)
+
+        # Change records of the step go out once it is committed and the lock released
+        if owned and ChangeFeed._subscribers:
+          ChangeFeed.deliver()
+
         # If action changed state, keep it; otherwise state already set to next_state
         return True
-      else:
-        print(f"[{self.owner.kl}] Ignored event {event} in state {self.state}")
-        return False
-    
+
     def get_current_state(self) -> str:
         """Get current state name"""
-        return self.state
-    
+        return self.model.states[self.index]
+
     def get_history(self) -> list:
-        """Get transition history"""
-        return self._history.copy()
+        """Get transition history as (from state, event, to state) names"""
+        states, events = self.model.states, self.model.events
+        return [(states[s], events[e], states[n] if n is not None else None) for s, e, n in self._history]
@@ -1,32 +1,70 @@
 # runtime/storage.py
 from __future__ import annotations
 from collections import defaultdict
-from typing import Any, Dict, List, Optional
+from typing import Any, Dict, Iterator, List, Optional
+from runtime.context import current_context
+from runtime.unit_of_work import active_unit
+from runtime.columnar import ColumnStore, Predicate
+from runtime.catalog import Catalog, CatalogExtent
+from runtime.changefeed import ChangeFeed
 
 class ObjectStore:
-    """Central storage for all model instances"""
-    _store: Dict[str, Dict[str, Any]] = defaultdict(dict)  # { classname: {id: instance} }
+    """Storage for model instances of the current runtime context"""
 
     @classmethod
     def register(cls, class_name: str):
         """Register a class type in the store"""
-        cls._store.setdefault(class_name, {})
+        current_context().store.setdefault(class_name, {})
 
     @classmethod
     def create(cls, class_name: str, id: str, instance: Any):
         """Store an instance"""
-        cls._store[class_name][id] = instance
+        uow = active_unit.uow
+        if uow is not None:
+            uow.stage_create(class_name, id, instance)
+        else:
+            ctx = instance._ctx
+            if ctx.snapshots:
+                ctx.preserve_extent(class_name)
+            ctx.store[class_name][id] = instance
+            if instance._watch_lifecycle:
+                ChangeFeed.instance_created(class_name, instance)
+
+    @classmethod
+    def _extent(cls, class_name: str) -> Dict[str, Any]:
+        """Instances of a class as seen by the current thread"""
+        instances = current_context().store[class_name]
+        uow = active_unit.uow
+        if uow is not None and (class_name in uow.created or class_name in uow.deleted):
+            return uow.resolve_extent(class_name, instances)
+        return instances
 
     @classmethod
     def find(cls, class_name: str, id: str) -> Optional[Any]:
-        """Find instance by class name and id"""
-        return cls._store[class_name].get(id)
+        """Find instance by class name and id (faulting it back in if it was paged out)"""
+        inst = cls._extent(class_name).get(id)
+        if inst is not None and inst._pager is not None:
+            inst._pager.fault_in(inst)
+        return inst
+
+    @classmethod
+    def find_by(cls, class_name: str, attr: str, value: Any) -> Optional[Any]:
+        """Any instance whose attribute equals value (an index probe for catalog-backed classes)"""
+        extent = cls._extent(class_name)
+        if type(extent) is CatalogExtent:
+            return extent.catalog.find_by(attr, value)
+        return next((inst for inst in extent.values() if inst.get_attr(attr) == value), None)
 
     @classmethod
     def select_all(cls, class_name: str) -> List[Any]:
         """Select all instances of a class"""
-        return list(cls._store[class_name].values())
-    
+        return list(cls._extent(class_name).values())
+
+    @classmethod
+    def iter_all(cls, class_name: str) -> Iterator[Any]:
+        """Iterate the instances of a class without copying them (do not create or delete while iterating)"""
+        return iter(cls._extent(class_name).values())
+
     @classmethod
     def select_any(cls, class_name: str) -> Optional[Any]:
         """Select any one instance of a class"""
@@ -36,18 +74,159 @@ class ObjectStore:
     @classmethod
     def delete(cls, class_name: str, id: str):
         """Delete an instance"""
-        if id in cls._store[class_name]:
-            del cls._store[class_name][id]
-    
+        uow = active_unit.uow
+        if uow is not None:
+            instance = cls._extent(class_name).get(id)
+            if instance is not None:
+                uow.stage_delete(class_name, id, instance)
+        else:
+            ctx = current_context()
+            instance = ctx.store[class_name].get(id)
+            if instance is None:
+                return
+            if ctx.snapshots:
+                ctx.preserve_extent(class_name)
+                ctx.preserve_attrs(instance)  # releasing its column row moves its values
+            del ctx.store[class_name][id]
+            if instance._watch_lifecycle:
+                ChangeFeed.instance_deleted(class_name, instance)
+            if class_name in ctx.columns:
+                ctx.columns[class_name].release(instance)
+
+    @classmethod
+    def _apply_create(cls, class_name: str, instances: Dict[str, Any]):
+        """Apply a batch of buffered creations"""
+        ctx = current_context()
+        if ctx.snapshots:
+            ctx.preserve_extent(class_name)
+        ctx.store[class_name].update(instances)
+        for instance in instances.values():
+            if instance._watch_lifecycle:
+                ChangeFeed.instance_created(class_name, instance)
+
+    @classmethod
+    def _apply_delete(cls, class_name: str, instances: Dict[str, Any]):
+        """Apply a batch of buffered deletions"""
+        ctx = current_context()
+        extent = ctx.store[class_name]
+        columns = ctx.columns.get(class_name)
+        if ctx.snapshots:
+            ctx.preserve_extent(class_name)
+            for instance in instances.values():
+                ctx.preserve_attrs(instance)
+        for id in instances:
+            instance = extent.pop(id, None)
+            if instance is None:
+                continue
+            if instance._watch_lifecycle:
+                ChangeFeed.instance_deleted(class_name, instance)
+            if columns is not None:
+                columns.release(instance)
+
     @classmethod
     def clear(cls, class_name: Optional[str] = None):
         """Clear all instances or instances of specific class"""
+        ctx = current_context()
+        if ctx.snapshots:
+            ctx.preserve_all()
         if class_name:
-            cls._store[class_name] = {}
+            ctx.store[class_name] = {}
+            if class_name in ctx.columns:
+                ctx.columns[class_name].reset()
         else:
-            cls._store = defaultdict(dict)
-    
+            ctx.store = defaultdict(dict)
+            for columns in ctx.columns.values():
+                columns.reset()
+
     @classmethod
     def count(cls, class_name: str) -> int:
         """Count instances of a class"""
-        return len(cls._store[class_name])
+        return len(cls._extent(class_name))
+
+    # --- Memory-mapped catalogs (read-mostly classes shared between processes) ---
+
+    @classmethod
+    def map_catalog(cls, model_class: type, path: str, shared_writes: bool = False) -> Catalog:
+        """Serve a class's instances from a catalog file published with write_catalog.
+
+        The class must have no instances in the current context yet; its
+        extent becomes the mapped catalog until the context is cleared.
+        """
+        class_name = model_class.__name__
+        ctx = current_context()
+        with ctx.lock:
+            if ctx.store.get(class_name):
+                raise ValueError(f"{class_name} already has instances in {ctx.name}; clear them before mapping a catalog")
+            catalog = Catalog(path, model_class, ctx, shared_writes)
+            if ctx.snapshots:
+                ctx.preserve_extent(class_name)
+            ctx.store[class_name] = CatalogExtent(catalog)
+        print(f"[CATALOG] {class_name} mapped from {path} ({len(catalog)} rows, generation {catalog.generation:x})")
+        return catalog
+
+    @classmethod
+    def refresh_catalogs(cls) -> List[str]:
+        """Pick up newly published catalog files; returns the classes that changed"""
+        return [class_name for class_name, extent in list(current_context().store.items())
+                if type(extent) is CatalogExtent and extent.catalog.refresh()]
+
+    # --- Columnar numeric attributes (optional, requires numpy) ---
+
+    @classmethod
+    def enable_columns(cls, model_class: type, columns: Optional[Dict[str, str]] = None, capacity: int = 1024) -> ColumnStore:
+        """Keep a class's numeric attributes in NumPy columns.
+
+        columns maps attribute name to dtype and defaults to the class's
+        generated _NUMERIC_ATTRS. Existing instances are moved into rows.
+        """
+        class_name = model_class.__name__
+        columns = columns if columns is not None else getattr(model_class, '_NUMERIC_ATTRS', {})
+        if not columns:
+            raise ValueError(f"{class_name} has no numeric attributes to store as columns")
+        store = ColumnStore(model_class, columns, capacity)
+        ctx = current_context()
+        with ctx.lock:
+            ctx.columns[class_name] = store
+            for instance in ctx.store[class_name].values():
+                if ctx.snapshots:
+                    ctx.preserve_attrs(instance)
+                instance._columns = store
+                store.allocate(instance)
+                for name in columns:
+                    if name in instance._attrs:
+                        store.set(instance, name, instance._attrs.pop(name))
+        return store
+
+    @classmethod
+    def column_filter(cls, class_name: str, attr: str, op: str, value: Any) -> List[Any]:
+        """Vectorized select: instances where `attr op value`"""
+        return current_context().columns[class_name].filter((attr, op, value))
+
+    @classmethod
+    def column_aggregate(cls, class_name: str, attr: str, fn: str = 'sum', where: Optional[Predicate] = None) -> Any:
+        """Vectorized sum | mean | min | max | count of a numeric attribute"""
+        return current_context().columns[class_name].aggregate(attr, fn, where)
+
+    @classmethod
+    def column_update(cls, class_name: str, attr: str, value: Any, where: Optional[Predicate] = None, mode: str = 'set') -> int:
+        """Vectorized bulk update (mode 'set' or 'add'); applied immediately, outside any unit of work"""
+        ctx = current_context()
+        store = ctx.columns[class_name]
+        with ctx.lock:
+            if ctx.snapshots:
+                for instance in store.filter(where):
+                    ctx.preserve_attrs(instance)
+            if attr not in store.model_class._watched:
+                return store.update(attr, value, where, mode)
+            touched = store.filter(where)
+            before = [instance._stored_attr(attr) for instance in touched]
+            count = store.update(attr, value, where, mode)
+            held = ChangeFeed.hold()
+            try:
+                for instance, old in zip(touched, before):
+                    ChangeFeed.attr_changed(instance, attr, old, instance._stored_attr(attr))
+            finally:
+                if held:
+                    ChangeFeed.release()
+        ChangeFeed.deliver()
+        return count
@@ -0,0 +1,251 @@
+# runtime/tracing.py
+from __future__ import annotations
+import functools
+import itertools
+import json
+import os
+import random
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+class Span:
+    """One timed operation inside a sampled trace"""
+    __slots__ = ('name', 'cat', 'trace_id', 'span_id', 'parent_id', 'tid', 'start', 'end', 'args')
+
+    def __init__(self, name: str, cat: str, trace_id: int, span_id: int, parent_id: Optional[int], args: Any):
+        self.name = name
+        self.cat = cat
+        self.trace_id = trace_id
+        self.span_id = span_id
+        self.parent_id = parent_id
+        self.tid = threading.get_ident()
+        self.args = args
+        self.start = time.perf_counter_ns()
+        self.end: Optional[int] = None
+
+    def __repr__(self):
+        return f"<Span#{self.span_id} {self.cat}:{self.name} trace={self.trace_id}>"
+
+class _Unsampled:
+    """Stack marker for a root dispatch that lost the sampling draw"""
+    __slots__ = ()
+
+    def __bool__(self):
+        return False
+
+_UNSAMPLED: Any = _Unsampled()
+
+class _ThreadTrace(threading.local):
+    """Per-thread stack of open spans"""
+    def __init__(self):
+        self.stack: List[Span] = []
+
+# Flow hand-off between threads: (parent span, flow id)
+Handoff = Tuple[Span, int]
+
+class Tracer:
+    """Sampled causal tracing of dispatches, actions, relationships and bridges.
+
+    The sampling decision is taken once per root dispatch (one with no
+    traced caller); everything it causes on the same thread, and on timer
+    threads it hands off to, joins the same trace. Relationship, bridge and
+    action spans are only recorded inside a sampled trace. Spans are kept in a bounded
+    buffer and written out as Chrome trace-event JSON.
+    """
+    enabled: bool = False  # checked on the hot paths before anything else
+    sample_rate: float = 0.0
+    max_spans: int = 100000
+    dropped: int = 0  # records discarded once the buffer was full
+    _records: List[Any] = []  # ended Spans, plus (phase, name, cat, ts, tid, id/args) tuples for instants and flows
+    _ids = itertools.count(1)
+    _rng = random.Random()
+    _epoch: int = time.perf_counter_ns()
+    _local = _ThreadTrace()
+    _lock = threading.Lock()
+
+    @classmethod
+    def configure(cls, sample_rate: float = 1.0, max_spans: int = 100000, seed: Optional[int] = None):
+        """Start tracing a fraction of root dispatches (0 disables tracing)"""
+        if not 0.0 <= sample_rate <= 1.0:
+            raise ValueError("sample_rate must be between 0 and 1")
+        cls.sample_rate = sample_rate
+        cls.max_spans = max_spans
+        if seed is not None:
+            cls._rng = random.Random(seed)
+        cls.enabled = sample_rate > 0.0
+
+    @classmethod
+    def disable(cls):
+        cls.enabled = False
+
+    @classmethod
+    def clear(cls):
+        """Drop recorded spans"""
+        with cls._lock:
+            cls._records = []
+            cls.dropped = 0
+        cls._epoch = time.perf_counter_ns()
+
+    @classmethod
+    def begin(cls, name: str, cat: str, args: Any = None, root: bool = False) -> Optional[Span]:
+        """Open a span under the current one; root=True may also start a new trace.
+
+        Returns None when there is no sampled trace to join (nothing to
+        close then). A root that loses the sampling draw returns a falsy
+        marker that must still be passed to end(), so everything it causes
+        is skipped with a single lookup.
+        """
+        stack = cls._local.stack
+        if stack:
+            parent = stack[-1]
+            if parent is _UNSAMPLED:
+                return None
+            span = Span(name, cat, parent.trace_id, next(cls._ids), parent.span_id, args)
+        elif not root:
+            return None
+        elif cls._rng.random() < cls.sample_rate:
+            span_id = next(cls._ids)
+            span = Span(name, cat, span_id, span_id, None, args)
+        else:
+            stack.append(_UNSAMPLED)
+            return _UNSAMPLED
+        stack.append(span)
+        return span
+
+    @classmethod
+    def end(cls, span: Optional[Span], args: Optional[Dict[str, Any]] = None):
+        """Close the span opened by the matching begin()"""
+        if span is None:
+            return
+        cls._local.stack.pop()
+        if not span:
+            return
+        span.end = time.perf_counter_ns()
+        if args:
+            span.args = dict(span.args or {}, **args)
+        cls._record(span)
+
+    @classmethod
+    def current(cls) -> Optional[Span]:
+        """Innermost open span of a sampled trace on this thread"""
+        stack = cls._local.stack
+        return stack[-1] if stack and stack[-1] is not _UNSAMPLED else None
+
+    @classmethod
+    def instant(cls, name: str, cat: str, args: Any = None):
+        """Mark a point in time inside the current sampled trace"""
+        span = cls.current()
+        if span is not None:
+            cls._record(('i', name, cat, time.perf_counter_ns(), threading.get_ident(), args))
+
+    @classmethod
+    def handoff(cls) -> Optional[Handoff]:
+        """Capture the current span so work started on another thread joins its trace"""
+        span = cls.current()
+        if span is None:
+            return None
+        flow_id = next(cls._ids)
+        cls._record(('s', span.name, 'flow', time.perf_counter_ns(), threading.get_ident(), flow_id))
+        return span, flow_id
+
+    @classmethod
+    def resume(cls, handoff: Optional[Handoff]) -> '_Resumed':
+        """Context manager making a handed-off span the parent of spans opened inside it"""
+        return _Resumed(cls, handoff)
+
+    @classmethod
+    def _record(cls, record: Any):
+        with cls._lock:
+            if len(cls._records) >= cls.max_spans:
+                cls.dropped += 1
+                return
+            cls._records.append(record)
+
+    @classmethod
+    def spans(cls) -> List[Span]:
+        with cls._lock:
+            return [r for r in cls._records if isinstance(r, Span)]
+
+    @classmethod
+    def export(cls, path: str) -> int:
+        """Write recorded spans as a Chrome trace-event file; returns the number of events"""
+        with cls._lock:
+            records = list(cls._records)
+        pid = os.getpid()
+        threads: Dict[int, int] = {}
+        events: List[Dict[str, Any]] = []
+
+        def ts(ns: int) -> float:
+            return (ns - cls._epoch) / 1000.0
+
+        def tid(ident: int) -> int:
+            return threads.setdefault(ident, len(threads) + 1)
+
+        for r in records:
+            if isinstance(r, Span):
+                args = {'trace_id': r.trace_id, 'span_id': r.span_id, 'parent_id': r.parent_id}
+                args.update(_json_args(r.args))
+                events.append({'name': r.name, 'cat': r.cat, 'ph': 'X', 'ts': ts(r.start), 'dur': (r.end - r.start) / 1000.0,
+                               'pid': pid, 'tid': tid(r.tid), 'args': args})
+            else:
+                phase, name, cat, at, ident, extra = r
+                event = {'name': name, 'cat': cat, 'ph': phase, 'ts': ts(at), 'pid': pid, 'tid': tid(ident)}
+                if phase == 'i':
+                    event['s'] = 't'
+                    event['args'] = _json_args(extra)
+                else:
+                    event['id'] = extra
+                    if phase == 'f':
+                        event['bp'] = 'e'
+                events.append(event)
+        for ident, n in threads.items():
+            events.append({'name': 'thread_name', 'ph': 'M', 'pid': pid, 'tid': n, 'args': {'name': f'thread-{ident}'}})
+        with open(path, 'w') as f:
+            json.dump({'traceEvents': events, 'displayTimeUnit': 'ms', 'otherData': {'dropped': cls.dropped}}, f)
+        print(f"[TRACE] Wrote {len(events)} events to {path}")
+        return len(events)
+
+class _Resumed:
+    def __init__(self, tracer: type, handoff: Optional[Handoff]):
+        self.tracer = tracer
+        self.handoff = handoff
+
+    def __enter__(self):
+        if self.handoff is not None:
+            span, flow_id = self.handoff
+            self.tracer._local.stack.append(span)
+            self.tracer._record(('f', span.name, 'flow', time.perf_counter_ns(), threading.get_ident(), flow_id))
+
+    def __exit__(self, *exc):
+        if self.handoff is not None:
+            self.tracer._local.stack.pop()
+
+def traced(cat: str, name: Optional[str] = None) -> Callable:
+    """Decorator: trace calls of a function as spans (arguments are kept for the export)"""
+    def wrap(fn: Callable) -> Callable:
+        label = name or fn.__name__
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            if not Tracer.enabled:
+                return fn(*args, **kwargs)
+            span = Tracer.begin(label, cat, args)
+            if span is None:
+                return fn(*args, **kwargs)
+            if args and isinstance(args[0], str):
+                span.name = f"{label} {args[0]}"  # e.g. the relationship id
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                Tracer.end(span)
+        return wrapper
+    return wrap
+
+def _json_args(args: Any) -> Dict[str, Any]:
+    """Span arguments as JSON-friendly values (instances by their repr)"""
+    if args is None:
+        return {}
+    if isinstance(args, dict):
+        return {str(k): v if isinstance(v, (str, int, float, bool, type(None))) else repr(v) for k, v in args.items()}
+    return {'args': [a if isinstance(a, (str, int, float, bool, type(None))) else repr(a) for a in args]}
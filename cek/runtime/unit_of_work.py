@@ -0,0 +1,319 @@
+# runtime/unit_of_work.py
+from __future__ import annotations
+import threading
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from runtime.context import current_context
+
+class _ActiveUnit(threading.local):
+    """Per-thread pointer to the unit of work of the running dispatch"""
+    uow: Optional['UnitOfWork'] = None
+    spare: Optional['UnitOfWork'] = None  # emptied unit kept for reuse by the next step
+
+active_unit = _ActiveUnit()
+
+_KEEP = object()  # returned by an atomic update that leaves the value as it is
+
+# Atomic attribute updates lock one stripe, chosen by instance and attribute name,
+# so updates of different counters rarely wait on each other
+_STRIPES = tuple(threading.Lock() for _ in range(64))
+
+def _stripe_index(inst: Any, name: str) -> int:
+    return ((id(inst) >> 4) ^ hash(name)) & 63
+
+def _stripe(inst: Any, name: str) -> threading.Lock:
+    return _STRIPES[_stripe_index(inst, name)]
+
+def current_unit() -> Optional['UnitOfWork']:
+    """Get the unit of work open on this thread, if any"""
+    return active_unit.uow
+
+class UnitOfWork:
+    """Buffers the changes of one run-to-completion step"""
+
+    def __init__(self):
+        self.attrs: Dict[Any, Dict[str, Any]] = {}  # { instance: {name: value} }
+        self.links: Dict[str, List[Tuple[bool, Any, Any]]] = {}  # { rel_id: [(linked, inst1, inst2)] }
+        self.created: Dict[str, Dict[str, Any]] = {}  # { classname: {id: instance} }
+        self.deleted: Dict[str, Dict[str, Any]] = {}  # { classname: {id: instance} }
+        self.machines: Dict[Any, Tuple[int, int]] = {}  # { sm: (state index, history length) }
+        self.atomics: Dict[Tuple[Any, str], List[Any]] = {}  # { (instance, name): [value the step sees, [(update, applied)]] }
+        self.dropped: Dict[Any, None] = {}  # instances created and deleted within the step
+
+    @staticmethod
+    def begin() -> Tuple['UnitOfWork', bool]:
+        """Open a unit on this thread or join the one already open"""
+        uow = active_unit.uow
+        if uow is not None:
+            return uow, False
+        uow = active_unit.spare or UnitOfWork()
+        active_unit.spare = None
+        active_unit.uow = uow
+        return uow, True
+
+    @staticmethod
+    def end(owned: bool):
+        """Close the unit if this caller opened it (kept for reuse only if it was left empty)"""
+        if owned:
+            uow = active_unit.uow
+            active_unit.uow = None
+            if uow is not None and uow._is_empty():
+                active_unit.spare = uow
+
+    def _is_empty(self) -> bool:
+        return not (self.attrs or self.links or self.created or self.deleted or self.machines or self.atomics or self.dropped)
+
+    def track(self, sm: Any):
+        """Remember a state machine's position so rollback can restore it"""
+        if sm not in self.machines:
+            self.machines[sm] = (sm.index, len(sm._history))
+
+    def stage_attr(self, inst: Any, name: str, value: Any):
+        """Buffer an attribute write"""
+        if self.atomics:
+            self.atomics.pop((inst, name), None)  # a plain write replaces the step's atomic updates
+        pending = self.attrs.get(inst)
+        if pending is None:
+            self.attrs[inst] = {name: value}
+        else:
+            pending[name] = value
+
+    def stage_atomic(self, inst: Any, name: str, update: Callable[[Any], Any]) -> Tuple[Any, Any]:
+        """Buffer an atomic update, run on the value this step sees; returns (old, new or _KEEP)"""
+        entry = self.atomics.get((inst, name))
+        if entry is None:
+            entry = self.atomics[(inst, name)] = [inst._stored_attr(name), []]
+        old = entry[0]
+        new = update(old)
+        entry[1].append((update, new is not _KEEP))
+        if new is not _KEEP:
+            entry[0] = new
+        return old, new
+
+    def stage_link(self, rel_id: str, inst1: Any, inst2: Any, linked: bool):
+        """Buffer a relate (linked=True) or unrelate (linked=False)"""
+        ops = self.links.get(rel_id)
+        if ops is None:
+            self.links[rel_id] = [(linked, inst1, inst2)]
+        else:
+            ops.append((linked, inst1, inst2))
+
+    def stage_create(self, class_name: str, id: str, instance: Any):
+        """Buffer an instance creation"""
+        deleted = self.deleted.get(class_name)
+        if deleted:
+            deleted.pop(id, None)
+        if self.dropped:
+            self.dropped.pop(instance, None)
+        created = self.created.get(class_name)
+        if created is None:
+            self.created[class_name] = {id: instance}
+        else:
+            created[id] = instance
+
+    def stage_delete(self, class_name: str, id: str, instance: Any):
+        """Buffer an instance deletion"""
+        created = self.created.get(class_name)
+        if created and created.pop(id, None) is not None:
+            self.dropped[instance] = None  # never stored: nothing staged for it is applied
+        else:
+            self.deleted.setdefault(class_name, {})[id] = instance
+
+    def resolve_extent(self, class_name: str, instances: Dict[str, Any]) -> Dict[str, Any]:
+        """Overlay pending creates and deletes on a committed extent"""
+        merged = dict(instances)
+        merged.update(self.created.get(class_name, {}))
+        for id in self.deleted.get(class_name, {}):
+            merged.pop(id, None)
+        return merged
+
+    def resolve_related(self, rel_id: str, source_instance: Any, results: List[Any]) -> List[Any]:
+        """Overlay pending relates and unrelates on committed navigation results"""
+        for linked, inst1, inst2 in self.links[rel_id]:
+            if inst1._id == source_instance._id:
+                other = inst2
+            elif inst2._id == source_instance._id:
+                other = inst1
+            else:
+                continue
+            if linked and other not in results:
+                results.append(other)
+            elif not linked and other in results:
+                results.remove(other)
+        return results
+
+    def commit(self):
+        """Apply all buffered changes in one batch.
+
+        Either the whole step is applied or none of it: if applying raises,
+        what was already applied is undone, the tracked state machines are
+        restored and the error is re-raised for the dispatcher to report.
+        Atomic updates are re-run here on the latest committed values, under
+        their stripe locks; one that no longer has the outcome the step saw
+        (a decrement now refused, say) fails the commit the same way.
+        Undo records are only kept when something can fail partway (atomic
+        updates, column stores); a step that only changed state takes no lock.
+        """
+        if not (self.attrs or self.links or self.created or self.deleted or self.atomics or self.dropped):
+            # Only state changes: mirroring them into state attributes cannot fail halfway,
+            # so there is nothing to lock, hold back or undo
+            try:
+                if self.machines:
+                    self._sync_states(None)
+            except BaseException:
+                self._restore()
+                raise
+            finally:
+                self.machines.clear()
+            return
+        if self.dropped:
+            self._leave_out_dropped()
+        held = ChangeFeed.watching and ChangeFeed.hold()  # records reach the feed only if the whole step applies
+        published = False
+        try:
+            ctx = current_context()
+            with ctx.lock:
+                if self.atomics or ctx.columns:
+                    self._apply_or_undo()
+                else:
+                    self._apply(None)  # plain dict writes: nothing can fail partway, so nothing to undo
+                ctx.version += 1
+            published = True
+        except BaseException:
+            self._restore()
+            raise
+        finally:
+            if held:
+                ChangeFeed.release(published)
+            self._reset()
+
+    def _apply_or_undo(self):
+        """Apply under the stripe locks of the atomic updates, taking back what was applied if anything raises"""
+        stripes = [_STRIPES[i] for i in sorted({_stripe_index(inst, name) for inst, name in self.atomics})]
+        for stripe in stripes:
+            stripe.acquire()
+        undo: List[Tuple[Any, ...]] = []
+        try:
+            self._apply(undo)
+        except BaseException:
+            self._undo(undo)
+            raise
+        finally:
+            for stripe in reversed(stripes):
+                stripe.release()
+
+    def _leave_out_dropped(self):
+        """Discard what was staged for instances created and deleted within the step (before any column row is allocated)"""
+        dropped = self.dropped
+        for inst in dropped:
+            self.attrs.pop(inst, None)
+            sm = inst.__dict__.get('sm')
+            if sm is not None:
+                self.machines.pop(sm, None)
+        if self.atomics:
+            for key in [key for key in self.atomics if key[0] in dropped]:
+                del self.atomics[key]
+        for rel_id, ops in self.links.items():
+            self.links[rel_id] = [op for op in ops if op[1] not in dropped and op[2] not in dropped]
+
+    def _apply(self, undo: Optional[List[Tuple[Any, ...]]]):
+        """Apply the buffered changes, recording in undo (unless None) how to take each one back"""
+        if self.atomics:
+            self._apply_atomics(undo)
+        # Attributes first so created instances are stored with their final values
+        for inst, changes in self.attrs.items():
+            if undo is not None:
+                undo.append(('attrs', inst, {name: inst._stored_attr(name) for name in changes}))
+            inst._apply_attrs(changes)
+        if self.machines:
+            self._sync_states(undo)
+        for class_name, instances in self.created.items():
+            if undo is not None:
+                undo.append(('created', class_name, instances))
+            _storage.ObjectStore._apply_create(class_name, instances)
+        for rel_id, ops in self.links.items():
+            for linked, inst1, inst2 in ops:
+                if linked:
+                    if _relationship._link(rel_id, inst1, inst2) and undo is not None:
+                        undo.append(('linked', rel_id, inst1, inst2))
+                elif _relationship._unlink(rel_id, inst1, inst2) and undo is not None:
+                    undo.append(('unlinked', rel_id, inst1, inst2))
+        for class_name, instances in self.deleted.items():
+            if undo is not None:
+                present = current_context().store[class_name]
+                undo.append(('deleted', class_name, {id: inst for id, inst in instances.items() if present.get(id) is inst}))
+            _storage.ObjectStore._apply_delete(class_name, instances)
+
+    @staticmethod
+    def _undo(undo: List[Tuple[Any, ...]]):
+        """Take back partly applied changes, newest first"""
+        for entry in reversed(undo):
+            kind = entry[0]
+            if kind == 'attrs':
+                entry[1]._apply_attrs(entry[2])
+            elif kind == 'created':
+                _storage.ObjectStore._apply_delete(entry[1], entry[2])
+            elif kind == 'linked':
+                _relationship._unlink(*entry[1:])
+            elif kind == 'unlinked':
+                _relationship._link(*entry[1:])
+            elif kind == 'deleted':
+                _storage.ObjectStore._apply_create(entry[1], entry[2])
+
+    def _apply_atomics(self, undo: List[Tuple[Any, ...]]):
+        """Re-run the buffered atomic updates on the committed values and apply them (stripes held)"""
+        changes: Dict[Any, Dict[str, Any]] = {}
+        for (inst, name), (_, updates) in self.atomics.items():
+            value = inst._stored_attr(name)
+            for update, applied in updates:
+                new = update(value)
+                if (new is not _KEEP) != applied:
+                    raise RuntimeError(f"{inst.kl}:{inst._id}.{name} changed to {value!r} under the step")
+                if applied:
+                    value = new
+            if any(applied for _, applied in updates):
+                changes.setdefault(inst, {})[name] = value
+        for inst, values in changes.items():
+            undo.append(('attrs', inst, {name: inst._stored_attr(name) for name in values}))
+            inst._apply_attrs(values)
+
+    def _sync_states(self, undo: Optional[List[Tuple[Any, ...]]]):
+        """Mirror each machine's final state into its state attribute once per step"""
+        for sm, (index, _) in self.machines.items():
+            attr = sm.model.state_attr
+            if attr and sm.index != index:
+                owner = sm.owner
+                if undo is not None:
+                    undo.append(('attrs', owner, {attr: owner._stored_attr(attr)}))
+                owner._apply_attrs({attr: sm.state})
+
+    def rollback(self):
+        """Discard buffered changes and restore tracked state machines"""
+        try:
+            self._restore()
+        finally:
+            self._reset()
+
+    def _restore(self):
+        """Put tracked state machines back where the step found them"""
+        for sm, (index, history_len) in self.machines.items():
+            sm.index = index
+            del sm._history[history_len:]
+
+    def _reset(self):
+        self.machines.clear()
+        self.attrs.clear()
+        if self.links:
+            self.links.clear()
+        if self.created:
+            self.created.clear()
+        if self.deleted:
+            self.deleted.clear()
+        if self.atomics:
+            self.atomics.clear()
+        if self.dropped:
+            self.dropped.clear()
+
+# Imported last: both modules import this one
+import runtime.storage as _storage
+import runtime.relationship as _relationship
+from runtime.changefeed import ChangeFeed
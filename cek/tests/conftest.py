@@ -0,0 +1,69 @@
+# tests/conftest.py - shared fixtures: a fresh runtime context per test and a small shop
+#
+#   cd cek && python -m pytest -q tests
+from __future__ import annotations
+import importlib
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from runtime.context import RuntimeContext
+from runtime.changefeed import ChangeFeed
+from runtime.relationship import relate
+from runtime.state_machine import StateMachine, EventPayload
+from models.Product import Product
+from models.VendingMachine import VendingMachine
+from models.UserInterface import UserInterface
+
+@pytest.fixture(autouse=True)
+def ctx(capsys):
+    """Every test runs in its own context with transition logging off and no change capture left behind"""
+    StateMachine.log_transitions = False
+    context = RuntimeContext('test')
+    with context:
+        yield context
+    context.clear()  # reload_models walks every live context, and this one may outlive the test
+    ChangeFeed.clear()
+    for model_class in (Product, VendingMachine, UserInterface):
+        ChangeFeed.unwatch(model_class)
+    EventPayload.pool(0)
+
+@pytest.fixture
+def model_package(tmp_path, monkeypatch):
+    """A throwaway models package: write(module, source) (re)writes a module and returns it imported"""
+    package = tmp_path / 'testmodels'
+    package.mkdir()
+    (package / '__init__.py').write_text('')
+    monkeypatch.syspath_prepend(str(tmp_path))
+    monkeypatch.setattr(sys, 'dont_write_bytecode', True)  # rewritten modules may keep their size and mtime
+
+    def write(module: str, source: str):
+        (package / f'{module}.py').write_text(source)
+        return importlib.import_module(f'testmodels.{module}')
+    yield write
+    for name in [name for name in sys.modules if name.split('.')[0] == 'testmodels']:
+        del sys.modules[name]
+
+def make_product(code: str = 'A1', stock: int = 5, price: float = 7000.0, id: str = None) -> Product:
+    product = Product._create_instance(id=id or f'product_{code}')
+    product.set_attr('productCode', code)
+    product.set_attr('price', price)
+    product.set_attr('stock', stock)
+    return product
+
+def make_machine(n: int = 1) -> VendingMachine:
+    vm = VendingMachine._create_instance(id=f'vendingmachine_{n}')
+    relate('R2', vm, UserInterface._create_instance(id=f'userinterface_{n}'))
+    return vm
+
+def purchase(vm: VendingMachine, code: str = 'A1') -> bool:
+    """Select and pay; True if the machine got as far as taking payment"""
+    vm.send_ProductSelected(code)
+    if vm.sm.get_current_state() != 'WaitingPayment':
+        vm.send_Reset()
+        return False
+    vm.send_PaymentSuccess()
+    return True
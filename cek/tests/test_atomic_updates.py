@@ -0,0 +1,85 @@
+# tests/test_atomic_updates.py - counters updated by concurrent steps: no lost updates
+from __future__ import annotations
+import threading
+
+import pytest
+
+from runtime.changefeed import ChangeFeed
+from runtime.relationship import select_one_related
+from runtime.unit_of_work import UnitOfWork
+from models.Product import Product
+
+from tests.conftest import make_machine, make_product, purchase
+
+def test_update_is_private_to_the_step_until_commit(ctx):
+    product = make_product(stock=5)
+    ChangeFeed.watch(Product, ['stock'], lifecycle=False)
+    sub = ChangeFeed.subscribe()
+    with ctx.snapshot() as snap:
+        uow, owned = UnitOfWork.begin()
+        try:
+            assert product.increment_attr('stock', -1) == 4
+            assert product.get_attr('stock') == 4  # the step sees its own update
+            assert product._stored_attr('stock') == 5
+            uow.rollback()
+        finally:
+            UnitOfWork.end(owned)
+        assert snap.get_attr(product, 'stock') == 5
+    assert product.get_attr('stock') == 5
+    assert sub.poll() == []
+
+def test_commit_fails_when_the_outcome_no_longer_holds(ctx):
+    product = make_product(stock=1)
+    uow, owned = UnitOfWork.begin()
+    try:
+        assert product.decrement_attr_if_positive('stock', 1) == 0
+        other = threading.Thread(target=ctx.run, args=(product.decrement_attr_if_positive, 'stock', 1))
+        other.start()  # another buyer takes the last unit first
+        other.join()
+        with pytest.raises(RuntimeError, match='stock changed to 0'):
+            uow.commit()
+    finally:
+        UnitOfWork.end(owned)
+    assert product.get_attr('stock') == 0
+
+def test_atomic_assign_adds_no_checks_of_its_own():
+    product = make_product(stock=1)
+    vm = make_machine()
+    vm.send_ProductSelected('A1')
+    product.set_attr('stock', 0)  # sold elsewhere while this customer was paying
+    vm.send_PaymentSuccess()
+    assert vm.sm.get_current_state() == 'Idle'  # the model checks stock on selection only
+    assert product.get_attr('stock') == -1
+
+def test_rolled_back_step_leaves_no_change_records():
+    make_product(stock=2)
+    vm = make_machine()
+    ChangeFeed.watch(Product, ['stock'], lifecycle=False)
+    sub = ChangeFeed.subscribe()
+    vm.send_ProductSelected('A1')
+    def broken(message: str = ''):
+        raise RuntimeError('display offline')
+    select_one_related('R2', vm).showMessage = broken  # raised after the stock update
+    vm.send_PaymentSuccess()
+    assert sub.poll() == []
+
+def test_concurrent_machines_lose_no_stock_updates(ctx):
+    product = make_product(stock=30)
+    machines = [make_machine(n) for n in range(1, 5)]
+    sales = []
+
+    def sell(vm):
+        with ctx:
+            sold = 0
+            for _ in range(20):
+                if purchase(vm) and vm.sm.get_current_state() == 'Idle':
+                    sold += 1
+            sales.append(sold)
+
+    workers = [threading.Thread(target=sell, args=(vm,)) for vm in machines]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    assert sum(sales) >= 30
+    assert product.get_attr('stock') == 30 - sum(sales)
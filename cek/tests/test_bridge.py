@@ -0,0 +1,91 @@
+# tests/test_bridge.py - bridge calls over keep-alive HTTP: a call the service may have acted on is never re-sent
+from __future__ import annotations
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from runtime.bridge import BridgeAdapter, BridgeError
+from runtime.bridge_server import StandInServer
+
+from tests.conftest import make_machine, make_product
+
+class Service(BaseHTTPRequestHandler):
+    """Answers {"result": n} for the n-th request; drops the connection instead when told to"""
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, *args):
+        pass
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get('Content-Length', 0)))
+        server = self.server
+        server.requests.append((self.command, self.path))
+        if server.drop_next:
+            server.drop_next = False
+            self.close_connection = True  # read it, then hang up without a reply
+            return
+        data = json.dumps({'result': len(server.requests)}).encode()
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+        self.close_connection = server.close_after_reply
+
+    do_PUT = do_POST
+
+@pytest.fixture
+def service():
+    server = ThreadingHTTPServer(('127.0.0.1', 0), Service)
+    server.requests = []
+    server.drop_next = False
+    server.close_after_reply = False
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    BridgeAdapter.configure(f'http://127.0.0.1:{server.server_address[1]}/svc')
+    yield server
+    BridgeAdapter.configure(None)
+    BridgeAdapter._routes.clear()
+    BridgeAdapter.reset_stats()
+    server.shutdown()
+    server.server_close()
+
+def test_post_dropped_after_sending_is_not_retried(service):
+    assert BridgeAdapter.call('PAY', 'charge', {'amount': 1}) == 1  # leaves a keep-alive connection
+    service.drop_next = True
+    with pytest.raises(BridgeError):
+        BridgeAdapter.call('PAY', 'charge', {'amount': 1})
+    assert service.requests == [('POST', '/svc/PAY/charge')] * 2  # charged once, not twice
+
+def test_idempotent_route_is_retried_on_a_fresh_connection(service):
+    BridgeAdapter.route('INV', 'reserve', 'stock/A1', method='PUT')
+    assert BridgeAdapter.call('INV', 'reserve') == 1
+    service.drop_next = True
+    assert BridgeAdapter.call('INV', 'reserve') == 3
+    assert service.requests == [('PUT', '/svc/stock/A1')] * 3
+    assert BridgeAdapter.stats()['connections_opened'] == 1  # the retry reconnects the same connection
+
+def test_connection_closed_while_idle_is_replaced_before_sending(service):
+    service.close_after_reply = True  # the server keeps nothing open between calls
+    assert BridgeAdapter.call('PAY', 'charge') == 1
+    time.sleep(0.1)  # let the server finish hanging up
+    assert BridgeAdapter.call('PAY', 'charge') == 2
+    assert service.requests == [('POST', '/svc/PAY/charge')] * 2
+    assert BridgeAdapter.stats()['connections_opened'] == 2
+
+def test_instance_created_in_the_step_is_sent_with_its_attributes():
+    make_product(price=7000.0)
+    vm = make_machine()
+    sent = []
+    with StandInServer() as standin:
+        standin.handle('PS', 'createQR', sent.append)
+        BridgeAdapter.configure(standin.url)
+        try:
+            vm.send_ProductSelected('A1')
+        finally:
+            BridgeAdapter.configure(None)
+    txn = sent[0]['t_instance']
+    assert txn['kl'] == 'TXN' and txn['attrs']['amount'] == 7000.0 and txn['attrs']['status'] == 'Pending'
@@ -0,0 +1,35 @@
+# tests/test_broadcast.py - one event sent to many instances
+from __future__ import annotations
+
+from runtime.broadcast import broadcast
+from runtime.relationship import select_one_related
+
+from tests.conftest import make_machine, make_product
+
+def test_each_instance_steps_as_its_own_unit():
+    make_product(stock=5)
+    machines = [make_machine(n) for n in range(1, 4)]
+    def broken(message: str = ''):
+        raise RuntimeError('display offline')
+    select_one_related('R2', machines[1]).showQR = broken
+    result = broadcast('ProductSelected', 'VendingMachine', payload={'p_productCode': 'A1'})
+    assert (result.targets, result.handled, result.ignored, result.failed) == (3, 2, 0, [machines[1]])
+    assert [vm.sm.get_current_state() for vm in machines] == ['WaitingPayment', 'Idle', 'WaitingPayment']
+
+def test_machine_moved_on_by_an_earlier_step_is_ignored():
+    make_product(stock=5)
+    first, second, third = [make_machine(n) for n in range(1, 4)]
+    def show_error(error_msg: str = ''):
+        second.send_ProductSelected('A1')  # takes second out of Idle before its turn
+    select_one_related('R2', first).showError = show_error
+    result = broadcast('ProductSelected', [first, second, third], payload={'p_productCode': 'ZZ'})
+    assert (result.targets, result.handled, result.ignored, result.failed) == (3, 2, 1, [])
+    assert second.sm.get_current_state() == 'WaitingPayment'
+
+def test_states_and_where_narrow_the_targets():
+    make_product(stock=5)
+    machines = [make_machine(n) for n in range(1, 5)]
+    machines[0].send_ProductSelected('A1')
+    result = broadcast('Reset', 'VendingMachine', state='Idle', where=lambda vm: vm is not machines[3])
+    assert (result.targets, result.handled, result.ignored) == (2, 0, 2)
+    assert result.by_state['Idle']['to'] is None
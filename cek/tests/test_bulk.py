@@ -0,0 +1,53 @@
+# tests/test_bulk.py - bulk-loaded instances are indistinguishable from ones created one by one
+from __future__ import annotations
+import io
+import json
+
+import pytest
+
+from runtime.bulk import _iter_json_array, bulk_load
+from runtime.relationship import select_one_related
+from runtime.storage import ObjectStore
+from models.Product import Product
+from models.UserInterface import UserInterface
+from models.VendingMachine import VendingMachine
+
+from tests.conftest import purchase
+
+def test_loaded_fleet_sells_like_a_created_one(tmp_path):
+    products = tmp_path / 'products.csv'
+    products.write_text('id,productCode,price,stock,aisle\n'
+                        'product_1,A1,7000,2,3\n'
+                        'product_2,A2,6500.5,0,3\n')
+    machines = tmp_path / 'machines.jsonl'
+    machines.write_text('\n'.join(json.dumps({'id': f'vendingmachine_{n}', 'ui': f'userinterface_{n}'})
+                                  for n in (1, 2)))
+    report = bulk_load(Product, str(products))
+    assert (report.rows, report.created, report.ignored_fields) == (2, 2, {'aisle'})
+    bulk_load(UserInterface, [{'id': 'userinterface_1'}, {'id': 'userinterface_2'}])
+    report = bulk_load(VendingMachine, str(machines), links={'R2': ('ui', 'UserInterface')}, batch_size=1)
+    assert report.batches == 2 and report.links == {'R2': 2}
+    product = ObjectStore.find('Product', 'product_2')
+    assert (product.get_attr('price'), product.get_attr('stock')) == (6500.5, 0)
+    vm = ObjectStore.find('VendingMachine', 'vendingmachine_2')
+    assert select_one_related('R2', vm) is ObjectStore.find('UserInterface', 'userinterface_2')
+    assert vm.sm.get_current_state() == 'Idle'
+    assert purchase(vm, 'A1') and purchase(vm, 'A1') and not purchase(vm, 'A1')
+    assert ObjectStore.find('Product', 'product_1').get_attr('stock') == 0
+
+def test_bad_records_are_reported_or_skipped():
+    records = [{'id': 'product_1', 'stock': '3'}, {'id': 'product_2', 'stock': 'many'},
+               {'id': 'product_1', 'stock': '1'}, {'id': 'product_3', 'stock': '2.0'}]
+    with pytest.raises(ValueError, match='row 2'):
+        bulk_load(Product, records)
+    ObjectStore.clear()
+    report = bulk_load(Product, records, on_error='skip')
+    assert report.created == 2 and report.skipped == 2
+    assert [row for row, _ in report.errors] == [2, 3]
+    assert ObjectStore.find('Product', 'product_3').get_attr('stock') == 2
+
+def test_json_array_is_streamed_across_chunk_boundaries():
+    records = [{'id': f'product_{n}', 'name': 'a, "quoted" [name]', 'stock': n} for n in range(50)]
+    assert list(_iter_json_array(io.StringIO(json.dumps(records, indent=1)), chunk_size=7)) == records
+    with pytest.raises(ValueError):
+        list(_iter_json_array(io.StringIO('[{"id": 1}'), chunk_size=4))
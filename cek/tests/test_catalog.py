@@ -0,0 +1,67 @@
+# tests/test_catalog.py - catalog-backed classes: instances built on use, also across a model reload
+from __future__ import annotations
+import os
+
+from runtime.catalog import write_catalog
+from runtime.reload import reload_models
+from runtime.storage import ObjectStore
+
+SHELF = '''
+from runtime.base import InstanceBase
+
+class Shelf(InstanceBase):
+    kl = "SHF"
+
+    @staticmethod
+    def _declared_attrs():
+        return {{'code': '', 'capacity': 0}}
+
+    def label(self):
+        return {label!r} + self.get_attr('code')
+'''
+
+def publish_shelves(Shelf, path: str, rows: int = 100):
+    write_catalog(path, Shelf, [{'id': f'shelf_{i}', 'code': f'S{i:03d}', 'capacity': i} for i in range(rows)],
+                  writable=['capacity'], indexes=['code'], keep_writable=True)
+
+def map_shelves(model_package, tmp_path, rows: int = 100):
+    Shelf = model_package('Shelf', SHELF.format(label='v1:')).Shelf
+    path = str(tmp_path / 'shelves.cat')
+    publish_shelves(Shelf, path, rows)
+    return ObjectStore.map_catalog(Shelf, path)
+
+def test_rows_are_built_only_when_used(model_package, tmp_path):
+    catalog = map_shelves(model_package, tmp_path)
+    assert ObjectStore.count('Shelf') == 100 and catalog.materialized() == 0
+    shelf = ObjectStore.find_by('Shelf', 'code', 'S042')
+    assert shelf._id == 'shelf_42' and shelf.get_attr('capacity') == 42
+    shelf.set_attr('capacity', 41)
+    assert ObjectStore.find('Shelf', 'shelf_42').get_attr('capacity') == 41
+    assert catalog.materialized() == 1
+
+def test_reload_repoints_the_catalog_without_building_every_row(model_package, tmp_path):
+    catalog = map_shelves(model_package, tmp_path)
+    built = ObjectStore.find('Shelf', 'shelf_7')
+    model_package('Shelf', SHELF.format(label='v2:'))
+    report = reload_models('testmodels')
+    assert report.migrated['Shelf'] == 1
+    assert catalog.materialized() == 1
+    assert built.label() == 'v2:S007'
+    assert catalog.model_class is type(built)
+    assert ObjectStore.find('Shelf', 'shelf_8').label() == 'v2:S008'
+
+def test_refresh_releases_the_old_mappings(model_package, tmp_path):
+    catalog = map_shelves(model_package, tmp_path)
+    shelf = ObjectStore.find('Shelf', 'shelf_3')
+    shelf.set_attr('capacity', 2)
+    old = []
+    for rows in range(101, 106):
+        old.append(catalog._map)
+        publish_shelves(catalog.model_class, catalog.path, rows)
+        assert catalog.refresh()
+    assert all(m.mm.closed and m.rw.closed for m in old)
+    assert len(catalog) == 105 and shelf.get_attr('capacity') == 2
+    if os.path.exists('/proc/self/maps'):
+        with open('/proc/self/maps') as maps:
+            mapped = {line.split()[-1] for line in maps if str(tmp_path) in line}
+        assert len(mapped) == 2  # the current catalog and its column file
@@ -0,0 +1,66 @@
+# tests/test_changefeed.py - change records reach subscribers only for committed steps
+from __future__ import annotations
+
+import pytest
+
+from runtime.changefeed import ChangeFeed
+from runtime.storage import ObjectStore
+from runtime.unit_of_work import active_unit
+from models.Product import Product
+from models.VendingMachine import VendingMachine
+
+from tests.conftest import make_machine, make_product, purchase
+
+def test_committed_step_is_captured():
+    product = make_product(stock=2)
+    vm = make_machine()
+    ChangeFeed.watch(Product, ['stock'], lifecycle=False)
+    sub = ChangeFeed.subscribe()
+    assert purchase(vm)
+    records = sub.poll()
+    assert [(r.id, r.attr, r.old, r.new) for r in records] == [(product._id, 'stock', 2, 1)]
+
+def test_failed_commit_emits_nothing():
+    make_product(stock=2)
+    vm = make_machine()
+    vm.send_ProductSelected('A1')
+    ChangeFeed.watch(VendingMachine, ['currentState'], lifecycle=False)
+    sub = ChangeFeed.subscribe()
+    original = ObjectStore._apply_delete.__func__
+    def failing_delete(cls, class_name, instances):
+        original(cls, class_name, instances)
+        raise RuntimeError('disk full')
+    ObjectStore._apply_delete = classmethod(failing_delete)
+    try:
+        vm.send_PaymentSuccess()  # currentState -> Idle is applied, then undone with the rest
+    finally:
+        ObjectStore._apply_delete = classmethod(original)
+    assert vm.get_attr('currentState') == 'WaitingPayment'
+    assert sub.poll() == []
+
+def test_callback_runs_after_commit_and_writes_in_its_own_unit():
+    product = make_product(stock=2)
+    vm = make_machine()
+    ChangeFeed.watch(VendingMachine, ['currentState'], lifecycle=False)
+    seen = []
+    def on_change(batch):
+        seen.append((active_unit.uow, batch[0].new, vm.get_attr('currentState')))
+        product.set_attr('price', product.get_attr('price') - 100)  # not part of the step that triggered it
+    ChangeFeed.subscribe(on_change, batch_size=1)
+    assert purchase(vm)
+    assert seen == [(None, 'WaitingPayment', 'WaitingPayment'), (None, 'Idle', 'Idle')]
+    assert product.get_attr('price') == 6800.0
+
+def test_callback_error_is_raised_after_every_subscriber_is_served():
+    make_product(stock=2)
+    vm = make_machine()
+    ChangeFeed.watch(VendingMachine, ['currentState'], lifecycle=False)
+    def failing(batch):
+        raise ValueError('sink unavailable')
+    ChangeFeed.subscribe(failing, batch_size=1)
+    received = []
+    ChangeFeed.subscribe(received.extend, batch_size=1)
+    with pytest.raises(ValueError, match='sink unavailable'):
+        vm.send_ProductSelected('A1')
+    assert [r.new for r in received] == ['WaitingPayment']
+    assert vm.get_attr('currentState') == 'WaitingPayment'  # the step itself was committed
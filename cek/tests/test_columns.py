@@ -0,0 +1,61 @@
+# tests/test_columns.py - numeric attributes kept in NumPy columns read, query and update like plain ones
+from __future__ import annotations
+
+import pytest
+
+pytest.importorskip('numpy')
+
+from runtime.relationship import relate
+from runtime.storage import ObjectStore
+from runtime.unit_of_work import UnitOfWork
+from models.Product import Product
+
+from tests.conftest import make_machine, make_product, purchase
+
+def test_existing_values_move_into_columns_and_queries_see_them():
+    products = [make_product(f'A{n}', stock=n, id=f'product_{n}') for n in range(5)]
+    ObjectStore.enable_columns(Product)
+    assert 'stock' not in products[3]._attrs
+    assert [p.get_attr('stock') for p in products] == [0, 1, 2, 3, 4]
+    assert ObjectStore.column_filter('Product', 'stock', '<', 2) == products[:2]
+    assert ObjectStore.column_aggregate('Product', 'stock') == 10
+    assert ObjectStore.column_aggregate('Product', 'price', 'max', where=('stock', '>', 0)) == 7000.0
+    assert ObjectStore.column_update('Product', 'stock', 10, where=('stock', '<', 2)) == 2
+    assert [p.get_attr('stock') for p in products] == [10, 10, 2, 3, 4]
+    assert ObjectStore.column_update('Product', 'stock', 1, mode='add') == 5
+    assert products[2].get_attr('stock') == 3
+
+def test_purchase_decrements_the_column():
+    product = make_product(stock=2)
+    ObjectStore.enable_columns(Product)
+    assert purchase(make_machine())
+    assert product.get_attr('stock') == 1
+    assert ObjectStore.column_aggregate('Product', 'stock') == 1
+
+def test_deleted_instance_keeps_its_values_and_frees_its_row():
+    kept = make_product('A1', stock=3, id='product_1')
+    gone = make_product('A2', stock=7, id='product_2')
+    ObjectStore.enable_columns(Product)
+    ObjectStore.delete('Product', gone._id)
+    assert gone.get_attr('stock') == 7
+    assert ObjectStore.column_aggregate('Product', 'stock', 'count') == 1
+    fresh = make_product('A3', stock=4, id='product_3')
+    assert fresh._row == 1  # reuses the freed row
+    assert ObjectStore.column_aggregate('Product', 'stock') == 7
+    assert kept.get_attr('stock') == 3 and gone.get_attr('stock') == 7
+
+def test_instance_created_and_deleted_in_one_step_gets_no_row(ctx):
+    make_product('A1', stock=3, id='product_1')
+    ObjectStore.enable_columns(Product)
+    columns = ctx.columns['Product']
+    uow, owned = UnitOfWork.begin()
+    try:
+        temp = make_product('A2', stock=7, id='product_2')
+        relate('R1', make_machine(), temp)
+        ObjectStore.delete('Product', temp._id)
+        uow.commit()
+    finally:
+        UnitOfWork.end(owned)
+    assert temp._row is None and columns.size == 1 and columns._free == []
+    assert ObjectStore.find('Product', 'product_2') is None
+    assert ctx.links.get('R1', {}) == {}
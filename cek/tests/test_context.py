@@ -0,0 +1,92 @@
+# tests/test_context.py - runtime contexts keep independent domains apart in one process
+from __future__ import annotations
+import threading
+import time
+
+from runtime.base import InstanceBase
+from runtime.context import RuntimeContext, current_context, quiesced
+from runtime.state_machine import StateMachine
+from runtime.storage import ObjectStore
+
+from tests.conftest import make_machine, make_product, purchase
+
+def test_contexts_do_not_see_each_others_instances(ctx):
+    make_product(stock=1)
+    make_machine()
+    other = RuntimeContext('other')
+    with other:
+        assert ObjectStore.count('VendingMachine') == 0
+        make_product(stock=5)
+        make_machine(1)  # same ids, different domain
+    assert other.run(ObjectStore.count, 'VendingMachine') == 1
+    assert ObjectStore.find('Product', 'product_A1').get_attr('stock') == 1
+    assert len(other.links['R2']) == len(ctx.links['R2']) == 1
+
+def test_dispatch_runs_in_the_instances_own_context(ctx):
+    other = RuntimeContext('other')
+    with other:
+        product = make_product(stock=2)
+        vm = make_machine()
+    assert purchase(vm)  # sent from the test's context
+    assert product.get_attr('stock') == 1
+    assert ObjectStore.count('Transaction') == 0 and ObjectStore.count('Product') == 0
+    assert current_context() is ctx
+
+def test_fleets_on_separate_threads_sell_independently():
+    results = {}
+
+    def tenant(n: int):
+        with RuntimeContext(f'tenant-{n}'):
+            product = make_product(stock=10)
+            vm = make_machine()
+            sold = sum(purchase(vm) for _ in range(10 + n))
+            results[n] = (sold, product.get_attr('stock'), ObjectStore.count('Product'))
+
+    threads = [threading.Thread(target=tenant, args=(n,)) for n in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert sorted((sold, stock, count) for sold, stock, count in results.values()) == [(10, 0, 1)] * 4
+
+def test_closed_gate_holds_new_steps_until_it_opens(ctx):
+    product = make_product(stock=2)
+    vm = make_machine()
+    ctx.steps.close()
+    buying = threading.Thread(target=ctx.run, args=(purchase, vm))
+    buying.start()
+    buying.join(0.1)
+    assert buying.is_alive() and product.get_attr('stock') == 2
+    ctx.steps.open()
+    buying.join(5)
+    assert product.get_attr('stock') == 1 and not ctx.steps.active
+
+def test_step_inside_a_closed_gate_is_let_through_the_next(ctx):
+    other = RuntimeContext('other')
+    with other:
+        target = InstanceBase('lamp_1', 'LMP')
+        target.sm = StateMachine(target, 'Off', {'Off': {'On': (None, None, 'On')}})
+    inside, release = threading.Event(), threading.Event()
+
+    def forward(owner, payload):
+        inside.set()
+        release.wait(5)
+        target.sm.dispatch('On')  # into a context that is closed by now
+    source = InstanceBase('switch_1', 'SW')
+    source.sm = StateMachine(source, 'Idle', {'Idle': {'Go': (None, forward, 'Idle')}})
+    stepping = threading.Thread(target=source.sm.dispatch, args=('Go',))
+    stepping.start()
+    assert inside.wait(5)
+    drained = threading.Event()
+
+    def quiesce():
+        with quiesced([ctx, other]):
+            drained.set()
+    closing = threading.Thread(target=quiesce)
+    closing.start()
+    while not (ctx.steps.closed and other.steps.closed):
+        time.sleep(0.001)
+    release.set()
+    closing.join(5)
+    stepping.join(5)
+    assert drained.is_set() and target.sm.get_current_state() == 'On'
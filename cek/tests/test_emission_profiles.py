@@ -0,0 +1,56 @@
+# tests/test_emission_profiles.py - the optimized translator output behaves exactly like the simulation output
+from __future__ import annotations
+import json
+import os
+import shutil
+import subprocess
+import sys
+
+import pytest
+
+CEK = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+ROOT = os.path.dirname(CEK)
+
+GENERATE = '''
+import fs from "fs";
+import path from "path";
+import { validateAndNormalize } from "%(root)s/compiler/parser.js";
+import { generateModelFiles } from "%(root)s/compiler/codegen.js";
+const res = validateAndNormalize(JSON.parse(fs.readFileSync("%(root)s/vending_machine.json", "utf8")));
+const files = generateModelFiles(res.model || res.normalized || res, { profile: process.argv[1] });
+for (const [name, source] of Object.entries(files)) {
+  if (!name.startsWith("models/")) continue;
+  fs.mkdirSync(path.dirname(path.join(process.argv[2], name)), { recursive: true });
+  fs.writeFileSync(path.join(process.argv[2], name), source);
+}
+'''
+
+SCENARIO = '''
+import contextlib, json, random
+import loadgen
+with contextlib.redirect_stdout(loadgen.NullWriter()):
+    vms, codes = loadgen.build_fleet(6, 8, 4)
+rng = random.Random(3)
+stats = loadgen.run_scenario(loadgen.poisson_arrivals(100.0, 400, 6, codes, 1.1, rng), vms, rng=rng)
+from runtime.storage import ObjectStore
+result = {k: v for k, v in stats.summary().items() if 'second' not in k}
+result['states'] = [vm.sm.get_history() for vm in vms]
+result['stock'] = sorted((p.get_attr('productCode'), p.get_attr('stock')) for p in ObjectStore.select_all('Product'))
+print(json.dumps(result))
+'''
+
+def run_profile(profile: str, tmp_path) -> dict:
+    out = tmp_path / profile
+    subprocess.run(['node', '--input-type=module', '-e', GENERATE % {'root': ROOT}, profile, str(out)],
+                   check=True, capture_output=True)
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join([str(out), CEK]), PYTHONDONTWRITEBYTECODE='1')
+    done = subprocess.run([sys.executable, '-c', SCENARIO], env=env, cwd=str(out), check=True,
+                          capture_output=True, text=True)
+    return json.loads(done.stdout.strip().splitlines()[-1])
+
+@pytest.mark.skipif(shutil.which('node') is None, reason='the translator runs on node')
+def test_optimized_profile_runs_the_scenario_like_the_simulation_profile(tmp_path):
+    simulation = run_profile('simulation', tmp_path)
+    optimized = run_profile('optimized', tmp_path)
+    assert simulation['customers'] == 400 and simulation['sales'] > 0
+    assert optimized == simulation
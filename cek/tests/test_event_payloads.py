@@ -0,0 +1,50 @@
+# tests/test_event_payloads.py - slotted event layouts read like dict payloads and can be pooled safely
+from __future__ import annotations
+
+import pytest
+
+from runtime.state_machine import EventPayload, NO_PAYLOAD
+from models.VendingMachine import VendingMachine
+
+from tests.conftest import make_machine, make_product, purchase
+
+def test_layout_reads_like_a_mapping():
+    payload = VendingMachine.P_ProductSelected('A1')
+    assert not hasattr(payload, '__dict__')
+    assert payload['p_productCode'] == payload.get('p_productCode') == 'A1'
+    assert 'p_productCode' in payload and 'p_amount' not in payload
+    assert payload.get('p_amount', 0) == 0
+    with pytest.raises(KeyError):
+        payload['p_amount']
+    assert dict(payload) == {'p_productCode': 'A1'} and payload == {'p_productCode': 'A1'}
+    assert len(NO_PAYLOAD) == 0 and NO_PAYLOAD == {}
+
+def test_pooled_payloads_are_reused_without_changing_outcomes():
+    product = make_product(stock=3)
+    vm = make_machine()
+    VendingMachine.P_ProductSelected.pool(2)
+    first = VendingMachine.P_ProductSelected.acquire('A1')
+    first.release()
+    assert purchase(vm)
+    assert VendingMachine.P_ProductSelected.acquire('B2') is first  # released again after the dispatch
+    assert first.p_productCode == 'B2'
+    assert vm.dispatch_event('ProductSelected', p_productCode='A1')  # dict payloads still work
+    vm.send_PaymentSuccess()
+    assert product.get_attr('stock') == 1
+    EventPayload.pool(0)
+    assert VendingMachine.P_ProductSelected.acquire('A1') is not VendingMachine.P_ProductSelected.acquire('A1')
+
+def test_pool_keeps_at_most_its_size():
+    layout = VendingMachine.P_ProductSelected
+    layout.pool(1)
+    a, b = layout.acquire('A1'), layout.acquire('A2')
+    a.release()
+    b.release()
+    assert layout.acquire('A3') is a and layout.acquire('A4') is not b
+
+def test_machines_share_history_entries():
+    make_product(stock=5)
+    first, second = make_machine(1), make_machine(2)
+    assert purchase(first) and purchase(second)
+    assert first.sm.get_history() == second.sm.get_history()
+    assert all(a is b for a, b in zip(first.sm._history, second.sm._history))
@@ -0,0 +1,71 @@
+# tests/test_event_server.py - JSON-lines event server and its pipelining client
+from __future__ import annotations
+import asyncio
+import threading
+import time
+
+import pytest
+
+from runtime.event_server import EventClient, EventServer
+from runtime.relationship import select_one_related
+
+from tests.conftest import make_machine, make_product
+
+def test_requests_are_answered_in_order(ctx):
+    make_product(stock=1)
+    make_machine()
+    async def session(port):
+        async with EventClient(port=port) as client:
+            futures = [client.submit('VM', 'vendingmachine_1', 'ProductSelected', p_productCode='A1'),
+                       client.submit('VM', 'vendingmachine_1', 'PaymentSuccess'),
+                       client.submit('VM', 'vendingmachine_1'),
+                       client.submit('VM', 'nope')]
+            return await asyncio.gather(*futures)
+    with EventServer(ctx=ctx) as server:
+        replies = asyncio.run(session(server.port))
+    assert [reply['id'] for reply in replies] == [1, 2, 3, 4]
+    assert [reply.get('state') for reply in replies] == ['WaitingPayment', 'Idle', 'Idle', None]
+    assert replies[3]['ok'] is False
+
+def test_workers_take_turns_on_one_instance(ctx):
+    vm = make_machine()
+    inside = []
+    overlaps = []
+    def slow_error(error_msg: str = ''):
+        inside.append(1)
+        overlaps.append(len(inside))
+        time.sleep(0.005)
+        inside.pop()
+    select_one_related('R2', vm).showError = slow_error  # every selection of an unknown product shows an error
+    async def session(port):
+        async with EventClient(port=port) as client:
+            return await asyncio.gather(*[client.send('VM', vm._id, 'ProductSelected', p_productCode='ZZ')
+                                          for _ in range(5)])
+    with EventServer(ctx=ctx, workers=4) as server:
+        clients = [threading.Thread(target=asyncio.run, args=(session(server.port),)) for _ in range(4)]
+        for client in clients:
+            client.start()
+        for client in clients:
+            client.join()
+    assert len(overlaps) == 20
+    assert max(overlaps) == 1
+    assert vm.sm.get_current_state() == 'Idle'
+
+def test_malformed_reply_fails_pending_requests():
+    async def garbage(reader, writer):
+        await reader.readline()
+        writer.write(b'not json\n')
+        await writer.drain()
+    async def session():
+        server = await asyncio.start_server(garbage, '127.0.0.1', 0)
+        async with server:
+            client = await EventClient(port=server.sockets[0].getsockname()[1]).connect()
+            first = client.submit('VM', 'vendingmachine_1')
+            second = client.submit('VM', 'vendingmachine_1')
+            for future in (first, second):
+                with pytest.raises(ConnectionError, match='Malformed reply'):
+                    await asyncio.wait_for(future, 5)
+            with pytest.raises(ConnectionError):
+                client.submit('VM', 'vendingmachine_1')
+            await client.close()
+    asyncio.run(session())
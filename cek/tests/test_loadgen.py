@@ -0,0 +1,53 @@
+# tests/test_loadgen.py - scenario runs account for every customer and every unit sold
+from __future__ import annotations
+import random
+
+from runtime.storage import ObjectStore
+from models.VendingMachine import VendingMachine
+
+import loadgen
+
+def test_trace_replay_counts_each_outcome(tmp_path):
+    trace = tmp_path / 'arrivals.csv'
+    trace.write_text('time,machine,product,outcome\n'
+                     '0.0,0,P0001,success\n'
+                     '0.1,1,P0001,success\n'   # the only unit is gone
+                     '0.2,0,P0009,\n'          # not in the catalog
+                     '0.3,1,P0002,failed\n'
+                     '0.4,1,P0002,timeout\n'
+                     '0.5,0,P0002,success\n')
+    vms, _ = loadgen.build_fleet(machines=2, products=2, stock=1)
+    stats = loadgen.run_scenario(loadgen.trace_arrivals(str(trace)), vms)
+    summary = stats.summary()
+    assert {k: summary[k] for k in ('customers', 'sales', 'stock_outs', 'not_found', 'payment_failures',
+                                    'payment_timeouts', 'rejected')} == {
+        'customers': 6, 'sales': 2, 'stock_outs': 1, 'not_found': 1, 'payment_failures': 1,
+        'payment_timeouts': 1, 'rejected': 0}
+    assert summary['revenue'] == 14000.0
+    assert [vm.sm.get_current_state() for vm in vms] == ['Idle', 'Idle']
+
+def test_seeded_poisson_run_is_reproducible_and_sells_what_left_the_shelf():
+    def run():
+        vms, codes = loadgen.build_fleet(machines=4, products=5, stock=20)
+        rng = random.Random(7)
+        arrivals = loadgen.poisson_arrivals(200.0, 300, 4, codes, 1.1, rng)
+        stats = loadgen.run_scenario(arrivals, vms, rng=rng)
+        remaining = sum(p.get_attr('stock') for p in ObjectStore.select_all('Product'))
+        return stats, remaining
+    first, remaining = run()
+    second, _ = run()
+    assert first.customers == 300
+    assert first.sales == 5 * 20 - remaining
+    assert first.stock_outs > 0  # 300 customers against 100 units
+    assert {k: v for k, v in first.summary().items() if 'second' not in k} == \
+           {k: v for k, v in second.summary().items() if 'second' not in k}
+
+def test_payment_that_dispenses_nothing_is_not_a_sale(monkeypatch):
+    vms, codes = loadgen.build_fleet(machines=1, products=1, stock=2)
+    model = vms[0].sm.model
+    table = [list(row) for row in model.table]
+    table[VendingMachine.S_Dispensing][VendingMachine.E_ItemDispensed] = None  # the item never comes out
+    monkeypatch.setattr(model, 'table', tuple(tuple(row) for row in table))
+    stats = loadgen.run_scenario([(0.0, 0, codes[0], 'success')], vms)
+    assert (stats.sales, stats.revenue) == (0, 0.0)
+    assert vms[0].sm.get_current_state() == 'Dispensing'
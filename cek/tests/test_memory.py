@@ -0,0 +1,27 @@
+# tests/test_memory.py - memory samples count what the runtime holds and show where it grew
+from __future__ import annotations
+
+from runtime import memory
+
+from tests.conftest import make_machine, make_product, purchase
+
+def test_sample_counts_instances_links_and_history():
+    make_product(stock=3)
+    vm = make_machine()
+    before = memory.sample()
+    assert before.classes['VendingMachine']['instances'] == 1
+    assert before.links['R2']['links'] == 1
+    assert purchase(vm)
+    after = memory.sample()
+    assert after.classes['VendingMachine']['history'] == len(vm.sm.get_history())
+    deltas = memory.growth(before, after)
+    assert deltas['class:VendingMachine']['history'] == len(vm.sm.get_history())
+    assert after.total_bytes > before.total_bytes
+
+def test_large_class_is_estimated_from_a_sample():
+    for n in range(400):
+        make_product(f'A{n}', id=f'product_{n}')
+    exact = memory.sample(max_per_class=None).classes['Product']
+    estimate = memory.sample(max_per_class=50).classes['Product']
+    assert estimate['instances'] == exact['instances'] == 400
+    assert abs(estimate['bytes'] - exact['bytes']) < exact['bytes'] * 0.1
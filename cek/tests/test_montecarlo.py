@@ -0,0 +1,32 @@
+# tests/test_montecarlo.py - a study's results do not depend on how its runs are spread over workers
+from __future__ import annotations
+import statistics
+
+import montecarlo
+
+GRID = {'machines': [2], 'products': [3], 'stock': [5], 'price': [7000.0], 'customers': [40], 'rate': [100.0],
+        'zipf': [1.1], 'success_rate': [0.9], 'failure_rate': [0.05, 0.5]}
+
+def summaries(workers: int):
+    results = montecarlo.iter_results(montecarlo.scenarios(GRID, replicas=3, seed=11), workers, window=2)
+    return {result['run']: result['summary'] for result in results}
+
+def untimed(summary):
+    return {k: v for k, v in summary.items() if 'second' not in k}
+
+def test_runs_give_the_same_results_serially_and_on_a_pool():
+    serial = summaries(workers=1)
+    pooled = summaries(workers=2)
+    assert sorted(serial) == list(range(6))
+    assert {n: untimed(s) for n, s in serial.items()} == {n: untimed(s) for n, s in pooled.items()}
+    assert all(s['sales'] <= 3 * 5 for s in serial.values())
+
+def test_aggregate_matches_the_sample_statistics():
+    sales = [3, 7, 4, 9, 12]
+    agg = montecarlo.Aggregate({})
+    for n in sales:
+        agg.add({'sales': n})
+    assert agg.runs == 5
+    assert abs(agg.mean('sales') - statistics.mean(sales)) < 1e-9
+    assert abs(agg.stdev('sales') - statistics.stdev(sales)) < 1e-9
+    assert abs(agg.ci95('sales') - 1.96 * statistics.stdev(sales) / 5 ** 0.5) < 1e-9
@@ -0,0 +1,97 @@
+# tests/test_paging.py - evicted instances come back as they left, also across a model reload
+from __future__ import annotations
+import threading
+
+import pytest
+
+from runtime.paging import Pager
+from runtime.reload import reload_models
+from runtime.relationship import select_one_related
+
+from tests.conftest import make_machine, make_product, purchase
+
+LAMP = '''
+from runtime.base import InstanceBase
+from runtime.state_machine import StateMachine, StateModel
+from runtime.storage import ObjectStore
+
+STATES = {states!r}
+
+class Lamp(InstanceBase):
+    kl = "LMP"
+
+    def __init__(self, id=None):
+        super().__init__(id, "LMP")
+        ObjectStore.register("Lamp")
+        ObjectStore.create("Lamp", self._id, self)
+        self.sm = StateMachine(self, 'Off', self._SM)
+
+    @staticmethod
+    def _declared_attrs():
+        return {{}}
+
+    _SM = StateModel(
+        states=STATES,
+        events=('Toggle',),
+        table=tuple(((None, None, STATES.index('On' if s == 'Off' else 'Off')),) for s in STATES),
+        state_attr=None,
+    )
+'''
+
+@pytest.fixture
+def pager(ctx):
+    pager = Pager(ctx=ctx)
+    yield pager
+    pager.close()
+
+def test_evicted_machine_resumes_where_it_left(pager):
+    product = make_product(stock=2)
+    vm = make_machine()
+    vm.send_ProductSelected('A1')
+    history = vm.sm.get_history()
+    assert pager.evict([vm]) == 1
+    assert 'sm' not in vm.__dict__ and vm._pager is pager
+    assert select_one_related('R1', vm) is product  # links stay with the stub
+    vm.send_PaymentSuccess()
+    assert vm._pager is None and pager.faults == 1
+    assert vm.sm.get_history()[:len(history)] == history
+    assert vm.sm.get_current_state() == 'Idle'
+    assert product.get_attr('stock') == 1
+    assert purchase(vm)
+
+def test_eviction_waits_for_a_step_in_flight(pager, ctx):
+    product = make_product(stock=2)
+    vm = make_machine()
+    vm.send_ProductSelected('A1')
+    inside, release = threading.Event(), threading.Event()
+
+    def broken(message: str = ''):
+        inside.set()
+        release.wait(5)
+        raise RuntimeError('display offline')  # the step rolls back after eviction was asked for
+    select_one_related('R2', vm).showMessage = broken
+    paying = threading.Thread(target=ctx.run, args=(vm.send_PaymentSuccess,))
+    paying.start()
+    assert inside.wait(5)
+    evicting = threading.Thread(target=pager.evict, args=([vm],))
+    evicting.start()
+    evicting.join(0.1)
+    assert evicting.is_alive()
+    release.set()
+    paying.join(5)
+    evicting.join(5)
+    assert vm._pager is pager
+    assert vm.sm.get_current_state() == 'WaitingPayment'  # paged as the rollback left it
+    assert product.get_attr('stock') == 2
+
+def test_reload_with_reordered_states_keeps_a_paged_instance_in_its_state(pager, model_package):
+    lamp = model_package('Lamp', LAMP.format(states=('Off', 'On'))).Lamp('lamp_1')
+    lamp.sm.dispatch('Toggle')
+    assert pager.evict([lamp]) == 1
+    model_package('Lamp', LAMP.format(states=('On', 'Off')))  # written only: reload_models imports it
+    reload_models('testmodels')
+    assert lamp.sm.model.states == ('On', 'Off')
+    assert lamp.sm.get_current_state() == 'On'
+    assert lamp.sm.get_history() == [('Off', 'Toggle', 'On')]
+    lamp.sm.dispatch('Toggle')
+    assert lamp.sm.get_current_state() == 'Off'
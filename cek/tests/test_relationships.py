@@ -0,0 +1,37 @@
+# tests/test_relationships.py - links, partners and the reference slots of single-valued ends
+from __future__ import annotations
+
+from runtime.relationship import relate, relate_many, rebuild_ref_slots, select_one_related, select_related, unrelate
+from runtime.unit_of_work import UnitOfWork
+from models.InventoryService import InventoryService
+from models.Payment import Payment
+from models.PaymentService import PaymentService
+from models.Transaction import Transaction
+
+from tests.conftest import make_machine, make_product
+
+def test_slot_and_lookup_pick_the_same_partner():
+    vm = make_machine()
+    first, second, third = make_product('A1'), make_product('B2'), make_product('C3')
+    relate('R1', vm, first)
+    relate('R1', vm, second)
+    assert vm.get_attr('R1_selectedProduct') is first
+    assert select_one_related('R1', vm) is select_related('R1', vm)[0] is first
+    uow, owned = UnitOfWork.begin()
+    try:
+        relate('R1', vm, third)  # a pending link: looked up without the slot
+        assert select_one_related('R1', vm) is first
+        uow.commit()
+    finally:
+        UnitOfWork.end(owned)
+    assert select_one_related('R1', vm) is first
+    unrelate('R1', vm, first)
+    assert vm.get_attr('R1_selectedProduct') is select_related('R1', vm)[0] is second
+    relate_many('R1', [(vm, first)])
+    rebuild_ref_slots()
+    assert select_one_related('R1', vm) is second
+
+def test_only_classes_linked_at_run_time_get_slots():
+    assert PaymentService._REF_SLOTS == {} and InventoryService._REF_SLOTS == {}  # external entities (bridges)
+    assert 'R5' not in Payment._REF_SLOTS
+    assert Transaction._REF_SLOTS == {'R4': 'R4_payment'}
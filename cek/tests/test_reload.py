@@ -0,0 +1,95 @@
+# tests/test_reload.py - regenerated classes replace live ones without losing instances or their state
+from __future__ import annotations
+import threading
+
+from runtime.base import InstanceBase
+from runtime.reload import reload_models
+from runtime.state_machine import StateMachine
+from runtime.storage import ObjectStore
+
+LAMP = '''
+from runtime.base import InstanceBase
+from runtime.state_machine import StateMachine, StateModel
+from runtime.storage import ObjectStore
+
+STATES = {states!r}
+
+class Lamp(InstanceBase):
+    kl = "LMP"
+
+    def __init__(self, id=None):
+        super().__init__(id, "LMP")
+        for name, value in self._declared_attrs().items():
+            self.set_attr(name, value)
+        ObjectStore.register("Lamp")
+        ObjectStore.create("Lamp", self._id, self)
+        self.sm = StateMachine(self, 'Off', self._SM)
+
+    @staticmethod
+    def _declared_attrs():
+        return {attrs!r}
+
+    def describe(self):
+        return {label!r} + self.sm.get_current_state()
+
+    _SM = StateModel(
+        states=STATES,
+        events=('Toggle',),
+        table=tuple(((None, None, STATES.index('On' if s == 'Off' else 'Off')),) for s in STATES),
+        state_attr=None,
+    )
+'''
+
+def lamp_source(states=('Off', 'On'), attrs=None, label='v1:'):
+    return LAMP.format(states=states, attrs=attrs if attrs is not None else {'watts': 60, 'room': ''}, label=label)
+
+def test_live_instances_switch_to_the_new_code_and_layout(model_package):
+    Lamp = model_package('Lamp', lamp_source()).Lamp
+    lamp = Lamp('lamp_1')
+    lamp.set_attr('room', 'hall')
+    lamp.sm.dispatch('Toggle')
+    model_package('Lamp', lamp_source(states=('Off', 'Dim', 'On'), attrs={'watts': 60, 'lumens': 800}, label='v2:'))
+    report = reload_models('testmodels')
+    assert ObjectStore.find('Lamp', 'lamp_1') is lamp
+    assert type(lamp) is not Lamp and type(lamp).__name__ == 'Lamp'
+    assert lamp.describe() == 'v2:On'
+    assert (lamp.get_attr('lumens'), lamp.get_attr('watts')) == (800, 60)
+    assert 'room' not in lamp._attrs
+    assert report.migrated == {'Lamp': 1}
+    assert report.added_attrs['Lamp'] == ['lumens'] and report.removed_attrs['Lamp'] == ['room']
+    lamp.sm.dispatch('Toggle')
+    assert lamp.sm.get_current_state() == 'Off'
+
+def test_state_dropped_by_the_new_model_resets_to_initial(model_package):
+    lamp = model_package('Lamp', lamp_source()).Lamp('lamp_1')
+    lamp.sm.dispatch('Toggle')
+    model_package('Lamp', lamp_source(states=('Off', 'Lit')).replace("'On' if", "'Lit' if"))
+    report = reload_models('testmodels')
+    assert report.orphaned_states == {'Lamp': {'lamp_1': 'On'}}
+    assert lamp.sm.get_current_state() == 'Off'
+    lamp.sm.dispatch('Toggle')
+    assert lamp.sm.get_current_state() == 'Lit'
+
+def test_reload_waits_for_steps_in_flight(model_package):
+    model_package('Lamp', lamp_source()).Lamp('lamp_1')
+    started, release = threading.Event(), threading.Event()
+
+    def slow(owner, payload):
+        started.set()
+        release.wait(5)
+        owner.set_attr('count', 1)
+    counter = InstanceBase('counter_1', 'CNT')
+    counter.sm = StateMachine(counter, 'Idle', {'Idle': {'Go': (None, slow, 'Idle')}})
+    stepping = threading.Thread(target=counter.sm.dispatch, args=('Go',))
+    stepping.start()
+    assert started.wait(5)
+    reports = []
+    reloading = threading.Thread(target=lambda: reports.append(reload_models('testmodels')))
+    reloading.start()
+    reloading.join(0.2)
+    assert reloading.is_alive()  # held back until the step commits
+    release.set()
+    stepping.join(5)
+    reloading.join(5)
+    assert reports and counter.get_attr('count') == 1
+    assert counter.sm.dispatch('Go')  # steps run again once the swap is done
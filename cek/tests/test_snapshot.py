@@ -0,0 +1,74 @@
+# tests/test_snapshot.py - read snapshots keep the state of the commit they were opened at
+from __future__ import annotations
+import threading
+
+from runtime.storage import ObjectStore
+
+from tests.conftest import make_machine, make_product, purchase
+
+def report(snap):
+    """What a reporting query reads: machine states, what they hold across R1/R3, stock and open transactions"""
+    machines = {}
+    for vm in snap.select_all('VendingMachine'):
+        txn = snap.select_one_related('R3', vm)
+        product = snap.select_one_related('R1', vm)
+        machines[vm._id] = (snap.state(vm), txn, product)
+    stock = sum(snap.get_attr(p, 'stock') for p in snap.select_all('Product'))
+    return machines, stock, snap.count('Transaction')
+
+def test_snapshot_keeps_a_purchase_as_it_was(ctx):
+    product = make_product(stock=2)
+    vm = make_machine()
+    vm.send_ProductSelected('A1')
+    with ctx.snapshot() as snap:
+        txn = snap.select_one_related('R3', vm)
+        vm.send_PaymentSuccess()
+        make_product('B1', stock=9)
+        assert vm.sm.get_current_state() == 'Idle' and product.get_attr('stock') == 1
+        assert snap.state(vm) == 'WaitingPayment'
+        assert snap.get_attr(product, 'stock') == 2
+        assert snap.select_one_related('R1', vm) is product
+        assert snap.find('Transaction', txn._id) is txn and ObjectStore.count('Transaction') == 0
+        assert [p._id for p in snap.select_all('Product')] == ['product_A1']
+        assert snap.stats()['commits_since'] > 0
+    assert snap.closed and ctx.snapshots == ()
+
+def test_report_is_consistent_while_machines_keep_selling(ctx):
+    make_product('A1', stock=200, id='product_1')
+    make_product('A2', stock=200, id='product_2')
+    machines = [make_machine(n) for n in range(1, 6)]
+    for vm in machines[:3]:
+        vm.send_ProductSelected('A1')  # mid-purchase when the snapshot is taken
+    snap = ctx.snapshot()
+    expected = report(snap)
+    done = threading.Event()
+
+    def traffic():
+        with ctx:
+            for n in range(60):
+                vm = machines[n % len(machines)]
+                if vm.sm.get_current_state() == 'WaitingPayment':
+                    vm.send_PaymentSuccess()
+                else:
+                    purchase(vm, 'A2' if n % 2 else 'A1')
+        done.set()
+
+    worker = threading.Thread(target=traffic)
+    worker.start()
+    reads = 0
+    while not done.is_set() or reads == 0:
+        assert report(snap) == expected
+        reads += 1
+    worker.join()
+    assert report(snap) == expected
+    assert expected[1] == 400 and expected[2] == 3
+    assert sum(p.get_attr('stock') for p in ObjectStore.select_all('Product')) < 400
+    snap.close()
+
+def test_snapshot_keeps_the_newest_instance_before_it(ctx):
+    older, newest = make_product('A1', stock=4), make_product('B1', stock=6)
+    with ctx.snapshot() as snap:
+        older.set_attr('stock', 3)
+        newest.set_attr('stock', 5)
+        assert snap.get_attr(older, 'stock') == 4
+        assert snap.get_attr(newest, 'stock') == 6
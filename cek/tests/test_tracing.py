@@ -0,0 +1,51 @@
+# tests/test_tracing.py - sampled causal traces: everything a dispatch causes joins its trace
+from __future__ import annotations
+import json
+
+import pytest
+
+from runtime.tracing import Tracer
+
+from tests.conftest import make_machine, make_product, purchase
+
+@pytest.fixture
+def tracer():
+    Tracer.clear()
+    Tracer.configure(1.0, seed=1)
+    yield Tracer
+    Tracer.disable()
+    Tracer.clear()
+
+def test_each_customer_event_roots_one_causal_tree(tracer):
+    make_product(stock=2)
+    assert purchase(make_machine())
+    spans = tracer.spans()
+    roots = [s for s in spans if s.parent_id is None]
+    assert [s.name for s in roots] == ['VM.ProductSelected', 'VM.PaymentSuccess']
+    by_id = {s.span_id: s for s in spans}
+    for span in spans:
+        if span.parent_id is not None:
+            assert by_id[span.parent_id].trace_id == span.trace_id
+    dispense = [s for s in spans if s.name == 'IS::updateStock']
+    assert dispense and dispense[0].trace_id == roots[1].span_id
+    assert dispense[0].args == {'productCode': 'A1', 'newStock': 1}
+
+def test_unsampled_dispatch_records_nothing(tracer):
+    make_product(stock=2)
+    vm = make_machine()
+    tracer.configure(0.000001, seed=1)
+    assert purchase(vm)
+    assert tracer.spans() == []
+    assert tracer.current() is None
+
+def test_export_writes_chrome_trace_events(tracer, tmp_path):
+    make_product(stock=2)
+    assert purchase(make_machine())
+    path = tmp_path / 'trace.json'
+    count = tracer.export(str(path))
+    events = json.loads(path.read_text())['traceEvents']
+    assert len(events) == count
+    complete = [e for e in events if e['ph'] == 'X']
+    assert len(complete) == len(tracer.spans())
+    assert all(e['dur'] >= 0 and 'trace_id' in e['args'] for e in complete)
+    assert any(e['ph'] == 'M' for e in events)
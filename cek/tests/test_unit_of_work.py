@@ -0,0 +1,99 @@
+# tests/test_unit_of_work.py - a dispatch step is applied as a whole or not at all
+from __future__ import annotations
+import threading
+
+from runtime.base import InstanceBase
+from runtime.changefeed import ChangeFeed
+from runtime.storage import ObjectStore
+from runtime.relationship import select_one_related
+from runtime.state_machine import StateMachine
+from runtime.unit_of_work import active_unit
+
+from tests.conftest import make_machine, make_product, purchase
+
+def test_purchase_commits_every_change_of_the_step():
+    product = make_product(stock=2)
+    vm = make_machine()
+    assert purchase(vm)
+    assert vm.sm.get_current_state() == 'Idle'
+    assert vm.get_attr('currentState') == 'Idle'
+    assert product.get_attr('stock') == 1
+    assert select_one_related('R1', vm) is None
+    assert ObjectStore.count('Transaction') == 0
+
+def test_failing_action_rolls_the_step_back():
+    product = make_product(stock=2)
+    vm = make_machine()
+    vm.send_ProductSelected('A1')
+    ui = select_one_related('R2', vm)
+    def broken(message: str = ''):
+        raise RuntimeError('display offline')
+    ui.showMessage = broken  # raised from the ItemDispensed action, after the stock update
+    vm.send_PaymentSuccess()
+    assert vm.sm.get_current_state() == 'WaitingPayment'
+    assert product.get_attr('stock') == 2
+    assert select_one_related('R1', vm) is product
+    assert ObjectStore.count('Transaction') == 1
+
+def test_failing_commit_undoes_what_it_applied():
+    product = make_product(stock=2)
+    vm = make_machine()
+    vm.send_ProductSelected('A1')
+    txn = select_one_related('R3', vm)
+    original = ObjectStore._apply_delete.__func__
+    def failing_delete(cls, class_name, instances):
+        raise RuntimeError('store unavailable')  # the last phase of the commit: attributes and links are already applied
+    ObjectStore._apply_delete = classmethod(failing_delete)
+    try:
+        vm.send_PaymentSuccess()
+    finally:
+        ObjectStore._apply_delete = classmethod(original)
+    assert vm.sm.get_current_state() == 'WaitingPayment'
+    assert vm.get_attr('currentState') == 'WaitingPayment'
+    assert product.get_attr('stock') == 2
+    assert select_one_related('R1', vm) is product
+    assert select_one_related('R3', vm) is txn
+    assert txn.get_attr('status') != 'Completed'
+    assert ObjectStore.count('Transaction') == 1
+    assert active_unit.uow is None
+    assert purchase(make_machine(2)) and product.get_attr('stock') == 1  # the next step starts clean
+
+def test_unit_left_dirty_is_not_reused():
+    from runtime.unit_of_work import UnitOfWork
+    product = make_product(stock=2)
+    uow, owned = UnitOfWork.begin()
+    product.set_attr('stock', 99)  # staged, never committed
+    UnitOfWork.end(owned)  # e.g. an exception escaped between staging and commit
+    assert active_unit.spare is not uow
+    vm = make_machine()
+    assert purchase(vm)
+    assert product.get_attr('stock') == 1  # the abandoned write did not ride along with the next step
+
+def test_step_that_only_changes_state_does_not_wait_for_the_lock(ctx):
+    owner = InstanceBase('toggle_1', 'TGL')
+    sm = StateMachine(owner, 'Off', {'Off': {'Toggle': (None, None, 'On')}, 'On': {'Toggle': (None, None, 'Off')}})
+    version = ctx.version
+    locked, release = threading.Event(), threading.Event()
+
+    def hold_lock():
+        with ctx.lock:
+            locked.set()
+            release.wait(5)
+    holder = threading.Thread(target=hold_lock)
+    holder.start()
+    locked.wait(5)
+    try:
+        assert sm.dispatch('Toggle') and sm.get_current_state() == 'On'  # would block behind the holder
+    finally:
+        release.set()
+        holder.join()
+    assert ctx.version == version
+
+def test_watched_write_reaches_the_feed_once_committed(ctx):
+    product = make_product(stock=2)
+    vm = make_machine()
+    ChangeFeed.watch(type(product), ['stock'], lifecycle=False)
+    sub = ChangeFeed.subscribe()
+    assert purchase(vm)
+    assert [(r.attr, r.old, r.new) for r in sub.poll()] == [('stock', 2, 1)]
+    assert ctx.version > 0
@@ -73,8 +73,69 @@ function translateExpression(expr, contextType) {
   return pyExpr;
 }
 
+// Class-level constant names for the integer state/event encoding
+const smStateConst = (name) => `S_${String(name).replace(/\W/g, "_")}`;
+const smEventConst = (name) => `E_${String(name).replace(/\W/g, "_")}`;
+
+// --- EMISSION PROFILES ---
+// "simulation": every class, bridge and operation is looked up when the action
+//   runs, behind hasattr/try guards, so partial or inconsistent models still run.
+// "optimized": those lookups are resolved against the model at generation time;
+//   actions call model classes, bridges and operations directly (model classes
+//   are imported once per module) and guards that can never fail are dropped.
+export const EMISSION_PROFILES = ["optimized", "simulation"];
+
+// Generation-time view of the model used by the optimized profile
+function emissionScope(model, ownerName, profile) {
+  const classes = new Map(); // KeyLetters -> { name, ops, events, hasSM, external }
+  for (const c of [...(model.classes || []), ...(model.associationClasses || [])]) {
+    const kl = c.kl || c.KL || c.keyLetters || c.name;
+    if (!kl || classes.has(kl)) continue;
+    const ops = new Set(
+      (c.operations || []).map((op) => {
+        const signature = op.signature || op.name || String(op);
+        const match = signature.match(/(\w+)\((.*)\)/);
+        return match ? match[1] : signature.replace(/\W/g, "");
+      }),
+    );
+    const events = new Set((c.stateMachine?.transitions || []).map((t) => t.event));
+    const params = eventParameters(c, model);
+    classes.set(kl, { name: (c.name || c.class_name).replace(/\W/g, ""), ops, events, params, hasSM: !!c.stateMachine, external: !!c.isExternal });
+  }
+  return { optimized: profile === "optimized", classes, ownerName, imports: new Set() };
+}
+
+// Parameters of the events a class receives, from the model's event signatures:
+// Map(event name -> [{ name, pythonType, default }]), only events that carry data
+function eventParameters(cls, model) {
+  const params = new Map();
+  const classId = cls.id ?? cls.class_id;
+  if (classId === undefined) return params;
+  for (const evt of model.events || []) {
+    if (String(evt.class_id) !== String(classId) || !evt.event_name) continue;
+    const parsed = (evt.parameters || []).flatMap((p) => (typeof p === "string" ? parseOalParameters(p) : [p]));
+    if (parsed.length && parsed.every((p) => /^[A-Za-z_]\w*$/.test(p.name || ""))) params.set(evt.event_name, parsed);
+  }
+  return params;
+}
+
+// Positional arguments for an event's parameter layout from OAL "name: value" pairs,
+// or null when the pairs name something the layout does not have
+function layoutArgs(layout, pairs) {
+  if (pairs.some(([k]) => !layout.some((p) => p.name === k))) return null;
+  return layout.map((p) => pairs.find(([k]) => k === p.name)?.[1] ?? (p.default || "None")).join(", ");
+}
+
+// --- ATOMIC UPDATES ---
+// OAL has no atomic read-modify-write, so the translator accepts one statement for it:
+//   atomic assign p.stock = p.stock - 1;
+// becomes p.increment_attr('stock', -1): the counter is updated in one step even
+// when several machines run the action for the same instance at once. Nothing is
+// inferred from plain assignments; a model opts in per statement.
+const ATOMIC_ASSIGN = /^atomic\s+assign\s+(\w+)\.(\w+)\s*=\s*(\w+)\.(\w+)\s*([+-])\s*(.+?)\s*;?$/;
+
 // --- CORE OAL TRANSLATOR (STATEFUL) ---
-function OAL_TO_PYTHON_SIMULATION(oalCode, ownerKl, ownerId, contextType, baseIndent = "        ", eventStateMap = {}) {
+function OAL_TO_PYTHON_SIMULATION(oalCode, ownerKl, ownerId, contextType, baseIndent = "        ", eventStateMap = {}, scope = null) {
   if (!oalCode) return baseIndent + "pass";
 
   const lines = oalCode.split("\n").filter((l) => l.trim() !== "");
@@ -83,7 +144,18 @@ function OAL_TO_PYTHON_SIMULATION(oalCode, ownerKl, ownerId, contextType, baseIn
   let indentLevel = 0;
   const getIndent = () => baseIndent + "    ".repeat(indentLevel);
 
-  pyLines.push(baseIndent + "from runtime.base import RuntimeServices");
+  // Optimized profile: the class each OAL variable holds, where the OAL tells us
+  const optimized = !!(scope && scope.optimized);
+  const varKl = { self: ownerKl };
+  const classOf = (varName) => (optimized ? scope.classes.get(varKl[varName]) : undefined);
+  const importClass = (info) => {
+    if (info.name !== scope.ownerName) scope.imports.add(info.name);
+    return info.name;
+  };
+
+  if (!optimized) {
+    pyLines.push(baseIndent + "from runtime.base import RuntimeServices");
+  }
 
   for (let line of lines) {
     line = line.trim();
@@ -125,6 +197,7 @@ function OAL_TO_PYTHON_SIMULATION(oalCode, ownerKl, ownerId, contextType, baseIn
     // Loops
     const forMatch = line.match(/for each\s+(\w+)\s+in\s+(\w+)/);
     if (forMatch) {
+      delete varKl[forMatch[1]];
       pyLines.push(getIndent() + `for ${forMatch[1]} in ${forMatch[2]}:`);
       indentLevel++;
       continue;
@@ -163,6 +236,9 @@ function OAL_TO_PYTHON_SIMULATION(oalCode, ownerKl, ownerId, contextType, baseIn
 
       // Use lazy class lookup for OAL class names (KeyLetters)
       let selectCmd = `ObjectStore.select_all(_KL_MAP.get("${className}", "${className}"))`;
+      const selectInfo = optimized ? scope.classes.get(className) : undefined;
+      if (type === "many" || !selectInfo) delete varKl[varName];
+      else varKl[varName] = className;
 
       if (whereClause) {
         //  Bersihkan where clause dari kurung luar
@@ -174,7 +250,23 @@ function OAL_TO_PYTHON_SIMULATION(oalCode, ownerKl, ownerId, contextType, baseIn
         }
 
         const pyWhere = translateExpression(cleanWhere, contextType);
+        const equality = cleanWhere.match(/^selected\.(\w+)\s*==\s*(.+)$/);
+        if (selectInfo && type !== "many" && equality && !/\b(and|or)\b|selected\./.test(equality[2])) {
+          // Single-attribute equality: let the store answer it (an index probe for catalog-backed classes)
+          const value = translateExpression(equality[2].trim(), contextType);
+          pyLines.push(getIndent() + `${varName} = ObjectStore.find_by("${selectInfo.name}", '${equality[1]}', ${value})`);
+          continue;
+        }
+        if (selectInfo) {
+          // Scan the extent in place; any/one stop at the first match
+          const scan = `candidate for candidate in ObjectStore.iter_all("${selectInfo.name}") if ${pyWhere}`;
+          pyLines.push(getIndent() + (type === "many" ? `${varName} = [${scan}]` : `${varName} = next((${scan}), None)`));
+          continue;
+        }
         pyLines.push(getIndent() + `${varName}_list = [candidate for candidate in ${selectCmd} if ${pyWhere}]`);
+      } else if (selectInfo) {
+        pyLines.push(getIndent() + `${varName} = ObjectStore.${type === "many" ? "select_all" : "select_any"}("${selectInfo.name}")`);
+        continue;
       } else {
         pyLines.push(getIndent() + `${varName}_list = ${selectCmd}`);
       }
@@ -194,12 +286,14 @@ function OAL_TO_PYTHON_SIMULATION(oalCode, ownerKl, ownerId, contextType, baseIn
       const pySource = sourceVar === "self" ? "owner" : sourceVar;
 
       pyLines.push(getIndent() + `# [Relationship Navigation] ${line}`);
-      pyLines.push(getIndent() + `${varName}_list = select_related("${relId}", ${pySource})`);
-
+      if (type === "many") delete varKl[varName];
+      else varKl[varName] = targetClass;
       if (type === "many") {
+        pyLines.push(getIndent() + `${varName}_list = select_related("${relId}", ${pySource})`);
         pyLines.push(getIndent() + `${varName} = ${varName}_list`);
       } else {
-        pyLines.push(getIndent() + `${varName} = ${varName}_list[0] if ${varName}_list else None`);
+        // Single-valued ends are read from the instance's reference slot
+        pyLines.push(getIndent() + `${varName} = select_one_related("${relId}", ${pySource})`);
       }
       continue;
     }
@@ -208,9 +302,16 @@ function OAL_TO_PYTHON_SIMULATION(oalCode, ownerKl, ownerId, contextType, baseIn
     const createMatch = line.match(/create\s+object\s+instance\s+(\w+)\s+of\s+(\w+);?/);
     if (createMatch) {
       const [, varName, className] = createMatch;
-      // Use lazy class lookup for OAL class names (KeyLetters)
-      pyLines.push(getIndent() + `_cls_${varName} = _get_class_by_kl("${className}")`);
-      pyLines.push(getIndent() + `${varName} = _cls_${varName}._create_instance()`);
+      const createInfo = optimized ? scope.classes.get(className) : undefined;
+      if (createInfo) {
+        varKl[varName] = className;
+        pyLines.push(getIndent() + `${varName} = ${importClass(createInfo)}._create_instance()`);
+      } else {
+        delete varKl[varName];
+        // Use lazy class lookup for OAL class names (KeyLetters)
+        pyLines.push(getIndent() + `_cls_${varName} = _get_class_by_kl("${className}")`);
+        pyLines.push(getIndent() + `${varName} = _cls_${varName}._create_instance()`);
+      }
       pyLines.push(getIndent() + `print(f"[OAL] Created {${varName}.kl}:{${varName}._id}")`);
       continue;
     }
@@ -262,7 +363,7 @@ function OAL_TO_PYTHON_SIMULATION(oalCode, ownerKl, ownerId, contextType, baseIn
       const pyTarget = target === "self" ? "owner" : target;
 
       // Parse params manual karena formatnya mirip array
-      let pyPayload = "{}";
+      let pyPayload = "NO_PAYLOAD";
       if (params && params.trim()) {
         const paramPairs = params.split(",").map((p) => {
           const parts = p.split(":");
@@ -285,24 +386,59 @@ function OAL_TO_PYTHON_SIMULATION(oalCode, ownerKl, ownerId, contextType, baseIn
       const [, evtId, evtName, params, target] = genMatch;
       const pyTarget = target === "self" ? "owner" : target;
 
-      let pyPayload = "{}";
+      let pyPayload = "NO_PAYLOAD";
+      const paramPairs = [];
       if (params.trim()) {
-        const paramPairs = params.split(",").map((p) => {
+        for (const p of params.split(",")) {
           const parts = p.split(":");
           const k = parts[0].trim();
           const v = parts.slice(1).join(":").trim(); // Handle jika value ada titik dua
-          return `'${k}': ${translateExpression(v, contextType)}`;
-        });
-        pyPayload = `{${paramPairs.join(", ")}}`;
+          paramPairs.push([k, translateExpression(v, contextType)]);
+        }
+        pyPayload = `{${paramPairs.map(([k, v]) => `'${k}': ${v}`).join(", ")}}`;
       }
 
       pyLines.push(getIndent() + `# [Event Generation] ${evtName} to ${target}`);
 
+      // Optimized profile: events with parameters travel in the target class's P_<event> layout,
+      // taken from its pool and handed back once the dispatch returns
+      const dispatchIndexed = (pyObj, indent) => {
+        const info = pyObj === "owner" ? classOf("self") : classOf(target);
+        const layout = paramPairs.length && info ? info.params.get(evtName) : undefined;
+        const args = layout ? layoutArgs(layout, paramPairs) : null;
+        const dispatch = `${pyObj}.sm.dispatch_index(${pyObj}.${smEventConst(evtName)}, `;
+        if (args === null) return [indent + dispatch + `${pyPayload})`];
+        return [
+          indent + `_evt_payload = ${pyObj}.P_${evtName}.acquire(${args})`,
+          indent + dispatch + `_evt_payload)`,
+          indent + `_evt_payload.release()`,
+        ];
+      };
+
       const targetState = eventStateMap ? eventStateMap[evtName] : undefined;
+      if (optimized && contextType === "STATE_ACTION" && pyTarget === "owner" && targetState) {
+        // A state action's owner is never None and always has its state machine
+        pyLines.push(getIndent() + `owner.sm.index = owner.${smStateConst(targetState)}`);
+        pyLines.push(...dispatchIndexed("owner", getIndent()));
+        continue;
+      }
+      const targetInfo = pyTarget === "owner" ? undefined : classOf(target);
+      if (targetInfo) {
+        if (targetInfo.hasSM && targetInfo.events.has(evtName)) {
+          pyLines.push(getIndent() + `if ${pyTarget} is not None:`);
+          pyLines.push(...dispatchIndexed(pyTarget, getIndent() + "    "));
+        } else {
+          pyLines.push(getIndent() + `pass  # ${targetInfo.name} has no transition on ${evtName}`);
+        }
+        continue;
+      }
       if (pyTarget === "owner" && targetState) {
+        // Own-class event: use the integer state/event encoding emitted on the class
+        pyLines.push(getIndent() + `if ${pyTarget} and hasattr(${pyTarget}, 'sm'):`);
+        pyLines.push(getIndent() + `    ${pyTarget}.sm.index = ${pyTarget}.${smStateConst(targetState)}`);
         pyLines.push(getIndent() + `if ${pyTarget} and hasattr(${pyTarget}, 'sm'):`);
-        pyLines.push(getIndent() + `    ${pyTarget}.sm.state = '${targetState}'`);
-        pyLines.push(getIndent() + `    ${pyTarget}.set_attr('currentState', '${targetState}')`);
+        pyLines.push(getIndent() + `    ${pyTarget}.sm.dispatch_index(${pyTarget}.${smEventConst(evtName)}, ${pyPayload})`);
+        continue;
       }
 
       pyLines.push(getIndent() + `if ${pyTarget} and hasattr(${pyTarget}, 'sm'):`);
@@ -326,9 +462,20 @@ function OAL_TO_PYTHON_SIMULATION(oalCode, ownerKl, ownerId, contextType, baseIn
           return parts.length > 1 ? `${k}=${v}` : `${k}`;
         })
         .join(", ");
+      if (optimized) {
+        const eeInfo = scope.classes.get(eeName);
+        if (!eeInfo) {
+          pyLines.push(getIndent() + `print(f"[OAL] External Entity ${eeName} not loaded.")`);
+          continue;
+        }
+        if (eeInfo.external && eeInfo.ops.has(opName)) {
+          pyLines.push(getIndent() + `${importClass(eeInfo)}.${opName}(${callArgs})`);
+          continue;
+        }
+      }
       pyLines.push(getIndent() + `try:`);
-      pyLines.push(getIndent() + `    ${eeName}.${opName}(${callArgs})`);
-      pyLines.push(getIndent() + `except NameError: print(f"[OAL] External Entity ${eeName} not loaded.")`);
+      pyLines.push(getIndent() + `    _get_class_by_kl("${eeName}").${opName}(${callArgs})`);
+      pyLines.push(getIndent() + `except (NameError, ImportError): print(f"[OAL] External Entity ${eeName} not loaded.")`);
       continue;
     }
 
@@ -366,7 +513,14 @@ function OAL_TO_PYTHON_SIMULATION(oalCode, ownerKl, ownerId, contextType, baseIn
           })
           .join(", ");
         pyLines.push(getIndent() + `# [Operation Call] ${line}`);
-        pyLines.push(getIndent() + `if hasattr(${pyObj}, '${op}'): ${pyObj}.${op}(${callArgs})`);
+        const objInfo = classOf(obj);
+        if (objInfo && objInfo.ops.has(op)) {
+          pyLines.push(getIndent() + `${pyObj}.${op}(${callArgs})`);
+        } else if (objInfo) {
+          pyLines.push(getIndent() + `pass  # ${objInfo.name} has no operation ${op}`);
+        } else {
+          pyLines.push(getIndent() + `if hasattr(${pyObj}, '${op}'): ${pyObj}.${op}(${callArgs})`);
+        }
         continue;
       }
     }
@@ -379,12 +533,23 @@ function OAL_TO_PYTHON_SIMULATION(oalCode, ownerKl, ownerId, contextType, baseIn
       const pySrc = srcVar === "self" ? "owner" : srcVar;
       const tempVar = `${pySrc}_rel_tmp`;
       pyLines.push(getIndent() + `# [Unrelate Navigation] ${line}`);
-      pyLines.push(getIndent() + `${tempVar}_list = select_related("${relId}", ${pySrc})`);
-      pyLines.push(getIndent() + `${tempVar} = ${tempVar}_list[0] if ${tempVar}_list else None`);
+      pyLines.push(getIndent() + `${tempVar} = select_one_related("${relId}", ${pySrc})`);
       pyLines.push(getIndent() + `if ${tempVar} is not None: unrelate("${relId}", ${pySrc}, ${tempVar})`);
       continue;
     }
 
+    // [KOMPONEN: Atomic Update] atomic assign p.stock = p.stock - 1;
+    const atomicMatch = line.match(ATOMIC_ASSIGN);
+    if (atomicMatch && atomicMatch[1] === atomicMatch[3] && atomicMatch[2] === atomicMatch[4]) {
+      const [, obj, attr, , , sign, amount] = atomicMatch;
+      const pyObj = obj === "self" ? "owner" : obj;
+      const pyAmount = translateExpression(amount, contextType);
+      const delta = sign === "-" ? (/^[\w.]+$/.test(pyAmount) ? `-${pyAmount}` : `-(${pyAmount})`) : pyAmount;
+      pyLines.push(getIndent() + `# [Atomic Update] ${line}`);
+      pyLines.push(getIndent() + `${pyObj}.increment_attr('${attr}', ${delta})`);
+      continue;
+    }
+
     // [KOMPONEN: Assignments] [Writing Attributes]
     const assignMatch = line.match(/(?:assign\s+)?(.+?)\s*=\s*(.+);/);
     if (assignMatch) {
@@ -398,6 +563,7 @@ function OAL_TO_PYTHON_SIMULATION(oalCode, ownerKl, ownerId, contextType, baseIn
         const pyObj = obj === "self" ? "owner" : obj;
         pyLines.push(getIndent() + `${pyObj}.set_attr('${attr}', ${pyRhs})`);
       } else {
+        delete varKl[lhs];
         pyLines.push(getIndent() + `${lhs} = ${pyRhs}`);
       }
       continue;
@@ -407,6 +573,7 @@ function OAL_TO_PYTHON_SIMULATION(oalCode, ownerKl, ownerId, contextType, baseIn
     pyLines.push(getIndent() + `# Unparsed OAL: ${line}`);
   }
 
+  if (!pyLines.some((l) => !l.trim().startsWith("#"))) pyLines.push(baseIndent + "pass");
   return pyLines.join("\n");
 }
 // --- RUNTIME GENERATION ---
@@ -420,88 +587,216 @@ from __future__ import annotations
 import time
 import threading
 import uuid
-from typing import Any, Dict, List, Optional, TYPE_CHECKING
+from collections.abc import Mapping
+from typing import Any, Callable, Dict, List, Optional, Tuple, TYPE_CHECKING
+from runtime.context import RuntimeContext, current_context
+from runtime.unit_of_work import active_unit, _KEEP, _stripe
+from runtime.changefeed import ChangeFeed
+from runtime.tracing import Tracer
+from runtime.state_machine import NO_PAYLOAD
 
 class EventInstance:
     """Represents an OAL event with payload data"""
-    def __init__(self, name: str, target: Any, payload: Optional[Dict] = None):
+    __slots__ = ('name', 'target', 'payload', 'timestamp')
+
+    def __init__(self, name: str, target: Any, payload: Optional[Mapping] = None):
         self.name = name
         self.target = target
-        self.payload = payload or {}
+        self.payload = payload if payload is not None else NO_PAYLOAD
         self.timestamp = time.time()
     
     def __repr__(self):
         return f"<Event:{self.name} -> {self.target}>"
 
 class RuntimeServices:
-    """Core runtime services for OAL simulation"""
-    _timers: Dict[str, threading.Timer] = {} 
-    _current_time: float = time.time()
-    _message_bus: List[Dict] = []
+    """Core runtime services for OAL simulation, acting on the current runtime context"""
 
     @classmethod
     def send_message(cls, target: str, message: str, payload: Dict):
         """Send inter-component message"""
         print(f"[MSG] Sending {message} to {target} with {payload}")
-        cls._message_bus.append({'to': target, 'msg': message, 'data': payload})
+        current_context().message_bus.append({'to': target, 'msg': message, 'data': payload})
     
     @classmethod
     def create_timer(cls, instance: Any, duration: float, event_name: str) -> str:
         """Create a timer that dispatches event after duration"""
         timer_id = str(uuid.uuid4())
+        timers = current_context().timers
+        handoff = Tracer.handoff() if Tracer.enabled else None  # the expiry joins the trace that set the timer
         def callback():
             print(f"[TIMER] Expired. Dispatching {event_name} to {instance.kl}")
             if hasattr(instance, 'sm'):
-                instance.sm.dispatch(event_name, {})
-            if timer_id in cls._timers:
-                del cls._timers[timer_id]
+                with Tracer.resume(handoff):
+                    instance.sm.dispatch(event_name, NO_PAYLOAD)
+            timers.pop(timer_id, None)
 
         t = threading.Timer(float(duration), callback)
+        t.instance = instance  # armed timers keep their instance from being paged out
         t.start()
-        cls._timers[timer_id] = t
+        timers[timer_id] = t
         return timer_id
     
     @classmethod
     def cancel_timer(cls, timer_id: str):
         """Cancel an existing timer"""
-        if timer_id in cls._timers:
-            cls._timers[timer_id].cancel()
-            del cls._timers[timer_id]
+        timers = current_context().timers
+        if timer_id in timers:
+            timers[timer_id].cancel()
+            del timers[timer_id]
         
     @classmethod
     def current_date(cls) -> str:
         """Get current date in ISO format"""
-        return time.strftime("%Y-%m-%d", time.localtime(cls._current_time))
+        return time.strftime("%Y-%m-%d", time.localtime(current_context().current_time))
     
     @classmethod
     def current_time(cls) -> str:
         """Get current time"""
-        return time.strftime("%H:%M:%S", time.localtime(cls._current_time))
+        return time.strftime("%H:%M:%S", time.localtime(current_context().current_time))
     
     @classmethod
     def current_timestamp(cls) -> float:
         """Get current timestamp"""
-        return cls._current_time
+        return current_context().current_time
 
 class InstanceBase:
     """Base class for all model instances"""
     kl: str = "BASE"
+    _columns: Optional[Any] = None  # ColumnStore holding this class's numeric attributes
+    _row: Optional[int] = None  # this instance's row in _columns
+    _watched: frozenset = frozenset()  # attributes captured by ChangeFeed
+    _watch_lifecycle: bool = False  # whether ChangeFeed captures creates/deletes
+    _REF_SLOTS: Dict[str, str] = {}  # { rel_id: referential attribute holding the single related instance }
+    _ctx: RuntimeContext  # context the instance was created in
+    _seq: int = 0  # creation number within the context (instances newer than a snapshot are not preserved for it)
+    _pager: Optional[Any] = None  # Pager holding this instance's attributes and state machine while it is evicted
     
     def __init__(self, id: str, kl: str):
         self._id = id
         self.kl = kl
         self._attrs: Dict[str, Any] = {}
+        self._ctx = ctx = current_context()
+        self._seq = ctx.instance_seq = ctx.instance_seq + 1
+        if ctx.columns:
+            self._columns = ctx.columns.get(type(self).__name__)
         
     def __repr__(self):
         return f"<{self.kl}:{self._id}>"
 
+    def __getattr__(self, name: str) -> Any:
+        # Only reached when normal lookup fails: an evicted instance is missing _attrs and sm until faulted in
+        pager = self.__dict__.get('_pager')
+        if pager is not None and name in ('_attrs', 'sm') and pager.fault_in(self):
+            return object.__getattribute__(self, name)
+        raise AttributeError(f"'{type(self).__name__}' object has no attribute '{name}'")
+
     def set_attr(self, name: str, value: Any):
-        """Set attribute value"""
-        self._attrs[name] = value
+        """Set attribute value (buffered while a unit of work is open)"""
+        uow = active_unit.uow
+        if uow is not None:
+            uow.stage_attr(self, name, value)
+            return
+        if self._ctx.snapshots:
+            self._ctx.preserve_attrs(self)
+        watched = name in self._watched
+        if watched:
+            old = self._stored_attr(name)
+        if self._columns is not None and name in self._columns.arrays:
+            self._columns.set(self, name, value)
+        else:
+            self._attrs[name] = value
+        if watched:
+            ChangeFeed.attr_changed(self, name, old, value)
 
     def get_attr(self, name: str) -> Any:
-        """Get attribute value"""
+        """Get attribute value, seeing writes buffered on this thread"""
+        uow = active_unit.uow
+        if uow is not None:
+            pending = uow.attrs.get(self)
+            if pending is not None and name in pending:
+                return pending[name]
+            if uow.atomics:
+                staged = uow.atomics.get((self, name))
+                if staged is not None:
+                    return staged[0]
+        if self._columns is not None and name in self._columns.arrays:
+            return self._columns.get(self, name)
         return self._attrs.get(name)
+
+    # --- Atomic updates ---
+    # For counters that several threads update at once (like Product.stock).
+    # Inside a step they are buffered like set_attr, as the update itself
+    # rather than its result: the step sees its own outcome at once, nobody
+    # else sees anything until commit, and commit re-runs each update on the
+    # latest value under its stripe lock, failing the step if the outcome
+    # changed. Outside a step each is applied at once under its stripe lock.
+    # An attribute the step already wrote with set_attr is private to it until
+    # commit, so the update applies to that pending value instead. Plain
+    # set_attr writes are not ordered against atomic ones: once an attribute is
+    # updated atomically, update it that way everywhere.
+
+    def increment_attr(self, name: str, delta: Any = 1) -> Any:
+        """Atomically add delta (negative to subtract) to a numeric attribute; returns the new value"""
+        return self._update_attr(name, lambda value: value + delta)[1]
+
+    def decrement_attr_if_positive(self, name: str, amount: Any = 1) -> Optional[Any]:
+        """Atomically subtract amount unless that takes the attribute below zero; returns the new value, or None if refused"""
+        old, new = self._update_attr(name, lambda value: value - amount if value is not None and value >= amount else _KEEP)
+        return None if new is _KEEP else new
+
+    def compare_and_set_attr(self, name: str, expected: Any, value: Any) -> bool:
+        """Atomically set the attribute to value if it currently equals expected; returns whether it did"""
+        return self._update_attr(name, lambda current: value if current == expected else _KEEP)[1] is not _KEEP
+
+    def _update_attr(self, name: str, update: Callable[[Any], Any]) -> Tuple[Any, Any]:
+        """Apply update(old) -> new (or _KEEP) atomically; returns (old, new)"""
+        uow = active_unit.uow
+        if uow is not None:
+            pending = uow.attrs.get(self)
+            if pending is not None and name in pending:
+                old = pending[name]
+                new = update(old)
+                if new is not _KEEP:
+                    pending[name] = new
+                return old, new
+            return uow.stage_atomic(self, name, update)
+        held = ChangeFeed.hold()  # subscribers are called once the stripe is released
+        try:
+            with _stripe(self, name):
+                old = self._stored_attr(name)
+                new = update(old)
+                if new is not _KEEP:
+                    self._apply_attrs({name: new})
+        finally:
+            if held:
+                ChangeFeed.release()
+        ChangeFeed.deliver()
+        return old, new
+
+    def _stored_attr(self, name: str) -> Any:
+        """Committed attribute value, ignoring any open unit of work"""
+        if self._columns is not None and name in self._columns.arrays:
+            return self._columns.get(self, name)
+        return self._attrs.get(name)
+
+    def _apply_attrs(self, changes: Dict[str, Any]):
+        """Write a batch of committed attribute values"""
+        if self._ctx.snapshots:
+            self._ctx.preserve_attrs(self)
+        columns = self._columns
+        watched = self._watched
+        if columns is None and not watched:
+            self._attrs.update(changes)
+            return
+        for name, value in changes.items():
+            if name in watched:
+                old = self._stored_attr(name)
+            if columns is not None and name in columns.arrays:
+                columns.set(self, name, value)
+            else:
+                self._attrs[name] = value
+            if name in watched:
+                ChangeFeed.attr_changed(self, name, old, value)
     
     @classmethod
     def _create_instance(cls, id: Optional[str] = None) -> 'InstanceBase':
@@ -516,32 +811,70 @@ class InstanceBase:
   files["runtime/storage.py"] = `# runtime/storage.py
 from __future__ import annotations
 from collections import defaultdict
-from typing import Any, Dict, List, Optional
+from typing import Any, Dict, Iterator, List, Optional
+from runtime.context import current_context
+from runtime.unit_of_work import active_unit
+from runtime.columnar import ColumnStore, Predicate
+from runtime.catalog import Catalog, CatalogExtent
+from runtime.changefeed import ChangeFeed
 
 class ObjectStore:
-    """Central storage for all model instances"""
-    _store: Dict[str, Dict[str, Any]] = defaultdict(dict)  # { classname: {id: instance} }
+    """Storage for model instances of the current runtime context"""
 
     @classmethod
     def register(cls, class_name: str):
         """Register a class type in the store"""
-        cls._store.setdefault(class_name, {})
+        current_context().store.setdefault(class_name, {})
 
     @classmethod
     def create(cls, class_name: str, id: str, instance: Any):
         """Store an instance"""
-        cls._store[class_name][id] = instance
+        uow = active_unit.uow
+        if uow is not None:
+            uow.stage_create(class_name, id, instance)
+        else:
+            ctx = instance._ctx
+            if ctx.snapshots:
+                ctx.preserve_extent(class_name)
+            ctx.store[class_name][id] = instance
+            if instance._watch_lifecycle:
+                ChangeFeed.instance_created(class_name, instance)
+
+    @classmethod
+    def _extent(cls, class_name: str) -> Dict[str, Any]:
+        """Instances of a class as seen by the current thread"""
+        instances = current_context().store[class_name]
+        uow = active_unit.uow
+        if uow is not None and (class_name in uow.created or class_name in uow.deleted):
+            return uow.resolve_extent(class_name, instances)
+        return instances
 
     @classmethod
     def find(cls, class_name: str, id: str) -> Optional[Any]:
-        """Find instance by class name and id"""
-        return cls._store[class_name].get(id)
+        """Find instance by class name and id (faulting it back in if it was paged out)"""
+        inst = cls._extent(class_name).get(id)
+        if inst is not None and inst._pager is not None:
+            inst._pager.fault_in(inst)
+        return inst
+
+    @classmethod
+    def find_by(cls, class_name: str, attr: str, value: Any) -> Optional[Any]:
+        """Any instance whose attribute equals value (an index probe for catalog-backed classes)"""
+        extent = cls._extent(class_name)
+        if type(extent) is CatalogExtent:
+            return extent.catalog.find_by(attr, value)
+        return next((inst for inst in extent.values() if inst.get_attr(attr) == value), None)
 
     @classmethod
     def select_all(cls, class_name: str) -> List[Any]:
         """Select all instances of a class"""
-        return list(cls._store[class_name].values())
-    
+        return list(cls._extent(class_name).values())
+
+    @classmethod
+    def iter_all(cls, class_name: str) -> Iterator[Any]:
+        """Iterate the instances of a class without copying them (do not create or delete while iterating)"""
+        return iter(cls._extent(class_name).values())
+
     @classmethod
     def select_any(cls, class_name: str) -> Optional[Any]:
         """Select any one instance of a class"""
@@ -551,162 +884,4336 @@ class ObjectStore:
     @classmethod
     def delete(cls, class_name: str, id: str):
         """Delete an instance"""
-        if id in cls._store[class_name]:
-            del cls._store[class_name][id]
-    
+        uow = active_unit.uow
+        if uow is not None:
+            instance = cls._extent(class_name).get(id)
+            if instance is not None:
+                uow.stage_delete(class_name, id, instance)
+        else:
+            ctx = current_context()
+            instance = ctx.store[class_name].get(id)
+            if instance is None:
+                return
+            if ctx.snapshots:
+                ctx.preserve_extent(class_name)
+                ctx.preserve_attrs(instance)  # releasing its column row moves its values
+            del ctx.store[class_name][id]
+            if instance._watch_lifecycle:
+                ChangeFeed.instance_deleted(class_name, instance)
+            if class_name in ctx.columns:
+                ctx.columns[class_name].release(instance)
+
+    @classmethod
+    def _apply_create(cls, class_name: str, instances: Dict[str, Any]):
+        """Apply a batch of buffered creations"""
+        ctx = current_context()
+        if ctx.snapshots:
+            ctx.preserve_extent(class_name)
+        ctx.store[class_name].update(instances)
+        for instance in instances.values():
+            if instance._watch_lifecycle:
+                ChangeFeed.instance_created(class_name, instance)
+
+    @classmethod
+    def _apply_delete(cls, class_name: str, instances: Dict[str, Any]):
+        """Apply a batch of buffered deletions"""
+        ctx = current_context()
+        extent = ctx.store[class_name]
+        columns = ctx.columns.get(class_name)
+        if ctx.snapshots:
+            ctx.preserve_extent(class_name)
+            for instance in instances.values():
+                ctx.preserve_attrs(instance)
+        for id in instances:
+            instance = extent.pop(id, None)
+            if instance is None:
+                continue
+            if instance._watch_lifecycle:
+                ChangeFeed.instance_deleted(class_name, instance)
+            if columns is not None:
+                columns.release(instance)
+
     @classmethod
     def clear(cls, class_name: Optional[str] = None):
         """Clear all instances or instances of specific class"""
+        ctx = current_context()
+        if ctx.snapshots:
+            ctx.preserve_all()
         if class_name:
-            cls._store[class_name] = {}
+            ctx.store[class_name] = {}
+            if class_name in ctx.columns:
+                ctx.columns[class_name].reset()
         else:
-            cls._store = defaultdict(dict)
-    
+            ctx.store = defaultdict(dict)
+            for columns in ctx.columns.values():
+                columns.reset()
+
     @classmethod
     def count(cls, class_name: str) -> int:
         """Count instances of a class"""
-        return len(cls._store[class_name])
+        return len(cls._extent(class_name))
+
+    # --- Memory-mapped catalogs (read-mostly classes shared between processes) ---
+
+    @classmethod
+    def map_catalog(cls, model_class: type, path: str, shared_writes: bool = False) -> Catalog:
+        """Serve a class's instances from a catalog file published with write_catalog.
+
+        The class must have no instances in the current context yet; its
+        extent becomes the mapped catalog until the context is cleared.
+        """
+        class_name = model_class.__name__
+        ctx = current_context()
+        with ctx.lock:
+            if ctx.store.get(class_name):
+                raise ValueError(f"{class_name} already has instances in {ctx.name}; clear them before mapping a catalog")
+            catalog = Catalog(path, model_class, ctx, shared_writes)
+            if ctx.snapshots:
+                ctx.preserve_extent(class_name)
+            ctx.store[class_name] = CatalogExtent(catalog)
+        print(f"[CATALOG] {class_name} mapped from {path} ({len(catalog)} rows, generation {catalog.generation:x})")
+        return catalog
+
+    @classmethod
+    def refresh_catalogs(cls) -> List[str]:
+        """Pick up newly published catalog files; returns the classes that changed"""
+        return [class_name for class_name, extent in list(current_context().store.items())
+                if type(extent) is CatalogExtent and extent.catalog.refresh()]
+
+    # --- Columnar numeric attributes (optional, requires numpy) ---
+
+    @classmethod
+    def enable_columns(cls, model_class: type, columns: Optional[Dict[str, str]] = None, capacity: int = 1024) -> ColumnStore:
+        """Keep a class's numeric attributes in NumPy columns.
+
+        columns maps attribute name to dtype and defaults to the class's
+        generated _NUMERIC_ATTRS. Existing instances are moved into rows.
+        """
+        class_name = model_class.__name__
+        columns = columns if columns is not None else getattr(model_class, '_NUMERIC_ATTRS', {})
+        if not columns:
+            raise ValueError(f"{class_name} has no numeric attributes to store as columns")
+        store = ColumnStore(model_class, columns, capacity)
+        ctx = current_context()
+        with ctx.lock:
+            ctx.columns[class_name] = store
+            for instance in ctx.store[class_name].values():
+                if ctx.snapshots:
+                    ctx.preserve_attrs(instance)
+                instance._columns = store
+                store.allocate(instance)
+                for name in columns:
+                    if name in instance._attrs:
+                        store.set(instance, name, instance._attrs.pop(name))
+        return store
+
+    @classmethod
+    def column_filter(cls, class_name: str, attr: str, op: str, value: Any) -> List[Any]:
+        """Vectorized select: instances where \`attr op value\`"""
+        return current_context().columns[class_name].filter((attr, op, value))
+
+    @classmethod
+    def column_aggregate(cls, class_name: str, attr: str, fn: str = 'sum', where: Optional[Predicate] = None) -> Any:
+        """Vectorized sum | mean | min | max | count of a numeric attribute"""
+        return current_context().columns[class_name].aggregate(attr, fn, where)
+
+    @classmethod
+    def column_update(cls, class_name: str, attr: str, value: Any, where: Optional[Predicate] = None, mode: str = 'set') -> int:
+        """Vectorized bulk update (mode 'set' or 'add'); applied immediately, outside any unit of work"""
+        ctx = current_context()
+        store = ctx.columns[class_name]
+        with ctx.lock:
+            if ctx.snapshots:
+                for instance in store.filter(where):
+                    ctx.preserve_attrs(instance)
+            if attr not in store.model_class._watched:
+                return store.update(attr, value, where, mode)
+            touched = store.filter(where)
+            before = [instance._stored_attr(attr) for instance in touched]
+            count = store.update(attr, value, where, mode)
+            held = ChangeFeed.hold()
+            try:
+                for instance, old in zip(touched, before):
+                    ChangeFeed.attr_changed(instance, attr, old, instance._stored_attr(attr))
+            finally:
+                if held:
+                    ChangeFeed.release()
+        ChangeFeed.deliver()
+        return count
 `;
 
   // [KOMPONEN: State Machine]
   files["runtime/state_machine.py"] = `# runtime/state_machine.py
 from __future__ import annotations
-from typing import Any, Callable, Dict, Optional, Tuple
+from collections.abc import Mapping
+from threading import get_ident
+from typing import Any, Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+from runtime.context import current_context
+from runtime.unit_of_work import UnitOfWork, active_unit
+from runtime.changefeed import ChangeFeed
+from runtime.tracing import Tracer
+
+# (guard, action, next state index); guard and action are called as fn(owner, owner, payload)
+Transition = Tuple[Optional[Callable], Optional[Callable], Optional[int]]
+
+class EventPayload:
+    """Parameters of one event, laid out in slots by a generated subclass (P_<event> on the model class)
+
+    It reads like a read-only mapping, so guards and actions that take dict
+    payloads (payload.get('p_productCode')) work with either. A subclass can
+    pool its instances (see pool()): acquire() then reuses released payloads
+    instead of allocating, and the sender releases a payload once its dispatch
+    returns. Actions must copy out any value they keep.
+    """
+    __slots__ = ()
+    _FIELDS: Tuple[str, ...] = ()
+    _free: Optional[List['EventPayload']] = None  # released instances, when this layout is pooled
+    _pool_size: int = 0
+
+    @classmethod
+    def acquire(cls, *values: Any) -> 'EventPayload':
+        """A payload holding values, reused from the pool when there is one"""
+        free = cls._free
+        if free:
+            try:
+                payload = free.pop()
+            except IndexError:  # another thread took the last one
+                return cls(*values)
+            payload.__init__(*values)
+            return payload
+        return cls(*values)
+
+    def release(self):
+        """Return the payload to its layout's pool (no-op when the layout is not pooled)"""
+        free = self._free
+        if free is not None and len(free) < self._pool_size:
+            free.append(self)
+
+    @classmethod
+    def pool(cls, size: int = 64):
+        """Pool up to size released payloads of this layout (0 turns pooling off); on EventPayload itself, of every layout"""
+        layouts = [cls] if cls._FIELDS else _layouts(cls)
+        for layout in layouts:
+            layout._free = [] if size > 0 else None
+            layout._pool_size = size
+
+    def get(self, name: str, default: Any = None) -> Any:
+        if name in self._FIELDS:
+            return getattr(self, name, default)
+        return default
+
+    def __getitem__(self, name: str) -> Any:
+        if name in self._FIELDS:
+            return getattr(self, name)
+        raise KeyError(name)
+
+    def __contains__(self, name: Any) -> bool:
+        return name in self._FIELDS
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._FIELDS)
+
+    def __len__(self) -> int:
+        return len(self._FIELDS)
+
+    def keys(self):
+        return self._FIELDS
+
+    def values(self) -> List[Any]:
+        return [getattr(self, name, None) for name in self._FIELDS]
+
+    def items(self) -> List[Tuple[str, Any]]:
+        return [(name, getattr(self, name, None)) for name in self._FIELDS]
+
+    def __eq__(self, other: Any) -> bool:
+        if isinstance(other, Mapping):
+            return dict(self.items()) == dict(other.items())
+        return NotImplemented
+
+    __hash__ = None  # mutable while pooled
+
+    def __repr__(self):
+        return f"{type(self).__name__}({', '.join(f'{k}={v!r}' for k, v in self.items())})"
+
+Mapping.register(EventPayload)
+
+def _layouts(cls: type) -> List[type]:
+    found = []
+    for sub in cls.__subclasses__():
+        if sub._FIELDS:
+            found.append(sub)
+        found.extend(_layouts(sub))
+    return found
+
+# Payload of events without parameters: shared, nothing to allocate
+NO_PAYLOAD = EventPayload()
+
+class StateModel:
+    """Integer-encoded states and events with a dense transition table, shared by all instances of a class"""
+
+    def __init__(self, states: Sequence[str], events: Sequence[str], table: Sequence[Sequence[Optional[Transition]]],
+                 state_attr: Optional[str] = 'currentState'):
+        self.states = tuple(states)
+        self.events = tuple(events)
+        self.state_index: Dict[str, int] = {name: i for i, name in enumerate(self.states)}
+        self.event_index: Dict[str, int] = {name: i for i, name in enumerate(self.events)}
+        self.table = tuple(tuple(row) for row in table)  # table[state][event] -> Transition or None
+        # steps[state][event] -> the (state, event, next state) history entry of that transition, built once
+        # and shared by every machine of the class so recording history allocates nothing
+        self.steps = tuple(tuple((s, e, t[2]) if t is not None else None for e, t in enumerate(row))
+                           for s, row in enumerate(self.table))
+        self.state_attr = state_attr  # attribute mirroring the current state name, synced on commit
+
+    @classmethod
+    def from_dict(cls, transition_table: Dict) -> 'StateModel':
+        """Encode a {state: {event: (guard, action, next_state)}} table of bound methods"""
+        states: List[str] = []
+        events: List[str] = []
+        for state, transitions in transition_table.items():
+            if state not in states:
+                states.append(state)
+            for event, (_, _, next_state) in transitions.items():
+                if event not in events:
+                    events.append(event)
+                if next_state and next_state not in states:
+                    states.append(next_state)
+        table = [[None] * len(events) for _ in states]
+        for state, transitions in transition_table.items():
+            for event, (guard_fn, action_fn, next_state) in transitions.items():
+                table[states.index(state)][events.index(event)] = (
+                    _unbound(guard_fn),
+                    _unbound(action_fn),
+                    states.index(next_state) if next_state else None,
+                )
+        return cls(states, events, table)
+
+    def step(self, state: int, event: int, next_state: Optional[int]) -> Tuple[int, int, Optional[int]]:
+        """The shared history entry for a transition (a new tuple if the table has no such transition)"""
+        entry = self.steps[state][event]
+        if entry is not None and entry[2] == next_state:
+            return entry
+        return (state, event, next_state)
+
+def _unbound(fn: Optional[Callable]) -> Optional[Callable]:
+    """Adapt an fn(owner, payload) callable to the fn(self, owner, payload) table convention"""
+    if fn is None:
+        return None
+    return lambda self, owner, payload: fn(owner, payload)
 
 class StateMachine:
     """State machine implementation for xtUML classes"""
-    
-    def __init__(self, owner: Any, initial_state: str, transition_table: Dict):
+    log_transitions: bool = True  # print init/transition/ignored lines
+
+    def __init__(self, owner: Any, initial_state: str, model: Any):
+        if isinstance(model, dict):
+            model = StateModel.from_dict(model)
+        if initial_state not in model.state_index:
+            raise ValueError(f"[{owner.kl}:{owner._id}] Unknown initial state '{initial_state}'")
         self.owner = owner
-        self.state = initial_state
-        self.table = transition_table
-        self._history: list = []
-        print(f"[{owner.kl}:{owner._id}] SM Init: {self.state}")
+        self.model = model
+        self.index = model.state_index[initial_state]
+        self._history: list = []  # (from index, event index, to index)
+        if self.log_transitions:
+            print(f"[{owner.kl}:{owner._id}] SM Init: {initial_state}")
 
-    def dispatch(self, event: str, payload: Optional[Dict] = None) -> bool:
+    @classmethod
+    def attach(cls, owner: Any, model: StateModel, index: int) -> 'StateMachine':
+        """Build a machine already in state \`index\`, skipping validation and the init log (bulk loading)"""
+        sm = cls.__new__(cls)
+        sm.owner = owner
+        sm.model = model
+        sm.index = index
+        sm._history = []
+        return sm
+
+    @property
+    def state(self) -> str:
+        """Current state name"""
+        return self.model.states[self.index]
+
+    @state.setter
+    def state(self, name: str):
+        self.index = self.model.state_index[name]
+
+    def dispatch(self, event: str, payload: Optional[Mapping] = None) -> bool:
+        """Dispatch an event by name"""
+        event_index = self.model.event_index.get(event)
+        if event_index is None:
+            if self.log_transitions:
+                print(f"[{self.owner.kl}] Ignored event {event} in state {self.state}")
+            return False
+        return self.dispatch_index(event_index, payload)
+
+    def dispatch_index(self, event: int, payload: Optional[Mapping] = None) -> bool:
       """
-      Dispatch an event to the state machine.
+      Dispatch an event by its index in the class's event encoding.
       payload contains event parameters (rcvd_evt data).
+      The transition and its action run as one unit of work: attribute,
+      relationship, create and delete changes are applied together when the
+      step completes and discarded if the action raises. A step not sent by
+      an action is counted in its context's StepGate until it has committed,
+      so reload_models and Pager.evict can wait for it.
       """
       if payload is None:
-        payload = {}
-            
-      state_transitions = self.table.get(self.state, {})
-      if event in state_transitions:
-        guard_fn, action_fn, next_state = state_transitions[event]
-            
+        payload = NO_PAYLOAD
+      ctx = getattr(self.owner, '_ctx', None)
+      if ctx is not None and ctx is not current_context():
+        return self._step_in(ctx, event, payload)
+      if active_unit.uow is not None:  # sent by an action: joins the unit of the step that sent it
+        return self._traced_step(event, payload) if Tracer.enabled else self._step(event, payload)
+      # A root step: counted in the context's step gate before its transition is looked up
+      me = get_ident()
+      gate = (ctx or current_context()).steps
+      active = gate.active
+      active.append(me)  # StepGate.enter, inlined
+      if gate.closed:
+        gate.admit(me)
+      try:
+        attrs = self.owner.__dict__
+        sm = self if attrs.get('sm', self) is self and '_pager' not in attrs else self._resolved()
+        if Tracer.enabled:
+          return sm._traced_step(event, payload)
+        transition = sm.model.table[sm.index][event]  # _step, inlined on the untraced path
+        if transition is not None:
+          return sm._fire(transition, event, payload, sm.log_transitions)
+        if sm.log_transitions:
+          print(f"[{sm.owner.kl}] Ignored event {sm.model.events[event]} in state {sm.state}")
+        return False
+      finally:
+        active.remove(me)
+
+    def _step_in(self, ctx: Any, event: int, payload: Mapping) -> bool:
+      """Run a step in the owner's runtime context, as its own unit of work"""
+      outer = active_unit.uow
+      active_unit.uow = None
+      try:
+        with ctx:
+          return self.dispatch_index(event, payload)
+      finally:
+        active_unit.uow = outer
+
+    def _resolved(self) -> 'StateMachine':
+      """The owner's machine now: another one if the owner was evicted (or faulted back in) since this one was read"""
+      attrs = self.owner.__dict__
+      if attrs.get('sm', self) is self and '_pager' not in attrs:
+        return self
+      return self.owner.sm
+
+    def _traced_step(self, event: int, payload: Mapping) -> bool:
+      """Run a step inside a dispatch span"""
+      span = Tracer.begin('dispatch', 'dispatch', root=True)
+      if span is None:
+        return self._step(event, payload)
+      if span:
+        span.name = f"{self.owner.kl}.{self.model.events[event]}"
+        span.args = {'id': self.owner._id, 'from': self.state}
+      handled = False
+      try:
+        handled = self._step(event, payload)
+        return handled
+      finally:
+        Tracer.end(span, {'to': self.state, 'handled': handled} if span else None)
+
+    def _step(self, event: int, payload: Mapping) -> bool:
+      transition = self.model.table[self.index][event]
+      if transition is not None:
+        return self._fire(transition, event, payload, self.log_transitions)
+      else:
+        if self.log_transitions:
+          print(f"[{self.owner.kl}] Ignored event {self.model.events[event]} in state {self.state}")
+        return False
+
+    def _fire(self, transition: Transition, event: int, payload: Mapping, log: bool) -> bool:
+        """Take a transition already looked up for the current state (guard, action, commit)"""
+        guard_fn, action_fn, next_index = transition
+        owner = self.owner
+
         # Check guard condition if exists
-        if guard_fn and not guard_fn(self.owner, payload):
-          print(f"[{self.owner.kl}:{self.owner._id}] Guard failed for {event}")
+        if guard_fn and not guard_fn(owner, owner, payload):
+          if log:
+            print(f"[{owner.kl}:{owner._id}] Guard failed for {self.model.events[event]}")
           return False
-            
-        print(f"[{self.owner.kl}:{self.owner._id}] Transition: {self.state} -> {next_state} via {event}")
-            
-        # Record history
-        self._history.append((self.state, event, next_state))
-            
-        # Apply state change before action so self-generated events see the target state
-        prior_state = self.state
-        if next_state:
-          self.state = next_state
-          self.owner.set_attr('currentState', next_state)
-
-        # Execute action with payload
-        if action_fn:
-          try:
-            action_fn(self.owner, payload)
-          except Exception as e:
-            print(f"[{self.owner.kl}:{self.owner._id}] Action error: {e}")
-                    
+
+        if log:
+          next_state = self.model.states[next_index] if next_index is not None else None
+          print(f"[{owner.kl}:{owner._id}] Transition: {self.state} -> {next_state} via {self.model.events[event]}")
+
+        # Events generated by an action join the unit of the outermost dispatch
+        uow, owned = UnitOfWork.begin()
+        uow.track(self)
+        try:
+          # Record history
+          self._history.append(self.model.steps[self.index][event] or (self.index, event, next_index))
+
+          # Apply state change before action so self-generated events see the target state
+          if next_index is not None:
+            self.index = next_index
+
+          # Execute action with payload
+          if action_fn:
+            span = Tracer.begin('action', 'action') if Tracer.enabled else None
+            if span is None:
+              action_fn(owner, owner, payload)
+            else:
+              span.name = getattr(action_fn, '__name__', 'action')
+              try:
+                action_fn(owner, owner, payload)
+              finally:
+                Tracer.end(span)
+        except Exception as e:
+          if not owned:
+            raise
+          uow.rollback()
+          print(f"[{owner.kl}:{owner._id}] Action error: {e} (step rolled back)")
+          return False
+        else:
+          if owned:
+            try:
+              uow.commit()
+            except Exception as e:
+              print(f"[{owner.kl}:{owner._id}] Commit error: {e} (step rolled back)")
+              return False
+        finally:
+          UnitOfWork.end(owned)
+
+        # Change records of the step go out once it is committed and the lock released
+        if owned and ChangeFeed._subscribers:
+          ChangeFeed.deliver()
+
         # If action changed state, keep it; otherwise state already set to next_state
         return True
-      else:
-        print(f"[{self.owner.kl}] Ignored event {event} in state {self.state}")
-        return False
-    
+
     def get_current_state(self) -> str:
         """Get current state name"""
-        return self.state
-    
+        return self.model.states[self.index]
+
     def get_history(self) -> list:
-        """Get transition history"""
-        return self._history.copy()
+        """Get transition history as (from state, event, to state) names"""
+        states, events = self.model.states, self.model.events
+        return [(states[s], events[e], states[n] if n is not None else None) for s, e, n in self._history]
 `;
 
   // [KOMPONEN: Relationship]
   files["runtime/relationship.py"] = `# runtime/relationship.py
 from __future__ import annotations
-from typing import Any, Dict, List, Tuple, Optional
-
-# Global relationship storage
-_LINKS: Dict[str, List[Tuple[Any, Any]]] = {}
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+from runtime.context import RuntimeContext, current_context
+from runtime.unit_of_work import active_unit
+from runtime.tracing import traced
+from runtime.catalog import CatalogExtent
 
+@traced('relationship')
 def relate(rel_id: str, inst1: Any, inst2: Any) -> bool:
     """Create a relationship link between two instances"""
     if inst1 is None or inst2 is None:
         print(f"[RELATE] Warning: Cannot relate None instances across {rel_id}")
         return False
-        
-    link = (inst1, inst2)
-    if link not in _LINKS.setdefault(rel_id, []):
-        _LINKS[rel_id].append(link)
-        print(f"[RELATE] {inst1.kl}:{inst1._id} linked to {inst2.kl}:{inst2._id} across {rel_id}")
+
+    uow = active_unit.uow
+    if uow is not None:
+        if inst2 in _related(rel_id, inst1):
+            return False
+        uow.stage_link(rel_id, inst1, inst2, True)
         return True
-    return False
+    return _link(rel_id, inst1, inst2)
 
+@traced('relationship')
 def unrelate(rel_id: str, inst1: Any, inst2: Any) -> bool:
     """Remove a relationship link between two instances"""
     if inst1 is None or inst2 is None:
         return False
-        
+
+    uow = active_unit.uow
+    if uow is not None:
+        if inst2 not in _related(rel_id, inst1):
+            return False
+        uow.stage_link(rel_id, inst1, inst2, False)
+        return True
+    return _unlink(rel_id, inst1, inst2)
+
+def _link(rel_id: str, inst1: Any, inst2: Any) -> bool:
+    """Store a link immediately"""
+    ctx = inst1._ctx
     link = (inst1, inst2)
-    reverse_link = (inst2, inst1)
-    
-    if rel_id in _LINKS:
-        if link in _LINKS[rel_id]:
-            _LINKS[rel_id].remove(link)
-            print(f"[UNRELATE] {inst1.kl}:{inst1._id} unlinked from {inst2.kl}:{inst2._id} across {rel_id}")
-            return True
-        elif reverse_link in _LINKS[rel_id]:
-            _LINKS[rel_id].remove(reverse_link)
-            print(f"[UNRELATE] {inst2.kl}:{inst2._id} unlinked from {inst1.kl}:{inst1._id} across {rel_id}")
-            return True
-    return False
-    
+    links = ctx.links.get(rel_id)
+    if links is None:
+        links = ctx.links[rel_id] = {}
+    if link in links:
+        return False
+    if ctx.snapshots:
+        ctx.preserve_links(rel_id, inst1, inst2)
+    links[link] = None
+    partners = ctx.partners.get(rel_id)
+    if partners is None:
+        partners = ctx.partners[rel_id] = {}
+    _add_partner(rel_id, partners, inst1, inst2)
+    if inst2 is not inst1:
+        _add_partner(rel_id, partners, inst2, inst1)
+    print(f"[RELATE] {inst1.kl}:{inst1._id} linked to {inst2.kl}:{inst2._id} across {rel_id}")
+    return True
+
+def relate_many(rel_id: str, pairs: Iterable[Tuple[Any, Any]]) -> int:
+    """Link many pairs in one pass, outside any unit of work (bulk loading).
+
+    Same result as relating each pair, without the per-link log line.
+    Pairs already linked are skipped; returns the number of new links.
+    """
+    if active_unit.uow is not None:
+        raise RuntimeError("relate_many cannot run inside a unit of work")
+    created = 0
+    ctx = links = partners = None
+    for inst1, inst2 in pairs:
+        if inst1._ctx is not ctx:
+            ctx = inst1._ctx
+            links = ctx.links.setdefault(rel_id, {})
+            partners = ctx.partners.setdefault(rel_id, {})
+        link = (inst1, inst2)
+        if link in links:
+            continue
+        if ctx.snapshots:
+            ctx.preserve_links(rel_id, inst1, inst2)
+        links[link] = None
+        _add_partner(rel_id, partners, inst1, inst2)
+        if inst2 is not inst1:
+            _add_partner(rel_id, partners, inst2, inst1)
+        created += 1
+    print(f"[RELATE] {created} links across {rel_id}")
+    return created
+
+def _unlink(rel_id: str, inst1: Any, inst2: Any) -> bool:
+    """Drop a link immediately, in either direction"""
+    ctx = inst1._ctx
+    links = ctx.links.get(rel_id)
+    if not links:
+        return False
+    if ctx.snapshots and ((inst1, inst2) in links or (inst2, inst1) in links):
+        ctx.preserve_links(rel_id, inst1, inst2)
+    if (inst1, inst2) in links:
+        del links[(inst1, inst2)]
+        print(f"[UNRELATE] {inst1.kl}:{inst1._id} unlinked from {inst2.kl}:{inst2._id} across {rel_id}")
+    elif (inst2, inst1) in links:
+        del links[(inst2, inst1)]
+        print(f"[UNRELATE] {inst2.kl}:{inst2._id} unlinked from {inst1.kl}:{inst1._id} across {rel_id}")
+    else:
+        return False
+    partners = ctx.partners[rel_id]
+    _drop_partner(rel_id, partners, inst1, inst2)
+    if inst2 is not inst1:
+        _drop_partner(rel_id, partners, inst2, inst1)
+    return True
+
+def _add_partner(rel_id: str, partners: Dict[Any, List[Any]], inst: Any, other: Any):
+    """Add other to inst's partners; inst's reference slot holds the first of them, as select_one_related returns"""
+    related = partners.get(inst)
+    if related is None:
+        partners[inst] = [other]
+        slot = inst._REF_SLOTS.get(rel_id)
+        if slot is not None:
+            inst._attrs[slot] = other
+    else:
+        related.append(other)
+
+def _drop_partner(rel_id: str, partners: Dict[Any, List[Any]], inst: Any, other: Any):
+    """Remove other from inst's partners; repoint or empty inst's reference slot if it held other"""
+    related = partners[inst]
+    related.remove(other)
+    if not related:
+        del partners[inst]
+    slot = inst._REF_SLOTS.get(rel_id)
+    if slot is not None and inst._attrs.get(slot) is other:
+        inst._attrs[slot] = related[0] if related else None
+
+@traced('relationship')
 def select_related(rel_id: str, source_instance: Any) -> List[Any]:
     """Select all instances related to source across relationship"""
     if source_instance is None:
         return []
-        
-    results = []
-    for inst1, inst2 in _LINKS.get(rel_id, []):
-        if inst1._id == source_instance._id:
-            results.append(inst2)
-        elif inst2._id == source_instance._id:
-            results.append(inst1)
+    return _related(rel_id, source_instance)
+
+def _related(rel_id: str, source_instance: Any) -> List[Any]:
+    """select_related without its span, for the runtime's own reads (relate, unrelate, select_one_related)"""
+    partners = source_instance._ctx.partners.get(rel_id)
+    results = list(partners.get(source_instance, ())) if partners else []
+    uow = active_unit.uow
+    if uow is not None and rel_id in uow.links:
+        return uow.resolve_related(rel_id, source_instance, results)
     return results
 
 def select_one_related(rel_id: str, source_instance: Any) -> Optional[Any]:
-    """Select one instance related to source across relationship"""
-    related = select_related(rel_id, source_instance)
+    """Select one instance related to source across relationship.
+
+    Single-valued ends (those with a reference slot) are read straight from
+    the slot unless the calling unit of work has pending links across rel_id.
+    """
+    if source_instance is None:
+        return None
+    slot = source_instance._REF_SLOTS.get(rel_id)
+    if slot is not None:
+        uow = active_unit.uow
+        if uow is None or rel_id not in uow.links:
+            return source_instance._attrs.get(slot)
+    related = _related(rel_id, source_instance)
     return related[0] if related else None
 
 def is_related(rel_id: str, inst1: Any, inst2: Any) -> bool:
     """Check if two instances are related"""
     if inst1 is None or inst2 is None:
         return False
-    link = (inst1, inst2)
-    reverse = (inst2, inst1)
-    links = _LINKS.get(rel_id, [])
-    return link in links or reverse in links
+    uow = active_unit.uow
+    if uow is not None and rel_id in uow.links:
+        return inst2 in select_related(rel_id, inst1)
+    links = inst1._ctx.links.get(rel_id, ())
+    return (inst1, inst2) in links or (inst2, inst1) in links
 
 def clear_relationships(rel_id: Optional[str] = None):
     """Clear all relationships or specific relationship"""
-    global _LINKS
+    ctx = current_context()
+    if ctx.snapshots:
+        ctx.preserve_all()
+    dropped = {rel_id: ctx.links.get(rel_id, {})} if rel_id else ctx.links
+    for rid, links in dropped.items():
+        for inst1, inst2 in links:
+            for inst in (inst1, inst2):
+                slot = inst._REF_SLOTS.get(rid)
+                if slot is not None:
+                    inst._attrs[slot] = None
     if rel_id:
-        _LINKS[rel_id] = []
+        ctx.links[rel_id] = {}
+        ctx.partners.pop(rel_id, None)
     else:
-        _LINKS = {}
+        ctx.links = {}
+        ctx.partners = {}
+
+def rebuild_ref_slots(ctx: Optional[RuntimeContext] = None):
+    """Recompute every reference slot of a context from its links (e.g. after the slot layout changed)"""
+    ctx = ctx or current_context()
+    if ctx.snapshots:
+        ctx.preserve_all()
+    for extent in ctx.store.values():
+        # A catalog's rows are not instances until used; paged stubs rebuild their slots when faulted in
+        instances = extent.catalog._instances.values() if type(extent) is CatalogExtent else extent.values()
+        for inst in list(instances):
+            if inst._pager is None:
+                for slot in inst._REF_SLOTS.values():
+                    inst._attrs[slot] = None
+    for rel_id, partners in ctx.partners.items():
+        for inst, related in partners.items():
+            slot = inst._REF_SLOTS.get(rel_id)
+            if slot is not None and inst._pager is None:
+                inst._attrs[slot] = related[0]
+`;
+
+  // [KOMPONEN: Unit of Work]
+  files["runtime/unit_of_work.py"] = `# runtime/unit_of_work.py
+from __future__ import annotations
+import threading
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from runtime.context import current_context
+
+class _ActiveUnit(threading.local):
+    """Per-thread pointer to the unit of work of the running dispatch"""
+    uow: Optional['UnitOfWork'] = None
+    spare: Optional['UnitOfWork'] = None  # emptied unit kept for reuse by the next step
+
+active_unit = _ActiveUnit()
+
+_KEEP = object()  # returned by an atomic update that leaves the value as it is
+
+# Atomic attribute updates lock one stripe, chosen by instance and attribute name,
+# so updates of different counters rarely wait on each other
+_STRIPES = tuple(threading.Lock() for _ in range(64))
+
+def _stripe_index(inst: Any, name: str) -> int:
+    return ((id(inst) >> 4) ^ hash(name)) & 63
+
+def _stripe(inst: Any, name: str) -> threading.Lock:
+    return _STRIPES[_stripe_index(inst, name)]
+
+def current_unit() -> Optional['UnitOfWork']:
+    """Get the unit of work open on this thread, if any"""
+    return active_unit.uow
+
+class UnitOfWork:
+    """Buffers the changes of one run-to-completion step"""
+
+    def __init__(self):
+        self.attrs: Dict[Any, Dict[str, Any]] = {}  # { instance: {name: value} }
+        self.links: Dict[str, List[Tuple[bool, Any, Any]]] = {}  # { rel_id: [(linked, inst1, inst2)] }
+        self.created: Dict[str, Dict[str, Any]] = {}  # { classname: {id: instance} }
+        self.deleted: Dict[str, Dict[str, Any]] = {}  # { classname: {id: instance} }
+        self.machines: Dict[Any, Tuple[int, int]] = {}  # { sm: (state index, history length) }
+        self.atomics: Dict[Tuple[Any, str], List[Any]] = {}  # { (instance, name): [value the step sees, [(update, applied)]] }
+        self.dropped: Dict[Any, None] = {}  # instances created and deleted within the step
+
+    @staticmethod
+    def begin() -> Tuple['UnitOfWork', bool]:
+        """Open a unit on this thread or join the one already open"""
+        uow = active_unit.uow
+        if uow is not None:
+            return uow, False
+        uow = active_unit.spare or UnitOfWork()
+        active_unit.spare = None
+        active_unit.uow = uow
+        return uow, True
+
+    @staticmethod
+    def end(owned: bool):
+        """Close the unit if this caller opened it (kept for reuse only if it was left empty)"""
+        if owned:
+            uow = active_unit.uow
+            active_unit.uow = None
+            if uow is not None and uow._is_empty():
+                active_unit.spare = uow
+
+    def _is_empty(self) -> bool:
+        return not (self.attrs or self.links or self.created or self.deleted or self.machines or self.atomics or self.dropped)
+
+    def track(self, sm: Any):
+        """Remember a state machine's position so rollback can restore it"""
+        if sm not in self.machines:
+            self.machines[sm] = (sm.index, len(sm._history))
+
+    def stage_attr(self, inst: Any, name: str, value: Any):
+        """Buffer an attribute write"""
+        if self.atomics:
+            self.atomics.pop((inst, name), None)  # a plain write replaces the step's atomic updates
+        pending = self.attrs.get(inst)
+        if pending is None:
+            self.attrs[inst] = {name: value}
+        else:
+            pending[name] = value
+
+    def stage_atomic(self, inst: Any, name: str, update: Callable[[Any], Any]) -> Tuple[Any, Any]:
+        """Buffer an atomic update, run on the value this step sees; returns (old, new or _KEEP)"""
+        entry = self.atomics.get((inst, name))
+        if entry is None:
+            entry = self.atomics[(inst, name)] = [inst._stored_attr(name), []]
+        old = entry[0]
+        new = update(old)
+        entry[1].append((update, new is not _KEEP))
+        if new is not _KEEP:
+            entry[0] = new
+        return old, new
+
+    def stage_link(self, rel_id: str, inst1: Any, inst2: Any, linked: bool):
+        """Buffer a relate (linked=True) or unrelate (linked=False)"""
+        ops = self.links.get(rel_id)
+        if ops is None:
+            self.links[rel_id] = [(linked, inst1, inst2)]
+        else:
+            ops.append((linked, inst1, inst2))
+
+    def stage_create(self, class_name: str, id: str, instance: Any):
+        """Buffer an instance creation"""
+        deleted = self.deleted.get(class_name)
+        if deleted:
+            deleted.pop(id, None)
+        if self.dropped:
+            self.dropped.pop(instance, None)
+        created = self.created.get(class_name)
+        if created is None:
+            self.created[class_name] = {id: instance}
+        else:
+            created[id] = instance
+
+    def stage_delete(self, class_name: str, id: str, instance: Any):
+        """Buffer an instance deletion"""
+        created = self.created.get(class_name)
+        if created and created.pop(id, None) is not None:
+            self.dropped[instance] = None  # never stored: nothing staged for it is applied
+        else:
+            self.deleted.setdefault(class_name, {})[id] = instance
+
+    def resolve_extent(self, class_name: str, instances: Dict[str, Any]) -> Dict[str, Any]:
+        """Overlay pending creates and deletes on a committed extent"""
+        merged = dict(instances)
+        merged.update(self.created.get(class_name, {}))
+        for id in self.deleted.get(class_name, {}):
+            merged.pop(id, None)
+        return merged
+
+    def resolve_related(self, rel_id: str, source_instance: Any, results: List[Any]) -> List[Any]:
+        """Overlay pending relates and unrelates on committed navigation results"""
+        for linked, inst1, inst2 in self.links[rel_id]:
+            if inst1._id == source_instance._id:
+                other = inst2
+            elif inst2._id == source_instance._id:
+                other = inst1
+            else:
+                continue
+            if linked and other not in results:
+                results.append(other)
+            elif not linked and other in results:
+                results.remove(other)
+        return results
+
+    def commit(self):
+        """Apply all buffered changes in one batch.
+
+        Either the whole step is applied or none of it: if applying raises,
+        what was already applied is undone, the tracked state machines are
+        restored and the error is re-raised for the dispatcher to report.
+        Atomic updates are re-run here on the latest committed values, under
+        their stripe locks; one that no longer has the outcome the step saw
+        (a decrement now refused, say) fails the commit the same way.
+        Undo records are only kept when something can fail partway (atomic
+        updates, column stores); a step that only changed state takes no lock.
+        """
+        if not (self.attrs or self.links or self.created or self.deleted or self.atomics or self.dropped):
+            # Only state changes: mirroring them into state attributes cannot fail halfway,
+            # so there is nothing to lock, hold back or undo
+            try:
+                if self.machines:
+                    self._sync_states(None)
+            except BaseException:
+                self._restore()
+                raise
+            finally:
+                self.machines.clear()
+            return
+        if self.dropped:
+            self._leave_out_dropped()
+        held = ChangeFeed.watching and ChangeFeed.hold()  # records reach the feed only if the whole step applies
+        published = False
+        try:
+            ctx = current_context()
+            with ctx.lock:
+                if self.atomics or ctx.columns:
+                    self._apply_or_undo()
+                else:
+                    self._apply(None)  # plain dict writes: nothing can fail partway, so nothing to undo
+                ctx.version += 1
+            published = True
+        except BaseException:
+            self._restore()
+            raise
+        finally:
+            if held:
+                ChangeFeed.release(published)
+            self._reset()
+
+    def _apply_or_undo(self):
+        """Apply under the stripe locks of the atomic updates, taking back what was applied if anything raises"""
+        stripes = [_STRIPES[i] for i in sorted({_stripe_index(inst, name) for inst, name in self.atomics})]
+        for stripe in stripes:
+            stripe.acquire()
+        undo: List[Tuple[Any, ...]] = []
+        try:
+            self._apply(undo)
+        except BaseException:
+            self._undo(undo)
+            raise
+        finally:
+            for stripe in reversed(stripes):
+                stripe.release()
+
+    def _leave_out_dropped(self):
+        """Discard what was staged for instances created and deleted within the step (before any column row is allocated)"""
+        dropped = self.dropped
+        for inst in dropped:
+            self.attrs.pop(inst, None)
+            sm = inst.__dict__.get('sm')
+            if sm is not None:
+                self.machines.pop(sm, None)
+        if self.atomics:
+            for key in [key for key in self.atomics if key[0] in dropped]:
+                del self.atomics[key]
+        for rel_id, ops in self.links.items():
+            self.links[rel_id] = [op for op in ops if op[1] not in dropped and op[2] not in dropped]
+
+    def _apply(self, undo: Optional[List[Tuple[Any, ...]]]):
+        """Apply the buffered changes, recording in undo (unless None) how to take each one back"""
+        if self.atomics:
+            self._apply_atomics(undo)
+        # Attributes first so created instances are stored with their final values
+        for inst, changes in self.attrs.items():
+            if undo is not None:
+                undo.append(('attrs', inst, {name: inst._stored_attr(name) for name in changes}))
+            inst._apply_attrs(changes)
+        if self.machines:
+            self._sync_states(undo)
+        for class_name, instances in self.created.items():
+            if undo is not None:
+                undo.append(('created', class_name, instances))
+            _storage.ObjectStore._apply_create(class_name, instances)
+        for rel_id, ops in self.links.items():
+            for linked, inst1, inst2 in ops:
+                if linked:
+                    if _relationship._link(rel_id, inst1, inst2) and undo is not None:
+                        undo.append(('linked', rel_id, inst1, inst2))
+                elif _relationship._unlink(rel_id, inst1, inst2) and undo is not None:
+                    undo.append(('unlinked', rel_id, inst1, inst2))
+        for class_name, instances in self.deleted.items():
+            if undo is not None:
+                present = current_context().store[class_name]
+                undo.append(('deleted', class_name, {id: inst for id, inst in instances.items() if present.get(id) is inst}))
+            _storage.ObjectStore._apply_delete(class_name, instances)
+
+    @staticmethod
+    def _undo(undo: List[Tuple[Any, ...]]):
+        """Take back partly applied changes, newest first"""
+        for entry in reversed(undo):
+            kind = entry[0]
+            if kind == 'attrs':
+                entry[1]._apply_attrs(entry[2])
+            elif kind == 'created':
+                _storage.ObjectStore._apply_delete(entry[1], entry[2])
+            elif kind == 'linked':
+                _relationship._unlink(*entry[1:])
+            elif kind == 'unlinked':
+                _relationship._link(*entry[1:])
+            elif kind == 'deleted':
+                _storage.ObjectStore._apply_create(entry[1], entry[2])
+
+    def _apply_atomics(self, undo: List[Tuple[Any, ...]]):
+        """Re-run the buffered atomic updates on the committed values and apply them (stripes held)"""
+        changes: Dict[Any, Dict[str, Any]] = {}
+        for (inst, name), (_, updates) in self.atomics.items():
+            value = inst._stored_attr(name)
+            for update, applied in updates:
+                new = update(value)
+                if (new is not _KEEP) != applied:
+                    raise RuntimeError(f"{inst.kl}:{inst._id}.{name} changed to {value!r} under the step")
+                if applied:
+                    value = new
+            if any(applied for _, applied in updates):
+                changes.setdefault(inst, {})[name] = value
+        for inst, values in changes.items():
+            undo.append(('attrs', inst, {name: inst._stored_attr(name) for name in values}))
+            inst._apply_attrs(values)
+
+    def _sync_states(self, undo: Optional[List[Tuple[Any, ...]]]):
+        """Mirror each machine's final state into its state attribute once per step"""
+        for sm, (index, _) in self.machines.items():
+            attr = sm.model.state_attr
+            if attr and sm.index != index:
+                owner = sm.owner
+                if undo is not None:
+                    undo.append(('attrs', owner, {attr: owner._stored_attr(attr)}))
+                owner._apply_attrs({attr: sm.state})
+
+    def rollback(self):
+        """Discard buffered changes and restore tracked state machines"""
+        try:
+            self._restore()
+        finally:
+            self._reset()
+
+    def _restore(self):
+        """Put tracked state machines back where the step found them"""
+        for sm, (index, history_len) in self.machines.items():
+            sm.index = index
+            del sm._history[history_len:]
+
+    def _reset(self):
+        self.machines.clear()
+        self.attrs.clear()
+        if self.links:
+            self.links.clear()
+        if self.created:
+            self.created.clear()
+        if self.deleted:
+            self.deleted.clear()
+        if self.atomics:
+            self.atomics.clear()
+        if self.dropped:
+            self.dropped.clear()
+
+# Imported last: both modules import this one
+import runtime.storage as _storage
+import runtime.relationship as _relationship
+from runtime.changefeed import ChangeFeed
+`;
+
+  // [KOMPONEN: Columnar Storage]
+  files["runtime/columnar.py"] = `# runtime/columnar.py
+from __future__ import annotations
+from typing import Any, Dict, List, Optional, Tuple
+
+try:
+    import numpy as np
+except ImportError:  # optional dependency, only needed for columnar classes
+    np = None
+
+# (attribute, operator, value) predicate for vectorized queries
+Predicate = Tuple[str, str, Any]
+
+_OPERATORS: Dict[str, str] = {
+    '<': 'less',
+    '<=': 'less_equal',
+    '>': 'greater',
+    '>=': 'greater_equal',
+    '==': 'equal',
+    '!=': 'not_equal',
+}
+
+class ColumnStore:
+    """Numeric attributes of one class held as NumPy columns, one row per instance"""
+
+    def __init__(self, model_class: type, columns: Dict[str, str], capacity: int = 1024):
+        if np is None:
+            raise RuntimeError("Columnar storage requires numpy (pip install numpy)")
+        self.model_class = model_class
+        self.class_name = model_class.__name__
+        self.dtypes = dict(columns)
+        self.capacity = max(1, capacity)
+        self.reset()
+
+    def reset(self):
+        """Drop all rows"""
+        self.arrays: Dict[str, Any] = {name: np.zeros(self.capacity, dtype=dtype) for name, dtype in self.dtypes.items()}
+        self.live = np.zeros(self.capacity, dtype=bool)
+        self.instances: List[Any] = [None] * self.capacity
+        self.size = 0  # rows ever handed out
+        self._free: List[int] = []
+
+    def _grow(self):
+        new_capacity = self.capacity * 2
+        for name, column in self.arrays.items():
+            grown = np.zeros(new_capacity, dtype=column.dtype)
+            grown[:self.capacity] = column
+            self.arrays[name] = grown
+        live = np.zeros(new_capacity, dtype=bool)
+        live[:self.capacity] = self.live
+        self.live = live
+        self.instances.extend([None] * (new_capacity - self.capacity))
+        self.capacity = new_capacity
+
+    def allocate(self, inst: Any) -> int:
+        """Give an instance a row"""
+        if self._free:
+            row = self._free.pop()
+        else:
+            if self.size == self.capacity:
+                self._grow()
+            row = self.size
+            self.size += 1
+        for column in self.arrays.values():
+            column[row] = 0
+        self.live[row] = True
+        self.instances[row] = inst
+        inst._row = row
+        return row
+
+    def release(self, inst: Any):
+        """Free an instance's row, leaving its last values readable from _attrs"""
+        row = inst._row
+        if row is None or self.instances[row] is not inst:
+            return
+        for name, column in self.arrays.items():
+            inst._attrs[name] = column[row].item()
+        inst._columns = None  # detached: later reads and writes use the dict
+        self.live[row] = False
+        self.instances[row] = None
+        self._free.append(row)
+        inst._row = None
+
+    def get(self, inst: Any, name: str) -> Any:
+        """Read one value as a Python scalar"""
+        row = inst._row
+        if row is None:
+            return None
+        return self.arrays[name][row].item()
+
+    def set(self, inst: Any, name: str, value: Any):
+        """Write one value"""
+        row = inst._row
+        if row is None:
+            row = self.allocate(inst)
+        self.arrays[name][row] = value
+
+    # --- Vectorized queries ---
+
+    def mask(self, where: Optional[Predicate] = None) -> Any:
+        """Boolean row mask of live rows matching the predicate"""
+        live = self.live[:self.size]
+        if where is None:
+            return live.copy()
+        name, op, value = where
+        if op not in _OPERATORS:
+            raise ValueError(f"Unsupported operator '{op}' (use one of {', '.join(_OPERATORS)})")
+        return getattr(np, _OPERATORS[op])(self.arrays[name][:self.size], value) & live
+
+    def filter(self, where: Optional[Predicate] = None) -> List[Any]:
+        """Instances whose rows match the predicate"""
+        instances = self.instances
+        return [instances[row] for row in np.flatnonzero(self.mask(where))]
+
+    def aggregate(self, name: str, fn: str = 'sum', where: Optional[Predicate] = None) -> Any:
+        """sum | mean | min | max | count over matching rows"""
+        selected = self.arrays[name][:self.size][self.mask(where)]
+        if fn == 'count':
+            return int(selected.size)
+        if selected.size == 0:
+            return 0 if fn == 'sum' else None
+        if fn not in ('sum', 'mean', 'min', 'max'):
+            raise ValueError(f"Unsupported aggregate '{fn}'")
+        return getattr(selected, fn)().item()
+
+    def update(self, name: str, value: Any, where: Optional[Predicate] = None, mode: str = 'set') -> int:
+        """Set (or add to) a column on all matching rows; returns rows touched"""
+        mask = self.mask(where)
+        column = self.arrays[name][:self.size]
+        if mode == 'set':
+            column[mask] = value
+        elif mode == 'add':
+            column[mask] += value
+        else:
+            raise ValueError(f"Unsupported update mode '{mode}'")
+        return int(np.count_nonzero(mask))
+`;
+
+  // [KOMPONEN: Change Data Capture]
+  files["runtime/changefeed.py"] = `# runtime/changefeed.py
+from __future__ import annotations
+import itertools
+import threading
+import time
+from collections import deque
+from typing import Any, Callable, Deque, Dict, Iterable, List, Optional, Set
+
+class ChangeRecord:
+    """One captured change: create, update or delete of an instance"""
+    __slots__ = ('seq', 'kind', 'class_name', 'id', 'attr', 'old', 'new', 'timestamp')
+
+    def __init__(self, seq: int, kind: str, class_name: str, id: str, attr: Optional[str] = None, old: Any = None, new: Any = None):
+        self.seq = seq
+        self.kind = kind
+        self.class_name = class_name
+        self.id = id
+        self.attr = attr
+        self.old = old
+        self.new = new
+        self.timestamp = time.time()
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {name: getattr(self, name) for name in self.__slots__}
+
+    def __repr__(self):
+        if self.kind == 'update':
+            return f"<Change#{self.seq} {self.class_name}:{self.id}.{self.attr} {self.old!r} -> {self.new!r}>"
+        return f"<Change#{self.seq} {self.kind} {self.class_name}:{self.id}>"
+
+class Subscription:
+    """A consumer's cursor into the change buffer"""
+
+    def __init__(self, callback: Optional[Callable[[List[ChangeRecord]], None]], batch_size: int,
+                 classes: Optional[Iterable[str]], attrs: Optional[Iterable[str]], cursor: int):
+        self.callback = callback
+        self.batch_size = batch_size
+        self.classes = frozenset(classes) if classes else None
+        self.attrs = frozenset(attrs) if attrs else None
+        self.cursor = cursor  # seq of the last record consumed
+        self.missed = 0  # records evicted from the buffer before this subscriber read them
+
+    def _accepts(self, record: ChangeRecord) -> bool:
+        if self.classes is not None and record.class_name not in self.classes:
+            return False
+        if self.attrs is not None and record.kind == 'update' and record.attr not in self.attrs:
+            return False
+        return True
+
+    def poll(self, max_records: Optional[int] = None) -> List[ChangeRecord]:
+        """Take the next batch of records (pull-style consumers)"""
+        return ChangeFeed._take(self, max_records or self.batch_size)
+
+class ChangeFeed:
+    """Change-data-capture of watched attributes into a bounded buffer"""
+    _buffer: Deque[ChangeRecord] = deque(maxlen=10000)
+    _seq: int = 0
+    _subscribers: List[Subscription] = []
+    _lock = threading.RLock()
+    _held = threading.local()  # records emitted on this thread while it applies a commit
+    _watched_classes: Set[str] = set()
+    watching: bool = False  # some class is watched (commits only hold records back then)
+
+    @classmethod
+    def configure(cls, capacity: int):
+        """Resize the buffer (drops buffered records)"""
+        with cls._lock:
+            cls._buffer = deque(maxlen=capacity)
+
+    @classmethod
+    def watch(cls, model_class: type, attrs: Iterable[str] = (), lifecycle: bool = True):
+        """Capture changes to attrs (and creates/deletes if lifecycle) of a model class"""
+        model_class._watched = frozenset(model_class._watched) | frozenset(attrs)
+        model_class._watch_lifecycle = model_class._watch_lifecycle or lifecycle
+        if model_class._watched or model_class._watch_lifecycle:
+            cls._watched_classes.add(model_class.__name__)
+            cls.watching = True
+
+    @classmethod
+    def unwatch(cls, model_class: type):
+        """Stop capturing changes for a model class"""
+        model_class._watched = frozenset()
+        model_class._watch_lifecycle = False
+        cls._watched_classes.discard(model_class.__name__)
+        cls.watching = bool(cls._watched_classes)
+
+    @classmethod
+    def subscribe(cls, callback: Optional[Callable[[List[ChangeRecord]], None]] = None, batch_size: int = 100,
+                  classes: Optional[Iterable[str]] = None, attrs: Optional[Iterable[str]] = None) -> Subscription:
+        """Register a consumer; with a callback, batches are pushed once batch_size records are pending"""
+        with cls._lock:
+            sub = Subscription(callback, batch_size, classes, attrs, cls._seq)
+            cls._subscribers.append(sub)
+        return sub
+
+    @classmethod
+    def unsubscribe(cls, sub: Subscription):
+        with cls._lock:
+            if sub in cls._subscribers:
+                cls._subscribers.remove(sub)
+
+    @classmethod
+    def flush(cls):
+        """Push every pending record to callback subscribers regardless of batch size"""
+        cls.deliver(force=True)
+
+    @classmethod
+    def hold(cls) -> bool:
+        """Keep this thread's records back until release (False if they are already held)"""
+        if getattr(cls._held, 'records', None) is not None:
+            return False
+        cls._held.records = []
+        return True
+
+    @classmethod
+    def release(cls, publish: bool = True):
+        """Publish the held records to the buffer, or drop them (a rolled-back commit)"""
+        records, cls._held.records = cls._held.records, None
+        if publish and records:
+            with cls._lock:
+                for kind, class_name, id, attr, old, new in records:
+                    cls._seq += 1
+                    cls._buffer.append(ChangeRecord(cls._seq, kind, class_name, id, attr, old, new))
+
+    @classmethod
+    def deliver(cls, force: bool = False):
+        """Push pending batches to callback subscribers.
+
+        Called once the writer has released the context lock and closed its
+        unit of work, so a callback that writes opens a unit of its own. Every
+        subscriber is served; the first callback error is then re-raised.
+        """
+        if not cls._subscribers:
+            return
+        uow, active_unit.uow = active_unit.uow, None
+        try:
+            error = cls._deliver(force)
+        finally:
+            active_unit.uow = uow
+        if error is not None:
+            raise error
+
+    @classmethod
+    def clear(cls):
+        """Drop buffered records and subscribers"""
+        with cls._lock:
+            cls._buffer.clear()
+            cls._subscribers = []
+
+    # --- Emission (called by the runtime) ---
+
+    @classmethod
+    def attr_changed(cls, inst: Any, name: str, old: Any, new: Any):
+        """Record an attribute write on a stored instance"""
+        if old == new:
+            return
+        class_name = type(inst).__name__
+        if inst._ctx.store.get(class_name, {}).get(inst._id) is not inst:
+            return  # not stored yet (initial values travel with the create record) or already deleted
+        cls._emit('update', class_name, inst._id, name, old, new)
+
+    @classmethod
+    def instance_created(cls, class_name: str, inst: Any):
+        values = {name: inst.get_attr(name) for name in inst._watched} if inst._watched else None
+        cls._emit('create', class_name, inst._id, None, None, values)
+
+    @classmethod
+    def instance_deleted(cls, class_name: str, inst: Any):
+        cls._emit('delete', class_name, inst._id)
+
+    @classmethod
+    def _emit(cls, kind: str, class_name: str, id: str, attr: Optional[str] = None, old: Any = None, new: Any = None):
+        held = getattr(cls._held, 'records', None)
+        if held is not None:
+            held.append((kind, class_name, id, attr, old, new))
+            return
+        with cls._lock:
+            cls._seq += 1
+            cls._buffer.append(ChangeRecord(cls._seq, kind, class_name, id, attr, old, new))
+        cls.deliver()
+
+    @classmethod
+    def _take(cls, sub: Subscription, max_records: int) -> List[ChangeRecord]:
+        with cls._lock:
+            batch: List[ChangeRecord] = []
+            if not cls._buffer or sub.cursor >= cls._seq:
+                return batch
+            first = cls._buffer[0].seq
+            if sub.cursor + 1 < first:
+                sub.missed += first - sub.cursor - 1
+                sub.cursor = first - 1
+            for record in itertools.islice(cls._buffer, sub.cursor + 1 - first, None):
+                sub.cursor = record.seq
+                if sub._accepts(record):
+                    batch.append(record)
+                    if len(batch) >= max_records:
+                        break
+            return batch
+
+    @classmethod
+    def _deliver(cls, force: bool = False) -> Optional[Exception]:
+        error = None
+        for sub in list(cls._subscribers):
+            if sub.callback is None:
+                continue
+            while force or cls._seq - sub.cursor >= sub.batch_size:
+                batch = cls._take(sub, sub.batch_size)
+                if not batch:
+                    break
+                try:
+                    sub.callback(batch)
+                except Exception as e:
+                    if error is None:
+                        error = e
+        return error
+
+# Imported last: the unit of work module imports the store, which imports this one
+from runtime.unit_of_work import active_unit
+`;
+
+  // [KOMPONEN: Bridge Adapter]
+  files["runtime/bridge.py"] = `# runtime/bridge.py
+from __future__ import annotations
+import http.client
+import json
+import select
+import threading
+import time
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import urlsplit
+from runtime.tracing import Tracer
+from runtime.unit_of_work import active_unit
+
+class BridgeError(Exception):
+    """A bridge call could not be completed"""
+
+class ConnectionPool:
+    """Keep-alive HTTP connections to one host, at most max_size in use at a time"""
+
+    def __init__(self, host: str, port: int, max_size: int = 8, timeout: float = 2.0, https: bool = False):
+        self.host = host
+        self.port = port
+        self.max_size = max_size
+        self.timeout = timeout
+        self._factory = http.client.HTTPSConnection if https else http.client.HTTPConnection
+        self._idle: List[http.client.HTTPConnection] = []
+        self._slots = threading.BoundedSemaphore(max_size)
+        self._lock = threading.Lock()
+        self.opened = 0  # connections created over the pool's lifetime
+
+    def acquire(self) -> Tuple[http.client.HTTPConnection, bool]:
+        """Take a connection, waiting up to timeout for a free slot; returns (conn, reused)"""
+        if not self._slots.acquire(timeout=self.timeout):
+            raise BridgeError(f"No free connection to {self.host}:{self.port} within {self.timeout}s")
+        with self._lock:
+            conn = self._idle.pop() if self._idle else None
+        if conn is not None and not _dropped(conn):
+            return conn, True
+        if conn is not None:
+            conn.close()  # the server closed it while idle
+        with self._lock:
+            self.opened += 1
+        return self._factory(self.host, self.port, timeout=self.timeout), False
+
+    def release(self, conn: http.client.HTTPConnection, reusable: bool = True):
+        """Return a connection; broken ones are closed instead of kept"""
+        if reusable:
+            with self._lock:
+                self._idle.append(conn)
+        else:
+            conn.close()
+        self._slots.release()
+
+    def close(self):
+        """Close idle connections"""
+        with self._lock:
+            idle, self._idle = self._idle, []
+        for conn in idle:
+            conn.close()
+
+class BridgeAdapter:
+    """Maps external entity bridge operations to HTTP/JSON calls.
+
+    Until configure() is called every bridge is a local no-op returning None.
+    Once configured, KL::op(params) is sent as POST {base_url}/{KL}/{op} with
+    the parameters as a JSON object; the reply's "result" field is returned.
+
+    A call that fails on a reused keep-alive connection is retried once on a
+    fresh one only if the service cannot have acted on it: the request was
+    not completely sent, or the operation is idempotent (GET, HEAD, PUT,
+    DELETE and OPTIONS routes, or a route declared idempotent).
+    """
+    _pool: Optional[ConnectionPool] = None
+    _base_path: str = ''
+    _routes: Dict[Tuple[str, str], Tuple[str, str, bool]] = {}  # { (kl, op): (method, path, idempotent) }
+    _stats: Dict[Tuple[str, str], Dict[str, float]] = {}  # { (kl, op): {calls, errors, seconds, max_seconds} }
+    _lock = threading.Lock()
+
+    @classmethod
+    def configure(cls, base_url: Optional[str], max_connections: int = 8, timeout: float = 2.0):
+        """Point bridges at a service (None switches back to local no-ops)"""
+        if cls._pool is not None:
+            cls._pool.close()
+        if base_url is None:
+            cls._pool = None
+            return
+        url = urlsplit(base_url)
+        if url.scheme not in ('http', 'https') or not url.hostname:
+            raise ValueError(f"Unsupported bridge URL: {base_url}")
+        https = url.scheme == 'https'
+        cls._pool = ConnectionPool(url.hostname, url.port or (443 if https else 80), max_connections, timeout, https)
+        cls._base_path = url.path.rstrip('/')
+
+    @classmethod
+    def route(cls, kl: str, op: str, path: str, method: str = 'POST', idempotent: Optional[bool] = None):
+        """Override the endpoint of one bridge operation (path is relative to the base URL)"""
+        method = method.upper()
+        if idempotent is None:
+            idempotent = method in _IDEMPOTENT
+        cls._routes[(kl, op)] = (method, '/' + path.lstrip('/'), idempotent)
+
+    @classmethod
+    def is_configured(cls) -> bool:
+        return cls._pool is not None
+
+    @classmethod
+    def call(cls, kl: str, op: str, params: Optional[Dict[str, Any]] = None) -> Any:
+        """Invoke a bridge operation; raises BridgeError on transport or service failure"""
+        if Tracer.enabled:
+            span = Tracer.begin(f"{kl}::{op}", 'bridge', params)
+            try:
+                return cls._call(kl, op, params)
+            finally:
+                Tracer.end(span)
+        return cls._call(kl, op, params)
+
+    @classmethod
+    def _call(cls, kl: str, op: str, params: Optional[Dict[str, Any]]) -> Any:
+        pool = cls._pool
+        if pool is None:
+            return None
+        method, path, idempotent = cls._routes.get((kl, op), ('POST', f"/{kl}/{op}", False))
+        body = json.dumps({k: _to_json(v) for k, v in (params or {}).items()})
+        started = time.perf_counter()
+        try:
+            reply = cls._send(pool, method, cls._base_path + path, body, idempotent)
+        except BridgeError:
+            cls._record(kl, op, time.perf_counter() - started, failed=True)
+            raise
+        cls._record(kl, op, time.perf_counter() - started)
+        return reply.get('result')
+
+    @classmethod
+    def _send(cls, pool: ConnectionPool, method: str, path: str, body: str, idempotent: bool) -> Dict[str, Any]:
+        headers = {'Content-Type': 'application/json', 'Connection': 'keep-alive'}
+        conn, reused = pool.acquire()
+        try:
+            sent = False
+            try:
+                conn.request(method, path, body=body, headers=headers)
+                sent = True
+                response = conn.getresponse()
+            except (http.client.RemoteDisconnected, ConnectionResetError, BrokenPipeError):
+                if not reused or (sent and not idempotent):
+                    raise  # the service may have acted on it: a second send could apply it twice
+                # The server dropped an idle keep-alive connection; retry once on a fresh one
+                conn.close()
+                conn.request(method, path, body=body, headers=headers)
+                response = conn.getresponse()
+            data = response.read()
+        except (OSError, http.client.HTTPException) as e:
+            pool.release(conn, reusable=False)
+            raise BridgeError(f"{method} {path} failed: {e}") from e
+        pool.release(conn, reusable=not response.will_close)
+        try:
+            reply = json.loads(data) if data else {}
+        except ValueError:
+            raise BridgeError(f"{method} {path} returned invalid JSON")
+        if response.status >= 400:
+            raise BridgeError(f"{method} {path} returned {response.status}: {reply.get('error', response.reason)}")
+        return reply
+
+    @classmethod
+    def _record(cls, kl: str, op: str, seconds: float, failed: bool = False):
+        with cls._lock:
+            s = cls._stats.get((kl, op))
+            if s is None:
+                s = cls._stats[(kl, op)] = {'calls': 0, 'errors': 0, 'seconds': 0.0, 'max_seconds': 0.0}
+            s['calls'] += 1
+            s['errors'] += failed
+            s['seconds'] += seconds
+            s['max_seconds'] = max(s['max_seconds'], seconds)
+
+    @classmethod
+    def stats(cls) -> Dict[str, Any]:
+        """Per-operation call counts and latency, plus pool usage"""
+        with cls._lock:
+            ops = {f"{kl}::{op}": dict(s, mean_seconds=s['seconds'] / s['calls']) for (kl, op), s in cls._stats.items()}
+        pool = cls._pool
+        return {
+            'operations': ops,
+            'connections_opened': pool.opened if pool else 0,
+            'max_connections': pool.max_size if pool else 0,
+        }
+
+    @classmethod
+    def reset_stats(cls):
+        with cls._lock:
+            cls._stats = {}
+
+_IDEMPOTENT = frozenset(('GET', 'HEAD', 'PUT', 'DELETE', 'OPTIONS'))
+
+def _dropped(conn: http.client.HTTPConnection) -> bool:
+    """Whether an idle connection was closed by the server (its socket reads as ready)"""
+    sock = conn.sock
+    if sock is None:
+        return False  # not connected yet: connects on the next request
+    try:
+        return bool(select.select([sock], [], [], 0)[0])
+    except (OSError, ValueError):
+        return True
+
+def _to_json(value: Any, nested: bool = False) -> Any:
+    """Encode bridge arguments; instance references travel as their kl, id and attributes.
+
+    Instances referenced from another instance's attributes (referential
+    slots) are sent as just their kl and id, so cycles such as 1:1 links
+    are not followed. Attribute values are read through get_attr, so they
+    include what the calling step has set but not yet committed.
+    """
+    if hasattr(value, '_REF_SLOTS') and hasattr(value, 'kl'):
+        if nested:
+            return {'kl': value.kl, 'id': value._id}
+        return {'kl': value.kl, 'id': value._id, 'attrs': {name: _to_json(value.get_attr(name), True) for name in _attr_names(value)}}
+    if isinstance(value, (list, tuple)):
+        return [_to_json(v, nested) for v in value]
+    if isinstance(value, dict):
+        return {str(k): _to_json(v, nested) for k, v in value.items()}
+    if hasattr(value, 'item'):
+        return value.item()  # numpy scalar read from a column
+    return value
+
+def _attr_names(inst: Any) -> List[str]:
+    """Declared, stored and pending attribute names of an instance (one created in the calling step has none stored yet)"""
+    declared = getattr(inst, '_declared_attrs', None)
+    names = dict.fromkeys(declared() if declared is not None else ())
+    names.update(dict.fromkeys(inst._attrs))
+    if inst._columns is not None:
+        names.update(dict.fromkeys(inst._columns.arrays))
+    uow = active_unit.uow
+    if uow is not None:
+        names.update(dict.fromkeys(uow.attrs.get(inst, ())))
+        names.update(dict.fromkeys(name for owner, name in uow.atomics if owner is inst))
+    return list(names)
+`;
+
+  // [KOMPONEN: Bridge Stand-in Server]
+  files["runtime/bridge_server.py"] = `# runtime/bridge_server.py
+from __future__ import annotations
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Callable, Dict, Optional, Tuple
+
+Handler = Callable[[Dict[str, Any]], Any]  # bridge parameters -> result
+
+class StandInServer:
+    """In-process HTTP/JSON stand-in for external entities, for offline runs.
+
+    Serves POST /{KL}/{op} the way BridgeAdapter sends it. Operations without
+    a registered handler answer {"result": null}. latency adds a fixed delay
+    per request to model a remote service.
+    """
+
+    def __init__(self, host: str = '127.0.0.1', port: int = 0, latency: float = 0.0):
+        self.host = host
+        self.port = port
+        self.latency = latency
+        self.handlers: Dict[Tuple[str, str], Handler] = {}
+        self.requests = 0
+        self.connections = 0
+        self._lock = threading.Lock()
+        self._server: Optional[ThreadingHTTPServer] = None
+        self._thread: Optional[threading.Thread] = None
+
+    def handle(self, kl: str, op: str, fn: Handler):
+        """Register the implementation of one bridge operation"""
+        self.handlers[(kl, op)] = fn
+
+    @property
+    def url(self) -> str:
+        return f"http://{self.host}:{self.port}"
+
+    def start(self) -> str:
+        """Serve on a background thread; returns the base URL"""
+        if self._server is not None:
+            return self.url
+        self._server = ThreadingHTTPServer((self.host, self.port), _make_request_handler(self))
+        self._server.daemon_threads = True
+        self.port = self._server.server_address[1]
+        self._thread = threading.Thread(target=self._server.serve_forever, name='bridge-standin', daemon=True)
+        self._thread.start()
+        print(f"[BRIDGE] Stand-in server listening on {self.url}")
+        return self.url
+
+    def stop(self):
+        if self._server is None:
+            return
+        self._server.shutdown()
+        self._server.server_close()
+        self._thread.join()
+        self._server = None
+        self._thread = None
+
+    def __enter__(self) -> 'StandInServer':
+        self.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def _dispatch(self, path: str, params: Dict[str, Any]) -> Tuple[int, Dict[str, Any]]:
+        with self._lock:
+            self.requests += 1
+        parts = path.strip('/').split('/')
+        if len(parts) < 2:
+            return 404, {'error': f"No bridge operation at {path}"}
+        kl, op = parts[-2], parts[-1]
+        if self.latency:
+            time.sleep(self.latency)
+        fn = self.handlers.get((kl, op))
+        try:
+            return 200, {'result': fn(params) if fn else None}
+        except Exception as e:
+            return 500, {'error': f"{kl}::{op}: {e}"}
+
+def _make_request_handler(server: StandInServer) -> type:
+    class _RequestHandler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'  # keep connections open between requests
+        disable_nagle_algorithm = True  # headers and body go out in separate writes
+
+        def setup(self):
+            super().setup()
+            with server._lock:
+                server.connections += 1
+
+        def do_POST(self):
+            length = int(self.headers.get('Content-Length') or 0)
+            try:
+                params = json.loads(self.rfile.read(length) or b'{}')
+            except ValueError:
+                status, reply = 400, {'error': 'Body is not JSON'}
+            else:
+                status, reply = server._dispatch(self.path, params)
+            body = json.dumps(reply).encode()
+            self.send_response(status)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        do_PUT = do_POST
+
+        def log_message(self, format, *args):
+            pass
+
+    return _RequestHandler
+`;
+
+  // [KOMPONEN: Hot Reload]
+  files["runtime/reload.py"] = `# runtime/reload.py
+from __future__ import annotations
+import contextlib
+import importlib
+import sys
+import time
+from typing import Any, Dict, List
+from runtime.context import RuntimeContext, quiesced
+from runtime.unit_of_work import active_unit
+from runtime.storage import ObjectStore
+from runtime.catalog import CatalogExtent
+from runtime.relationship import rebuild_ref_slots
+
+class ReloadReport:
+    """What a reload changed, per class"""
+
+    def __init__(self):
+        self.modules: List[str] = []
+        self.migrated: Dict[str, int] = {}  # { classname: instances moved to the new class }
+        self.added_attrs: Dict[str, List[str]] = {}
+        self.removed_attrs: Dict[str, List[str]] = {}
+        self.orphaned_states: Dict[str, Dict[str, str]] = {}  # { classname: {id: state that no longer exists} }
+        self.missing_classes: List[str] = []  # stored classes the new models no longer define
+        self.seconds = 0.0
+
+    def summary(self) -> str:
+        lines = [f"[RELOAD] {len(self.modules)} modules reloaded in {self.seconds * 1000:.1f} ms"]
+        for class_name, count in self.migrated.items():
+            added = self.added_attrs.get(class_name, [])
+            removed = self.removed_attrs.get(class_name, [])
+            lines.append(f"[RELOAD] {class_name}: {count} instances migrated (+{len(added)} / -{len(removed)} attrs)")
+            for id, state in self.orphaned_states.get(class_name, {}).items():
+                lines.append(f"[RELOAD] {class_name}:{id} state '{state}' removed, reset to initial state")
+        for class_name in self.missing_classes:
+            lines.append(f"[RELOAD] {class_name} is no longer generated; its instances keep the old class")
+        return '\\n'.join(lines)
+
+def reload_models(package: str = 'models') -> ReloadReport:
+    """Re-import regenerated model modules and move live instances onto the new classes.
+
+    Instances of every runtime context are migrated. They keep their
+    identity, so the relationship store, pending timers
+    and any caller-held references stay valid. Attributes are migrated to the
+    new layout (new ones get their initial value, dropped ones are removed)
+    and state machines switch to the new transition table, keeping their
+    current state by name. Runs between steps: dispatches already in flight
+    in any context finish on the old code and commit first, and ones that
+    start meanwhile wait for the swap, then run on the new code.
+    Names bound with \`from models.X import X\` before the reload still refer to
+    the old class objects; look classes up again afterwards.
+    """
+    if active_unit.uow is not None:
+        raise RuntimeError("Cannot reload models from inside a state machine step")
+    report = ReloadReport()
+    started = time.perf_counter()
+    importlib.invalidate_caches()
+    contexts = RuntimeContext.all()
+    with quiesced(contexts), contextlib.ExitStack() as locks:
+        for ctx in contexts:
+            locks.enter_context(ctx.lock)
+        old_classes = {name: _stored_class(instances)
+                       for ctx in contexts for name, instances in ctx.store.items() if instances}
+        modules = [m for name, m in sys.modules.items() if name.startswith(package + '.') and m is not None]
+        # Base classes first so subclasses re-import the new superclass
+        modules.sort(key=lambda m: _hierarchy_depth(m, package))
+        for module in modules:
+            importlib.reload(module)
+            report.modules.append(module.__name__)
+        if package in sys.modules:
+            importlib.reload(sys.modules[package])
+
+        for class_name, old_cls in old_classes.items():
+            new_cls = getattr(sys.modules.get(old_cls.__module__), class_name, None)
+            if new_cls is None or new_cls is old_cls:
+                report.missing_classes.append(class_name)
+                continue
+            for ctx in contexts:
+                if ctx.store.get(class_name):
+                    with ctx:
+                        _migrate_class(ctx, class_name, old_cls, new_cls, report)
+        for ctx in contexts:
+            rebuild_ref_slots(ctx)  # relationship ends may have gained or lost their slot
+    report.seconds = time.perf_counter() - started
+    print(report.summary())
+    return report
+
+def _stored_class(instances: Any) -> type:
+    """Class of a stored extent's instances (a catalog knows it without building one)"""
+    if type(instances) is CatalogExtent:
+        return instances.catalog.model_class
+    return type(next(iter(instances.values())))
+
+def _hierarchy_depth(module: Any, package: str) -> int:
+    """How many generated superclasses the module's class has"""
+    cls = getattr(module, module.__name__.rsplit('.', 1)[-1], None)
+    if not isinstance(cls, type):
+        return 0
+    return sum(1 for base in cls.__mro__[1:] if base.__module__.startswith(package + '.'))
+
+def _declared(cls: type) -> Dict[str, Any]:
+    """Declared attributes across the class hierarchy (superclass first)"""
+    attrs: Dict[str, Any] = {}
+    for klass in reversed(cls.__mro__):
+        fn = klass.__dict__.get('_declared_attrs')
+        if fn is not None:
+            attrs.update(fn.__func__())
+    return attrs
+
+def _migrate_class(ctx: RuntimeContext, class_name: str, old_cls: type, new_cls: type, report: ReloadReport):
+    old_attrs = _declared(old_cls)
+    new_attrs = _declared(new_cls)
+    added = [name for name in new_attrs if name not in old_attrs]
+    removed = [name for name in old_attrs if name not in new_attrs]
+    report.added_attrs[class_name] = added
+    report.removed_attrs[class_name] = removed
+
+    # Change data capture settings belong to the class, not the module
+    new_cls._watched = old_cls._watched
+    new_cls._watch_lifecycle = old_cls._watch_lifecycle
+
+    extent = ctx.store[class_name]
+    if type(extent) is CatalogExtent:
+        # Rows live in the catalog file: only the instances built so far exist, and later ones use model_class
+        catalog = extent.catalog
+        catalog.model_class = new_cls
+        built = list(catalog._instances.values())
+        for instance in built:
+            instance.__class__ = new_cls
+        report.migrated[class_name] = report.migrated.get(class_name, 0) + len(built)
+        return
+
+    # Move column-stored values back to the instances, re-enable on the new layout below
+    columns = ctx.columns.pop(class_name, None)
+    instances = list(ctx.store[class_name].values())
+    for instance in instances:
+        if instance._pager is not None:
+            instance._pager.fault_in(instance)  # its page holds state and history indices of the old model
+    if columns is not None:
+        for instance in instances:
+            columns.release(instance)
+
+    new_model = getattr(new_cls, '_SM', None)
+    for instance in instances:
+        instance.__class__ = new_cls
+        if added:
+            fresh = _declared(new_cls)  # per instance: defaults such as unique ids are not shared
+            for name in added:
+                instance._attrs.setdefault(name, fresh[name])
+        for name in removed:
+            instance._attrs.pop(name, None)
+        _migrate_state_machine(instance, new_model, report)
+    report.migrated[class_name] = report.migrated.get(class_name, 0) + len(instances)
+
+    if columns is not None and getattr(new_cls, '_NUMERIC_ATTRS', None):
+        ObjectStore.enable_columns(new_cls, capacity=max(len(instances), 1024))
+
+def _migrate_state_machine(instance: Any, new_model: Any, report: ReloadReport):
+    sm = instance.__dict__.get('sm')
+    if new_model is None:
+        if sm is not None:
+            del instance.sm  # the class no longer has a state machine
+        return
+    if sm is None:
+        instance._build_state_machine()
+        return
+    old_model = sm.model
+    state = old_model.states[sm.index]
+    index = new_model.state_index.get(state)
+    if index is None:
+        report.orphaned_states.setdefault(type(instance).__name__, {})[instance._id] = state
+        index = 0  # the initial state is encoded first
+    sm.model = new_model
+    sm.index = index
+    history = []
+    for s, e, n in sm._history:
+        s = new_model.state_index.get(old_model.states[s])
+        e = new_model.event_index.get(old_model.events[e])
+        n = new_model.state_index.get(old_model.states[n]) if n is not None else None
+        if s is not None and e is not None:
+            history.append(new_model.step(s, e, n))
+    sm._history = history
+    if new_model.state_attr:
+        instance._apply_attrs({new_model.state_attr: new_model.states[index]})
+`;
+
+  // [KOMPONEN: Memory Accounting]
+  files["runtime/memory.py"] = `# runtime/memory.py
+from __future__ import annotations
+import random
+import sys
+import time
+from typing import Any, Dict, Optional, Tuple
+from runtime.context import RuntimeContext, current_context
+from runtime.changefeed import ChangeFeed
+from runtime.catalog import CatalogExtent
+
+try:
+    import resource
+except ImportError:  # not available on Windows
+    resource = None
+
+_sizeof = sys.getsizeof
+
+class MemorySample:
+    """Estimated memory held by the runtime at one point in time"""
+
+    def __init__(self):
+        self.timestamp = time.time()
+        self.classes: Dict[str, Dict[str, int]] = {}  # { classname: {instances, paged, bytes, attr_bytes, history, history_bytes} }
+        self.links: Dict[str, Dict[str, int]] = {}  # { rel_id: {links, bytes} }
+        self.columns: Dict[str, int] = {}  # { classname: bytes held by its ColumnStore }
+        self.catalogs: Dict[str, Dict[str, int]] = {}  # { classname: {rows, materialized, mapped_bytes} } (shared, not in the total)
+        self.queues: Dict[str, Dict[str, int]] = {}  # timers, message bus, change feed: {items, bytes}
+        self.max_rss: Optional[int] = None  # peak resident set size of the process, bytes
+
+    @property
+    def total_bytes(self) -> int:
+        return (sum(c['bytes'] for c in self.classes.values()) + sum(l['bytes'] for l in self.links.values())
+                + sum(self.columns.values()) + sum(q['bytes'] for q in self.queues.values()))
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'timestamp': self.timestamp,
+            'classes': self.classes,
+            'links': self.links,
+            'columns': self.columns,
+            'catalogs': self.catalogs,
+            'queues': self.queues,
+            'total_bytes': self.total_bytes,
+            'max_rss': self.max_rss,
+        }
+
+def sample(max_per_class: int = 1000, rng: Optional[random.Random] = None, ctx: Optional[RuntimeContext] = None) -> MemorySample:
+    """Measure the containers of a runtime context (the current one by default).
+
+    Instance sizes are shallow sizes of the instance, its dicts, attribute
+    values and state machine history (instances referenced from attributes
+    count as one pointer). Classes with more than max_per_class instances are
+    estimated from a random sample; max_per_class=None measures every one.
+    """
+    rng = rng or random.Random(0)
+    ctx = ctx or current_context()
+    snapshot = MemorySample()
+    for class_name, extent in list(ctx.store.items()):
+        if type(extent) is CatalogExtent:
+            catalog = extent.catalog
+            snapshot.catalogs[class_name] = {'rows': len(catalog), 'materialized': catalog.materialized(),
+                                             'mapped_bytes': catalog.mapped_bytes()}
+            continue
+        instances = list(extent.values())
+        measured = instances
+        if max_per_class is not None and len(instances) > max_per_class:
+            measured = rng.sample(instances, max_per_class)
+        scale = len(instances) / len(measured) if measured else 0
+        total = attrs = history = history_bytes = 0
+        for inst in measured:
+            if inst._pager is not None:
+                total += _sizeof(inst) + _sizeof(inst.__dict__)  # paged out: only the stub is in memory
+                continue
+            inst_attrs = _attrs_size(inst)
+            inst_history, inst_history_bytes = _history_size(inst)
+            attrs += inst_attrs
+            history += inst_history
+            history_bytes += inst_history_bytes
+            total += _sizeof(inst) + _sizeof(inst.__dict__) + inst_attrs + inst_history_bytes
+        snapshot.classes[class_name] = {
+            'instances': len(instances),
+            'paged': sum(1 for inst in instances if inst._pager is not None),
+            'bytes': int(total * scale),
+            'attr_bytes': int(attrs * scale),
+            'history': int(history * scale),
+            'history_bytes': int(history_bytes * scale),
+        }
+    for rel_id, links in list(ctx.links.items()):
+        # Each link is a 2-tuple key in the relationship's dict, plus one entry in each end's partner list
+        partners = ctx.partners.get(rel_id, {})
+        index = _sizeof(partners) + sum(_sizeof(related) for related in list(partners.values()))
+        snapshot.links[rel_id] = {'links': len(links), 'bytes': _sizeof(links) + len(links) * _sizeof((None, None)) + index}
+    for class_name, store in ctx.columns.items():
+        snapshot.columns[class_name] = (sum(a.nbytes for a in store.arrays.values()) + store.live.nbytes
+                                        + _sizeof(store.instances) + _sizeof(store._free))
+    timers = ctx.timers
+    snapshot.queues['timers'] = {
+        'items': len(timers),
+        'bytes': _sizeof(timers) + sum(_sizeof(t) + _sizeof(t.__dict__) for t in list(timers.values())),
+    }
+    bus = ctx.message_bus
+    snapshot.queues['message_bus'] = {
+        'items': len(bus),
+        'bytes': _sizeof(bus) + sum(_container_size(m) for m in list(bus)),
+    }
+    feed = ChangeFeed._buffer
+    record_size = _sizeof(feed[0]) if feed else 0
+    snapshot.queues['change_feed'] = {'items': len(feed), 'bytes': _sizeof(feed) + len(feed) * record_size}
+    if resource is not None:
+        rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        snapshot.max_rss = rss if sys.platform == 'darwin' else rss * 1024
+    return snapshot
+
+def _attrs_size(inst: Any) -> int:
+    size = _sizeof(inst._attrs)
+    for value in inst._attrs.values():
+        if not hasattr(value, '_REF_SLOTS'):  # references to other instances (even paged out ones) are counted by their own class
+            size += _container_size(value)
+    return size
+
+def _history_size(inst: Any) -> Tuple[int, int]:
+    sm = inst.__dict__.get('sm')
+    if sm is None:
+        return 0, 0
+    history = sm._history
+    entry = 0
+    if history:
+        first = history[0]
+        if sm.model.steps[first[0]][first[1]] is not first:  # entries the state model shares cost only their list slot
+            entry = _sizeof(first)
+    return len(history), _sizeof(sm) + _sizeof(sm.__dict__) + _sizeof(history) + len(history) * entry
+
+def _container_size(value: Any) -> int:
+    """Shallow size of a value plus, for plain containers, their items"""
+    size = _sizeof(value)
+    if isinstance(value, dict):
+        size += sum(_sizeof(k) + _sizeof(v) for k, v in value.items())
+    elif isinstance(value, (list, tuple, set, frozenset)):
+        size += sum(_sizeof(v) for v in value)
+    return size
+
+def growth(before: MemorySample, after: MemorySample) -> Dict[str, Dict[str, int]]:
+    """Per-entry deltas between two samples (only entries that changed)"""
+    deltas: Dict[str, Dict[str, int]] = {}
+
+    def compare(prefix: str, old: Dict[str, Dict[str, int]], new: Dict[str, Dict[str, int]]):
+        for name in sorted(set(old) | set(new)):
+            a, b = old.get(name, {}), new.get(name, {})
+            changed = {k: b.get(k, 0) - a.get(k, 0) for k in set(a) | set(b) if b.get(k, 0) != a.get(k, 0)}
+            if changed:
+                deltas[f"{prefix}{name}"] = changed
+
+    compare('class:', before.classes, after.classes)
+    compare('rel:', before.links, after.links)
+    compare('columns:', {k: {'bytes': v} for k, v in before.columns.items()}, {k: {'bytes': v} for k, v in after.columns.items()})
+    compare('catalog:', before.catalogs, after.catalogs)
+    compare('queue:', before.queues, after.queues)
+    return deltas
+
+def format_report(snapshot: MemorySample, previous: Optional[MemorySample] = None) -> str:
+    """Human-readable footprint report, with growth since previous if given"""
+    delta = growth(previous, snapshot) if previous is not None else {}
+
+    def change(key: str, field: str) -> str:
+        d = delta.get(key, {}).get(field)
+        return f"{d:+d}" if d else ''
+
+    lines = ['=' * 72, 'Runtime memory footprint', '=' * 72]
+    paging = any(c.get('paged') for c in snapshot.classes.values())
+    lines.append(f"{'class':<20}{'instances':>10}{'(+/-)':>8}{'bytes':>12}{'(+/-)':>10}{'history':>10}{'(+/-)':>8}"
+                 + (f"{'paged':>9}" if paging else ''))
+    for name, c in sorted(snapshot.classes.items()):
+        key = f"class:{name}"
+        lines.append(f"{name:<20}{c['instances']:>10}{change(key, 'instances'):>8}{c['bytes']:>12}"
+                     f"{change(key, 'bytes'):>10}{c['history']:>10}{change(key, 'history'):>8}"
+                     + (f"{c.get('paged', 0):>9}" if paging else ''))
+    lines.append('')
+    lines.append(f"{'relationship':<20}{'links':>10}{'(+/-)':>8}{'bytes':>12}{'(+/-)':>10}")
+    for rel_id, l in sorted(snapshot.links.items()):
+        key = f"rel:{rel_id}"
+        lines.append(f"{rel_id:<20}{l['links']:>10}{change(key, 'links'):>8}{l['bytes']:>12}{change(key, 'bytes'):>10}")
+    if snapshot.columns:
+        lines.append('')
+        lines.append(f"{'columns':<20}{'':>18}{'bytes':>12}{'(+/-)':>10}")
+        for name, size in sorted(snapshot.columns.items()):
+            lines.append(f"{name:<20}{'':>18}{size:>12}{change(f'columns:{name}', 'bytes'):>10}")
+    if snapshot.catalogs:
+        lines.append('')
+        lines.append(f"{'catalog':<20}{'rows':>10}{'in use':>8}{'mapped':>12}{'(+/-)':>10}")
+        for name, c in sorted(snapshot.catalogs.items()):
+            key = f"catalog:{name}"
+            lines.append(f"{name:<20}{c['rows']:>10}{c['materialized']:>8}{c['mapped_bytes']:>12}"
+                         f"{change(key, 'mapped_bytes'):>10}")
+    lines.append('')
+    lines.append(f"{'queue':<20}{'items':>10}{'(+/-)':>8}{'bytes':>12}{'(+/-)':>10}")
+    for name, q in snapshot.queues.items():
+        key = f"queue:{name}"
+        lines.append(f"{name:<20}{q['items']:>10}{change(key, 'items'):>8}{q['bytes']:>12}{change(key, 'bytes'):>10}")
+    lines.append('')
+    total = f"Estimated total:    {snapshot.total_bytes} bytes"
+    if previous is not None:
+        total += f" ({snapshot.total_bytes - previous.total_bytes:+d} since previous sample)"
+    lines.append(total)
+    if snapshot.max_rss is not None:
+        lines.append(f"Process peak RSS:   {snapshot.max_rss} bytes")
+    return '\\n'.join(lines)
+`;
+
+  // [KOMPONEN: Causal Tracing]
+  files["runtime/tracing.py"] = `# runtime/tracing.py
+from __future__ import annotations
+import functools
+import itertools
+import json
+import os
+import random
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+class Span:
+    """One timed operation inside a sampled trace"""
+    __slots__ = ('name', 'cat', 'trace_id', 'span_id', 'parent_id', 'tid', 'start', 'end', 'args')
+
+    def __init__(self, name: str, cat: str, trace_id: int, span_id: int, parent_id: Optional[int], args: Any):
+        self.name = name
+        self.cat = cat
+        self.trace_id = trace_id
+        self.span_id = span_id
+        self.parent_id = parent_id
+        self.tid = threading.get_ident()
+        self.args = args
+        self.start = time.perf_counter_ns()
+        self.end: Optional[int] = None
+
+    def __repr__(self):
+        return f"<Span#{self.span_id} {self.cat}:{self.name} trace={self.trace_id}>"
+
+class _Unsampled:
+    """Stack marker for a root dispatch that lost the sampling draw"""
+    __slots__ = ()
+
+    def __bool__(self):
+        return False
+
+_UNSAMPLED: Any = _Unsampled()
+
+class _ThreadTrace(threading.local):
+    """Per-thread stack of open spans"""
+    def __init__(self):
+        self.stack: List[Span] = []
+
+# Flow hand-off between threads: (parent span, flow id)
+Handoff = Tuple[Span, int]
+
+class Tracer:
+    """Sampled causal tracing of dispatches, actions, relationships and bridges.
+
+    The sampling decision is taken once per root dispatch (one with no
+    traced caller); everything it causes on the same thread, and on timer
+    threads it hands off to, joins the same trace. Relationship, bridge and
+    action spans are only recorded inside a sampled trace. Spans are kept in a bounded
+    buffer and written out as Chrome trace-event JSON.
+    """
+    enabled: bool = False  # checked on the hot paths before anything else
+    sample_rate: float = 0.0
+    max_spans: int = 100000
+    dropped: int = 0  # records discarded once the buffer was full
+    _records: List[Any] = []  # ended Spans, plus (phase, name, cat, ts, tid, id/args) tuples for instants and flows
+    _ids = itertools.count(1)
+    _rng = random.Random()
+    _epoch: int = time.perf_counter_ns()
+    _local = _ThreadTrace()
+    _lock = threading.Lock()
+
+    @classmethod
+    def configure(cls, sample_rate: float = 1.0, max_spans: int = 100000, seed: Optional[int] = None):
+        """Start tracing a fraction of root dispatches (0 disables tracing)"""
+        if not 0.0 <= sample_rate <= 1.0:
+            raise ValueError("sample_rate must be between 0 and 1")
+        cls.sample_rate = sample_rate
+        cls.max_spans = max_spans
+        if seed is not None:
+            cls._rng = random.Random(seed)
+        cls.enabled = sample_rate > 0.0
+
+    @classmethod
+    def disable(cls):
+        cls.enabled = False
+
+    @classmethod
+    def clear(cls):
+        """Drop recorded spans"""
+        with cls._lock:
+            cls._records = []
+            cls.dropped = 0
+        cls._epoch = time.perf_counter_ns()
+
+    @classmethod
+    def begin(cls, name: str, cat: str, args: Any = None, root: bool = False) -> Optional[Span]:
+        """Open a span under the current one; root=True may also start a new trace.
+
+        Returns None when there is no sampled trace to join (nothing to
+        close then). A root that loses the sampling draw returns a falsy
+        marker that must still be passed to end(), so everything it causes
+        is skipped with a single lookup.
+        """
+        stack = cls._local.stack
+        if stack:
+            parent = stack[-1]
+            if parent is _UNSAMPLED:
+                return None
+            span = Span(name, cat, parent.trace_id, next(cls._ids), parent.span_id, args)
+        elif not root:
+            return None
+        elif cls._rng.random() < cls.sample_rate:
+            span_id = next(cls._ids)
+            span = Span(name, cat, span_id, span_id, None, args)
+        else:
+            stack.append(_UNSAMPLED)
+            return _UNSAMPLED
+        stack.append(span)
+        return span
+
+    @classmethod
+    def end(cls, span: Optional[Span], args: Optional[Dict[str, Any]] = None):
+        """Close the span opened by the matching begin()"""
+        if span is None:
+            return
+        cls._local.stack.pop()
+        if not span:
+            return
+        span.end = time.perf_counter_ns()
+        if args:
+            span.args = dict(span.args or {}, **args)
+        cls._record(span)
+
+    @classmethod
+    def current(cls) -> Optional[Span]:
+        """Innermost open span of a sampled trace on this thread"""
+        stack = cls._local.stack
+        return stack[-1] if stack and stack[-1] is not _UNSAMPLED else None
+
+    @classmethod
+    def instant(cls, name: str, cat: str, args: Any = None):
+        """Mark a point in time inside the current sampled trace"""
+        span = cls.current()
+        if span is not None:
+            cls._record(('i', name, cat, time.perf_counter_ns(), threading.get_ident(), args))
+
+    @classmethod
+    def handoff(cls) -> Optional[Handoff]:
+        """Capture the current span so work started on another thread joins its trace"""
+        span = cls.current()
+        if span is None:
+            return None
+        flow_id = next(cls._ids)
+        cls._record(('s', span.name, 'flow', time.perf_counter_ns(), threading.get_ident(), flow_id))
+        return span, flow_id
+
+    @classmethod
+    def resume(cls, handoff: Optional[Handoff]) -> '_Resumed':
+        """Context manager making a handed-off span the parent of spans opened inside it"""
+        return _Resumed(cls, handoff)
+
+    @classmethod
+    def _record(cls, record: Any):
+        with cls._lock:
+            if len(cls._records) >= cls.max_spans:
+                cls.dropped += 1
+                return
+            cls._records.append(record)
+
+    @classmethod
+    def spans(cls) -> List[Span]:
+        with cls._lock:
+            return [r for r in cls._records if isinstance(r, Span)]
+
+    @classmethod
+    def export(cls, path: str) -> int:
+        """Write recorded spans as a Chrome trace-event file; returns the number of events"""
+        with cls._lock:
+            records = list(cls._records)
+        pid = os.getpid()
+        threads: Dict[int, int] = {}
+        events: List[Dict[str, Any]] = []
+
+        def ts(ns: int) -> float:
+            return (ns - cls._epoch) / 1000.0
+
+        def tid(ident: int) -> int:
+            return threads.setdefault(ident, len(threads) + 1)
+
+        for r in records:
+            if isinstance(r, Span):
+                args = {'trace_id': r.trace_id, 'span_id': r.span_id, 'parent_id': r.parent_id}
+                args.update(_json_args(r.args))
+                events.append({'name': r.name, 'cat': r.cat, 'ph': 'X', 'ts': ts(r.start), 'dur': (r.end - r.start) / 1000.0,
+                               'pid': pid, 'tid': tid(r.tid), 'args': args})
+            else:
+                phase, name, cat, at, ident, extra = r
+                event = {'name': name, 'cat': cat, 'ph': phase, 'ts': ts(at), 'pid': pid, 'tid': tid(ident)}
+                if phase == 'i':
+                    event['s'] = 't'
+                    event['args'] = _json_args(extra)
+                else:
+                    event['id'] = extra
+                    if phase == 'f':
+                        event['bp'] = 'e'
+                events.append(event)
+        for ident, n in threads.items():
+            events.append({'name': 'thread_name', 'ph': 'M', 'pid': pid, 'tid': n, 'args': {'name': f'thread-{ident}'}})
+        with open(path, 'w') as f:
+            json.dump({'traceEvents': events, 'displayTimeUnit': 'ms', 'otherData': {'dropped': cls.dropped}}, f)
+        print(f"[TRACE] Wrote {len(events)} events to {path}")
+        return len(events)
+
+class _Resumed:
+    def __init__(self, tracer: type, handoff: Optional[Handoff]):
+        self.tracer = tracer
+        self.handoff = handoff
+
+    def __enter__(self):
+        if self.handoff is not None:
+            span, flow_id = self.handoff
+            self.tracer._local.stack.append(span)
+            self.tracer._record(('f', span.name, 'flow', time.perf_counter_ns(), threading.get_ident(), flow_id))
+
+    def __exit__(self, *exc):
+        if self.handoff is not None:
+            self.tracer._local.stack.pop()
+
+def traced(cat: str, name: Optional[str] = None) -> Callable:
+    """Decorator: trace calls of a function as spans (arguments are kept for the export)"""
+    def wrap(fn: Callable) -> Callable:
+        label = name or fn.__name__
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            if not Tracer.enabled:
+                return fn(*args, **kwargs)
+            span = Tracer.begin(label, cat, args)
+            if span is None:
+                return fn(*args, **kwargs)
+            if args and isinstance(args[0], str):
+                span.name = f"{label} {args[0]}"  # e.g. the relationship id
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                Tracer.end(span)
+        return wrapper
+    return wrap
+
+def _json_args(args: Any) -> Dict[str, Any]:
+    """Span arguments as JSON-friendly values (instances by their repr)"""
+    if args is None:
+        return {}
+    if isinstance(args, dict):
+        return {str(k): v if isinstance(v, (str, int, float, bool, type(None))) else repr(v) for k, v in args.items()}
+    return {'args': [a if isinstance(a, (str, int, float, bool, type(None))) else repr(a) for a in args]}
+`;
+
+  // [KOMPONEN: Runtime Context]
+  files["runtime/context.py"] = `# runtime/context.py
+from __future__ import annotations
+import contextlib
+import contextvars
+import itertools
+import threading
+import time
+import weakref
+from collections import defaultdict
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+class StepGate:
+    """The root steps in flight in one context, and a way to hold new ones back.
+
+    A step that opens its own unit of work enters before it looks up its
+    transition and leaves once it has committed. While the gate is closed,
+    steps that have not entered yet wait for it to open again, and drain()
+    waits for the ones already inside. A thread that is itself inside a step
+    of a closed gate is let through, since whoever closed it is waiting for
+    that step to finish.
+    """
+
+    def __init__(self):
+        self.active: List[int] = []  # thread ident per step inside (list append/remove are atomic)
+        self.closed = False
+        self._closers = 0
+        self._opened = threading.Event()
+        self._opened.set()
+        self._lock = threading.Lock()
+
+    def enter(self, me: int) -> bool:
+        """Count a step of thread me in; returns True if it had to wait for the gate to open"""
+        self.active.append(me)
+        return self.closed and self.admit(me)
+
+    def admit(self, me: int) -> bool:
+        """For a step already counted in while the gate is closed: wait for it to open unless let through"""
+        if _inside_closed_gate(me, self):
+            return False
+        active = self.active
+        while self.closed:
+            active.remove(me)
+            self._opened.wait()
+            active.append(me)
+        return True
+
+    def leave(self, me: int):
+        self.active.remove(me)
+
+    def close(self):
+        """Hold back steps that have not entered yet (closes nest)"""
+        with self._lock:
+            self._closers += 1
+            self._opened.clear()
+            self.closed = True
+
+    def open(self):
+        with self._lock:
+            self._closers -= 1
+            if not self._closers:
+                self.closed = False
+                self._opened.set()
+
+    def drain(self, poll: float = 0.0005):
+        """Wait until no step is inside (call with the gate closed, from outside any step)"""
+        if threading.get_ident() in self.active:
+            raise RuntimeError("Cannot wait for a context's steps from inside one of them")
+        while self.active:
+            time.sleep(poll)
+
+def _inside_closed_gate(me: int, entering: StepGate) -> bool:
+    """Whether thread me already has a step inside a closed gate (counting entering's new entry out)"""
+    for ctx in RuntimeContext.all():
+        gate = ctx.steps
+        inside = gate.active.count(me) - (gate is entering)
+        if gate.closed and inside > 0:
+            return True
+    return False
+
+@contextlib.contextmanager
+def quiesced(contexts: Iterable['RuntimeContext']) -> Iterator[None]:
+    """Hold back new steps in contexts and wait for the ones in flight to commit"""
+    gates = [ctx.steps for ctx in contexts]
+    for gate in gates:
+        gate.close()
+    try:
+        for gate in gates:
+            gate.drain()
+        yield
+    finally:
+        for gate in gates:
+            gate.open()
+
+class RuntimeContext:
+    """State of one simulation: instances, links, timers and messages.
+
+    ObjectStore, the relationship functions and RuntimeServices act on the
+    context that is current for the calling thread (the default context
+    unless another one is entered with \`with ctx:\`). Instances remember the
+    context they were created in, and events dispatched to them run there,
+    so independent domains can share a process and run on separate threads.
+    """
+    _ids = itertools.count(1)
+    _all: 'weakref.WeakSet[RuntimeContext]' = weakref.WeakSet()
+
+    def __init__(self, name: Optional[str] = None):
+        self.name = name or f"context-{next(self._ids)}"
+        self.store: Dict[str, Dict[str, Any]] = defaultdict(dict)  # { classname: {id: instance} }
+        self.columns: Dict[str, Any] = {}  # { classname: ColumnStore }
+        self.links: Dict[str, Dict[Tuple[Any, Any], None]] = {}  # { rel_id: {(inst1, inst2): None} } in link order
+        self.partners: Dict[str, Dict[Any, List[Any]]] = {}  # { rel_id: {instance: [related instances]} }
+        self.timers: Dict[str, threading.Timer] = {}
+        self.message_bus: List[Dict] = []
+        self.current_time: float = time.time()
+        self.lock = threading.RLock()  # held while a unit of work is applied to this context
+        self.steps = StepGate()  # root steps in flight (reload and eviction wait for them)
+        self.version = 0  # units of work committed
+        self.instance_seq = 0  # instances created so far (numbers them for snapshots)
+        self.snapshots: Tuple[Any, ...] = ()  # open read snapshots, handed old values before each write
+        self._tokens = threading.local()
+        RuntimeContext._all.add(self)
+
+    def __repr__(self):
+        return f"<RuntimeContext {self.name}>"
+
+    def __enter__(self) -> 'RuntimeContext':
+        tokens = self._tokens.__dict__.setdefault('stack', [])
+        tokens.append(_current.set(self))
+        return self
+
+    def __exit__(self, *exc):
+        _current.reset(self._tokens.stack.pop())
+
+    def run(self, fn: Callable, *args, **kwargs) -> Any:
+        """Call fn with this context current"""
+        with self:
+            return fn(*args, **kwargs)
+
+    def snapshot(self) -> Any:
+        """Open a consistent point-in-time read view (see runtime.snapshot.Snapshot)"""
+        from runtime.snapshot import Snapshot
+        with self.lock:  # between commits
+            snap = Snapshot(self)
+            self.snapshots = self.snapshots + (snap,)
+        return snap
+
+    def _release_snapshot(self, snap: Any):
+        with self.lock:
+            self.snapshots = tuple(s for s in self.snapshots if s is not snap)
+
+    # Copy-on-write hooks: the runtime calls these (only when snapshots are open) before changing state
+
+    def preserve_attrs(self, inst: Any):
+        for snap in self.snapshots:
+            snap._keep_attrs(inst)
+
+    def preserve_extent(self, class_name: str):
+        for snap in self.snapshots:
+            snap._keep_extent(class_name)
+
+    def preserve_links(self, rel_id: str, inst1: Any, inst2: Any):
+        for snap in self.snapshots:
+            snap._keep_links(rel_id, inst1, inst2)
+
+    def preserve_all(self):
+        for snap in self.snapshots:
+            snap._keep_all()
+
+    def clear(self):
+        """Cancel timers and drop all instances, links and messages"""
+        if self.snapshots:
+            self.preserve_all()
+        for timer in list(self.timers.values()):
+            timer.cancel()
+        self.timers.clear()
+        self.store = defaultdict(dict)
+        for columns in self.columns.values():
+            columns.reset()
+        self.links = {}
+        self.partners = {}
+        self.message_bus = []
+
+    @classmethod
+    def all(cls) -> List['RuntimeContext']:
+        """Every live context"""
+        return list(cls._all)
+
+_default = RuntimeContext('default')
+_current: contextvars.ContextVar = contextvars.ContextVar('runtime_context', default=_default)
+
+def current_context() -> RuntimeContext:
+    """The context the calling thread is working in"""
+    return _current.get()
+
+def default_context() -> RuntimeContext:
+    """The process-wide context used when no other one has been entered"""
+    return _default
+`;
+
+  // [KOMPONEN: Runtime Broadcast]
+  files["runtime/broadcast.py"] = `# runtime/broadcast.py
+from __future__ import annotations
+import time
+import types
+from concurrent.futures import ThreadPoolExecutor
+from threading import get_ident
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple, Union
+from runtime.context import current_context
+from runtime.storage import ObjectStore
+from runtime.state_machine import StateMachine
+from runtime.tracing import Tracer
+from runtime.unit_of_work import active_unit
+
+class BroadcastResult:
+    """Aggregate outcome of one bulk dispatch"""
+
+    def __init__(self, event: str):
+        self.event = event
+        self.targets = 0  # instances selected
+        self.handled = 0  # transitions taken
+        self.ignored = 0  # no transition for the event in the instance's state (when grouped or when its turn came)
+        self.failed: List[Any] = []  # instances whose guard failed or whose action rolled back
+        self.by_state: Dict[str, Dict[str, Any]] = {}  # { from state: {targets, handled, to} }
+        self.seconds = 0.0
+
+    def summary(self) -> Dict[str, Any]:
+        return {
+            'event': self.event,
+            'targets': self.targets,
+            'handled': self.handled,
+            'ignored': self.ignored,
+            'failed': len(self.failed),
+            'by_state': self.by_state,
+            'seconds': self.seconds,
+        }
+
+    def __repr__(self):
+        return (f"<BroadcastResult {self.event}: {self.handled}/{self.targets} handled, "
+                f"{self.ignored} ignored, {len(self.failed)} failed>")
+
+# (runtime context, state model, state index) -> state machines in that state
+_Group = Tuple[Any, Any, int]
+
+def broadcast(event: str, targets: Union[str, Iterable[Any]], state: Union[str, Iterable[str], None] = None,
+              where: Optional[Callable[[Any], bool]] = None, payload: Optional[Dict[str, Any]] = None,
+              workers: int = 1, chunk_size: int = 256) -> BroadcastResult:
+    """Send one event to many instances.
+
+    targets is a class name (every instance of it in the current context)
+    or an iterable of instances; state and where narrow the selection.
+    Targets are grouped by their current state so each group looks its
+    transition up once; groups with no transition are counted as ignored
+    without touching their instances. Called outside a step, each instance
+    takes its step as its own unit of work. Called from an action with
+    workers=1, the steps run on the caller's thread and join the action's
+    unit like any event the action generates: they commit or roll back with
+    it, and an action error in one of them propagates to the caller. With
+    workers > 1 the steps are spread over a thread pool in chunks, each
+    step its own unit of work (worker threads never join the caller's unit,
+    so use workers only outside actions). The payload is shared read-only
+    by every step.
+    """
+    started = time.perf_counter()
+    result = BroadcastResult(event)
+    instances = ObjectStore.select_all(targets) if isinstance(targets, str) else targets
+    states = {state} if isinstance(state, str) else set(state) if state is not None else None
+    shared = types.MappingProxyType(dict(payload or {}))
+
+    groups: Dict[_Group, List[Any]] = {}
+    for inst in instances:
+        sm = inst.__dict__.get('sm')
+        if sm is not None:
+            model, index, target = sm.model, sm.index, sm
+        elif '_paged_state' in inst.__dict__:
+            # Paged out: grouped by the state it was evicted in, faulted in only if that state handles the event
+            model, index, target = type(inst)._SM, inst._paged_state, inst
+        else:
+            continue
+        if states is not None and model.states[index] not in states:
+            continue
+        if where is not None and not where(inst):
+            continue
+        key = (inst._ctx, model, index)
+        machines = groups.get(key)
+        if machines is None:
+            machines = groups[key] = []
+        machines.append(target)
+    result.targets = sum(len(machines) for machines in groups.values())
+
+    work: List[Tuple[Any, Any, int, int, List[Any]]] = []  # (ctx, transition, state index, event index, machines)
+    for (ctx, model, index), machines in groups.items():
+        name = model.states[index]
+        stats = result.by_state.setdefault(name, {'targets': 0, 'handled': 0, 'to': None})
+        stats['targets'] += len(machines)
+        event_index = model.event_index.get(event)
+        transition = model.table[index][event_index] if event_index is not None else None
+        if transition is None:
+            result.ignored += len(machines)
+            continue
+        machines = [target if target.__class__ is StateMachine else target.sm for target in machines]
+        next_index = transition[2]
+        stats['to'] = model.states[next_index] if next_index is not None else name
+        print(f"[BROADCAST] {event} -> {len(machines)} {machines[0].owner.kl} in {name}")
+        size = chunk_size if workers > 1 else len(machines)
+        for i in range(0, len(machines), size):
+            work.append((ctx, transition, index, event_index, machines[i:i + size]))
+
+    if workers > 1 and len(work) > 1:
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            outcomes = list(pool.map(lambda chunk: _run_chunk(*chunk, shared), work))
+    else:
+        outcomes = [_run_chunk(*chunk, shared) for chunk in work]
+
+    for (ctx, transition, index, event_index, machines), (handled, ignored, failed) in zip(work, outcomes):
+        result.handled += handled
+        result.ignored += ignored
+        result.failed.extend(failed)
+        result.by_state[machines[0].model.states[index]]['handled'] += handled
+    result.seconds = time.perf_counter() - started
+    return result
+
+def _run_chunk(ctx: Any, transition: Any, index: int, event_index: int, machines: List[Any],
+               payload: Any) -> Tuple[int, int, List[Any]]:
+    """Fire a looked-up transition on each machine still in the grouped state; returns (handled, ignored, failed)"""
+    handled = 0
+    ignored = 0
+    failed = []
+    traced = Tracer.enabled  # traced dispatches go through the normal path to get their spans
+    entered = ctx is not current_context()
+    if entered:
+        ctx.__enter__()
+    me = get_ident()
+    gate = ctx.steps if active_unit.uow is None else None  # steps joining the caller's unit count under its step
+    waited = gate is not None and gate.enter(me)  # models may have been reloaded meanwhile: look transitions up again
+    try:
+        for sm in machines:
+            if sm.owner.__dict__.get('sm') is not sm:
+                sm = sm._resolved()  # evicted (or faulted back in) since grouping
+            if sm.index == index and not traced and not waited:
+                ok = sm._fire(transition, event_index, payload, False)
+            elif sm.model.table[sm.index][event_index] is None:
+                ignored += 1  # moved on since grouping (an earlier step sent it an event) to a state that ignores it
+                continue
+            else:
+                ok = sm.dispatch_index(event_index, payload)
+            if ok:
+                handled += 1
+            else:
+                failed.append(sm.owner)
+    finally:
+        if gate is not None:
+            gate.leave(me)
+        if entered:
+            ctx.__exit__(None, None, None)
+    return handled, ignored, failed
+`;
+
+  // [KOMPONEN: Runtime Snapshot]
+  files["runtime/snapshot.py"] = `# runtime/snapshot.py
+from __future__ import annotations
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+class Snapshot:
+    """Point-in-time read view of a runtime context, kept by copy-on-write.
+
+    Opening a snapshot copies nothing. While it is open, every write to the
+    context (attribute commits, creates and deletes, relates and unrelates)
+    first hands the snapshot the value about to be overwritten, once per
+    instance, extent or relationship end. Reads return that saved value if
+    there is one and the live value otherwise, so a long report sees the
+    state as of the commit boundary it was opened at while dispatch carries
+    on. Close the snapshot (or use it as a context manager) to stop the
+    copying.
+    """
+
+    def __init__(self, ctx: Any):
+        self.ctx = ctx
+        self.version = ctx.version  # units of work committed before the snapshot
+        self.seq = ctx.instance_seq  # instances numbered above this were created after it
+        self.taken = time.time()
+        self.closed = False
+        self._attrs: Dict[Any, Dict[str, Any]] = {}  # { instance: attributes at snapshot time }
+        self._extents: Dict[str, Dict[str, Any]] = {}  # { classname: {id: instance} }
+        self._links: Dict[str, Dict[Tuple[Any, Any], None]] = {}  # { rel_id: link pairs }
+        self._partners: Dict[Tuple[str, Any], List[Any]] = {}  # { (rel_id, instance): related instances }
+        self._complete = False  # everything preserved (the live state was cleared)
+
+    def __repr__(self):
+        return f"<Snapshot {self.ctx.name} v{self.version}{' closed' if self.closed else ''}>"
+
+    def __enter__(self) -> 'Snapshot':
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        """Stop preserving and drop the saved values"""
+        if not self.closed:
+            self.ctx._release_snapshot(self)
+            self.closed = True
+            self._attrs = {}
+            self._extents = {}
+            self._links = {}
+            self._partners = {}
+
+    # --- Writer side: called by the runtime before it changes live state ---
+
+    def _keep_attrs(self, inst: Any):
+        if self._complete or inst._seq > self.seq or inst in self._attrs:
+            return
+        self._attrs[inst] = _current_attrs(inst)
+
+    def _keep_extent(self, class_name: str):
+        if self._complete or class_name in self._extents:
+            return
+        self._extents[class_name] = dict(self.ctx.store.get(class_name, {}))
+
+    def _keep_links(self, rel_id: str, inst1: Any, inst2: Any):
+        if self._complete:
+            return
+        if rel_id not in self._links:
+            self._links[rel_id] = dict(self.ctx.links.get(rel_id, {}))
+        partners = self.ctx.partners.get(rel_id, {})
+        for inst in (inst1, inst2):
+            if inst._seq <= self.seq:
+                if (rel_id, inst) not in self._partners:
+                    self._partners[(rel_id, inst)] = list(partners.get(inst, ()))
+                self._keep_attrs(inst)  # reference slots live in the attributes
+
+    def _keep_all(self):
+        """Preserve the whole context (before it is cleared)"""
+        if self._complete:
+            return
+        ctx = self.ctx
+        for class_name, extent in list(ctx.store.items()):
+            self._keep_extent(class_name)
+            for inst in list(extent.values()):
+                self._keep_attrs(inst)
+        for rel_id, partners in list(ctx.partners.items()):
+            self._links.setdefault(rel_id, dict(ctx.links.get(rel_id, {})))
+            for inst, related in list(partners.items()):
+                self._partners.setdefault((rel_id, inst), list(related))
+        self._complete = True
+
+    # --- Reader side ---
+
+    def _extent(self, class_name: str) -> Dict[str, Any]:
+        saved = self._extents.get(class_name)
+        if saved is None:
+            live = {} if self._complete else dict(self.ctx.store.get(class_name, {}))
+            saved = self._extents.get(class_name)  # preserved while we were copying: that copy is older
+            if saved is None:
+                return live
+        return saved
+
+    def select_all(self, class_name: str) -> List[Any]:
+        """Instances of a class as of the snapshot"""
+        return list(self._extent(class_name).values())
+
+    def find(self, class_name: str, id: str) -> Optional[Any]:
+        return self._extent(class_name).get(id)
+
+    def count(self, class_name: str) -> int:
+        return len(self._extent(class_name))
+
+    def attrs(self, inst: Any) -> Dict[str, Any]:
+        """All attribute values of an instance as of the snapshot"""
+        saved = self._attrs.get(inst)
+        if saved is None:
+            live = _current_attrs(inst)
+            saved = self._attrs.get(inst)
+            if saved is None:
+                return live
+        return dict(saved)
+
+    def get_attr(self, inst: Any, name: str) -> Any:
+        saved = self._attrs.get(inst)
+        if saved is None:
+            value = inst._stored_attr(name)
+            saved = self._attrs.get(inst)
+            if saved is None:
+                return value
+        return saved.get(name)
+
+    def state(self, inst: Any) -> Optional[str]:
+        """Current state of an instance's state machine as of the snapshot"""
+        sm = inst.__dict__.get('sm')
+        model = sm.model if sm is not None else type(inst)._SM if '_paged_state' in inst.__dict__ else None
+        if model is None or not model.state_attr:
+            return None
+        return self.get_attr(inst, model.state_attr)
+
+    def select_related(self, rel_id: str, inst: Any) -> List[Any]:
+        saved = self._partners.get((rel_id, inst))
+        if saved is None:
+            if self._complete:
+                return []
+            live = list(self.ctx.partners.get(rel_id, {}).get(inst, ()))
+            saved = self._partners.get((rel_id, inst))
+            if saved is None:
+                return live
+        return list(saved)
+
+    def select_one_related(self, rel_id: str, inst: Any) -> Optional[Any]:
+        related = self.select_related(rel_id, inst)
+        return related[0] if related else None
+
+    def links(self, rel_id: str) -> List[Tuple[Any, Any]]:
+        """Link pairs of a relationship as of the snapshot"""
+        saved = self._links.get(rel_id)
+        if saved is None:
+            live = [] if self._complete else list(self.ctx.links.get(rel_id, {}))
+            saved = self._links.get(rel_id)
+            if saved is None:
+                return live
+        return list(saved)
+
+    def stats(self) -> Dict[str, int]:
+        """How much has been copied to keep the snapshot consistent"""
+        return {
+            'version': self.version,
+            'commits_since': self.ctx.version - self.version,
+            'instances': len(self._attrs),
+            'extents': len(self._extents),
+            'relationships': len(self._links),
+            'partner_lists': len(self._partners),
+        }
+
+def _current_attrs(inst: Any) -> Dict[str, Any]:
+    """Committed attribute values of an instance, including column-stored ones"""
+    attrs = dict(inst._attrs)
+    columns = inst._columns
+    if columns is not None:
+        for name in columns.arrays:
+            attrs[name] = columns.get(inst, name)
+    return attrs
+`;
+
+  // [KOMPONEN: Asyncio Event Server]
+  files["runtime/event_server.py"] = `# runtime/event_server.py
+from __future__ import annotations
+import asyncio
+import collections
+import json
+import os
+import threading
+import weakref
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Deque, Dict, List, Optional, Tuple
+from runtime.context import RuntimeContext, current_context
+from runtime.storage import ObjectStore
+
+class EventServer:
+    """Asyncio JSON-lines front end that feeds events to model instances.
+
+    Each request is one JSON object on its own line:
+
+        {"id": 7, "class": "VendingMachine", "instance": "vendingmachine_1",
+         "event": "ProductSelected", "params": {"p_productCode": "A1"}}
+
+    and is answered by one line with the dispatch result and the state the
+    instance is in afterwards:
+
+        {"id": 7, "ok": true, "state": "WaitingPayment"}
+
+    "class" is a class name or KeyLetters; leave out "event" to only read the
+    state. Clients may pipeline: a connection's requests are handled in the
+    order sent and answered in that order, while connections are served
+    concurrently. Listens on TCP (host, port) or on a Unix socket (path).
+
+    Events are dispatched on the event loop thread. With workers > 0 they run
+    on a thread pool instead, so actions that block in bridge calls do not
+    hold up other connections; requests for the same instance still take
+    their turns, one at a time.
+    """
+
+    def __init__(self, host: str = '127.0.0.1', port: int = 0, path: Optional[str] = None,
+                 ctx: Optional[RuntimeContext] = None, workers: int = 0, backlog: int = 4096,
+                 line_limit: int = 64 * 1024):
+        self.host = host
+        self.port = port
+        self.path = path
+        self.ctx = ctx or current_context()
+        self.workers = workers
+        self.backlog = backlog
+        self.line_limit = line_limit
+        self.requests = 0
+        self.errors = 0
+        self.connections = 0  # accepted so far
+        self._counts = threading.Lock()  # requests and errors are counted on worker threads too
+        self.open_connections = 0
+        self._classes: Dict[str, str] = {}  # { class name or KeyLetters: class name }
+        self._turns: 'weakref.WeakKeyDictionary[Any, threading.Lock]' = weakref.WeakKeyDictionary()  # per instance, with workers
+        self._turns_lock = threading.Lock()
+        self._pool: Optional[ThreadPoolExecutor] = None
+        self._server: Optional[asyncio.AbstractServer] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def address(self) -> str:
+        return f"unix:{self.path}" if self.path else f"{self.host}:{self.port}"
+
+    async def serve(self) -> asyncio.AbstractServer:
+        """Start listening on the running event loop"""
+        if self.workers > 0 and self._pool is None:
+            self._pool = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='event-server')
+        if self.path:
+            if os.path.exists(self.path):
+                os.unlink(self.path)
+            self._server = await asyncio.start_unix_server(self._handle, path=self.path, backlog=self.backlog,
+                                                           limit=self.line_limit)
+        else:
+            self._server = await asyncio.start_server(self._handle, self.host, self.port, backlog=self.backlog,
+                                                      limit=self.line_limit)
+            self.port = self._server.sockets[0].getsockname()[1]
+        print(f"[EVENTS] Event server listening on {self.address}")
+        return self._server
+
+    async def serve_forever(self):
+        server = await self.serve()
+        try:
+            async with server:
+                await server.serve_forever()
+        finally:
+            self._close()
+
+    def start(self) -> str:
+        """Serve on a background thread with its own event loop; returns the address"""
+        if self._thread is not None:
+            return self.address
+        ready = threading.Event()
+        failure = []
+
+        def run():
+            self._loop = asyncio.new_event_loop()
+            try:
+                self._loop.run_until_complete(self.serve())
+            except Exception as e:
+                failure.append(e)
+                ready.set()
+                return
+            ready.set()
+            self._loop.run_forever()
+            self._server.close()
+            self._loop.run_until_complete(self._server.wait_closed())
+            self._loop.close()
+            self._close()
+
+        self._thread = threading.Thread(target=run, name='event-server', daemon=True)
+        self._thread.start()
+        ready.wait()
+        if failure:
+            self._thread = None
+            raise failure[0]
+        return self.address
+
+    def stop(self):
+        if self._thread is None:
+            return
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join()
+        self._thread = None
+        self._loop = None
+
+    def __enter__(self) -> 'EventServer':
+        self.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            'requests': self.requests,
+            'errors': self.errors,
+            'connections': self.connections,
+            'open_connections': self.open_connections,
+        }
+
+    def _close(self):
+        if self._pool is not None:
+            self._pool.shutdown(wait=True)
+            self._pool = None
+        if self.path and os.path.exists(self.path):
+            os.unlink(self.path)
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        self.connections += 1
+        self.open_connections += 1
+        loop = asyncio.get_running_loop()
+        pending = b''  # start of a request line not yet complete
+        try:
+            while True:
+                chunk = await reader.read(self.line_limit)
+                if not chunk:
+                    break
+                # Everything a pipelining client has sent so far is answered with one write
+                *lines, pending = (pending + chunk).split(b'\\n')
+                if lines:
+                    if self._pool is None:
+                        replies = self._answer_all(lines)
+                    else:
+                        replies = await loop.run_in_executor(self._pool, self._answer_all, lines)
+                    writer.write(replies)
+                if len(pending) > self.line_limit:
+                    with self._counts:
+                        self.errors += 1
+                    writer.write(_encode({'id': None, 'ok': False, 'error': f"Request line exceeds {self.line_limit} bytes"}))
+                    break
+                if writer.transport.get_write_buffer_size() > self.line_limit:
+                    await writer.drain()  # the client is not reading its replies
+            await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            self.open_connections -= 1
+            writer.close()
+            try:
+                await writer.wait_closed()
+            except ConnectionError:
+                pass
+
+    def _answer_all(self, lines: List[bytes]) -> bytes:
+        """Handle a connection's request lines in order; returns their reply lines"""
+        replies = []
+        errors = 0
+        for line in lines:
+            if line.strip():
+                reply, failed = self._answer(line)
+                replies.append(reply)
+                errors += failed
+        with self._counts:
+            self.requests += len(replies)
+            self.errors += errors
+        return b''.join(replies)
+
+    def _answer(self, line: bytes) -> Tuple[bytes, bool]:
+        """Handle one request line; returns the reply line and whether the request failed"""
+        try:
+            request = json.loads(line)
+        except ValueError as e:
+            return _encode({'id': None, 'ok': False, 'error': f"Malformed request: {e}"}), True
+        if not isinstance(request, dict):
+            return _encode({'id': None, 'ok': False, 'error': "Request must be a JSON object"}), True
+        reply: Dict[str, Any] = {'id': request.get('id')}
+        try:
+            with self.ctx:
+                reply.update(self._route(request))
+        except Exception as e:
+            reply.update(ok=False, error=f"{type(e).__name__}: {e}")
+        return _encode(reply), 'error' in reply
+
+    def _route(self, request: Dict[str, Any]) -> Dict[str, Any]:
+        class_name = self._class_name(request.get('class'))
+        instance_id = request.get('instance')
+        inst = ObjectStore.find(class_name, instance_id) if class_name else None
+        if inst is None:
+            return {'ok': False, 'error': f"No instance {request.get('class')}:{instance_id}"}
+        if self._pool is None:
+            return self._request(inst, class_name, request)
+        with self._turns_lock:
+            turn = self._turns.get(inst)
+            if turn is None:
+                turn = self._turns[inst] = threading.Lock()
+        with turn:  # connections on other worker threads may be sending to the same instance
+            return self._request(inst, class_name, request)
+
+    def _request(self, inst: Any, class_name: str, request: Dict[str, Any]) -> Dict[str, Any]:
+        sm = inst.__dict__.get('sm')
+        event = request.get('event')
+        ok = True
+        if event is not None:
+            if sm is None:
+                return {'ok': False, 'error': f"{class_name} has no state machine"}
+            params = request.get('params') or {}
+            if not isinstance(params, dict):
+                return {'ok': False, 'error': "params must be a JSON object"}
+            ok = inst.dispatch_event(event, **params)
+        return {'ok': ok, 'state': sm.get_current_state() if sm is not None else None}
+
+    def _class_name(self, name: Any) -> Optional[str]:
+        """Resolve a class name or KeyLetters to the name instances are stored under"""
+        if not isinstance(name, str):
+            return None
+        resolved = self._classes.get(name)
+        if resolved is None:
+            from runtime.base import InstanceBase
+            pending = list(InstanceBase.__subclasses__())
+            while pending:
+                cls = pending.pop()
+                self._classes.setdefault(cls.__name__, cls.__name__)
+                kl = cls.__dict__.get('kl')
+                if isinstance(kl, str):
+                    self._classes.setdefault(kl, cls.__name__)
+                pending.extend(cls.__subclasses__())
+            resolved = self._classes.get(name)
+        return resolved
+
+def _encode(reply: Dict[str, Any]) -> bytes:
+    return (json.dumps(reply, default=str) + '\\n').encode()
+
+class EventClient:
+    """Asyncio client for EventServer that pipelines requests on one connection.
+
+    submit() writes a request and returns a future for its reply without
+    waiting for earlier replies; send() submits and waits.
+    """
+
+    def __init__(self, host: str = '127.0.0.1', port: int = 0, path: Optional[str] = None):
+        self.host = host
+        self.port = port
+        self.path = path
+        self._ids = 0
+        self._outgoing: List[bytes] = []  # encoded requests written together on the next loop turn
+        self._pending: Deque[Tuple[int, asyncio.Future]] = collections.deque()
+        self._reader: Optional[asyncio.StreamReader] = None
+        self._writer: Optional[asyncio.StreamWriter] = None
+        self._receiver: Optional[asyncio.Task] = None
+
+    async def connect(self) -> 'EventClient':
+        if self.path:
+            self._reader, self._writer = await asyncio.open_unix_connection(self.path)
+        else:
+            self._reader, self._writer = await asyncio.open_connection(self.host, self.port)
+        self._receiver = asyncio.get_running_loop().create_task(self._receive())
+        return self
+
+    async def close(self):
+        if self._writer is None:
+            return
+        self._flush()
+        self._writer.close()
+        try:
+            await self._writer.wait_closed()
+        except ConnectionError:
+            pass
+        if self._receiver is not None:
+            self._receiver.cancel()
+            try:
+                await self._receiver
+            except asyncio.CancelledError:
+                pass
+        self._fail_pending(ConnectionError("Connection closed"))
+        self._writer = None
+
+    async def __aenter__(self) -> 'EventClient':
+        return await self.connect()
+
+    async def __aexit__(self, *exc):
+        await self.close()
+
+    def submit(self, class_name: str, instance: str, event: Optional[str] = None, **params) -> asyncio.Future:
+        """Send one request now; the future resolves with its reply"""
+        if self._writer is None or self._receiver.done():
+            raise ConnectionError("EventClient is not connected")
+        self._ids += 1
+        request: Dict[str, Any] = {'id': self._ids, 'class': class_name, 'instance': instance}
+        if event is not None:
+            request['event'] = event
+            if params:
+                request['params'] = params
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((self._ids, future))
+        if not self._outgoing:
+            loop.call_soon(self._flush)
+        self._outgoing.append(_encode(request))
+        return future
+
+    async def send(self, class_name: str, instance: str, event: Optional[str] = None, **params) -> Dict[str, Any]:
+        future = self.submit(class_name, instance, event, **params)
+        self._flush()
+        await self._writer.drain()
+        return await future
+
+    def _flush(self):
+        if self._outgoing and self._writer is not None:
+            self._writer.write(b''.join(self._outgoing))
+            self._outgoing = []
+
+    async def _receive(self):
+        try:
+            while True:
+                line = await self._reader.readline()
+                if not line:
+                    break
+                try:
+                    reply = json.loads(line)
+                except ValueError as e:
+                    raise ConnectionError(f"Malformed reply: {e}") from e
+                if not isinstance(reply, dict):
+                    raise ConnectionError("Malformed reply: not a JSON object")
+                if not self._pending:
+                    continue
+                request_id, future = self._pending.popleft()
+                if reply.get('id') not in (request_id, None):
+                    future.set_exception(ConnectionError(f"Reply {reply.get('id')} out of order (expected {request_id})"))
+                elif not future.done():
+                    future.set_result(reply)
+        except ConnectionError as e:
+            self._fail_pending(e)
+            return
+        self._fail_pending(ConnectionError("Server closed the connection"))
+
+    def _fail_pending(self, error: Exception):
+        while self._pending:
+            _, future = self._pending.popleft()
+            if not future.done():
+                future.set_exception(error)
+`;
+
+  // [KOMPONEN: Bulk Loader]
+  files["runtime/bulk.py"] = `# runtime/bulk.py
+from __future__ import annotations
+import csv
+import gc
+import json
+import os
+import re
+import time
+import uuid
+from typing import Any, Callable, Dict, IO, Iterable, Iterator, List, Optional, Set, Tuple, Union
+from runtime.context import RuntimeContext, current_context
+from runtime.unit_of_work import active_unit
+from runtime.changefeed import ChangeFeed
+from runtime.state_machine import StateMachine
+from runtime.relationship import relate_many
+
+Record = Dict[str, Any]
+# rel_id -> (record field holding the related instance's id, related class or class name)
+Links = Dict[str, Tuple[str, Union[str, type]]]
+
+class LoadReport:
+    """Outcome of one bulk load"""
+
+    def __init__(self, class_name: str):
+        self.class_name = class_name
+        self.rows = 0  # records read
+        self.created = 0  # instances stored
+        self.skipped = 0  # records rejected (on_error='skip')
+        self.batches = 0
+        self.links: Dict[str, int] = {}  # { rel_id: links created }
+        self.errors: List[Tuple[int, str]] = []  # (row number, message), the first 100
+        self.ignored_fields: Set[str] = set()  # record fields that are not attributes of the class
+        self.seconds = 0.0
+
+    @property
+    def rows_per_second(self) -> float:
+        return self.rows / self.seconds if self.seconds else 0.0
+
+    def summary(self) -> Dict[str, Any]:
+        return {
+            'class': self.class_name,
+            'rows': self.rows,
+            'created': self.created,
+            'skipped': self.skipped,
+            'batches': self.batches,
+            'links': dict(self.links),
+            'ignored_fields': sorted(self.ignored_fields),
+            'seconds': self.seconds,
+            'rows_per_second': self.rows_per_second,
+        }
+
+    def __repr__(self):
+        return (f"<LoadReport {self.class_name}: {self.created}/{self.rows} rows in {self.seconds:.3f} s "
+                f"({self.rows_per_second:.0f} rows/s), {self.skipped} skipped>")
+
+    def _error(self, row: int, message: str):
+        self.skipped += 1
+        if len(self.errors) < 100:
+            self.errors.append((row, message))
+
+def bulk_load(model_class: type, source: Union[str, Iterable[Record]], format: Optional[str] = None,
+              id_field: str = 'id', links: Optional[Links] = None, batch_size: int = 10000,
+              on_error: str = 'raise', ctx: Optional[RuntimeContext] = None,
+              progress: Optional[Callable[[LoadReport], None]] = None) -> LoadReport:
+    """Create many instances of a model class from a file or an iterable of records.
+
+    source is a path (.csv, .json holding an array of objects, or
+    .jsonl/.ndjson with one object per line; format overrides the suffix)
+    or any iterable of dicts. Records are streamed, never read whole.
+    Fields named like the class's attributes are converted to the
+    attribute's type (CSV values arrive as text); id_field gives the
+    instance id (a uuid when missing). links maps a relationship to the
+    field holding the related instance's id, e.g.
+    {'R2': ('ui', 'UserInterface')}.
+
+    Instances are built without running the class's __init__: no per-row
+    set_attr, register/create call, state machine validation or log line.
+    Each batch of batch_size instances is added to the store at once under
+    the context lock, and the relationships are linked in one pass after
+    the last batch, so records may refer to instances loaded later in the
+    same file. A bad record raises ValueError, or with on_error='skip' is
+    counted in the report and left out.
+    """
+    if active_unit.uow is not None:
+        raise RuntimeError("bulk_load cannot run inside a unit of work")
+    if on_error not in ('raise', 'skip'):
+        raise ValueError(f"on_error must be 'raise' or 'skip', not {on_error!r}")
+    ctx = ctx or current_context()
+    class_name = model_class.__name__
+    report = LoadReport(class_name)
+    started = time.perf_counter()
+    collecting = gc.isenabled()
+    gc.disable()  # the loader only allocates; collections would rescan the growing store over and over
+    try:
+        with ctx:
+            records = iter_records(source, format) if isinstance(source, (str, os.PathLike)) else source
+            pending_links = _load_batches(model_class, records, id_field, links or {}, batch_size, on_error,
+                                          ctx, report, progress)
+            for rel_id, (related, pairs) in pending_links.items():
+                report.links[rel_id] = _link_pending(ctx, rel_id, related, pairs, on_error, report)
+    finally:
+        if collecting:
+            gc.enable()
+    report.seconds = time.perf_counter() - started
+    print(f"[BULK] Loaded {report.created} {class_name} in {report.seconds:.3f} s "
+          f"({report.rows_per_second:.0f} rows/s, {report.skipped} skipped)")
+    return report
+
+def _load_batches(model_class: type, records: Iterable[Record], id_field: str, links: Links, batch_size: int,
+                  on_error: str, ctx: RuntimeContext, report: LoadReport,
+                  progress: Optional[Callable[[LoadReport], None]]) -> Dict[str, Tuple[str, List[Tuple[int, Any, Any]]]]:
+    """Build and store instances batch by batch; returns the links still to make"""
+    class_name = model_class.__name__
+    extent = ctx.store.setdefault(class_name, {})
+    defaults = model_class._declared_attrs()
+    slots = set(model_class._REF_SLOTS.values())
+    converters = {name: _converter(value) for name, value in defaults.items() if name not in slots}
+    link_fields = {field: rel_id for rel_id, (field, _) in links.items()}
+    pending_links = {rel_id: (related if isinstance(related, str) else related.__name__, [])
+                     for rel_id, (_, related) in links.items()}
+    model = getattr(model_class, '_SM', None)
+    state_attr = model.state_attr if model is not None else None
+    plans: Dict[Tuple[str, ...], Tuple[List[Tuple[str, Callable]], List[Tuple[str, List]]]] = {}
+    new = object.__new__
+    declared_attrs = model_class._declared_attrs
+    kl = model_class.kl
+    batch: Dict[str, Any] = {}
+
+    for row, record in enumerate(records, 1):
+        report.rows = row
+        try:
+            # Records from one file share their fields: work out what to do with them once
+            fields = tuple(record)
+            plan = plans.get(fields)
+            if plan is None:
+                plan = plans[fields] = (
+                    [(field, converters[field]) for field in fields if field in converters],
+                    [(field, pending_links[link_fields[field]][1]) for field in fields if field in link_fields],
+                )
+                report.ignored_fields.update(f for f in fields if f not in converters and f not in link_fields and f != id_field)
+            convert_fields, link_targets = plan
+            id = record.get(id_field)
+            id = str(id) if id not in (None, '') else str(uuid.uuid4())
+            if id in extent or id in batch:
+                raise ValueError(f"duplicate id {id}")
+            attrs = declared_attrs()
+            for field, convert in convert_fields:
+                attrs[field] = convert(record[field], attrs[field])
+            for field, pairs in link_targets:
+                value = record[field]
+                if value not in (None, ''):
+                    pairs.append((row, id, str(value)))
+            inst = new(model_class)
+            inst._id = id
+            inst.kl = kl
+            inst._attrs = attrs
+            inst._ctx = ctx
+            inst._seq = ctx.instance_seq = ctx.instance_seq + 1
+            if model is not None:
+                state = attrs.get(state_attr) if state_attr else None
+                index = model.state_index.get(state) if state else 0
+                if index is None:
+                    raise ValueError(f"unknown state {state!r}")
+                inst.sm = StateMachine.attach(inst, model, index)
+        except (ValueError, TypeError) as e:
+            if on_error == 'raise':
+                raise ValueError(f"{class_name} row {row}: {e}") from e
+            report._error(row, str(e))
+            continue
+        batch[id] = inst
+        if len(batch) >= batch_size:
+            _store_batch(ctx, class_name, extent, batch, report, progress)
+            batch = {}
+    if batch:
+        _store_batch(ctx, class_name, extent, batch, report, progress)
+    return pending_links
+
+def _store_batch(ctx: RuntimeContext, class_name: str, extent: Dict[str, Any], batch: Dict[str, Any],
+                 report: LoadReport, progress: Optional[Callable[[LoadReport], None]]):
+    """Add one batch to the store, as one commit"""
+    columns = ctx.columns.get(class_name)
+    with ctx.lock:
+        if ctx.snapshots:
+            ctx.preserve_extent(class_name)
+        if columns is not None:
+            names = list(columns.arrays)
+            for inst in batch.values():
+                inst._columns = columns
+                columns.allocate(inst)
+                attrs = inst._attrs
+                for name in names:
+                    if name in attrs:
+                        columns.set(inst, name, attrs.pop(name))
+        extent.update(batch)
+        held = ChangeFeed.hold()
+        try:
+            for inst in batch.values():
+                if inst._watch_lifecycle:
+                    ChangeFeed.instance_created(class_name, inst)
+        finally:
+            if held:
+                ChangeFeed.release()
+        ctx.version += 1
+    ChangeFeed.deliver()
+    report.created += len(batch)
+    report.batches += 1
+    if progress is not None:
+        progress(report)
+
+def _link_pending(ctx: RuntimeContext, rel_id: str, related: str, pairs: List[Tuple[int, Any, Any]],
+                  on_error: str, report: LoadReport) -> int:
+    """Resolve the collected ids and link them across rel_id in one pass"""
+    extent = ctx.store[report.class_name]
+    targets = ctx.store.get(related, {})
+    resolved = []
+    for row, id, target_id in pairs:
+        inst = extent.get(id)
+        target = targets.get(target_id)
+        if inst is None:
+            continue  # the record itself was skipped
+        if target is None:
+            message = f"{rel_id}: no {related} {target_id}"
+            if on_error == 'raise':
+                raise ValueError(f"{report.class_name} row {row}: {message}")
+            report._error(row, message)
+            continue
+        resolved.append((inst, target))
+    with ctx.lock:
+        created = relate_many(rel_id, resolved)
+        ctx.version += 1
+    return created
+
+# --- Attribute conversion ---
+
+def _converter(default: Any) -> Callable[[Any, Any], Any]:
+    """Conversion of a record value to the type of an attribute's initial value"""
+    if isinstance(default, bool):
+        return _to_bool
+    if isinstance(default, int):
+        return _to_int
+    if isinstance(default, float):
+        return _to_float
+    if isinstance(default, str):
+        return _to_str
+    return _as_is
+
+def _to_bool(value: Any, default: Any) -> Any:
+    if isinstance(value, str):
+        text = value.strip().lower()
+        return default if not text else text in ('1', 'true', 'yes', 'y', 't')
+    return default if value is None else bool(value)
+
+def _to_int(value: Any, default: Any) -> Any:
+    if isinstance(value, str):
+        text = value.strip()
+        if not text:
+            return default
+        try:
+            return int(text)
+        except ValueError:
+            number = float(text)
+            if not number.is_integer():
+                raise ValueError(f"{value!r} is not an integer")
+            return int(number)
+    return default if value is None else int(value)
+
+def _to_float(value: Any, default: Any) -> Any:
+    if isinstance(value, str):
+        text = value.strip()
+        return float(text) if text else default
+    return default if value is None else float(value)
+
+def _to_str(value: Any, default: Any) -> Any:
+    return default if value is None else value if isinstance(value, str) else str(value)
+
+def _as_is(value: Any, default: Any) -> Any:
+    return value
+
+# --- Record sources ---
+
+def iter_records(path: Union[str, os.PathLike], format: Optional[str] = None) -> Iterator[Record]:
+    """Stream records from a CSV, JSON array or JSON-lines file"""
+    fmt = (format or os.path.splitext(os.fspath(path))[1].lstrip('.')).lower()
+    if fmt == 'csv':
+        with open(path, newline='') as f:
+            reader = csv.reader(f)
+            header = next(reader, None)
+            for values in reader:
+                if values:  # short rows leave the missing fields out, as if absent from the record
+                    yield dict(zip(header, values))
+    elif fmt in ('jsonl', 'ndjson'):
+        with open(path) as f:
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
+    elif fmt == 'json':
+        with open(path) as f:
+            yield from _iter_json_array(f)
+    else:
+        raise ValueError(f"Unknown record format '{fmt}' for {path} (expected csv, json or jsonl)")
+
+_WHITESPACE = re.compile(r'[ \\t\\n\\r]*')
+
+def _iter_json_array(f: IO[str], chunk_size: int = 1 << 16) -> Iterator[Record]:
+    """Yield the elements of a top-level JSON array, reading the file a chunk at a time"""
+    decoder = json.JSONDecoder()
+    buf = f.read(chunk_size)
+    pos = _WHITESPACE.match(buf).end()
+    if buf[pos:pos + 1] != '[':
+        raise ValueError("expected a JSON array of objects")
+    pos += 1
+    expect = 'first'  # 'first' (a record or ']'), 'record', or 'next' (',' or ']')
+    eof = False
+    while True:
+        pos = _WHITESPACE.match(buf, pos).end()
+        if pos == len(buf):
+            if eof:
+                raise ValueError("unterminated JSON array")
+            buf, pos = f.read(chunk_size), 0
+            eof = not buf
+            continue
+        char = buf[pos]
+        if char == ']' and expect != 'record':
+            return
+        if expect == 'next':
+            if char != ',':
+                raise ValueError(f"expected ',' or ']' in JSON array, found {buf[pos:pos + 20]!r}")
+            pos += 1
+            expect = 'record'
+            continue
+        try:
+            record, end = decoder.raw_decode(buf, pos)
+        except ValueError:
+            more = '' if eof else f.read(chunk_size)
+            if not more:
+                raise
+            buf, pos = buf[pos:] + more, 0  # the record spans the chunk boundary
+            continue
+        yield record
+        pos = end
+        expect = 'next'
+`;
+
+  // [KOMPONEN: Memory-Mapped Catalog]
+  files["runtime/catalog.py"] = `# runtime/catalog.py
+from __future__ import annotations
+import json
+import mmap
+import os
+import struct
+import threading
+import time
+import weakref
+import zlib
+from collections.abc import Mapping
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+from runtime.context import RuntimeContext, current_context, quiesced
+
+MAGIC = b'XTCATLG1'
+# magic, generation, rows, record size, layout offset, layout length (the layout is JSON at the end of the file)
+_HEADER = struct.Struct('<8sQQIQQ')
+_DATA_OFFSET = 64
+_SLOT = struct.Struct('<I')  # index slot: row + 1, or 0 when empty
+# attribute type -> field type; strings are stored as fixed-width UTF-8, sized to the longest value
+_FIELD_TYPES = {bool: '?', int: 'q', float: 'd', str: 's'}
+_COLUMN_TYPES = ('q', 'd')  # writable columns: 8-byte integers or reals
+
+def write_catalog(path: str, model_class: type, records: Iterable[Any], writable: Sequence[str] = (),
+                  indexes: Sequence[str] = (), keep_writable: bool = False) -> int:
+    """Publish a read-only catalog of a model class to path; returns its generation.
+
+    records are instances of the class or dicts of attribute values with an
+    'id'. Every declared attribute is stored in a fixed-width record; the
+    writable ones (numeric, e.g. stock) go to a separate column file that
+    processes may update. indexes names string attributes to build on-disk
+    hash indexes for (the id is always indexed). With keep_writable the
+    writable values of ids already in the catalog at path are carried over,
+    so a refreshed price list does not reset stock.
+
+    The new catalog is written beside path and renamed over it, so readers
+    see either the old or the new file, never a partial one.
+    """
+    class_name = model_class.__name__
+    slots = set(model_class._REF_SLOTS.values())
+    declared = {name: value for name, value in model_class._declared_attrs().items() if name not in slots}
+    fields: List[Tuple[str, str]] = [('_id', 's')]
+    for name, value in declared.items():
+        kind = _FIELD_TYPES.get(type(value))
+        if kind is None:
+            raise ValueError(f"{class_name}.{name} cannot be stored in a catalog ({type(value).__name__})")
+        fields.append((name, kind))
+    for name in writable:
+        if name not in declared or _FIELD_TYPES[type(declared[name])] not in _COLUMN_TYPES:
+            raise ValueError(f"{class_name}.{name} is not a numeric attribute and cannot be writable")
+    for name in indexes:
+        if name not in declared or not isinstance(declared[name], str):
+            raise ValueError(f"{class_name}.{name} is not a string attribute and cannot be indexed")
+
+    from runtime.bulk import _converter
+    converters = {name: _converter(value) for name, value in declared.items()}
+    rows: List[List[Any]] = []
+    for record in records:
+        if isinstance(record, Mapping):
+            values = [str(record['id'])]
+            values.extend(converters[name](record.get(name), default) for name, default in declared.items())
+        else:
+            values = [record._id]
+            values.extend(record._stored_attr(name) for name in declared)
+        rows.append(values)
+
+    generation = time.time_ns()
+    previous = _read_header(path)[1] if os.path.exists(path) else None
+    carried: Dict[str, List[Any]] = {}
+    if keep_writable and previous is not None and writable:
+        old = Catalog(path, model_class)
+        try:
+            for values in rows:
+                row = old._row_of('_id', values[0])
+                if row is not None:
+                    carried[values[0]] = [old._value(row, name) for name in writable]
+        finally:
+            old.close()
+
+    # Fixed-width record layout
+    columns = {name: n for n, (name, _) in enumerate(fields)}
+    layout_fields = []
+    formats = []
+    offset = 0
+    for name, kind in fields:
+        n = columns[name]
+        if kind == 's':
+            size = max([len(str(values[n]).encode()) for values in rows] + [1])
+            formats.append(f'{size}s')
+        else:
+            size = struct.calcsize('<' + kind)
+            formats.append(kind)
+        layout_fields.append({'name': name, 'type': kind, 'size': size, 'offset': offset})
+        offset += size
+    record = struct.Struct('<' + ''.join(formats))
+    record_size = record.size
+    data = bytearray(record_size * len(rows))
+    for row, values in enumerate(rows):
+        record.pack_into(data, row * record_size,
+                         *(str(v).encode() if kind == 's' else v for v, (_, kind) in zip(values, fields)))
+
+    # Open-addressing hash indexes over the raw field bytes
+    index_layout = {}
+    index_data = []
+    position = _DATA_OFFSET + len(data)
+    for name in ['_id'] + [name for name in indexes if name != '_id']:
+        size = 8
+        while size < 2 * len(rows):
+            size *= 2
+        table = bytearray(size * _SLOT.size)
+        n = columns[name]
+        for row, values in enumerate(rows):
+            key = str(values[n]).encode()
+            slot = zlib.crc32(key) & (size - 1)
+            while True:
+                entry = _SLOT.unpack_from(table, slot * _SLOT.size)[0]
+                if entry == 0:
+                    _SLOT.pack_into(table, slot * _SLOT.size, row + 1)
+                    break
+                if str(rows[entry - 1][n]).encode() == key:
+                    if name == '_id':
+                        raise ValueError(f"duplicate id {values[n]}")
+                    break  # select any: the first row with the key answers
+                slot = (slot + 1) & (size - 1)
+        position += -position % 8
+        index_layout[name] = [position, size]
+        index_data.append((position, table))
+        position += len(table)
+    layout = json.dumps({
+        'class': class_name,
+        'fields': layout_fields,
+        'writable': [[name, _FIELD_TYPES[type(declared[name])]] for name in writable],
+        'indexes': index_layout,
+    }).encode()
+
+    # Writable columns live in their own file, named after the generation that owns them
+    column_data = bytearray(8 * len(writable) * len(rows))
+    for k, name in enumerate(writable):
+        kind = _FIELD_TYPES[type(declared[name])]
+        view = memoryview(column_data)[8 * k * len(rows):8 * (k + 1) * len(rows)].cast(kind)
+        n = columns[name]
+        for row, values in enumerate(rows):
+            kept = carried.get(values[0])
+            view[row] = kept[k] if kept is not None else values[n]
+        view.release()
+    _write_file(_column_path(path, generation), column_data)
+
+    tmp = f"{path}.{generation:x}.tmp"
+    with open(tmp, 'wb') as f:
+        f.write(_HEADER.pack(MAGIC, generation, len(rows), record_size, position, len(layout)))
+        f.write(bytes(_DATA_OFFSET - _HEADER.size))
+        f.write(data)
+        for at, table in index_data:
+            f.write(bytes(at - f.tell()))
+            f.write(table)
+        f.write(layout)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+    if previous is not None and os.path.exists(_column_path(path, previous)):
+        os.unlink(_column_path(path, previous))  # processes still mapping it keep their pages until they refresh
+    print(f"[CATALOG] Published {len(rows)} {class_name} to {path} (generation {generation:x})")
+    return generation
+
+def _write_file(path: str, data: bytes):
+    with open(path, 'wb') as f:
+        f.write(data)
+        f.flush()
+        os.fsync(f.fileno())
+
+def _column_path(path: str, generation: int) -> str:
+    return f"{path}.{generation:x}.rw"
+
+def _read_header(path: str) -> Tuple[Any, ...]:
+    with open(path, 'rb') as f:
+        header = _HEADER.unpack(f.read(_HEADER.size))
+    if header[0] != MAGIC:
+        raise ValueError(f"{path} is not a catalog file")
+    return header
+
+class _Generation:
+    """One mapped catalog file and its writable columns"""
+
+    def __init__(self, path: str, shared_writes: bool):
+        with open(path, 'rb') as f:
+            self.mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        _, self.generation, self.rows, self.record_size, layout_offset, layout_len = _HEADER.unpack_from(self.mm, 0)
+        layout = json.loads(self.mm[layout_offset:layout_offset + layout_len])
+        # { attribute: (offset in record, unpack_from, is text) }
+        self.fields = {f['name']: (f['offset'], struct.Struct(f"<{f['size']}s" if f['type'] == 's' else '<' + f['type']).unpack_from,
+                                   f['type'] == 's') for f in layout['fields']}
+        self.indexes: Dict[str, Tuple[int, int]] = {name: tuple(spec) for name, spec in layout['indexes'].items()}
+        self.columns: Dict[str, memoryview] = {}
+        self.rw: Optional[mmap.mmap] = None
+        writable = layout['writable']
+        if writable and self.rows:
+            with open(_column_path(path, self.generation), 'r+b' if shared_writes else 'rb') as f:
+                self.rw = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_WRITE if shared_writes else mmap.ACCESS_COPY)
+            view = memoryview(self.rw)
+            for k, (name, kind) in enumerate(writable):
+                self.columns[name] = view[8 * k * self.rows:8 * (k + 1) * self.rows].cast(kind)
+            view.release()
+        else:
+            self.columns = {name: memoryview(bytearray()).cast(kind) for name, kind in writable}
+        # Where each attribute is read from: its writable column, else its record field
+        self.arrays: Dict[str, Any] = {name: self.columns.get(name, spec) for name, spec in self.fields.items() if name != '_id'}
+
+    def close(self):
+        for column in self.columns.values():
+            column.release()
+        if self.rw is not None:
+            self.rw.close()
+        self.mm.close()
+
+class Catalog:
+    """Instances of a read-mostly class served from a memory-mapped catalog file.
+
+    The file (see write_catalog) is mapped read-only, so every process that
+    opens it shares one copy of the records in the page cache instead of
+    holding its own instances. Instances are built on first access and kept
+    only while referenced; their attributes are read from the mapping
+    through the same hook ColumnStore uses. find() and find_by() on
+    indexed attributes probe the file's hash indexes.
+
+    Writable columns (e.g. stock) are private to the process by default
+    (copy-on-write pages) and survive refresh(); with shared_writes=True
+    they are mapped shared, so every process sees every write. Shared
+    writes are plain stores: concurrent updates of one value from several
+    processes are not serialized. Other attributes are read-only, and
+    instances cannot be created or deleted.
+    """
+
+    def __init__(self, path: str, model_class: type, ctx: Optional[RuntimeContext] = None, shared_writes: bool = False):
+        if getattr(model_class, '_SM', None) is not None:
+            raise ValueError(f"{model_class.__name__} has a state machine and cannot be served from a catalog")
+        self.path = path
+        self.model_class = model_class
+        self.class_name = model_class.__name__
+        self.ctx = ctx or current_context()
+        self.shared_writes = shared_writes
+        self._map = _Generation(path, shared_writes)
+        self.arrays = self._map.arrays
+        self._instances: 'weakref.WeakValueDictionary[str, Any]' = weakref.WeakValueDictionary()
+        self._written: Dict[str, Dict[str, Any]] = {}  # { id: {column: value} } private writes, replayed by refresh
+        self._lock = threading.Lock()  # one instance per id, even when two threads ask at once
+
+    def __repr__(self):
+        return f"<Catalog {self.class_name}: {len(self)} rows from {self.path}>"
+
+    def __len__(self) -> int:
+        return self._map.rows
+
+    @property
+    def generation(self) -> int:
+        return self._map.generation
+
+    # --- Attribute access, called by InstanceBase through _columns ---
+
+    def get(self, inst: Any, name: str) -> Any:
+        row = inst._row
+        if row is None:
+            return None
+        where = self.arrays[name]
+        if type(where) is not tuple:
+            return where[row]
+        offset, unpack, text = where
+        m = self._map
+        value = unpack(m.mm, _DATA_OFFSET + row * m.record_size + offset)[0]
+        return value.rstrip(b'\\0').decode() if text else value
+
+    def set(self, inst: Any, name: str, value: Any):
+        column = self._map.columns.get(name)
+        if column is None:
+            raise RuntimeError(f"{self.class_name}.{name} is read-only (served from the catalog {self.path})")
+        value = column[inst._row] = float(value) if column.format == 'd' else int(value)
+        if not self.shared_writes:
+            self._written.setdefault(inst._id, {})[name] = value
+
+    def release(self, inst: Any):
+        raise RuntimeError(f"{self.class_name} instances come from the read-only catalog {self.path}")
+
+    # --- Lookups ---
+
+    def find(self, id: Any) -> Optional[Any]:
+        inst = self._instances.get(id)
+        if inst is not None:
+            return inst
+        row = self._row_of('_id', id)
+        return self._instance(row, id) if row is not None else None
+
+    def find_by(self, name: str, value: Any) -> Optional[Any]:
+        """An instance whose attribute equals value (the index answers for indexed attributes)"""
+        if name in self._map.indexes:
+            row = self._row_of(name, value)
+            return self.instance(row) if row is not None else None
+        for row in range(self._map.rows):
+            if self._value(row, name) == value:
+                return self.instance(row)
+        return None
+
+    def instance(self, row: int) -> Any:
+        id = self._value(row, '_id')
+        inst = self._instances.get(id)
+        return inst if inst is not None else self._instance(row, id)
+
+    def instances(self) -> Iterator[Any]:
+        for row in range(self._map.rows):
+            yield self.instance(row)
+
+    def ids(self) -> Iterator[str]:
+        for row in range(self._map.rows):
+            yield self._value(row, '_id')
+
+    def materialized(self) -> int:
+        """Instances currently held in memory"""
+        return len(self._instances)
+
+    def mapped_bytes(self) -> int:
+        """Size of the mapped catalog and column files"""
+        m = self._map
+        return len(m.mm) + (len(m.rw) if m.rw is not None else 0)
+
+    def _instance(self, row: int, id: str) -> Any:
+        with self._lock:
+            inst = self._instances.get(id)
+            if inst is None:
+                cls = self.model_class
+                inst = object.__new__(cls)
+                inst._id = id
+                inst.kl = cls.kl
+                inst._attrs = {slot: None for slot in cls._REF_SLOTS.values()}
+                inst._ctx = self.ctx
+                inst._columns = self
+                inst._row = row
+                self._instances[id] = inst
+        return inst
+
+    def _value(self, row: int, name: str) -> Any:
+        m = self._map
+        column = m.columns.get(name)
+        if column is not None:
+            return column[row]
+        offset, unpack, text = m.fields[name]
+        value = unpack(m.mm, _DATA_OFFSET + row * m.record_size + offset)[0]
+        return value.rstrip(b'\\0').decode() if text else value
+
+    def _row_of(self, name: str, value: Any, m: Optional[_Generation] = None) -> Optional[int]:
+        """Probe the hash index on name; None if no row holds value"""
+        if not isinstance(value, str):
+            return None
+        m = m or self._map
+        at, size = m.indexes[name]
+        offset, unpack, _ = m.fields[name]
+        key = value.encode()
+        slot = zlib.crc32(key) & (size - 1)
+        while True:
+            entry = _SLOT.unpack_from(m.mm, at + slot * _SLOT.size)[0]
+            if entry == 0:
+                return None
+            if unpack(m.mm, _DATA_OFFSET + (entry - 1) * m.record_size + offset)[0].rstrip(b'\\0') == key:
+                return entry - 1
+            slot = (slot + 1) & (size - 1)
+
+    # --- Refresh ---
+
+    def refresh(self) -> bool:
+        """Switch to a newer catalog published at path; returns whether there was one.
+
+        Instances in memory keep their identity (and so their links) and
+        are repointed to their rows in the new file; those whose id is no
+        longer in it keep their last values, detached. Private writes are
+        applied again to the new columns. The old file is unmapped, so the
+        swap waits for the context's steps in flight; reads from other
+        threads outside a step must not overlap it.
+        """
+        if _read_header(self.path)[1] == self._map.generation:
+            return False
+        new = _Generation(self.path, self.shared_writes)
+        ctx = self.ctx
+        with quiesced([ctx]), ctx.lock, self._lock:
+            instances = list(self._instances.values())
+            if ctx.snapshots:
+                for inst in instances:
+                    ctx.preserve_attrs(inst)
+            for inst in instances:
+                row = self._row_of('_id', inst._id, new)
+                if row is None:
+                    for name in self.arrays:
+                        inst._attrs[name] = self.get(inst, name)
+                    inst._columns = None
+                    inst._row = None
+                    del self._instances[inst._id]
+                else:
+                    inst._row = row
+            written = self._written
+            self._written = {}
+            old = self._map
+            self._map = new
+            self.arrays = new.arrays
+            for id, values in written.items():
+                row = self._row_of('_id', id, new)
+                if row is not None:
+                    for name, value in values.items():
+                        column = new.columns.get(name)
+                        if column is not None:
+                            column[row] = value
+                            self._written.setdefault(id, {})[name] = value
+            old.close()
+            ctx.version += 1
+        print(f"[CATALOG] {self.class_name} refreshed from {self.path} "
+              f"(generation {old.generation:x} -> {new.generation:x}, {new.rows} rows)")
+        return True
+
+    def close(self):
+        """Unmap the file; instances still in memory keep their last values"""
+        with self._lock:
+            for inst in list(self._instances.values()):
+                for name in self.arrays:
+                    inst._attrs[name] = self.get(inst, name)
+                inst._columns = None
+                inst._row = None
+            self._instances.clear()
+        self._map.close()
+
+class CatalogExtent(Mapping):
+    """Extent of a catalog-backed class in a context's store: {id: instance}, read-only"""
+
+    def __init__(self, catalog: Catalog):
+        self.catalog = catalog
+
+    def __getitem__(self, id: str) -> Any:
+        inst = self.catalog.find(id)
+        if inst is None:
+            raise KeyError(id)
+        return inst
+
+    def get(self, id: str, default: Any = None) -> Any:
+        inst = self.catalog.find(id)
+        return default if inst is None else inst
+
+    def __contains__(self, id: Any) -> bool:
+        return self.catalog.find(id) is not None
+
+    def __iter__(self) -> Iterator[str]:
+        return self.catalog.ids()
+
+    def __len__(self) -> int:
+        return len(self.catalog)
+
+    def values(self) -> Iterator[Any]:
+        return self.catalog.instances()
+
+    def items(self) -> Iterator[Tuple[str, Any]]:
+        return ((inst._id, inst) for inst in self.catalog.instances())
+
+    def _read_only(self, *args, **kwargs):
+        raise RuntimeError(f"{self.catalog.class_name} instances come from the read-only catalog {self.catalog.path}")
+
+    __setitem__ = __delitem__ = update = pop = setdefault = _read_only
+`;
+
+  // [KOMPONEN: Instance Paging]
+  files["runtime/paging.py"] = `# runtime/paging.py
+from __future__ import annotations
+import json
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+from runtime.context import RuntimeContext, current_context, quiesced
+from runtime.unit_of_work import active_unit
+from runtime.state_machine import StateMachine
+
+_PLAIN = (str, int, float, bool, type(None))  # attribute values a page can hold
+
+class Pager:
+    """Evicts quiescent instances to a local on-disk store and faults them back in on use.
+
+    An evicted instance stays in the store as a stub with the same identity
+    (so its links and references stay valid) but without its attribute
+    dict and state machine, which are written to an SQLite file. Touching
+    the stub's attributes or state machine, find() and events sent to it
+    (dispatch_event, broadcasts with a transition for its state, timers)
+    bring them back transparently.
+
+    maintain() applies the policy: with idle_seconds, instances without a
+    transition for that long are evicted; with max_resident, the least
+    recently active are evicted until at most that many are in memory.
+    Activity is seen from state machine history, so the dispatch path pays
+    nothing. Only quiescent instances are evicted: no timer armed for them,
+    plain attribute values and, if states is given, in one of those states.
+    Eviction waits for the steps in flight in the pager's context to commit
+    and holds new ones back while it writes pages, so it can be called from
+    any thread that is not itself inside a step.
+    """
+
+    def __init__(self, path: Optional[str] = None, ctx: Optional[RuntimeContext] = None,
+                 classes: Optional[Iterable[type]] = None, max_resident: Optional[int] = None,
+                 idle_seconds: Optional[float] = None, states: Optional[Sequence[str]] = None):
+        self.ctx = ctx or current_context()
+        self._owns_file = path is None
+        if path is None:
+            fd, path = tempfile.mkstemp(prefix='pages-', suffix='.db')
+            os.close(fd)
+        self.path = path
+        self.classes = list(classes) if classes is not None else None  # None: every class with a state machine
+        self.max_resident = max_resident
+        self.idle_seconds = idle_seconds
+        self.states = set(states) if states is not None else None
+        self.evictions = 0
+        self.faults = 0
+        self.paged = 0  # instances currently evicted
+        self._seen: Dict[Any, Tuple[int, float]] = {}  # { resident instance: (history length, last active) }
+        self._lock = threading.RLock()  # faults can come from any thread
+        self._db = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._db.execute('PRAGMA journal_mode=WAL')
+        self._db.execute('PRAGMA synchronous=OFF')  # pages only need to outlive the process's memory, not a crash
+        self._db.execute('CREATE TABLE IF NOT EXISTS pages (class TEXT, id TEXT, page TEXT, PRIMARY KEY (class, id))')
+
+    def __repr__(self):
+        return f"<Pager {self.path}: {self.paged} paged, {self.evictions} evictions, {self.faults} faults>"
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            'paged': self.paged,
+            'resident': len(self._seen),
+            'evictions': self.evictions,
+            'faults': self.faults,
+            'file_bytes': sum(os.path.getsize(self.path + suffix) for suffix in ('', '-wal')
+                              if os.path.exists(self.path + suffix)),
+        }
+
+    # --- Policy ---
+
+    def maintain(self) -> int:
+        """Apply the eviction policy once; returns the number of instances evicted"""
+        if self.idle_seconds is None and self.max_resident is None:
+            return 0
+        now = time.monotonic()
+        seen: Dict[Any, Tuple[int, float]] = {}
+        for inst in self._resident():
+            sm = inst.__dict__.get('sm')
+            length = len(sm._history) if sm is not None else 0
+            last = self._seen.get(inst)
+            seen[inst] = last if last is not None and last[0] == length else (length, now)
+        self._seen = seen
+        by_age = sorted(seen, key=lambda inst: seen[inst][1])
+        victims = []
+        if self.idle_seconds is not None:
+            victims = [inst for inst in by_age if now - seen[inst][1] >= self.idle_seconds]
+        if self.max_resident is not None and len(by_age) - len(victims) > self.max_resident:
+            chosen = set(victims)
+            excess = len(by_age) - len(victims) - self.max_resident
+            victims.extend([inst for inst in by_age if inst not in chosen][:excess])
+        return self.evict(victims)
+
+    def _resident(self) -> List[Any]:
+        ctx = self.ctx
+        if self.classes is not None:
+            names = [cls.__name__ for cls in self.classes]
+        else:
+            names = [name for name, extent in ctx.store.items() if extent and _has_machine(next(iter(extent.values())))]
+        return [inst for name in names for inst in ctx.store.get(name, {}).values() if inst._pager is None]
+
+    # --- Eviction ---
+
+    def evict(self, instances: Iterable[Any]) -> int:
+        """Write the quiescent ones among instances to disk and drop them from memory; returns how many"""
+        if active_unit.uow is not None:
+            raise RuntimeError("Pager.evict cannot run inside a unit of work")
+        ctx = self.ctx
+        with quiesced([ctx]), ctx.lock, self._lock:  # no step can hold an instance half-changed meanwhile
+            armed = {timer.instance for timer in list(ctx.timers.values()) if getattr(timer, 'instance', None) is not None}
+            pages = []
+            evicted = []
+            for inst in instances:
+                page = self._page(inst, armed)
+                if page is not None:
+                    pages.append((type(inst).__name__, inst._id, json.dumps(page)))
+                    evicted.append(inst)
+            if not pages:
+                return 0
+            with self._db:
+                self._db.execute('BEGIN')
+                self._db.executemany('INSERT OR REPLACE INTO pages VALUES (?, ?, ?)', pages)
+            for inst in evicted:
+                if ctx.snapshots:
+                    ctx.preserve_attrs(inst)
+                state = inst.__dict__.pop('sm', None)
+                if state is not None:
+                    inst._paged_state = state.index  # lets broadcasts skip it when its state ignores the event
+                del inst._attrs
+                inst._pager = self
+                self._seen.pop(inst, None)
+            self.evictions += len(evicted)
+            self.paged += len(evicted)
+        return len(evicted)
+
+    def _page(self, inst: Any, armed: set) -> Optional[Dict[str, Any]]:
+        """What is written for an evictable instance, or None if it is not quiescent"""
+        if inst._pager is not None or inst._columns is not None or inst in armed or inst._ctx is not self.ctx:
+            return None
+        slots = inst._REF_SLOTS
+        refs = set(slots.values())
+        attrs = {}
+        for name, value in inst._attrs.items():
+            if name in refs:
+                continue  # rebuilt from the links when faulted in
+            if type(value) not in _PLAIN:
+                return None
+            attrs[name] = value
+        page: Dict[str, Any] = {'attrs': attrs}
+        sm = inst.__dict__.get('sm')
+        if sm is not None:
+            if self.states is not None and sm.model.states[sm.index] not in self.states:
+                return None
+            page['state'] = sm.index
+            page['history'] = sm._history
+        return page
+
+    # --- Faults ---
+
+    def fault_in(self, inst: Any) -> bool:
+        """Bring an evicted instance back into memory; False if it was resident"""
+        with self._lock:
+            if inst.__dict__.get('_pager') is not self:
+                return False
+            row = self._db.execute('SELECT page FROM pages WHERE class = ? AND id = ?',
+                                   (type(inst).__name__, inst._id)).fetchone()
+            if row is None:
+                raise RuntimeError(f"Page of {inst.kl}:{inst._id} is missing from {self.path}")
+            page = json.loads(row[0])
+            attrs = page['attrs']
+            ctx = inst._ctx
+            for rel_id, slot in inst._REF_SLOTS.items():
+                related = ctx.partners.get(rel_id, {}).get(inst)
+                attrs[slot] = related[0] if related else None
+            if 'state' in page:
+                sm = StateMachine.attach(inst, type(inst)._SM, page['state'])
+                sm._history = [sm.model.step(*step) for step in page['history']]
+                inst.sm = sm
+            inst._attrs = attrs
+            inst.__dict__.pop('_paged_state', None)
+            del inst._pager  # back to the class default: resident
+            self._seen[inst] = (len(page.get('history', ())), time.monotonic())
+            self.faults += 1
+            self.paged -= 1
+        return True
+
+    def fault_all(self) -> int:
+        """Bring every instance evicted by this pager back; returns how many"""
+        count = 0
+        for extent in list(self.ctx.store.values()):
+            for inst in list(extent.values()):
+                if inst.__dict__.get('_pager') is self:
+                    count += self.fault_in(inst)
+        return count
+
+    def close(self):
+        """Fault everything back in and close the store (deleting it if the pager created it)"""
+        self.fault_all()
+        self._db.close()
+        if self._owns_file:
+            for suffix in ('', '-wal', '-shm'):
+                if os.path.exists(self.path + suffix):
+                    os.unlink(self.path + suffix)
+
+def _has_machine(inst: Any) -> bool:
+    return getattr(type(inst), '_SM', None) is not None
 `;
 
   return files;
@@ -714,8 +5221,38 @@ def clear_relationships(rel_id: Optional[str] = None):
 
 // --- CLASS FILE GENERATION ---
 
-function genClassFile(cls, model) {
+// [KOMPONEN: Referential slots] relationship ends that navigate to at most one instance.
+// An end is single-valued when its multiplicity has no "star" or when the class
+// declares a referential attribute formalizing the relationship; that attribute
+// is used as the slot, otherwise one named R<n>_<otherClass> is added.
+function referentialSlots(cls, model) {
+  const classes = model.classes || [];
+  const sameRef = (ref, c) => ref !== undefined && ref !== null && [c.id, c.name, c.kl].map(String).includes(String(ref));
+  const slots = [];
+  for (const rel of model.relationships || []) {
+    if (rel.isGeneralization || rel.needsAssociationClass || !rel.rel_id) continue;
+    const isFrom = sameRef(rel.from_class, cls);
+    const isTo = sameRef(rel.to_class, cls);
+    if (isFrom === isTo) continue; // unrelated, or reflexive (no single end to pick)
+    const mult = String((isFrom ? rel.from_class_multiplicity : rel.to_class_multiplicity) || "");
+    const other = classes.find((c) => sameRef(isFrom ? rel.to_class : rel.from_class, c));
+    // External entities are bridges, never instances that links are made to
+    if (cls.isExternal || (other && other.isExternal)) continue;
+    const declared = (cls.attributes || []).find((a) => a.type === "referential_attribute" && a.relationshipId === rel.rel_id);
+    if (declared) {
+      slots.push({ relId: rel.rel_id, name: declared.name, declared: true });
+    } else if (other && mult && !/star|\*/.test(mult)) {
+      const otherName = other.name.replace(/\W/g, "");
+      const name = `${rel.rel_id}_${otherName.charAt(0).toLowerCase()}${otherName.slice(1)}`;
+      slots.push({ relId: rel.rel_id, name, declared: false, dataType: `inst_ref<${otherName}>` });
+    }
+  }
+  return slots;
+}
+
+function genClassFile(cls, model, profile = "optimized") {
   const className = cls.name.replace(/\W/g, "");
+  const scope = emissionScope(model, className, profile);
   const allClasses = model.classes || [];
   const associationClasses = model.associationClasses || [];
   const generalizations = model.generalizations || [];
@@ -728,9 +5265,13 @@ function genClassFile(cls, model) {
   lines.push("import uuid");
   lines.push("from typing import Any, Dict, List, Optional, TYPE_CHECKING");
   lines.push("from runtime.base import InstanceBase, RuntimeServices, EventInstance");
-  lines.push("from runtime.state_machine import StateMachine");
+  lines.push("from runtime.state_machine import StateMachine, StateModel, EventPayload, NO_PAYLOAD");
   lines.push("from runtime.storage import ObjectStore");
   lines.push("from runtime.relationship import relate, unrelate, select_related, select_one_related");
+  lines.push("from runtime.tracing import Tracer");
+  if (cls.isExternal) {
+    lines.push("from runtime.bridge import BridgeAdapter");
+  }
   if (baseClassName !== "InstanceBase") {
     lines.push(`from models.${baseClassName} import ${baseClassName}`);
   }
@@ -778,8 +5319,60 @@ function genClassFile(cls, model) {
   lines.push(`class ${className}(${baseClassName}):`);
   lines.push(`    """xtUML Class: ${cls.name} (${cls.kl})"""`);
   lines.push(`    kl = "${cls.kl}"`);
+
+  // [KOMPONEN: Columnar numeric attributes] dtypes for ObjectStore.enable_columns
+  const numericDtypes = { integer: "int64", real: "float64" };
+  const numericAttrs = (cls.attributes || []).filter((a) => numericDtypes[String(a.dataType || "").toLowerCase()]);
+  if (numericAttrs.length > 0) {
+    const entries = numericAttrs.map((a) => `'${a.name}': '${numericDtypes[String(a.dataType).toLowerCase()]}'`);
+    lines.push(`    _NUMERIC_ATTRS = {${entries.join(", ")}}`);
+  }
+  const refSlots = referentialSlots(cls, model);
+  const addedSlots = refSlots.filter((r) => !r.declared);
+  if (refSlots.length > 0) {
+    const entries = refSlots.map((r) => `'${r.relId}': '${r.name}'`);
+    const inherited = baseClassName !== "InstanceBase" ? `**${baseClassName}._REF_SLOTS, ` : "";
+    lines.push(`    _REF_SLOTS = {${inherited}${entries.join(", ")}}`);
+  }
   lines.push("");
 
+  // [KOMPONEN: State Machine Encoding] integer states/events, shared by the dispatch table
+  let smStates = [];
+  let smEvents = [];
+  if (cls.stateMachine) {
+    const addUnique = (list, name) => {
+      if (name && !list.includes(name)) list.push(name);
+    };
+    addUnique(smStates, cls.stateMachine.initialState);
+    (cls.stateMachine.states || []).forEach((st) => addUnique(smStates, st.name));
+    transitions.forEach((t) => {
+      addUnique(smStates, t.from);
+      addUnique(smStates, t.from?.split("_")[0]);
+      addUnique(smStates, t.to);
+      addUnique(smEvents, t.event);
+    });
+    lines.push("    # State and event encoding for the dense transition table");
+    smStates.forEach((st, i) => lines.push(`    ${smStateConst(st)} = ${i}`));
+    smEvents.forEach((ev, i) => lines.push(`    ${smEventConst(ev)} = ${i}`));
+    lines.push("");
+
+    // [KOMPONEN: Event Parameter Layouts] one slotted EventPayload per event that carries data
+    const eventParams = eventParameters(cls, model);
+    const slotTuple = (names) => (names.length === 1 ? `('${names[0]}',)` : `(${names.map((n) => `'${n}'`).join(", ")})`);
+    for (const ev of smEvents) {
+      const layout = eventParams.get(ev);
+      if (!layout) continue;
+      const evtId = (model.events || []).find((e) => e.event_name === ev && String(e.class_id) === String(cls.id))?.event_id;
+      lines.push(`    class P_${ev.replace(/\W/g, "_")}(EventPayload):`);
+      lines.push(`        """Parameters of ${evtId ? `${evtId}:` : ""}${ev}"""`);
+      lines.push(`        __slots__ = _FIELDS = ${slotTuple(layout.map((p) => p.name))}`);
+      lines.push("");
+      lines.push(`        def __init__(self, ${layout.map((p) => `${p.name}: ${p.pythonType || "Any"} = ${p.default || "None"}`).join(", ")}):`);
+      layout.forEach((p) => lines.push(`            self.${p.name} = ${p.name}`));
+      lines.push("");
+    }
+  }
+
   // Constructor with typed attributes
   lines.push("    def __init__(self, id: Optional[str] = None):");
   lines.push("        if id is None:");
@@ -796,12 +5389,24 @@ function genClassFile(cls, model) {
     const defaultVal = getDefaultValue(a.dataType, a.defaultValue);
     lines.push(`        self.set_attr('${a.name}', ${defaultVal})  # ${a.dataType || "any"}`);
   }
+  for (const r of addedSlots) {
+    lines.push(`        self.set_attr('${r.name}', None)  # ${r.dataType} (${r.relId})`);
+  }
 
   lines.push(`        ObjectStore.register("${className}")`);
   lines.push(`        ObjectStore.create("${className}", self._id, self)`);
   if (cls.stateMachine) lines.push("        self._build_state_machine()");
   lines.push("");
 
+  // [KOMPONEN: Attribute layout] declared attributes, used to migrate live instances on reload
+  lines.push("    @staticmethod");
+  lines.push("    def _declared_attrs() -> Dict[str, Any]:");
+  lines.push('        """Attributes declared on this class with fresh initial values"""');
+  const declared = (cls.attributes || []).map((a) => `'${a.name}': ${getDefaultValue(a.dataType, a.defaultValue)}`);
+  addedSlots.forEach((r) => declared.push(`'${r.name}': None`));
+  lines.push(`        return {${declared.join(", ")}}`);
+  lines.push("");
+
   // [KOMPONEN: Operations] with typed parameters
   for (const op of cls.operations || []) {
     const signature = op.signature || op.name || String(op);
@@ -819,6 +5424,7 @@ function genClassFile(cls, model) {
     lines.push(`    def ${opName}(${paramSig}):`);
     lines.push(`        """Operation: ${signature}"""`);
     lines.push(`        print(f"[{self.kl}:{self._id}] OPERATION: ${opName}")`);
+    lines.push(`        if Tracer.enabled: Tracer.instant(f"{self.kl}.${opName}", 'operation', {'id': self._id})`);
 
     // Add parameters to kwargs for OAL param.xxx access
     for (const p of params) {
@@ -827,7 +5433,7 @@ function genClassFile(cls, model) {
 
     if (op.action) {
       // [KOMPONEN: OAL for Non-State Actions]
-      const pyOpCode = OAL_TO_PYTHON_SIMULATION(op.action, cls.kl, "self._id", "OPERATION", "        ", eventStateMap);
+      const pyOpCode = OAL_TO_PYTHON_SIMULATION(op.action, cls.kl, "self._id", "OPERATION", "        ", eventStateMap, scope);
       lines.push(pyOpCode);
     } else {
       lines.push("        pass");
@@ -864,7 +5470,7 @@ function genClassFile(cls, model) {
         }
 
         // Translate OAL
-        const pyActionCode = OAL_TO_PYTHON_SIMULATION(t.actionOAL, cls.kl, "owner._id", "STATE_ACTION", "        ", eventStateMap);
+        const pyActionCode = OAL_TO_PYTHON_SIMULATION(t.actionOAL, cls.kl, "owner._id", "STATE_ACTION", "        ", eventStateMap, scope);
         lines.push(pyActionCode);
         lines.push("");
       } else {
@@ -887,22 +5493,30 @@ function genClassFile(cls, model) {
       }
     }
 
-    // Build transition table
-    lines.push("    def _build_sm_table(self) -> Dict:");
-    lines.push('        """Build state machine transition table"""');
-    lines.push("        table: Dict = {}");
-
+    // Build the dense transition table: one row per state, one column per event
+    const cells = smStates.map(() => smEvents.map(() => "None"));
     for (const t of tableTransitions) {
-      const actionRef = t.actionOAL && t.actionMethodName ? `self.${t.actionMethodName}` : "None";
-      lines.push(`        table.setdefault('${t.from}', {})['${t.event}'] = (None, ${actionRef}, '${t.to}')`);
+      const actionRef = t.actionOAL && t.actionMethodName ? t.actionMethodName : "None";
+      const nextRef = t.to ? smStateConst(t.to) : "None";
+      cells[smStates.indexOf(t.from)][smEvents.indexOf(t.event)] = `(None, ${actionRef}, ${nextRef})`;
     }
-    lines.push("        return table");
+    const pyTuple = (items) => (items.length === 1 ? `(${items[0]},)` : `(${items.join(", ")})`);
+    lines.push("    _SM = StateModel(");
+    lines.push(`        states=${pyTuple(smStates.map((st) => `'${st}'`))},`);
+    lines.push(`        events=${pyTuple(smEvents.map((ev) => `'${ev}'`))},`);
+    lines.push("        table=(");
+    smStates.forEach((st, i) => {
+      lines.push(`            # ${st}`);
+      lines.push(`            ${pyTuple(cells[i])},`);
+    });
+    lines.push("        ),");
+    lines.push("    )");
     lines.push("");
 
     lines.push("    def _build_state_machine(self):");
     lines.push(`        \"\"\"Initialize state machine\"\"\"`);
     lines.push(`        initial_state = self.get_attr('currentState') or '${cls.stateMachine.initialState || ""}'`);
-    lines.push(`        self.sm = StateMachine(self, initial_state, self._build_sm_table())`);
+    lines.push(`        self.sm = StateMachine(self, initial_state, self._SM)`);
     lines.push("");
 
     // Helper method to dispatch events with parameters
@@ -912,6 +5526,27 @@ function genClassFile(cls, model) {
     lines.push("            return self.sm.dispatch(event_name, payload)");
     lines.push("        return False");
     lines.push("");
+
+    // Typed senders: no keyword dict, and the parameters go in the event's (pooled) layout
+    const senderParams = eventParameters(cls, model);
+    for (const ev of smEvents) {
+      const name = ev.replace(/\W/g, "_");
+      const layout = senderParams.get(ev);
+      if (!layout) {
+        lines.push(`    def send_${name}(self) -> bool:`);
+        lines.push(`        """Dispatch ${ev} to this instance's state machine"""`);
+        lines.push(`        return self.sm.dispatch_index(self.${smEventConst(ev)}, NO_PAYLOAD)`);
+        lines.push("");
+        continue;
+      }
+      lines.push(`    def send_${name}(self, ${layout.map((p) => `${p.name}: ${p.pythonType || "Any"} = ${p.default || "None"}`).join(", ")}) -> bool:`);
+      lines.push(`        """Dispatch ${ev} to this instance's state machine"""`);
+      lines.push(`        payload = self.P_${name}.acquire(${layout.map((p) => p.name).join(", ")})`);
+      lines.push(`        handled = self.sm.dispatch_index(self.${smEventConst(ev)}, payload)`);
+      lines.push("        payload.release()");
+      lines.push("        return handled");
+      lines.push("");
+    }
   }
 
   // [KOMPONEN: Bridges / External Entities]
@@ -934,23 +5569,38 @@ function genClassFile(cls, model) {
       lines.push(`    def ${opName}(${paramSig}):`);
       lines.push(`        \"\"\"Bridge operation: ${signature}\"\"\"`);
       lines.push(`        print(f"[BRIDGE] ${cls.kl}::${opName} called")`);
-      lines.push(`        # TODO: Implement external service integration`);
-      lines.push(`        pass`);
+      const bridgeParams = params.map((p) => `'${p.name}': ${p.name}`);
+      lines.push(`        return BridgeAdapter.call("${cls.kl}", "${opName}", {${[...bridgeParams, "**kwargs"].join(", ")}})`);
       lines.push("");
     }
   }
 
+  // [KOMPONEN: Hoisted Imports] classes the optimized actions call directly. Imported
+  // after the class body: by the time another model module imports this one back,
+  // the class it needs is already defined.
+  if (scope.imports.size > 0) {
+    lines.push("# Model classes used by the actions above");
+    for (const name of [...scope.imports].sort()) {
+      lines.push(`from models.${name} import ${name}`);
+    }
+    lines.push("");
+  }
+
   return lines.join("\n");
 }
 
-export function generateModelFiles(model) {
+export function generateModelFiles(model, options = {}) {
+  const profile = options.profile || "optimized";
+  if (!EMISSION_PROFILES.includes(profile)) {
+    throw new Error(`Unknown emission profile "${profile}" (expected one of: ${EMISSION_PROFILES.join(", ")})`);
+  }
   const files = {};
   Object.assign(files, generateRuntimeFiles(model.relationships, model.associationClasses || []));
 
   // Generate model classes
   for (const c of model.classes || []) {
     const fname = `models/${(c.name || "Class").replace(/\W/g, "")}.py`;
-    files[fname] = genClassFile(c, model);
+    files[fname] = genClassFile(c, model, profile);
   }
 
   // Generate association classes for many-to-many relationships
@@ -962,12 +5612,14 @@ export function generateModelFiles(model) {
   // [KOMPONEN: Functions]
   if (model.functions && model.functions.length > 0) {
     const funcLines = [];
+    const funcScope = emissionScope(model, null, profile);
     funcLines.push(`# functions.py`);
     funcLines.push(`from __future__ import annotations`);
     funcLines.push(`from typing import Any, Dict, Optional`);
     funcLines.push(`from runtime.base import RuntimeServices`);
+    funcLines.push(`from runtime.state_machine import NO_PAYLOAD`);
     funcLines.push(`from runtime.storage import ObjectStore`);
-    funcLines.push(`from runtime.relationship import relate, unrelate, select_related`);
+    funcLines.push(`from runtime.relationship import relate, unrelate, select_related, select_one_related`);
     funcLines.push(``);
 
     for (const func of model.functions) {
@@ -979,13 +5631,15 @@ export function generateModelFiles(model) {
       funcLines.push(`    """OAL Function: ${funcName}"""`);
       funcLines.push(`    print(f"[FUNCTION] Executing ${funcName}")`);
       if (func.action) {
-        const pyFuncCode = OAL_TO_PYTHON_SIMULATION(func.action, "Global", "None", "FUNCTION", "    ");
+        const pyFuncCode = OAL_TO_PYTHON_SIMULATION(func.action, "Global", "None", "FUNCTION", "    ", {}, funcScope);
         funcLines.push(pyFuncCode);
       } else {
         funcLines.push(`    pass`);
       }
       funcLines.push(``);
     }
+    const funcImports = [...funcScope.imports].sort().map((name) => `from models.${name} import ${name}`);
+    funcLines.splice(funcLines.indexOf(``), 0, ...funcImports);
     files["functions.py"] = funcLines.join("\n");
   }
 
@@ -99,6 +99,17 @@ function lintOalAction(actionText, path, context, errors) {
     if (/^\w+\.\w+\(.*\)\s*;?$/i.test(line)) return;
     if (/^\w+\(.*\)\s*;?$/i.test(line)) return;
 
+    // Atomic counter update (translator extension): atomic assign p.attr = p.attr +/- amount;
+    const atomicMatch = line.match(/^atomic\s+assign\s+(\w+\.\w+)\s*=\s*(\w+\.\w+)\s*[+-]\s*.+;$/i);
+    if (atomicMatch) {
+      if (atomicMatch[1] !== atomicMatch[2]) add(`Atomic assign must update '${atomicMatch[1]}' from itself`, "Gunakan bentuk: atomic assign p.attr = p.attr - 1;", lineNo);
+      return;
+    }
+    if (/^atomic\b/i.test(line)) {
+      add(`Unsupported atomic statement: '${line}'`, "Gunakan bentuk: atomic assign p.attr = p.attr - 1;", lineNo);
+      return;
+    }
+
     // Assignments
     if (/^(assign\s+)?[^=]+\s*=\s*.+;$/i.test(line)) return;
 
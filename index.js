@@ -33,7 +33,7 @@ function setPythonContent(text) {
 }
 
 function combineFilesOrdered(files) {
-  const orderPriority = ["runtime/base.py", "runtime/state_machine.py", "runtime/storage.py", "runtime/relationship.py", "app.py"];
+  const orderPriority = ["runtime/context.py", "runtime/snapshot.py", "runtime/tracing.py", "runtime/unit_of_work.py", "runtime/changefeed.py", "runtime/base.py", "runtime/state_machine.py", "runtime/columnar.py", "runtime/catalog.py", "runtime/storage.py", "runtime/relationship.py", "runtime/bulk.py", "runtime/paging.py", "runtime/broadcast.py", "runtime/bridge.py", "runtime/bridge_server.py", "runtime/event_server.py", "runtime/reload.py", "runtime/memory.py", "app.py"];
 
   const runtimeFiles = [];
   const modelFiles = [];